@@ -1,73 +1,137 @@
 # Quadica Production Layout App V2.0 - 2024 Chris Warris
 
+import argparse
 import tkinter as tk
-import pandas as pd
 import svgwrite
 import os
-import csv
 import logging
+import multiprocessing
 import requests
 import socket
-import logging
 import time
-import win32gui
-import win32con
-import win32process
 import psutil
-
+import sqlite3
+import copy
+
+try:
+    import win32gui
+    import win32con
+    import win32process
+except ImportError:
+    # pywin32 is only available on the Windows stations; headless tools run without it
+    win32gui = win32con = win32process = None
+
+from collections import OrderedDict
 from dataclasses import dataclass
-from datetime import datetime
 from PIL import Image, ImageTk
-from functools import lru_cache
 from tkinter import ttk, messagebox
-from io import StringIO
 from typing import List, Dict, Any, Optional, Tuple
 
+import layout_engine
+import layout_profiler
+from layout_engine import PCBInstance, ProductionData, layout_logging, layout_metrics
+
 WORKING_DIRECTORY = r"Q:/Shared drives/Quadica/Custom Software/Quadica Production Layout App/Text Position Data"
 pcb_url = "https://docs.google.com/spreadsheets/d/1h8EJrRsPvCfTVxdSzLcAE-ID2eZ-scdMx913gR_Z1ZU/export?format=csv&gid=0"
 program_settings = "https://docs.google.com/spreadsheets/d/1h8EJrRsPvCfTVxdSzLcAE-ID2eZ-scdMx913gR_Z1ZU/export?format=csv&gid=852408781"
 PRODUCTION_FILE_PATH = r"Q:/Shared drives/Quadica/Production/production list.csv"
-
-@dataclass
-class ProductionData:
-    product_name: str
-    pcb_type: str
-    batch_id: str
-    order_number: str
-    led_codes: List[str]
-    lens_code: Optional[str]
-    connector_code: Optional[str]
-
-@dataclass
-class PCBInstance:
-    data: List[ProductionData]
-    faulty_modules: List[bool]
-    rows: int
-    columns: int
-
-    def __init__(self, modules_count, rows, columns):
-        self.data = []
-        self.faulty_modules = [False] * modules_count
-        self.rows = rows
-        self.columns = columns
-
-    def clear_data(self):
-        self.data = []
-
-    def reset_faulty_modules(self):
-        self.faulty_modules = [False] * len(self.faulty_modules)
-
-    def clear_all(self):
-        self.clear_data()
-        self.reset_faulty_modules()
-
-    def is_row_faulty(self, row):
-        start = row * self.columns
-        end = start + self.columns
-        return all(self.faulty_modules[start:end])
-
-    def is_column_faulty(self, col):
-        return all(self.faulty_modules[i] for i in range(col, len(self.faulty_modules), self.columns))
+EXPORT_DIRECTORY = r"Q:\Shared drives\Quadica\Production\Layout App Print Files\UV Laser Engrave Files"
+LIGHTBURN_EXECUTABLE = r"C:\Program Files\LightBurn\LightBurn.exe"
+
+# Logging: JSON lines, written off the UI thread, rotated and gzip-compressed
+LOG_FILE = "pcb_viewer.log"
+LOG_LEVEL = logging.INFO
+LOG_LEVELS = {
+    layout_logging.LIGHTBURN: logging.INFO,  # DEBUG traces every UDP command
+    layout_logging.CONFIG: logging.INFO,  # DEBUG dumps the program settings
+}
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 10
+
+lightburn_log = logging.getLogger(layout_logging.LIGHTBURN)
+config_log = logging.getLogger(layout_logging.CONFIG)
+data_log = logging.getLogger(layout_logging.DATA)
+ui_log = logging.getLogger(layout_logging.UI)
+export_log = logging.getLogger(layout_logging.EXPORT)
+
+# On-demand profiling (F9 toggles a capture; reports are written next to the log file)
+PROFILE_HOTKEY = "<F9>"
+PROFILE_SECONDS = 60  # stop a hotkey capture after this many seconds...
+PROFILE_ACTIONS = 20  # ...or after this many operator actions, whichever comes first
+
+# Stage timing export; leave both unset to keep instrumentation switched off
+METRICS_FILE = None  # e.g. r"C:\Quadica\layout_app.prom"
+METRICS_PORT = None  # e.g. 9464 for http://127.0.0.1:9464/metrics
+METRICS_INTERVAL = 60  # seconds between metrics file writes
+
+# Optional SQLite production store; when set, the production list and added modules are kept there
+PRODUCTION_DB = None  # e.g. r"C:\Quadica\production.sqlite"
+
+# Local cache of exported frets, an absolute path on the station's own drive; identical frets are linked or
+# copied from it instead of rendered again. None disables the cache.
+EXPORT_CACHE_DIRECTORY = None  # e.g. r"C:\Quadica\export_cache"
+EXPORT_CACHE_MAX_MB = 500
+EXPORT_CACHE_MAX_DAYS = 30
+
+# Frets per PCB type rendered into the export cache in the background, at low priority, once the production
+# list is loaded and whenever the selected type's frets change; Export and Batch Export then only link the
+# file into place. Starts a worker process, which on Windows loads this script again. Needs the export
+# cache; SVG exports only. 0 renders at export only.
+PREFETCH_FRETS = 0  # e.g. 20
+
+# Write each fret's texts in the order that shortens laser head travel instead of module by module
+OPTIMIZE_TRAVEL = False
+
+# Glyph library to write texts as outlines instead of Roboto Thin text; build it from the font with
+#   python -m layout_engine.build_glyphs Roboto-Thin.ttf -o glyphs/roboto-thin.json
+OUTLINE_GLYPHS = None  # e.g. "glyphs/roboto-thin.json"
+
+# Write each distinct code once as an SVG symbol placed with <use>, positions rounded to 0.001 mm;
+# much smaller files for large arrays. Check the LightBurn version in use imports <use> before enabling.
+COMPACT_SVG = False
+
+# Write LightBurn projects (.lbrn2) instead of SVGs, from <pcb type>.lbrn2 or default.lbrn2 in this folder:
+# projects saved in LightBurn with the layer settings and one text shape reading {code}. "" uses a built-in
+# single-layer template, None writes SVGs.
+LIGHTBURN_TEMPLATES = None  # e.g. "lightburn_templates"
+
+# Fixture definition (JSON, see layout_engine/nesting.py) holding several frets in the work area; Batch
+# Export nests the frets of the PCB types it takes into one file per fixture load. None: one fret per file.
+NEST_FIXTURE = None  # e.g. "fixtures/sz-quad.json"
+
+# Batch Export writes one bundle file per batch, every fret in its own group (SVG) or layer (LightBurn
+# project) with a table of contents next to it, loaded into LightBurn once; the operator steps through
+# the frets inside it. Ignored for PCB types nested in NEST_FIXTURE.
+BUNDLE_EXPORT = False
+
+# Engrave each module's Micro-ID dot code (quadica-micro-id-specs.md) at the layout's ID marker, with the
+# serial number the business system assigned it, from the production list's Serial column; modules without
+# one get no code. SVG exports only.
+MICRO_IDS = False
+
+# QR code URL templates (see layout_engine/qr.py), engraved at the layout's QR markers, error correction
+# level H like the WordPress plugin. Module codes take {serial} (from the production list's Serial column),
+# {batch_id}, {order_number}, {pcb_type} and {product_name}; fret codes {name} (the exported file's name),
+# {batch_id} and {pcb_type}. None engraves no QR codes. SVG exports only.
+QR_MODULE_URL = None  # e.g. "https://quadi.ca/m/{serial}"
+QR_FRET_URL = None  # e.g. "https://quadi.ca/f/{name}"
+
+# Frets exported in this session that Re-engrave offers
+REENGRAVE_HISTORY = 50
+
+# Journal of Batch Export jobs, offered for resuming after a crash, in this absolute directory; None disables it
+JOB_DIRECTORY = None  # e.g. r"C:\Quadica\layout_jobs"
+
+# Fret claims shared by several stations engraving one production list; unset for a single station
+CLAIMS_DB = None  # e.g. r"Q:/Shared drives/Quadica/Production/fret_claims.sqlite"
+STATION_NAME = socket.gethostname()
+CLAIM_LEASE_SECONDS = 15 * 60  # an unfinished fret is freed for other stations this long after the app stops renewing it
+
+# Engrave time estimates: per-laser profiles calibrated from the log of actual engraving times with
+#   python -m layout_engine.calibrate engrave_times.jsonl -p laser_profiles.json
+LASER_PROFILES = "laser_profiles.json"
+LASER_NAME = STATION_NAME
+ENGRAVE_TIME_LOG = None  # e.g. r"C:\Quadica\engrave_times.jsonl"; None logs no engraving times
 
 @dataclass
 class Monitor:
@@ -77,10 +141,10 @@ class Monitor:
     height: int
 
 class LightBurnController:
-    def __init__(self):
-        self.udp_ip = "127.0.0.1"
-        self.udp_out_port = 19840
-        self.udp_in_port = 19841
+    def __init__(self, udp_ip: str = "127.0.0.1", udp_out_port: int = 19840, udp_in_port: int = 19841):
+        self.udp_ip = udp_ip
+        self.udp_out_port = udp_out_port
+        self.udp_in_port = udp_in_port
         self.out_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.in_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         
@@ -88,11 +152,13 @@ class LightBurnController:
             self.in_sock.bind((self.udp_ip, self.udp_in_port))
             self.in_sock.settimeout(1.0)  # Set 1 second timeout
         except Exception as e:
-            logging.error(f"Failed to initialize LightBurn controller: {e}")
+            lightburn_log.error(f"Failed to initialize LightBurn controller: {e}")
 
     def _find_lightburn_windows(self) -> list:
         """Find all LightBurn-related window handles."""
         lightburn_windows = []
+        if win32gui is None:
+            return lightburn_windows
         
         def enum_window_callback(hwnd, _):
             if win32gui.IsWindowVisible(hwnd):
@@ -109,6 +175,7 @@ class LightBurnController:
         win32gui.EnumWindows(enum_window_callback, None)
         return lightburn_windows
 
+    @layout_metrics.timed("lightburn_close")
     def _force_close_windows(self) -> None:
         """Force close all LightBurn windows."""
         windows = self._find_lightburn_windows()
@@ -125,22 +192,26 @@ class LightBurnController:
                         process = psutil.Process(process_id)
                         process.terminate()
                     except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
-                        logging.warning(f"Failed to terminate LightBurn process: {e}")
+                        lightburn_log.warning(f"Failed to terminate LightBurn process: {e}")
             except Exception as e:
-                logging.error(f"Error closing LightBurn window: {e}")
+                lightburn_log.error(f"Error closing LightBurn window: {e}")
 
     def send_command(self, command: str) -> Tuple[bool, str]:
+        with layout_metrics.span("lightburn_command", command=command.split(':', 1)[0]):
+            return self._send_command(command)
+
+    def _send_command(self, command: str) -> Tuple[bool, str]:
         try:
             self.out_sock.sendto(command.encode(), (self.udp_ip, self.udp_out_port))
             data, addr = self.in_sock.recvfrom(1024)
             response = data.decode()
-            logging.debug(f"LightBurn command: {command}, Response: {response}")
+            lightburn_log.debug("LightBurn command: %s, Response: %s", command, response)
             return True, response
         except socket.timeout:
-            logging.debug(f"LightBurn command timeout: {command}")
+            lightburn_log.debug("LightBurn command timeout: %s", command)
             return False, "Timeout waiting for LightBurn response"
         except Exception as e:
-            logging.debug(f"LightBurn command error: {command}, Error: {str(e)}")
+            lightburn_log.debug("LightBurn command error: %s, Error: %s", command, e)
             return False, str(e)
 
     def ping(self) -> bool:
@@ -173,6 +244,12 @@ class PCBViewer:
 
     # Initialize the PCB Viewer application, set up the UI, and load initial data
     def __init__(self, root):
+        layout_logging.setup_logging(LOG_FILE, level=LOG_LEVEL, levels=LOG_LEVELS,
+                                     max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT)
+
+        if METRICS_FILE or METRICS_PORT:
+            layout_metrics.start(path=METRICS_FILE, port=METRICS_PORT, interval=METRICS_INTERVAL)
+
         self.root = root
         self.root.title("Quadica Production Layout App")
 
@@ -216,16 +293,42 @@ class PCBViewer:
         self.col_checkboxes = []
         self.unique_pcb_types = set()
         self.image_cache = {}
+        self.pcb_images = {}
         self.batch_id = "N/A"  # Initialize batch_id with a default value
         self.program_settings = self.load_program_settings()
         self.ir_leds = self.program_settings.get('ir_leds', [])
         self.available_pcbs = self.load_available_pcbs()
+        self.store = self.open_store()
+        self.claims = self.open_claims()
+        self.fret_claims = {}  # exported file path -> Claim awaiting "Engraving Finished"
+        self.jobs = self.open_jobs()
+        self.export_cache = None
+        if EXPORT_CACHE_DIRECTORY:
+            self.export_cache = layout_engine.ExportCache(EXPORT_CACHE_DIRECTORY, EXPORT_CACHE_MAX_MB * 1024 * 1024,
+                                                          EXPORT_CACHE_MAX_DAYS * 24 * 3600)
+        self.prefetcher = None
+        if self.export_cache and PREFETCH_FRETS and LIGHTBURN_TEMPLATES is None:
+            self.prefetcher = layout_engine.ExportPrefetcher(self.export_cache, WORKING_DIRECTORY)
+        self.estimator = self.open_estimator()
+        self.fret_works = {}  # exported file path -> FretWork, for logging the actual engrave time
+        self.engrave_loaded = {}  # exported file path -> time.monotonic() when loaded into LightBurn
+        self.engrave_started = {}  # exported file path -> time.monotonic() when the operator started the laser
+        self.exported_frets = OrderedDict()  # exported file path -> (PCB type, layout, copy of its instance)
+        self.reengrave = None  # fret, chosen slots and popup while Re-engrave is open
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.bind(PROFILE_HOTKEY, self.toggle_profile_capture)
+        layout_profiler.set_tags_provider(self.profile_tags)
         self.scale = 1.0  # Default self.scale
         self.root.bind("<Configure>", self.on_window_resize)
 
         # Add after initial screen setup but before setup_ui()
         self.lightburn = LightBurnController()
+        if self.claims:
+            self.root.after(CLAIM_LEASE_SECONDS * 1000 // 3, self.renew_claims)
+        if self.jobs and self.jobs.unfinished():
+            self.root.after_idle(self.offer_resume)
+        if self.export_cache:
+            self.root.after_idle(self.export_cache.evict)
 
         # Color scheme
         self.color_bg_main = '#7b90a4'
@@ -236,15 +339,9 @@ class PCBViewer:
         self.color_button_fg = 'white'
         self.color_button_active = '#b0d0e3'
         self.color_faulty = 'red'
+        self.color_selected = '#1f6fd1'
 
-        logging.basicConfig(level=logging.DEBUG, 
-                            format='%(asctime)s - %(levelname)s - %(message)s',
-                            handlers=[
-                                logging.FileHandler("pcb_viewer.log"),
-                                logging.StreamHandler()
-                            ])
-
-        logging.info("PCB Viewer initialized")
+        ui_log.info("PCB Viewer initialized")
 
         self.setup_ui()  # Set up the UI first
         
@@ -274,6 +371,7 @@ class PCBViewer:
         
         self.canvas = tk.Canvas(self.work_frame, bg=self.color_bg_work)
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.bind("<Button-1>", self.toggle_module_faulty)
         
         # Top bar elements
         self.pcb_var = tk.StringVar()
@@ -364,10 +462,21 @@ class PCBViewer:
                                         activeforeground=self.color_button_fg,
                                         font=('Arial', 16, 'bold'), pady=5)
         self.add_module_button.place(relx=0.45, rely=0.92, relwidth=0.1)
+
+        self.reengrave_button = tk.Button(self.root, text="Re-engrave", command=self.open_reengrave_popup,
+                                          bg=self.color_button_bg, fg=self.color_button_fg,
+                                          activebackground=self.color_button_active,
+                                          activeforeground=self.color_button_fg,
+                                          font=('Arial', 16, 'bold'), pady=5)
+        self.reengrave_button.place(relx=0.87, rely=0.92, relwidth=0.1)
         
         self.instance_label = tk.Label(self.root, text="", font=("Arial", 24),
                                     bg=self.color_bg_main, fg=self.color_text_muted)
         self.instance_label.place(relx=0.4, rely=0.86, relwidth=0.2)
+
+        self.eta_label = tk.Label(self.root, text="", font=("Arial", 14),
+                                  bg=self.color_bg_main, fg=self.color_text_muted)
+        self.eta_label.place(relx=0.6, rely=0.865, relwidth=0.25)
         
         self.add_module_button['state'] = 'disabled'
 
@@ -391,6 +500,9 @@ class PCBViewer:
         self.create_tooltip(self.add_module_button,
             "Add a new module to the current PCB layout")
 
+        self.create_tooltip(self.reengrave_button,
+            "Engrave only chosen modules of a fret exported earlier, in the same fixture position")
+
         self.create_tooltip(self.refresh_button, 
             "Reload production data from the CSV file and update the display")
 
@@ -469,10 +581,57 @@ class PCBViewer:
         widget.bind('<Enter>', on_enter)
         widget.bind('<Leave>', on_leave)
 
+    # Start or stop an on-demand profile capture
+    def toggle_profile_capture(self, event=None, seconds=PROFILE_SECONDS, actions=PROFILE_ACTIONS, trigger="hotkey"):
+        if layout_profiler.active():
+            layout_profiler.stop()
+            return
+
+        output_dir = os.path.dirname(os.path.abspath(LOG_FILE))
+        if layout_profiler.start(output_dir, seconds=seconds, actions=actions, schedule=self.root.after,
+                                 trigger=trigger, on_finished=self.on_profile_finished):
+            self.root.title("Quadica Production Layout App [profiling]")
+
+    def on_profile_finished(self, report_path):
+        self.root.title("Quadica Production Layout App")
+        if report_path:
+            messagebox.showinfo("Profile Captured", f"Profile report written to:\n{report_path}")
+
+    # Describe what the station is working on for profile reports
+    def profile_tags(self) -> Dict[str, Any]:
+        return {
+            'pcb_type': self.current_pcb_type,
+            'instance_count': len(self.pcb_instances),
+            'batch_id': self.batch_id,
+            'batch_size': len(self.production_data),
+            'modules_per_fret': len(self.pcb_data['Modules']) if self.pcb_data else 0,
+        }
+
     # Clear image cache on close
     def on_closing(self):
+        layout_profiler.stop()
         self.lightburn.cleanup()
         self.cleanup_cache()
+        if self.store:
+            self.store.close()
+        if self.claims:
+            # Frets exported but not engraved go back to the other stations straight away
+            try:
+                self.claims.release_station()
+            except sqlite3.Error as e:
+                data_log.error(f"Could not release fret claims: {str(e)}")
+            self.claims.close()
+        if self.jobs:
+            self.jobs.close()
+        if self.prefetcher:
+            self.prefetcher.close()
+            stats = self.prefetcher.stats()
+            export_log.info(f"Export prefetch: {stats['rendered']} frets rendered ahead, {stats['discarded']} "
+                            f"discarded after changes")
+        if self.export_cache:
+            export_log.info(f"Export cache: {self.export_cache.hits} hits, {self.export_cache.misses} misses")
+        layout_metrics.shutdown()
+        layout_logging.shutdown_logging()
         self.root.destroy()
 
     # Limit the cache sizes to prevent memory issues
@@ -480,6 +639,8 @@ class PCBViewer:
         max_cache_size = 20
         while len(self.image_cache) > max_cache_size:
             self.image_cache.pop(next(iter(self.image_cache)))
+        while len(self.pcb_images) > max_cache_size:
+            self.pcb_images.pop(next(iter(self.pcb_images)))
 
     @staticmethod
     def get_monitors() -> List[Monitor]:
@@ -491,7 +652,7 @@ class PCBViewer:
                 monitors.append(Monitor(m.x, m.y, m.width, m.height))
             return monitors
         except ImportError:
-            logging.warning("screeninfo module not found. Install with: pip install screeninfo")
+            ui_log.warning("screeninfo module not found. Install with: pip install screeninfo")
             # Return a single monitor based on root geometry as fallback
             return [Monitor(0, 0, tk.Tk().winfo_screenwidth(), tk.Tk().winfo_screenheight())]
 
@@ -501,41 +662,15 @@ class PCBViewer:
     
     # Retrieve program settings from Google Sheets
     def load_program_settings(self) -> Dict[str, Any]:
-
-        settings = {}
         try:
-            # Fetch data from Google Sheets
-            response = requests.get(program_settings)
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch program settings: {response.status_code}")
-
-            # Convert response content to StringIO for CSV reading
-            csv_content = StringIO(response.text)
-            csv_reader = csv.DictReader(csv_content)
-            
-            # Process each row in the settings
-            for row in csv_reader:
-                setting = row.get('setting', '').strip()
-                value = row.get('value', '').strip()
-                
-                # Special handling for IR LED list (check both possible names)
-                if setting in ['ir_leds', 'ir_leds_list']:
-                    # Split the comma-separated string into a list, strip whitespace, and convert to uppercase
-                    ir_leds = [led.strip().upper() for led in value.split(',') if led.strip()]
-                    settings['ir_leds'] = ir_leds
-                else:
-                    settings[setting] = value
-            
-            logging.info(f"Successfully loaded program settings: {settings}")
-            return settings
-                
+            return layout_engine.fetch_program_settings(program_settings)
         except requests.RequestException as e:
-            logging.error(f"Network error while fetching program settings: {str(e)}")
+            config_log.error(f"Network error while fetching program settings: {str(e)}")
             messagebox.showerror("Network Error", 
                             "Failed to fetch program settings from Google Sheets. Check your internet connection.")
             return {}
         except Exception as e:
-            logging.error(f"Error loading program settings: {str(e)}")
+            config_log.error(f"Error loading program settings: {str(e)}")
             messagebox.showerror("Error", 
                             f"An error occurred while loading program settings: {str(e)}")
             return {}
@@ -543,42 +678,14 @@ class PCBViewer:
     # Load master list of PCBs
     def load_available_pcbs(self):
         try:
-            # Fetch data from Google Sheets
-            response = requests.get(pcb_url)
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch data: {response.status_code}")
-
-            # Convert response content to StringIO for CSV reading
-            csv_content = StringIO(response.text)
-            pcb_data = {}
-            
-            # Read CSV content
-            csv_reader = csv.DictReader(csv_content)
-            for row in csv_reader:
-                pcb_name = row['pcb'].strip()
-                # Convert offset values, defaulting to 0 if empty or invalid
-                try:
-                    x_offset = float(row['x_offset']) if row['x_offset'] else 0
-                    y_offset = float(row['y_offset']) if row['y_offset'] else 0
-                except (ValueError, TypeError):
-                    x_offset = 0
-                    y_offset = 0
-                
-                pcb_data[pcb_name] = {
-                    'x_offset': x_offset,
-                    'y_offset': y_offset
-                }
-            
-            logging.info(f"Successfully loaded {len(pcb_data)} PCBs from Google Sheets")
-            return pcb_data
-            
+            return layout_engine.fetch_available_pcbs(pcb_url)
         except requests.RequestException as e:
-            logging.error(f"Network error while fetching PCB list: {str(e)}")
+            config_log.error(f"Network error while fetching PCB list: {str(e)}")
             messagebox.showerror("Network Error", 
                             "Failed to fetch PCB list from Google Sheets. Check your internet connection.")
             return {}
         except Exception as e:
-            logging.error(f"Error loading PCB list from Google Sheets: {str(e)}")
+            config_log.error(f"Error loading PCB list from Google Sheets: {str(e)}")
             messagebox.showerror("Error", 
                             f"An error occurred while loading PCB list: {str(e)}")
             return {}
@@ -586,137 +693,239 @@ class PCBViewer:
 
     ## 2.2 Production Data Processing
 
+    # Open the production store if one is configured; the app falls back to the CSV alone without it
+    def open_store(self) -> Optional[layout_engine.ProductionStore]:
+        if not PRODUCTION_DB:
+            return None
+        try:
+            return layout_engine.ProductionStore(PRODUCTION_DB)
+        except sqlite3.Error as e:
+            data_log.error(f"Error opening production store {PRODUCTION_DB}: {str(e)}")
+            messagebox.showwarning("Production Store", f"Could not open {PRODUCTION_DB}; using the CSV only.\n{str(e)}")
+            return None
+
+    # Open the shared fret claims if several stations are configured to work from one list
+    def open_claims(self) -> Optional[layout_engine.FretClaims]:
+        if not CLAIMS_DB:
+            return None
+        try:
+            return layout_engine.FretClaims(CLAIMS_DB, station=STATION_NAME, lease_seconds=CLAIM_LEASE_SECONDS)
+        except sqlite3.Error as e:
+            data_log.error(f"Error opening fret claims {CLAIMS_DB}: {str(e)}")
+            messagebox.showerror("Fret Claims", f"Could not open {CLAIMS_DB}; exports are disabled until the "
+                                 f"shared drive is available and the app is restarted.\n{str(e)}")
+            return None
+
+    # Keep this station's leases alive while frets wait for engraving
+    def renew_claims(self):
+        if self.fret_claims:
+            try:
+                self.claims.renew()
+            except sqlite3.Error as e:
+                data_log.error(f"Could not renew fret claims: {str(e)}")
+        self.root.after(CLAIM_LEASE_SECONDS * 1000 // 3, self.renew_claims)
+
+    # Claim the modules of a fret before exporting it. Modules another station has taken in the
+    # meantime are dropped from the fret; returns None if nothing is left or the claim failed.
+    def claim_fret(self, instance: PCBInstance) -> Optional[layout_engine.Claim]:
+        dropped = 0
+        while instance.data:
+            try:
+                claim = self.claims.claim(instance.data, instance.data[0].batch_id, self.current_pcb_type)
+                break
+            except layout_engine.ClaimConflict as e:
+                remaining = [data for data in instance.data if layout_engine.module_key(data) not in e.taken]
+                dropped += len(instance.data) - len(remaining)
+                instance.data = remaining
+            except sqlite3.Error as e:
+                data_log.error(f"Could not claim fret: {str(e)}")
+                messagebox.showerror("Fret Claims", f"Could not claim this fret: {str(e)}")
+                return None
+        else:
+            claim = None
+
+        if dropped:
+            data_log.info(f"Dropped {dropped} modules already taken by another station")
+            messagebox.showwarning("Fret Claims", f"{dropped} modules on this fret were already taken by "
+                                   "another station and have been removed from it.")
+        return claim
+
+    # Operator confirmed the engraving: close the file in LightBurn and complete the fret's claim
+    def finish_engraving(self, file_path: str):
+        self.lightburn.force_close()
+        self.journal_file(file_path, layout_engine.jobs.ENGRAVED)
+        self.complete_fret(file_path)
+
+    # Log an engraved fret's time and complete its claim; `file_path` may also be a bundle_ref
+    def complete_fret(self, file_path: str):
+        self.log_engrave_time(file_path)
+        claim = self.fret_claims.pop(file_path, None)
+        if claim:
+            try:
+                self.claims.complete(claim)
+            except sqlite3.Error as e:
+                data_log.error(f"Could not record completed fret {file_path}: {str(e)}")
+
+    # Engrave time estimator for this station's laser, uncalibrated defaults if it has no profile yet
+    def open_estimator(self) -> layout_engine.EngraveEstimator:
+        try:
+            profiles = layout_engine.load_profiles(LASER_PROFILES)
+        except (OSError, ValueError, TypeError) as e:
+            config_log.error(f"Error reading laser profiles {LASER_PROFILES}: {str(e)}")
+            profiles = {}
+        profile = profiles.get(LASER_NAME) or layout_engine.LaserProfile(LASER_NAME)
+        if not profile.samples:
+            config_log.info(f"No calibrated engrave time profile for {LASER_NAME}; estimates use defaults")
+        return layout_engine.EngraveEstimator(profile, optimize_travel=OPTIMIZE_TRAVEL, **self.code_options())
+
+    # A file is in LightBurn; the operator's handling time runs until they start the laser
+    def engraving_loaded(self, file_path: str):
+        self.engrave_loaded[file_path] = time.monotonic()
+        self.engrave_started.pop(file_path, None)
+
+    # The operator pressed "Laser Started"; the engraving time runs until they confirm it finished
+    def engraving_started(self, file_path: str):
+        self.engrave_started[file_path] = time.monotonic()
+
+    # Log the work, handling time and engraving time of a finished engraving for calibrating the
+    # estimates; engravings never marked as started are not logged, their time would include the handling
+    def log_engrave_time(self, file_path: str):
+        loaded = self.engrave_loaded.pop(file_path, None)
+        started = self.engrave_started.pop(file_path, None)
+        work = self.fret_works.pop(file_path, None)
+        if not ENGRAVE_TIME_LOG or started is None or work is None:
+            return
+        try:
+            layout_engine.log_engraving(ENGRAVE_TIME_LOG, LASER_NAME, os.path.basename(file_path), work,
+                                        time.monotonic() - started, None if loaded is None else started - loaded)
+        except OSError as e:
+            export_log.error(f"Could not log engrave time for {file_path}: {str(e)}")
+
+    # Estimated time left to engrave these exported files
+    def remaining_engrave_seconds(self, file_paths: List[str]) -> float:
+        return sum(self.estimator.profile.estimate(self.fret_works[file_path])
+                   for file_path in file_paths if file_path in self.fret_works)
+
+    # Open the Batch Export journal; without it batches are not resumable but still work
+    def open_jobs(self) -> Optional[layout_engine.JobQueue]:
+        if not JOB_DIRECTORY:
+            return None
+        try:
+            return layout_engine.JobQueue(JOB_DIRECTORY)
+        except OSError as e:
+            export_log.error(f"Error opening job journal in {JOB_DIRECTORY}: {str(e)}")
+            return None
+
+    # Journal a fret's progress; a journal failure never stops the engraving itself
+    def journal_fret(self, job, fret, state: str, file_path: Optional[str] = None,
+                     instance: Optional[PCBInstance] = None):
+        try:
+            self.jobs.advance(job, fret, state, file_path, instance)
+        except (OSError, layout_engine.JobStateError) as e:
+            export_log.error(f"Could not journal fret {fret.index} of job {job.job_id} as {state}: {str(e)}")
+
+    # Journal the LightBurn progress of a file exported by a Batch Export
+    def journal_file(self, file_path: str, state: str):
+        found = self.jobs.find_fret(file_path) if self.jobs else None
+        if found:
+            self.journal_fret(*found, state)
+
+    # Ask whether to continue a Batch Export that stopped before every fret was engraved
+    def offer_resume(self):
+        for job in self.jobs.unfinished():
+            counts = job.counts()
+            engraved = counts.get(layout_engine.jobs.ENGRAVED, 0)
+            if messagebox.askyesno("Resume Batch", f"A batch export of {job.pcb_type.upper()} (batch {job.batch_id}) "
+                                   f"stopped with {engraved} of {len(job.frets)} frets engraved.\n\n"
+                                   "Resume it now?"):
+                self.resume_job(job)
+                return
+            self.jobs.abandon(job)
+            export_log.info(f"Abandoned job {job.job_id} with {engraved} of {len(job.frets)} frets engraved")
+
+    # Re-export only the frets whose file is missing, then engrave every fret not yet engraved; both
+    # get the same bookkeeping as a fresh export
+    @layout_profiler.action
+    def resume_job(self, job):
+        start = time.perf_counter()
+        layout = None
+        file_paths = []
+        for fret in job.frets:
+            if fret.state in layout_engine.jobs.FINAL_STATES:
+                continue
+            instance = fret.instance(job.rows, job.columns)
+            if layout is None:
+                layout = self.load_pcb_data(job.pcb_type)
+                if layout is None:
+                    return
+                layout = layout_engine.apply_offsets(layout, job.pcb_type, self.available_pcbs)
+            if fret.state == layout_engine.jobs.PLANNED or not fret.file_intact():
+                file_name = os.path.basename(fret.file_path) if fret.file_path else fret.file_name
+                file_path = os.path.normpath(os.path.join(EXPORT_DIRECTORY, file_name))
+                try:
+                    os.makedirs(EXPORT_DIRECTORY, exist_ok=True)
+                    if LIGHTBURN_TEMPLATES is not None:
+                        self.write_project(job.pcb_type, layout, instance, file_path)
+                    elif self.export_cache:
+                        self.export_cache.export(layout, instance, file_path, **self.svg_options())
+                    else:
+                        layout_engine.write_svg(layout_engine.render_svg(layout, instance, file_path,
+                                                                         **self.svg_options()))
+                except Exception as e:
+                    messagebox.showerror("Error", f"Failed to re-export {fret.file_name}: {str(e)}")
+                    export_log.error(f"Failed to re-export {fret.file_name}: {str(e)}")
+                    return
+                self.journal_fret(job, fret, layout_engine.jobs.EXPORTED, file_path)
+                self.record_export(file_path, job.pcb_type, layout, instance)
+            else:
+                # Its slots were stored when it was first exported
+                self.record_export(fret.file_path, job.pcb_type, layout, instance, assigned=True)
+            if self.claims:
+                # Take the fret's modules back; skip it if another station has engraved them meanwhile
+                try:
+                    self.fret_claims[fret.file_path] = self.claims.claim(instance.data, job.batch_id, job.pcb_type)
+                except layout_engine.ClaimConflict:
+                    export_log.info(f"Skipping {fret.file_name}: taken by another station while this one was down")
+                    self.journal_fret(job, fret, layout_engine.jobs.SKIPPED)
+                    continue
+                except sqlite3.Error as e:
+                    messagebox.showerror("Fret Claims", f"Could not claim {fret.file_name}: {str(e)}")
+                    return
+            file_paths.append(fret.file_path)
+
+        export_log.info(f"Resumed job {job.job_id}: {len(file_paths)} frets to engrave, "
+                        f"prepared in {time.perf_counter() - start:.2f}s")
+        if file_paths:
+            self.process_batch_files(file_paths)
+
     # Load and parse production data from a CSV file
     def load_production_data(self, file_path: str) -> List[ProductionData]:
-        production_data = []
         try:
-            with open(file_path, 'r', newline='') as csvfile:
-                dialect = csv.Sniffer().sniff(csvfile.read(1024))
-                csvfile.seek(0)
-                csv_reader = csv.reader(csvfile, dialect)
-                
-                next(csv_reader, None)  # Skip header
-                
-                for row in csv_reader:
-                    if len(row) > 6:
-                        parsed_data = self.parse_production_row(row)
-                        if parsed_data:
-                            # Check for IR LEDs
-                            has_ir = any(led_code in self.ir_leds for led_code in parsed_data.led_codes)
-                            
-                            # Parse product name more carefully
-                            parts = parsed_data.product_name.split('-')
-                            if len(parts) >= 2:
-                                # Handle the second part which might have a revision letter
-                                second_part = parts[1]
-                                base_number = ''.join(filter(str.isdigit, second_part))  # Extract just the numbers
-                                
-                                # Create base PCB name without revision letter
-                                base_pcb = f"{parts[0]}-{base_number}".lower()
-                                ir_variant = f"{base_pcb}-ir".lower()
-
-                                # Set PCB type based on IR presence and variant availability
-                                if has_ir and ir_variant in self.available_pcbs:
-                                    parsed_data.pcb_type = ir_variant
-                                else:
-                                    parsed_data.pcb_type = self.determine_pcb_type(parsed_data.product_name)
-                            
-                            # Add to unique PCB types after determining correct type
-                            self.unique_pcb_types.add(parsed_data.pcb_type)
-                            production_data.append(parsed_data)
-
-                logging.info(f"Total parsed production data: {len(production_data)}")
-                logging.info(f"Unique PCB types found: {len(self.unique_pcb_types)}")
-                logging.info(f"PCB types with IR variants: {[pcb for pcb in self.unique_pcb_types if pcb.endswith('-ir')]}")
-                
-            return production_data
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while reading the production data: {str(e)}")
-            logging.error(f"Error loading production data: {str(e)}")
+            if self.store:
+                # Only the batches in the current list are read back, however much history the store holds
+                self.store.import_csv(file_path, self.available_pcbs, self.ir_leds)
+                production_data = self.store.modules(self.store.current_batches(file_path))
+            else:
+                production_data = layout_engine.load_production_data(file_path, self.available_pcbs, self.ir_leds)
+        except layout_engine.ProductionDataError as e:
+            messagebox.showerror("Error", str(e))
+            data_log.error(f"Error loading production data: {str(e)}")
+            return []
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Production store error: {str(e)}")
+            data_log.error(f"Production store error: {str(e)}")
+            return []
+
+        self.unique_pcb_types.update(data.pcb_type for data in production_data)
         return production_data
 
     # Parse a single row of production data and create a ProductionData object
     def parse_production_row(self, row: List[str]) -> Optional[ProductionData]:
-        try:
-            product_name = row[1] if len(row) > 1 else ""  # Product name is in the second column
-            pcb_type = self.determine_pcb_type(product_name)
-            batch_id = row[0] if row else ""  # Batch ID is in the first column (C1)
-            order_number = row[2] if len(row) > 2 else ""  # Order number is in the third column (C3)
-            led_codes = []
-            lens_code = None
-            connector_code = None
-
-            # Start from C7 (index 6) and look for short codes
-            for cell in row[6:]:
-                if len(cell) == 2 and cell[0].isalpha() and cell[1].isdigit():
-                    led_codes.append(cell)
-                elif len(cell) == 3:
-                    if cell.startswith('L'):
-                        lens_code = cell
-                    elif cell.startswith('C'):
-                        connector_code = cell
-
-            # If no short codes found in C7, it might be a single LED product
-            if not led_codes and len(row) > 6 and len(row[6]) == 2 and row[6][0].isalpha() and row[6][1].isdigit():
-                led_codes = [row[6]]
-
-            #print(product_name, pcb_type, batch_id, order_number, led_codes, lens_code, connector_code)
-            return ProductionData(product_name, pcb_type, batch_id, order_number, led_codes, lens_code, connector_code)
-        except Exception as e:
-            logging.error(f"Error parsing row: {row}. Error: {str(e)}")
-            return None
+        return layout_engine.parse_production_row(row, self.available_pcbs)
 
     # Determine the PCB type based on the product name
     def determine_pcb_type(self, product_name: str) -> str:
-        parts = product_name.split('-')
-        
-        determined_pcb_type = None
-
-        if parts[0] == "MR":
-            # Handle MR products
-            if len(parts) >= 3:
-                mr_variant = parts[-1]
-                
-                # Map MR products to LXB bases
-                if mr_variant == "20T":
-                    determined_pcb_type = "LXB-RT20bb"
-                elif mr_variant == "20S":
-                    determined_pcb_type = "LXB-RS20ag"
-                elif mr_variant == "10S":
-                    determined_pcb_type = "LXB-RS10ac"
-                else:
-                    logging.warning(f"Unknown MR variant: {mr_variant}")
-        
-        # Handle other product types (including fallback for unknown MR variants)
-        if not determined_pcb_type and len(parts) >= 2:
-            prefix = f"{parts[0]}-{parts[1]}"
-            
-            # Try to find an exact match for the first two parts
-            for pcb in self.available_pcbs:
-                if prefix.lower() in pcb.lower():
-                    determined_pcb_type = pcb
-                    break
-            
-            # If no exact match, try a more flexible match, but still requiring both parts
-            if not determined_pcb_type:
-                for pcb in self.available_pcbs:
-                    if parts[0].lower() in pcb.lower() and parts[1].lower() in pcb.lower():
-                        # Additional check to ensure parts are adjacent or only separated by a character
-                        pcb_parts = pcb.lower().split('-')
-                        for i in range(len(pcb_parts) - 1):
-                            if pcb_parts[i] == parts[0].lower() and pcb_parts[i+1] == parts[1].lower():
-                                determined_pcb_type = pcb
-                                break
-                        if determined_pcb_type:
-                            break
-
-        # If no match found, use a default naming convention
-        if not determined_pcb_type:
-            logging.warning(f"Unable to determine PCB type for product: {product_name}")
-            determined_pcb_type = f"{parts[0]}-{parts[1]}" if len(parts) >= 2 else product_name
-
-        return determined_pcb_type
+        return layout_engine.determine_pcb_type(product_name, self.available_pcbs)
     
     # Determine if the module contains an IR led
     def has_ir_led(self, product_name: str) -> bool:
@@ -740,17 +949,19 @@ class PCBViewer:
             else:
                 self.batch_id = "N/A"
                 self.batch_id_label.config(text="Batch: N/A")
+            self.prefetch_types()
                 
         except FileNotFoundError:
             error_msg = f"Production file not found at: {PRODUCTION_FILE_PATH}"
-            logging.error(error_msg)
+            data_log.error(error_msg)
             messagebox.showerror("Error", error_msg)
         except Exception as e:
             error_msg = f"Error loading production data: {str(e)}"
-            logging.error(error_msg)
+            data_log.error(error_msg)
             messagebox.showerror("Error", error_msg)
 
     # Reload production data
+    @layout_profiler.action
     def refresh_production_data(self):
         try:
             # Clear existing data
@@ -770,6 +981,7 @@ class PCBViewer:
             
             # Repopulate PCB list
             self.populate_pcb_list()
+            self.prefetch_types()
             
             # Reset dropdown to default and clear work area
             self.pcb_var.set("Select a PCB")
@@ -786,10 +998,11 @@ class PCBViewer:
             
         except Exception as e:
             error_msg = f"Error refreshing production data: {str(e)}"
-            logging.error(error_msg)
+            data_log.error(error_msg)
             messagebox.showerror("Error", error_msg)
 
     # Remove all module data for this PCB
+    @layout_profiler.action
     def clear_fret(self):
         if not self.pcb_data:
             messagebox.showerror("Error", "Please select a PCB type first")
@@ -797,11 +1010,7 @@ class PCBViewer:
             
         if messagebox.askyesno("Confirm Clear", "This will remove all module data. Continue?"):
             # Create new empty instance
-            modules_count = len(self.pcb_data['Modules'])
-            rows = int(self.pcb_data['Rows'])
-            columns = int(self.pcb_data['Columns'])
-            
-            self.pcb_instances = [PCBInstance(modules_count, rows, columns)]
+            self.pcb_instances = [layout_engine.empty_instance(self.pcb_data)]
             self.current_instance_index = 0
             
             # Update UI
@@ -812,111 +1021,32 @@ class PCBViewer:
 
     # Load PCB data from a CSV file and process it into a structured format
     def load_pcb_data(self, pcb_name: str) -> Optional[Dict[str, Any]]:
-        file_path = os.path.join(WORKING_DIRECTORY, f"{pcb_name}.csv")
+        if self.prefetcher:
+            # Compiled in the background after the production list was loaded
+            layout = self.prefetcher.layout(pcb_name)
+            if layout:
+                return layout
         try:
-            df = pd.read_csv(file_path)
-            
-            # Check if required columns are present
-            required_columns = ['Element', 'X', 'Y', 'Diameter', 'Height', 'Width', 'Columns', 'Rows']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
-
-            # Extract geometry data
-            geometry = df[df['Element'] == 'GEOMETRY']
-            if geometry.empty:
-                raise ValueError("No GEOMETRY data found in the CSV file")
-
-            # Extract MODULE data
-            module_data = df[df['Element'] == 'MODULE']
-            if module_data.empty:
-                raise ValueError("No MODULE data found in the CSV file")
-            
-            module_width = module_data['Width'].iloc[0]
-            module_height = module_data['Height'].iloc[0]
-
-            circles = df[df['Element'] == 'CIRCLE']
-            text = df[df['Element'] == 'MTEXT']
-            
-            # Load the center point from the "Point" element
-            point = df[df['Element'] == 'POINT']
-            if point.empty:
-                raise ValueError("No POINT data found in the CSV file")
-            center_point = {'x': point['X'].iloc[0], 'y': point['Y'].iloc[0]}
-            
-            # Create a list of module positions
-            modules = []
-            for _, circle in circles.iterrows():
-                module = {
-                    'x': circle['X'],
-                    'y': circle['Y'],
-                    'diameter': circle['Diameter'],
-                    'width': module_width,
-                    'height': module_height,
-                    'faulty': False,
-                    'led_positions': [],
-                    'connector_position': None,
-                    'lens_position': None
-                }
-                
-                # Calculate the rectangular bounding box
-                left = circle['X'] - module_width / 2
-                right = circle['X'] + module_width / 2
-                top = circle['Y'] - module_height / 2
-                bottom = circle['Y'] + module_height / 2
-
-                for _, t in text.iterrows():
-                    # Check if the text is within the rectangular bounding box
-                    if left <= t['X'] <= right and top <= t['Y'] <= bottom:
-                        position = {
-                            'x': t['X'],
-                            'y': t['Y'],
-                            'rotation': t['Rotation'],
-                            'height': t['TextHeight']
-                        }
-                        if t['TextString'].startswith('P'):
-                            module['led_positions'].append(position)
-                        elif t['TextString'].startswith('C'):
-                            module['connector_position'] = position
-                        elif t['TextString'].startswith('L'):
-                            module['lens_position'] = position
-                
-                modules.append(module)
-            
-            # Debugging: Print information about loaded modules
-            #print(f"Loaded {len(modules)} modules for {pcb_name}")
-            #for i, module in enumerate(modules):
-                #print(f"Module {i}: {len(module['led_positions'])} LED positions")
-
-            return {
-                'Height': geometry['Height'].iloc[0],
-                'Width': geometry['Width'].iloc[0],
-                'Columns': geometry['Columns'].iloc[0],
-                'Rows': geometry['Rows'].iloc[0],
-                'Circles': circles,
-                'Text': text,
-                'Modules': modules,
-                'CenterPoint': center_point
-            }
-        except Exception as e:
-            logging.error(f"Error loading PCB data for {pcb_name}: {str(e)}")
+            return layout_engine.compile_layout(pcb_name, WORKING_DIRECTORY)
+        except layout_engine.LayoutError as e:
+            data_log.error(f"Error loading PCB data for {pcb_name}: {str(e)}")
             messagebox.showerror("Error", f"An error occurred while reading PCB data: {str(e)}")
         return None
 
     # Create PCB instances based on the loaded production data
     def initialize_pcb_instances(self):
-        self.pcb_instances = []
-        matching_production_data = [data for data in self.production_data if data.pcb_type == self.current_pcb_type]
-        
-        modules_per_pcb = len(self.pcb_data['Modules'])
-        for i in range(0, len(matching_production_data), modules_per_pcb):
-            instance = PCBInstance(modules_per_pcb, int(self.pcb_data['Rows']), int(self.pcb_data['Columns']))
-            instance.data = matching_production_data[i:i+modules_per_pcb]
-            self.pcb_instances.append(instance)
-        
-        if not self.pcb_instances:
-            self.pcb_instances.append(PCBInstance(modules_per_pcb, int(self.pcb_data['Rows']), int(self.pcb_data['Columns'])))
-
+        production_data = self.production_data
+        if self.store and self.production_data:
+            # Re-read the selected type so modules added in earlier sessions are included
+            batch_ids = sorted({data.batch_id for data in self.production_data})
+            production_data = self.store.modules(batch_ids, self.current_pcb_type)
+        if self.claims:
+            # Leave out modules engraved or being engraved on other stations
+            try:
+                production_data = self.claims.available(production_data)
+            except sqlite3.Error as e:
+                data_log.error(f"Could not read fret claims: {str(e)}")
+        self.pcb_instances = layout_engine.plan_instances(production_data, self.current_pcb_type, self.pcb_data)
         self.current_instance_index = 0
 
     # Load the list of PCB types from a CSV file and populate the dropdown menu
@@ -938,12 +1068,12 @@ class PCBViewer:
                 # Set the default selection to "Select a PCB"
                 self.pcb_dropdown.set("Select a PCB")
             else:
-                logging.warning("No PCB types loaded.")
+                data_log.warning("No PCB types loaded.")
             
-            logging.info(f"Populated PCB list with {len(unique_pcb_types)} unique types")
+            data_log.info(f"Populated PCB list with {len(unique_pcb_types)} unique types")
         except Exception as e:
             error_msg = f"An error occurred while populating the PCB list: {str(e)}"
-            logging.error(error_msg)
+            data_log.error(error_msg)
             messagebox.showerror("Error", error_msg)
 
 
@@ -954,44 +1084,7 @@ class PCBViewer:
         if not self.pcb_instances:
             return
 
-        all_data = [item for instance in self.pcb_instances for item in instance.data]
-        modules_per_pcb = len(self.pcb_data['Modules'])
-        rows = int(self.pcb_data['Rows'])
-        columns = int(self.pcb_data['Columns'])
-        
-        # Preserve existing instances and their faulty statuses
-        preserved_instances = self.pcb_instances
-        self.pcb_instances = []
-        
-        data_index = 0
-        for instance in preserved_instances:
-            new_instance = PCBInstance(modules_per_pcb, rows, columns)
-            new_instance.faulty_modules = instance.faulty_modules.copy()  # Preserve faulty status
-            
-            for i in range(modules_per_pcb):
-                if not new_instance.faulty_modules[i] and data_index < len(all_data):
-                    new_instance.data.append(all_data[data_index])
-                    data_index += 1
-            
-            self.pcb_instances.append(new_instance)
-            
-            if data_index >= len(all_data):
-                break
-        
-        # If there's still data left, create new instances as needed
-        while data_index < len(all_data):
-            new_instance = PCBInstance(modules_per_pcb, rows, columns)
-            for i in range(modules_per_pcb):
-                if data_index < len(all_data):
-                    new_instance.data.append(all_data[data_index])
-                    data_index += 1
-                else:
-                    break
-            self.pcb_instances.append(new_instance)
-        
-        # Ensure we have at least one instance
-        if not self.pcb_instances:
-            self.pcb_instances.append(PCBInstance(modules_per_pcb, rows, columns))
+        self.pcb_instances = layout_engine.redistribute(self.pcb_instances, self.pcb_data)
         
         # Adjust current_instance_index if necessary
         if self.current_instance_index >= len(self.pcb_instances):
@@ -1000,8 +1093,32 @@ class PCBViewer:
         self.update_navigation_buttons()
         self.draw_pcb()
         self.cleanup_cache()
+        self.prefetch_current()
+
+    # Render the first frets of every PCB type in the production list into the export cache in the background
+    def prefetch_types(self):
+        if not self.prefetcher:
+            return
+        options = self.svg_options()
+        for pcb_type in sorted(self.unique_pcb_types):
+            self.prefetcher.stage_type(pcb_type, self.production_data, self.available_pcbs, PREFETCH_FRETS,
+                                       self.file_number, **options)
+
+    # Render the selected PCB type's frets as they stand into the export cache in the background, the
+    # displayed fret first and numbered as Export numbers them. Replaces what was staged for the type, so
+    # files of frets edited since are dropped.
+    def prefetch_current(self):
+        if not self.prefetcher or not self.pcb_data or not self.current_pcb_type:
+            return
+        order = list(range(self.current_instance_index, len(self.pcb_instances)))
+        order += range(self.current_instance_index)
+        instances = [self.pcb_instances[i] for i in order if self.pcb_instances[i].data][:PREFETCH_FRETS]
+        self.prefetcher.stage_frets(self.current_pcb_type, self.pcb_data,
+                                    [(instance, layout_engine.export_file_name(instance, self.file_number + n))
+                                     for n, instance in enumerate(instances)], **self.svg_options())
 
     # Insert new modules into product data
+    @layout_profiler.action
     def add_new_module(self, led_codes, lens_code, connector_code, quantity):
         product_name = f"{self.current_pcb_type}-{''.join(led_codes)}"
         current_instance = self.pcb_instances[self.current_instance_index]
@@ -1016,6 +1133,11 @@ class PCBViewer:
                 lens_code=lens_code,
                 connector_code=connector_code
             )
+            if self.store:
+                try:
+                    self.store.add_module(new_data)
+                except sqlite3.Error as e:
+                    data_log.error(f"Could not save added module to the production store: {str(e)}")
             current_instance.data.append(new_data)
         
         self.update_ui_after_changes()
@@ -1027,11 +1149,14 @@ class PCBViewer:
 
     # Initialize the checkboxes around a PCB array
     def initialize_checkboxes(self):
+        # Destroy the previous PCB's checkboxes; they are otherwise kept alive by Tk for the whole shift
+        for cb, _ in self.row_checkboxes + self.col_checkboxes:
+            cb.destroy()
         self.row_checkboxes = []
         self.col_checkboxes = []
         
         if not self.pcb_data:
-            logging.warning("No PCB data available. Checkboxes will not be created.")
+            ui_log.warning("No PCB data available. Checkboxes will not be created.")
             return
 
         for i in range(int(self.pcb_data['Rows'])):
@@ -1048,16 +1173,19 @@ class PCBViewer:
 
         self.update_checkbox_states()
 
-    # Initilize image cache
-    @lru_cache(maxsize=32)
+    # Load the PCB background image once per PCB type (cached per viewer, trimmed by cleanup_cache)
     def load_pcb_image(self, pcb_name):
+        if pcb_name in self.pcb_images:
+            return self.pcb_images[pcb_name]
         try:
             image_path = os.path.join(self.pcb_data_dir, f"{pcb_name}.png")
             image = Image.open(image_path)
-            return image
+            image.load()  # Read the pixels now so the file handle is released
         except FileNotFoundError:
-            logging.warning(f"Image not found for PCB: {pcb_name}")
-            return None
+            ui_log.warning(f"Image not found for PCB: {pcb_name}")
+            image = None
+        self.pcb_images[pcb_name] = image
+        return image
 
     # Load image and resize before caching
     def get_resized_photo(self, pcb_name, target_width, target_height):
@@ -1097,6 +1225,7 @@ class PCBViewer:
         self.prev_button['state'] = 'normal' if self.current_instance_index > 0 else 'disabled'
         self.next_button['state'] = 'normal' if self.current_instance_index < len(self.pcb_instances) - 1 else 'disabled'
         self.instance_label.config(text=f"PCB: {self.current_instance_index + 1} of {len(self.pcb_instances)}")
+        self.update_eta_label()
 
     # Update the UI elements to reflect changes
     def update_ui_after_changes(self):
@@ -1109,9 +1238,20 @@ class PCBViewer:
         else:
             self.canvas.delete("all")
             self.instance_label.config(text="")
+            self.eta_label.config(text="")
             self.update_navigation_buttons()
             self.update_checkbox_states()
 
+    # Estimated engrave time of the current fret and of all frets of this PCB type
+    def update_eta_label(self):
+        if not self.pcb_data or not self.pcb_instances:
+            self.eta_label.config(text="")
+            return
+        fret = self.estimator.fret_seconds(self.pcb_data, self.pcb_instances[self.current_instance_index])
+        batch = self.estimator.batch_seconds(self.pcb_data, self.pcb_instances)
+        self.eta_label.config(text=f"Engrave ~{layout_engine.format_duration(fret)}, "
+                                   f"all ~{layout_engine.format_duration(batch)}")
+
     # Update the instance label
     def update_instance_label(self):
         if self.pcb_instances:
@@ -1123,18 +1263,22 @@ class PCBViewer:
     ## 3.3 Navigation and Control
 
     # Navigate to the previous PCB instance
+    @layout_profiler.action
     def prev_pcb(self):
         if self.current_instance_index > 0:
             self.current_instance_index -= 1
             self.draw_pcb()
             self.update_navigation_buttons()
+            self.prefetch_current()
 
     # Navigate to the next PCB instance
+    @layout_profiler.action
     def next_pcb(self):
         if self.current_instance_index < len(self.pcb_instances) - 1:
             self.current_instance_index += 1
             self.draw_pcb()
             self.update_navigation_buttons()
+            self.prefetch_current()
 
     # Calculate the scale for use with the UI
     def calculate_scale(self):
@@ -1151,6 +1295,7 @@ class PCBViewer:
 # 4. Event Handling
 
     # Handle PCB selection event, load PCB data, and initialize instances
+    @layout_profiler.action
     def on_pcb_selected(self, event=None):
         display_value = self.pcb_var.get()
         pcb_name = self.pcb_dropdown_mapping.get(display_value)
@@ -1159,21 +1304,14 @@ class PCBViewer:
             self.pcb_type_label.config(text=display_value)
             self.batch_id_label.config(text=f"Batch: {self.batch_id}")
             
-            self.pcb_data = self.load_pcb_data(pcb_name)
-            if self.pcb_data:
-                # Associate offset data with the loaded PCB data
-                offset_data = self.available_pcbs.get(pcb_name.lower(), {'x_offset': 0, 'y_offset': 0})
-                self.pcb_data['x_offset'] = offset_data['x_offset']
-                self.pcb_data['y_offset'] = offset_data['y_offset']
-                
-                self.initialize_pcb_instances()
+            if self.load_pcb_type(pcb_name):
                 self.initialize_checkboxes()
                 self.current_instance_index = 0
                 self.load_pcb_image(pcb_name)
                 
                 self.calculate_scale()
                 
-                logging.info(f"Loaded PCB data for {pcb_name} with offsets: x={self.pcb_data['x_offset']}, y={self.pcb_data['y_offset']}")
+                ui_log.info(f"Loaded PCB data for {pcb_name} with offsets: x={self.pcb_data['x_offset']}, y={self.pcb_data['y_offset']}")
                 
                 self.draw_pcb()
                 self.add_module_button['state'] = 'normal'
@@ -1194,6 +1332,21 @@ class PCBViewer:
         
         self.update_navigation_buttons()
 
+    # Load the layout, offsets and instances for a PCB type (no UI work)
+    def load_pcb_type(self, pcb_name: str) -> bool:
+        self.close_reengrave(redraw=False)
+        self.current_pcb_type = pcb_name
+        self.pcb_data = self.load_pcb_data(pcb_name)
+        if not self.pcb_data:
+            return False
+
+        # Associate offset data with the loaded PCB data
+        layout_engine.apply_offsets(self.pcb_data, pcb_name, self.available_pcbs)
+
+        self.initialize_pcb_instances()
+        self.prefetch_current()
+        return True
+
     # Re-draws GUI in case window size changes
     def on_window_resize(self, event):
         if hasattr(self, '_resize_job'):
@@ -1201,7 +1354,23 @@ class PCBViewer:
         self._resize_job = self.root.after(100, self.redraw_pcb)
 
     # Toggle the faulty status of a module when clicked
+    @layout_profiler.action
     def toggle_module_faulty(self, event):
+        if not self.pcb_data or not self.pcb_instances:
+            return
+
+        i = self.module_at(event)
+        if i is None:
+            return
+        if self.reengrave:
+            self.toggle_reengrave_slot(i)
+            return
+        current_instance = self.pcb_instances[self.current_instance_index]
+        current_instance.faulty_modules[i] = not current_instance.faulty_modules[i]
+        self.redistribute_data()
+
+    # Index of the module under a canvas click, or None
+    def module_at(self, event) -> Optional[int]:
         self.calculate_scale()  # Ensure we're using the most up-to-date scale
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
@@ -1221,15 +1390,14 @@ class PCBViewer:
             module_bottom = module['y'] + module['height'] / 2
             
             if module_left <= x <= module_right and module_top <= y <= module_bottom:
-                current_instance = self.pcb_instances[self.current_instance_index]
-                current_instance.faulty_modules[i] = not current_instance.faulty_modules[i]
-                self.redistribute_data()
-                break
+                return i
+        return None
 
     # Faulty control for row
+    @layout_profiler.action
     def toggle_row(self, row):
         if not self.pcb_instances or self.current_instance_index >= len(self.pcb_instances):
-            logging.warning("No PCB instances available or invalid instance index.")
+            ui_log.warning("No PCB instances available or invalid instance index.")
             return
         
         current_instance = self.pcb_instances[self.current_instance_index]
@@ -1241,9 +1409,10 @@ class PCBViewer:
         self.update_checkbox_states()
 
     # Faulty control for col
+    @layout_profiler.action
     def toggle_column(self, col):
         if not self.pcb_instances or self.current_instance_index >= len(self.pcb_instances):
-            logging.warning("No PCB instances available or invalid instance index.")
+            ui_log.warning("No PCB instances available or invalid instance index.")
             return
         
         current_instance = self.pcb_instances[self.current_instance_index]
@@ -1365,6 +1534,7 @@ class PCBViewer:
 # 5. Drawing and Rendering
 
     # Draw the selected PCB on the canvas with its modules and data
+    @layout_metrics.timed("canvas_render")
     def draw_pcb(self):
         if not self.pcb_data or not self.pcb_instances:
             self.canvas.delete("all")
@@ -1427,7 +1597,6 @@ class PCBViewer:
         
         self.draw_modules_with_data(offset_x, offset_y)
 
-        self.canvas.bind("<Button-1>", self.toggle_module_faulty)
         self.instance_label.config(text=f"PCB: {self.current_instance_index + 1} of {len(self.pcb_instances)}")
         self.update_navigation_buttons()
         
@@ -1436,13 +1605,18 @@ class PCBViewer:
 
     # Draw individual modules on the PCB with their associated data
     def draw_modules_with_data(self, offset_x, offset_y):
-        current_instance = self.pcb_instances[self.current_instance_index]
+        current_instance = self.displayed_instance()
         data_index = 0
         for i, module in enumerate(self.pcb_data['Modules']):
             module_x = offset_x + module['x'] * self.scale
             module_y = offset_y + module['y'] * self.scale
             module_width = module['width'] * self.scale
             module_height = module['height'] * self.scale
+
+            if self.reengrave and i in self.reengrave['slots']:
+                self.canvas.create_rectangle(module_x - module_width / 2, module_y - module_height / 2,
+                                             module_x + module_width / 2, module_y + module_height / 2,
+                                             outline=self.color_selected, width=3)
             
             if current_instance.faulty_modules[i]:
                 # Draw X from corners of the rectangular area
@@ -1507,14 +1681,28 @@ class PCBViewer:
 # 6. Export Operations
     ## 6.1 SVG Generation
 
+    # Record a written fret: its slots in the production store (unless `assigned` already), its work
+    # for the engrave time log, and a copy for Re-engrave
+    def record_export(self, file_path: str, pcb_type: str, layout: Dict[str, Any], instance: PCBInstance,
+                      assigned: bool = False):
+        file_name = os.path.basename(file_path)
+        if self.store and not assigned:
+            try:
+                self.store.assign_fret(instance, file_name, self.draws_micro_ids())
+            except sqlite3.Error as e:
+                data_log.error(f"Could not record fret assignment for {file_name}: {str(e)}")
+        self.fret_works[file_path] = self.estimator.work(layout, instance, file_name=file_name)
+        self.remember_export(file_path, pcb_type, layout, instance)
+
     # Export the current PCB instance as an SVG file
+    @layout_profiler.action
     def export_svg(self, batch_mode=False):
         pcb_name = self.pcb_var.get()
         if not pcb_name or not self.pcb_data or not self.pcb_instances:
             messagebox.showerror("Error", "PCB data is not loaded properly")
             return
 
-        default_dir = r"Q:\Shared drives\Quadica\Production\Layout App Print Files\UV Laser Engrave Files"
+        default_dir = EXPORT_DIRECTORY
         if not os.path.exists(default_dir):
             os.makedirs(default_dir)
 
@@ -1523,75 +1711,38 @@ class PCBViewer:
             messagebox.showerror("Error", "No data available for current instance")
             return
 
-        first_prod_data = current_instance.data[0]
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        file_name = f"{first_prod_data.batch_id}_{first_prod_data.pcb_type}_{self.file_number:03d}.svg"
-        file_path = os.path.normpath(os.path.join(default_dir, file_name))
+        claim = None
+        if self.claims:
+            claim = self.claim_fret(current_instance)
+            if not claim:
+                self.update_ui_after_changes()
+                return None
 
-        # Center point from PCB data (assumed to be in mm)
-        center_x, center_y = self.pcb_data['CenterPoint']['x'], self.pcb_data['CenterPoint']['y']
+        file_name = layout_engine.export_file_name(current_instance, self.file_number, self.export_extension())
+        file_path = os.path.normpath(os.path.join(default_dir, file_name))
 
-        # Calculate offsets to center the PCB in the 210x210 mm work area
-        x_offset = 105 - center_x
-        y_offset = 105 - center_y
-
-        # Get PCB-specific offsets from the loaded PCB data
-        pcb_specific_x_offset = self.pcb_data.get('x_offset', 0)
-        pcb_specific_y_offset = self.pcb_data.get('y_offset', 0)
-        
-        print(f"Exporting SVG for PCB: {pcb_name}, X offset: {pcb_specific_x_offset}, Y offset: {pcb_specific_y_offset}")
+        export_log.debug("Exporting SVG for PCB: %s, X offset: %s, Y offset: %s",
+                         pcb_name, self.pcb_data.get('x_offset', 0), self.pcb_data.get('y_offset', 0))
+        if OPTIMIZE_TRAVEL:
+            travel = layout_engine.travel_report(self.pcb_data, current_instance)
+            export_log.info(f"Head travel for {file_name}: {travel['before_mm']:.0f} mm in layout order, "
+                            f"{travel['after_mm']:.0f} mm optimized")
 
         try:
-            # Create SVG with 210x210 mm dimensions
-            dwg = svgwrite.Drawing(file_path, size=('210mm', '210mm'), viewBox="0 0 210 210")
-
-            # Add 205x205 mm square around the final output
-            dwg.add(dwg.rect(insert=(2.5, 2.5), size=(205, 205), fill='none', stroke='#FF0000', stroke_width=0.5))
-
-            # Helper function to apply transformation (all values in mm)
-            def transform_coords(x, y):
-                new_x = x + x_offset + pcb_specific_x_offset
-                new_y = y + y_offset + pcb_specific_y_offset
-                return max(0, min(210, new_x)), max(0, min(210, new_y))
-
-            # Draw cross at the center point
-            center_x_transformed, center_y_transformed = transform_coords(center_x, center_y)
-            cross_size = 2  # Size of the cross in mm
-            dwg.add(dwg.line(start=(center_x_transformed - cross_size, center_y_transformed),
-                            end=(center_x_transformed + cross_size, center_y_transformed),
-                            stroke='red', stroke_width=0.2))
-            dwg.add(dwg.line(start=(center_x_transformed, center_y_transformed - cross_size),
-                            end=(center_x_transformed, center_y_transformed + cross_size),
-                            stroke='red', stroke_width=0.2))
-
-            data_index = 0
-            for i, module in enumerate(self.pcb_data['Modules']):
-                if current_instance.faulty_modules[i]:
-                    continue
-                elif data_index < len(current_instance.data):
-                    prod_data = current_instance.data[data_index]
-                    
-                    for j, led_pos in enumerate(module['led_positions']):
-                        if j < len(prod_data.led_codes):
-                            led_code = prod_data.led_codes[j]
-                            x, y = transform_coords(led_pos['x'], led_pos['y'])
-                            self.add_rotated_text(dwg, led_code, x, y, led_pos['rotation'], led_pos['height'])
-
-                    # For connector_position
-                    if module['connector_position'] and prod_data.connector_code:
-                        pos = module['connector_position']
-                        x, y = transform_coords(pos['x'], pos['y'])
-                        self.add_rotated_text(dwg, prod_data.connector_code, x, y, pos['rotation'], pos['height'])
-
-                    # For lens_position
-                    if module['lens_position'] and prod_data.lens_code:
-                        pos = module['lens_position']
-                        x, y = transform_coords(pos['x'], pos['y'])
-                        self.add_rotated_text(dwg, prod_data.lens_code, x, y, pos['rotation'], pos['height'])
-                    
-                    data_index += 1
-
-            dwg.save()
+            if LIGHTBURN_TEMPLATES is not None:
+                self.write_project(self.current_pcb_type, self.pcb_data, current_instance, file_path)
+            elif self.export_cache:
+                self.export_cache.export(self.pcb_data, current_instance, file_path, **self.svg_options())
+            else:
+                dwg = self.render_svg(current_instance, file_path)
+                self.write_svg(dwg)
+            self.record_export(file_path, self.current_pcb_type, self.pcb_data, current_instance)
+            if claim:
+                self.fret_claims[file_path] = claim
+                try:
+                    self.claims.set_file(claim, file_name)
+                except sqlite3.Error as e:
+                    data_log.error(f"Could not record file name for claim {claim.id}: {str(e)}")
 
             if not batch_mode:
                 #messagebox.showinfo("Success", f"SVG exported successfully to {file_path}")
@@ -1604,85 +1755,97 @@ class PCBViewer:
 
                 if not self.pcb_instances:
                     # If no instances left, create a new empty one
-                    rows = int(self.pcb_data['Rows'])
-                    columns = int(self.pcb_data['Columns'])
-                    modules_count = len(self.pcb_data['Modules'])
-                    self.pcb_instances.append(PCBInstance(modules_count, rows, columns))
+                    self.pcb_instances.append(layout_engine.empty_instance(self.pcb_data))
                 elif self.current_instance_index >= len(self.pcb_instances):
                     # Adjust the current index if it's out of range
                     self.current_instance_index = len(self.pcb_instances) - 1
 
                 self.update_ui_after_changes()
+                # Keep the next PREFETCH_FRETS frets rendered ahead
+                self.prefetch_current()
 
             if not batch_mode and file_path:
-                try:
-                    # Open LightBurn first
-                    os.startfile(r"C:\Program Files\LightBurn\LightBurn.exe")
-                    
-                    # Wait a moment for LightBurn to initialize
-                    self.root.after(3000)  # 2 second delay
-                    
-                    if self.lightburn.load_file(file_path):
-                        logging.info(f"Successfully loaded {file_path} into LightBurn")
-                        # Show confirmation dialog and wait for user to finish engraving
-                        self.show_engraving_confirmation()
-                    else:
-                        logging.warning(f"Failed to load {file_path} into LightBurn")
-                except Exception as e:
-                    logging.error(f"Error interacting with LightBurn: {e}")
-                    messagebox.showerror("Error", f"Failed to interact with LightBurn: {str(e)}")
+                self.engrave_file(file_path)
 
             return file_path
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save SVG: {str(e)}")
-            logging.error(f"Failed to save SVG: {str(e)}")
+            export_log.error(f"Failed to save SVG: {str(e)}")
+            if claim and file_path not in self.fret_claims:
+                try:
+                    self.claims.release(claim)
+                except sqlite3.Error as release_error:
+                    data_log.error(f"Could not release claim {claim.id}: {str(release_error)}")
             return None
 
-    # Add text to an SVG drawing
-    def add_rotated_text(self, dwg, text, x, y, angle, height):
-        # Constant adjustment factor to account for whitespace above and below characters
-        CHAR_HEIGHT_RATIO = 0.7 / 0.498  # Ratio of desired character height to total font height
-
-        # Adjust the font size to compensate for the vertical spacing
-        adjusted_height = height * CHAR_HEIGHT_RATIO
+    # Render options that change the exported file, also part of the export cache key
+    def svg_options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {}
+        if OPTIMIZE_TRAVEL:
+            options['optimize_travel'] = True
+        if OUTLINE_GLYPHS:
+            options['outline_glyphs'] = OUTLINE_GLYPHS
+        if COMPACT_SVG:
+            options['compact'] = True
+        if MICRO_IDS:
+            options['micro_ids'] = True
+        if QR_MODULE_URL:
+            options['module_qr'] = QR_MODULE_URL
+        if QR_FRET_URL:
+            options['fret_qr'] = QR_FRET_URL
+        return options
+
+    # The render options LightBurn projects take: those of svg_options bar the SVG-only ones
+    def project_options(self) -> Dict[str, Any]:
+        return {key: value for key, value in self.svg_options().items()
+                if key not in ('compact', 'micro_ids', 'module_qr', 'fret_qr')}
+
+    # The Micro-ID and QR code options of the files being exported; LightBurn projects carry no codes
+    def code_options(self) -> Dict[str, Any]:
+        if LIGHTBURN_TEMPLATES is not None:
+            return {}
+        return {key: value for key, value in self.svg_options().items() if key in ('micro_ids', 'module_qr', 'fret_qr')}
 
-        # Adjust the rotation angle to flip the text
-        adjusted_angle = (angle + 180) % 360
+    # Whether the files being exported draw Micro-IDs, recorded with their fret assignments for scan_verify
+    def draws_micro_ids(self) -> bool:
+        return bool(self.code_options().get('micro_ids'))
 
-        transform = f"rotate({-adjusted_angle} {x} {y})"
+    # Build the SVG drawing for a PCB instance without writing it to disk
+    def render_svg(self, current_instance: PCBInstance, file_path: str) -> svgwrite.Drawing:
+        return layout_engine.render_svg(self.pcb_data, current_instance, file_path, **self.svg_options())
 
-        font_family = "Roboto Thin, sans-serif"
-        font_weight = "normal"
-        font_style = "normal"
+    # Build the SVG bundle of several frets, numbered from the current file number, without writing it to disk
+    def render_bundle(self, instances: List[PCBInstance], file_path: str) -> svgwrite.Drawing:
+        return layout_engine.render_bundle_svg(self.pcb_data, instances, file_path, self.file_number,
+                                               **self.svg_options())
 
-        # Insert half-spaces between characters for SVG export
-        half_space = chr(8202)
-        spaced_text = half_space.join(text)
+    # Write a rendered SVG drawing to disk
+    def write_svg(self, dwg: svgwrite.Drawing):
+        layout_engine.write_svg(dwg)
 
-        # Use a dictionary for attributes to handle names with hyphens
-        text_attributes = {
-            'insert': (x, y),
-            'transform': transform,
-            'font-size': adjusted_height,
-            'text-anchor': "middle",
-            'font-family': font_family,
-            'font-weight': font_weight,
-            'font-style': font_style
-        }
+    # Exported file type: LightBurn projects when LIGHTBURN_TEMPLATES is set, SVGs otherwise
+    def export_extension(self) -> str:
+        return layout_engine.lightburn_export.PROJECT_EXTENSION if LIGHTBURN_TEMPLATES is not None else ".svg"
 
-        # Add the text element using the attributes dictionary
-        dwg.add(dwg.text(spaced_text, **text_attributes))
+    # Write a fret as a LightBurn project from its PCB type's template, engraving the same texts as the SVG.
+    # Projects bypass the export cache, which holds SVGs.
+    def write_project(self, pcb_type: str, layout: Dict[str, Any], instance: PCBInstance, file_path: str,
+                      slots: Optional[List[int]] = None):
+        template = layout_engine.load_template(layout_engine.template_path(LIGHTBURN_TEMPLATES, pcb_type))
+        layout_engine.write_lbrn2(layout_engine.render_lbrn2(layout, instance, template, slots=slots,
+                                                             **self.project_options()), file_path)
 
     ## 6.2 Batch Processing
 
     # Export all PCB instances as SVG files in batch mode
+    @layout_profiler.action
     def batch_export_svg(self):
         if not self.pcb_var.get() or not self.pcb_data or not self.pcb_instances:
             messagebox.showerror("Error", "PCB data is not loaded properly")
             return
 
-        default_dir = r"Q:\Shared drives\Quadica\Production\Layout App Print Files\UV Laser Engrave Files"
+        default_dir = EXPORT_DIRECTORY
         if not os.path.exists(default_dir):
             os.makedirs(default_dir)
 
@@ -1690,26 +1853,59 @@ class PCBViewer:
         original_file_number = self.file_number
         exported_files = []  # List to store paths of exported files
 
+        # Journal the plan first, so a crash at any point below can be resumed. Fixture loads and bundles
+        # are not journaled: resuming one would rewrite a file shared with frets engraved already.
+        planned = [i for i, instance in enumerate(self.pcb_instances) if instance.data]
+        fixture = self.batch_fixture()
+        bundle = BUNDLE_EXPORT and not fixture
+        job = None
+        if self.jobs and not fixture and not bundle:
+            try:
+                job = self.jobs.plan(self.current_pcb_type, self.batch_id, int(self.pcb_data['Rows']),
+                                     int(self.pcb_data['Columns']),
+                                     [(layout_engine.export_file_name(self.pcb_instances[i], self.file_number + n,
+                                                                      self.export_extension()),
+                                       self.pcb_instances[i]) for n, i in enumerate(planned)])
+            except OSError as e:
+                export_log.error(f"Could not journal batch export: {str(e)}")
+
         try:
             # First, export all files
-            for i in range(len(self.pcb_instances)):
-                self.current_instance_index = i
-                if self.pcb_instances[i].data:  # Only export if there's data
+            if fixture:
+                exported_files = self.export_nested(fixture, planned)
+            elif bundle:
+                steps = self.export_bundles(planned)
+                exported_files = [self.bundle_ref(*step) for step in steps]
+            else:
+                for n, i in enumerate(planned):
+                    self.current_instance_index = i
                     file_path = self.export_svg(batch_mode=True)
+                    if job:
+                        if file_path:
+                            self.journal_fret(job, job.frets[n], layout_engine.jobs.EXPORTED, file_path,
+                                              self.pcb_instances[i])
+                        else:
+                            self.journal_fret(job, job.frets[n], layout_engine.jobs.SKIPPED)
                     if file_path:
                         exported_files.append(file_path)
                         # Clear the data and reset faulty modules after successful export
                         self.pcb_instances[i].clear_all()
 
             if exported_files:
+                export_log.info(f"Batch of {len(exported_files)} {'fixture loads' if fixture else 'frets'}, about "
+                                f"{layout_engine.format_duration(self.remaining_engrave_seconds(exported_files))} "
+                                f"to engrave on {LASER_NAME}")
                 # Start the sequential processing of files
-                self.process_batch_files(exported_files)
+                if bundle:
+                    self.process_bundle_frets(steps)
+                else:
+                    self.process_batch_files(exported_files)
             else:
                 messagebox.showinfo("Info", "No files were exported.")
 
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred during batch export: {str(e)}")
-            logging.error(f"Batch export error: {str(e)}")
+            export_log.error(f"Batch export error: {str(e)}")
         finally:
             self.current_instance_index = original_instance_index
             self.file_number = original_file_number
@@ -1721,11 +1917,196 @@ class PCBViewer:
         # After batch export, check if all instances are empty
         if all(not instance.data for instance in self.pcb_instances):
             # If all are empty, create a new empty instance
-            self.pcb_instances = [PCBInstance(len(self.pcb_data['Modules']), 
-                                            int(self.pcb_data['Rows']), 
-                                            int(self.pcb_data['Columns']))]
+            self.pcb_instances = [layout_engine.empty_instance(self.pcb_data)]
             self.current_instance_index = 0
 
+    # Fixture that Batch Export nests the current PCB type in, or None for one fret per file
+    def batch_fixture(self) -> Optional[layout_engine.Fixture]:
+        if not NEST_FIXTURE:
+            return None
+        try:
+            fixture = layout_engine.load_fixture(NEST_FIXTURE)
+        except layout_engine.FixtureError as e:
+            export_log.error(str(e))
+            messagebox.showwarning("Fixture", f"{str(e)}\n\nExporting one fret per file.")
+            return None
+        if not fixture.accepts(self.current_pcb_type):
+            return None
+        try:
+            layout_engine.check_fit(fixture, self.pcb_data, self.current_pcb_type)
+        except layout_engine.FixtureError as e:
+            # A fixture for any PCB type only takes those that fit; one naming this type should have fitted
+            export_log.info(f"Not nesting {self.current_pcb_type}: {str(e)}")
+            if fixture.pcb_types:
+                messagebox.showwarning("Fixture", f"{str(e)}\n\nExporting one fret per file.")
+            return None
+        return fixture
+
+    # Export the planned frets in fixture loads, one file each; returns the exported files
+    def export_nested(self, fixture: layout_engine.Fixture, planned: List[int]) -> List[str]:
+        exported_files = []
+        for load in fixture.loads(planned):
+            instances = [self.pcb_instances[i] for i in load]
+            claim = None
+            if self.claims:
+                # One claim for the whole load, dropping modules other stations have taken
+                combined = layout_engine.empty_instance(self.pcb_data)
+                combined.data = [data for instance in instances for data in instance.data]
+                claim = self.claim_fret(combined)
+                if not claim:
+                    continue
+                kept = {layout_engine.module_key(data) for data in combined.data}
+                for instance in instances:
+                    instance.data = [data for data in instance.data if layout_engine.module_key(data) in kept]
+                instances = [instance for instance in instances if instance.data]
+
+            file_name = layout_engine.nested_file_name(instances, self.file_number, self.export_extension())
+            file_path = os.path.normpath(os.path.join(EXPORT_DIRECTORY, file_name))
+            frets = [(self.pcb_data, instance) for instance in instances]
+            try:
+                if LIGHTBURN_TEMPLATES is not None:
+                    template = layout_engine.load_template(
+                        layout_engine.template_path(LIGHTBURN_TEMPLATES, self.current_pcb_type))
+                    layout_engine.write_lbrn2(layout_engine.render_nested_lbrn2(frets, fixture, template,
+                                                                                **self.project_options()), file_path)
+                else:
+                    self.write_svg(layout_engine.render_nested_svg(frets, fixture, file_path, **self.svg_options()))
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save {file_name}: {str(e)}")
+                export_log.error(f"Failed to save {file_name}: {str(e)}")
+                if claim:
+                    try:
+                        self.claims.release(claim)
+                    except sqlite3.Error as release_error:
+                        data_log.error(f"Could not release claim {claim.id}: {str(release_error)}")
+                continue
+
+            if self.store:
+                try:
+                    self.store.assign_frets(instances, file_name, self.draws_micro_ids())
+                except sqlite3.Error as e:
+                    data_log.error(f"Could not record fret assignment for {file_name}: {str(e)}")
+            elements = layout_engine.nesting.nested_elements(frets, fixture)
+            if OPTIMIZE_TRAVEL:
+                elements = layout_engine.svg_export.order_elements(elements)[0]
+            codes = layout_engine.nesting.nested_codes(frets, fixture,
+                                                       layout_engine.svg_export.fret_file_stem(file_path),
+                                                       **self.code_options())
+            self.fret_works[file_path] = layout_engine.engrave_time.fret_work(elements, *codes)
+            if claim:
+                self.fret_claims[file_path] = claim
+                try:
+                    self.claims.set_file(claim, file_name)
+                except sqlite3.Error as e:
+                    data_log.error(f"Could not record file name for claim {claim.id}: {str(e)}")
+
+            export_log.info(f"Nested {len(instances)} frets in {file_name} ({fixture.name})")
+            exported_files.append(file_path)
+            self.file_number += len(instances)
+            for instance in instances:
+                instance.clear_all()
+        return exported_files
+
+    # A fret inside a bundle, keying its claim, estimate and engrave time like a file path does for single frets
+    def bundle_ref(self, bundle_path: str, name: str) -> str:
+        return f"{bundle_path}#{name}"
+
+    # Export the planned frets as bundles; returns the (bundle, fret name) steps to engrave, in order. SVG
+    # bundles hold the whole batch, LightBurn bundles as many frets as the template leaves layers for.
+    def export_bundles(self, planned: List[int]) -> List[Tuple[str, str]]:
+        extension = self.export_extension()
+        template = None
+        size = len(planned)
+        if LIGHTBURN_TEMPLATES is not None:
+            template = layout_engine.load_template(
+                layout_engine.template_path(LIGHTBURN_TEMPLATES, self.current_pcb_type))
+            size = max(1, layout_engine.bundle_capacity(template))
+
+        steps = []
+        for start in range(0, len(planned), size):
+            instances, claims = [], []
+            for i in planned[start:start + size]:
+                claim = None
+                if self.claims:
+                    claim = self.claim_fret(self.pcb_instances[i])
+                    if not claim:
+                        continue
+                instances.append(self.pcb_instances[i])
+                claims.append(claim)
+            if not instances:
+                continue
+
+            file_name = layout_engine.bundle_file_name(instances, self.file_number, extension)
+            file_path = os.path.normpath(os.path.join(EXPORT_DIRECTORY, file_name))
+            contents = layout_engine.bundle_contents(instances, self.file_number, extension)
+            try:
+                if template is not None:
+                    layout_engine.write_lbrn2(layout_engine.render_bundle_lbrn2(
+                        self.pcb_data, instances, template, self.file_number, **self.project_options()), file_path)
+                else:
+                    self.write_svg(self.render_bundle(instances, file_path))
+                layout_engine.write_toc(file_path, contents)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save {file_name}: {str(e)}")
+                export_log.error(f"Failed to save {file_name}: {str(e)}")
+                for claim in claims:
+                    if claim:
+                        try:
+                            self.claims.release(claim)
+                        except sqlite3.Error as release_error:
+                            data_log.error(f"Could not release claim {claim.id}: {str(release_error)}")
+                continue
+
+            for entry, instance, claim in zip(contents, instances, claims):
+                ref = self.bundle_ref(file_path, entry['name'])
+                if self.store:
+                    try:
+                        # Per fret, so a fret's slots can be looked up (e.g. by scan_verify)
+                        self.store.assign_fret(instance, self.bundle_ref(file_name, entry['name']),
+                                               self.draws_micro_ids())
+                    except sqlite3.Error as e:
+                        data_log.error(f"Could not record fret assignment for {ref}: {str(e)}")
+                self.fret_works[ref] = self.estimator.work(self.pcb_data, instance, file_name=entry['file'])
+                if claim:
+                    self.fret_claims[ref] = claim
+                    try:
+                        self.claims.set_file(claim, f"{file_name}#{entry['name']}")
+                    except sqlite3.Error as e:
+                        data_log.error(f"Could not record file name for claim {claim.id}: {str(e)}")
+                steps.append((file_path, entry['name']))
+                instance.clear_all()
+
+            export_log.info(f"Bundled {len(instances)} frets in {file_name}")
+            self.file_number += len(instances)
+        return steps
+
+    # Engrave bundled frets in order: each bundle is loaded into LightBurn once, at its first fret
+    def process_bundle_frets(self, steps: List[Tuple[str, str]], current_index: int = 0):
+        if current_index >= len(steps):
+            messagebox.showinfo("Complete", "All frets have been processed and engraved.")
+            return
+
+        bundle_path, name = steps[current_index]
+        try:
+            if current_index == 0 or steps[current_index - 1][0] != bundle_path:
+                self.launch_lightburn()
+                if not self.lightburn.load_file(bundle_path):
+                    lightburn_log.warning(f"Failed to load {bundle_path} into LightBurn")
+                    return
+                lightburn_log.info(f"Successfully loaded {bundle_path} into LightBurn")
+            self.engraving_loaded(self.bundle_ref(bundle_path, name))
+            self.show_bundle_fret_confirmation(steps, current_index)
+        except Exception as e:
+            lightburn_log.error(f"Error processing bundle: {e}")
+            messagebox.showerror("Error", f"Failed to process bundle: {str(e)}")
+
+    # Operator confirmed a bundled fret: complete it, closing the bundle in LightBurn after its last fret
+    def finish_bundle_fret(self, steps: List[Tuple[str, str]], current_index: int):
+        bundle_path, name = steps[current_index]
+        if current_index + 1 == len(steps) or steps[current_index + 1][0] != bundle_path:
+            self.lightburn.force_close()
+        self.complete_fret(self.bundle_ref(bundle_path, name))
+
     # Batch export SVG's with the LightBurn process
     def process_batch_files(self, file_paths: List[str], current_index: int = 0):
         """Process batch files sequentially"""
@@ -1735,22 +2116,68 @@ class PCBViewer:
 
         try:
             # Open LightBurn and load the current file
-            os.startfile(r"C:\Program Files\LightBurn\LightBurn.exe")
-            self.root.after(3000)  # Wait for LightBurn to initialize
+            self.launch_lightburn()
             
             if self.lightburn.load_file(file_paths[current_index]):
-                logging.info(f"Successfully loaded {file_paths[current_index]} into LightBurn")
+                lightburn_log.info(f"Successfully loaded {file_paths[current_index]} into LightBurn")
+                self.journal_file(file_paths[current_index], layout_engine.jobs.LOADED)
+                self.engraving_loaded(file_paths[current_index])
                 self.show_batch_engraving_confirmation(file_paths, current_index)
             else:
-                logging.warning(f"Failed to load {file_paths[current_index]} into LightBurn")
+                lightburn_log.warning(f"Failed to load {file_paths[current_index]} into LightBurn")
                 
         except Exception as e:
-            logging.error(f"Error processing batch file: {e}")
+            lightburn_log.error(f"Error processing batch file: {e}")
             messagebox.showerror("Error", f"Failed to process file: {str(e)}")
 
 
     ## 6.3 LightBurn Integration
 
+    # Start LightBurn and give it time to initialize before sending commands
+    def launch_lightburn(self):
+        os.startfile(LIGHTBURN_EXECUTABLE)
+        self.root.after(3000)  # Wait for LightBurn to initialize
+
+    # Load a single exported file into LightBurn and wait for the operator to finish engraving it
+    def engrave_file(self, file_path: str):
+        try:
+            self.launch_lightburn()
+
+            if self.lightburn.load_file(file_path):
+                lightburn_log.info(f"Successfully loaded {file_path} into LightBurn")
+                self.engraving_loaded(file_path)
+                # Show confirmation dialog and wait for user to finish engraving
+                self.show_engraving_confirmation(file_path)
+            else:
+                lightburn_log.warning(f"Failed to load {file_path} into LightBurn")
+        except Exception as e:
+            lightburn_log.error(f"Error interacting with LightBurn: {e}")
+            messagebox.showerror("Error", f"Failed to interact with LightBurn: {str(e)}")
+
+    # Height of an engraving confirmation dialog, which has room for "Laser Started" with the engrave time log on
+    def confirmation_height(self, height: int) -> int:
+        return height + 50 if ENGRAVE_TIME_LOG else height
+
+    # With the engrave time log on, the operator marks when the laser starts so the logged engraving time
+    # leaves out loading and framing (see engraving_started)
+    def add_started_button(self, dialog, file_path: str):
+        if not ENGRAVE_TIME_LOG:
+            return
+
+        def on_started():
+            self.engraving_started(file_path)
+            started_button.config(state=tk.DISABLED)
+
+        started_button = tk.Button(dialog,
+                                   text="Laser Started",
+                                   command=on_started,
+                                   bg=self.color_button_bg,
+                                   fg=self.color_button_fg,
+                                   activebackground=self.color_button_active,
+                                   activeforeground=self.color_button_fg,
+                                   font=('Arial', 12, 'bold'))
+        started_button.pack(pady=(10, 0))
+
     # Popup message to control batch flow
     def show_batch_engraving_confirmation(self, file_paths: List[str], current_index: int):
         """Show confirmation dialog for batch processing"""
@@ -1762,9 +2189,10 @@ class PCBViewer:
         dialog.grab_set()
         
         # Center the dialog
-        dialog.geometry("400x200")
+        height = self.confirmation_height(200)
+        dialog.geometry(f"400x{height}")
         x = self.root.winfo_x() + (self.root.winfo_width() - 400) // 2
-        y = self.root.winfo_y() + (self.root.winfo_height() - 200) // 2
+        y = self.root.winfo_y() + (self.root.winfo_height() - height) // 2
         dialog.geometry(f"+{x}+{y}")
         
         # Configure dialog
@@ -1773,6 +2201,9 @@ class PCBViewer:
         
         # Add messages
         progress_text = f"Processing file {current_index + 1} of {len(file_paths)}"
+        remaining = self.remaining_engrave_seconds(file_paths[current_index:])
+        if remaining:
+            progress_text += f"\nAbout {layout_engine.format_duration(remaining)} left"
         progress_label = tk.Label(dialog, 
                             text=progress_text,
                             font=("Arial", 14, "bold"),
@@ -1789,14 +2220,16 @@ class PCBViewer:
         
         def on_finished():
             try:
-                self.lightburn.force_close()
+                self.finish_engraving(file_paths[current_index])
                 dialog.destroy()
                 # Process next file
                 self.root.after(1000, lambda: self.process_batch_files(file_paths, current_index + 1))
             except Exception as e:
-                logging.error(f"Error closing LightBurn: {e}")
+                lightburn_log.error(f"Error closing LightBurn: {e}")
                 messagebox.showerror("Error", f"Failed to close LightBurn: {str(e)}")
         
+        self.add_started_button(dialog, file_paths[current_index])
+
         # Add button
         finish_button = tk.Button(dialog,
                                 text="Engraving Finished",
@@ -1811,8 +2244,67 @@ class PCBViewer:
         # Wait for dialog to close
         self.root.wait_window(dialog)
 
+    # Popup stepping the operator through the frets of a loaded bundle
+    def show_bundle_fret_confirmation(self, steps: List[Tuple[str, str]], current_index: int):
+        bundle_path, name = steps[current_index]
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Bundle Engraving Status")
+
+        # Make dialog modal
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        # Center the dialog
+        height = self.confirmation_height(220)
+        dialog.geometry(f"420x{height}")
+        x = self.root.winfo_x() + (self.root.winfo_width() - 420) // 2
+        y = self.root.winfo_y() + (self.root.winfo_height() - height) // 2
+        dialog.geometry(f"+{x}+{y}")
+
+        # Configure dialog
+        dialog.configure(bg=self.color_bg_main)
+        dialog.resizable(False, False)
+
+        progress_text = f"Fret {current_index + 1} of {len(steps)}: {name}"
+        remaining = self.remaining_engrave_seconds([self.bundle_ref(*step) for step in steps[current_index:]])
+        if remaining:
+            progress_text += f"\nAbout {layout_engine.format_duration(remaining)} left"
+        tk.Label(dialog, text=progress_text, font=("Arial", 14, "bold"),
+                 bg=self.color_bg_main, fg=self.color_text_muted).pack(pady=10)
+
+        if bundle_path.endswith(layout_engine.lightburn_export.PROJECT_EXTENSION):
+            instruction = f"Turn on output for layer {name} only, then engrave"
+        else:
+            instruction = f"Select group {name}, then engrave the selection"
+        tk.Label(dialog, text=instruction, font=("Arial", 12),
+                 bg=self.color_bg_main, fg=self.color_text_muted).pack(pady=10)
+
+        def on_finished():
+            try:
+                self.finish_bundle_fret(steps, current_index)
+                dialog.destroy()
+                self.root.after(1000, lambda: self.process_bundle_frets(steps, current_index + 1))
+            except Exception as e:
+                lightburn_log.error(f"Error closing LightBurn: {e}")
+                messagebox.showerror("Error", f"Failed to close LightBurn: {str(e)}")
+
+        self.add_started_button(dialog, self.bundle_ref(bundle_path, name))
+
+        finish_button = tk.Button(dialog,
+                                  text="Engraving Finished",
+                                  command=on_finished,
+                                  bg=self.color_button_bg,
+                                  fg=self.color_button_fg,
+                                  activebackground=self.color_button_active,
+                                  activeforeground=self.color_button_fg,
+                                  font=('Arial', 12, 'bold'))
+        finish_button.pack(pady=20)
+
+        # Wait for dialog to close
+        self.root.wait_window(dialog)
+
     # Popup used to control LightBurn workflow
-    def show_engraving_confirmation(self):
+    def show_engraving_confirmation(self, file_path: str):
         """Show a confirmation dialog after file is loaded into LightBurn"""
         dialog = tk.Toplevel(self.root)
         dialog.title("Engraving Status")
@@ -1822,9 +2314,10 @@ class PCBViewer:
         dialog.grab_set()
         
         # Center the dialog
-        dialog.geometry("300x150")
+        height = self.confirmation_height(150)
+        dialog.geometry(f"300x{height}")
         x = self.root.winfo_x() + (self.root.winfo_width() - 300) // 2
-        y = self.root.winfo_y() + (self.root.winfo_height() - 150) // 2
+        y = self.root.winfo_y() + (self.root.winfo_height() - height) // 2
         dialog.geometry(f"+{x}+{y}")
         
         # Configure dialog
@@ -1841,12 +2334,14 @@ class PCBViewer:
         
         def on_finished():
             try:
-                self.lightburn.force_close()
+                self.finish_engraving(file_path)
                 dialog.destroy()
             except Exception as e:
-                logging.error(f"Error closing LightBurn: {e}")
+                lightburn_log.error(f"Error closing LightBurn: {e}")
                 messagebox.showerror("Error", f"Failed to close LightBurn: {str(e)}")
         
+        self.add_started_button(dialog, file_path)
+
         # Add button
         finish_button = tk.Button(dialog,
                                 text="Engraving Finished",
@@ -1862,9 +2357,159 @@ class PCBViewer:
         self.root.wait_window(dialog)
 
 
+    ## 6.4 Re-engrave
+
+    # Keep a copy of an exported fret so Re-engrave can write some of its modules again
+    def remember_export(self, file_path: str, pcb_type: str, layout: Dict[str, Any], instance: PCBInstance):
+        self.exported_frets.pop(file_path, None)
+        self.exported_frets[file_path] = (pcb_type, layout, copy.deepcopy(instance))
+        while len(self.exported_frets) > REENGRAVE_HISTORY:
+            self.exported_frets.popitem(last=False)
+
+    # Module indices of a fret that were engraved: not faulty and holding data
+    def engraved_slots(self, instance: PCBInstance) -> List[int]:
+        slots = [i for i, faulty in enumerate(instance.faulty_modules) if not faulty]
+        return slots[:len(instance.data)]
+
+    # The instance drawn on the canvas: the fret being re-engraved while Re-engrave is open
+    def displayed_instance(self) -> PCBInstance:
+        if self.reengrave and self.reengrave['instance'] is not None:
+            return self.reengrave['instance']
+        return self.pcb_instances[self.current_instance_index]
+
+    # Write only `slots` of an exported fret, in the same fixture position; returns the new file
+    @layout_profiler.action
+    def export_reengrave(self, file_path: str, slots: List[int]) -> Optional[str]:
+        pcb_type, layout, instance = self.exported_frets[file_path]
+        reengrave_path = os.path.splitext(file_path)[0] + "_redo" + self.export_extension()
+        try:
+            if LIGHTBURN_TEMPLATES is not None:
+                self.write_project(pcb_type, layout, instance, reengrave_path, slots)
+            else:
+                layout_engine.write_svg(layout_engine.render_svg(layout, instance, reengrave_path, slots=slots,
+                                                                 **self.svg_options()))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save re-engrave file: {str(e)}")
+            export_log.error(f"Failed to save re-engrave file for {os.path.basename(file_path)}: {str(e)}")
+            return None
+        self.fret_works[reengrave_path] = self.estimator.work(layout, instance, slots,
+                                                              os.path.basename(reengrave_path))
+        export_log.info(f"Re-engraving slots {layout_engine.format_slots(slots)} of "
+                        f"{os.path.basename(file_path)} as {os.path.basename(reengrave_path)}")
+        return reengrave_path
+
+    # Select or deselect an engraved module of the fret being re-engraved
+    def toggle_reengrave_slot(self, i: int):
+        if self.reengrave['instance'] is None or i not in self.engraved_slots(self.reengrave['instance']):
+            return
+        self.reengrave['slots'] ^= {i}
+        self.reengrave['slots_var'].set(layout_engine.format_slots(self.reengrave['slots']))
+        self.draw_pcb()
+
+    # Leave Re-engrave: close its popup and show the current fret again
+    def close_reengrave(self, redraw: bool = True):
+        if not self.reengrave:
+            return
+        popup = self.reengrave['popup']
+        self.reengrave = None
+        popup.destroy()
+        if redraw:
+            self.draw_pcb()
+
+    # Pick modules of a fret exported in this session, on the canvas or by slot number, and engrave only those.
+    # The popup is not modal so that modules can be clicked on the canvas meanwhile.
+    def open_reengrave_popup(self):
+        if not self.pcb_data or self.reengrave:
+            return
+        candidates = [file_path for file_path, (pcb_type, _, _) in reversed(self.exported_frets.items())
+                      if pcb_type == self.current_pcb_type]
+        if not candidates:
+            messagebox.showinfo("Re-engrave", f"No {self.current_pcb_type.upper()} fret has been exported yet.")
+            return
+        names = [os.path.basename(file_path) for file_path in candidates]
+
+        popup = tk.Toplevel(self.root)
+        popup.title("Re-engrave")
+        popup.resizable(False, False)
+        popup.transient(self.root)
+        popup.protocol("WM_DELETE_WINDOW", self.close_reengrave)
+
+        main_frame = ttk.Frame(popup, padding="20")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        fret_var = tk.StringVar(value=names[0])
+        ttk.Label(main_frame, text="Fret:").grid(row=0, column=0, sticky="e", padx=5, pady=5)
+        fret_dropdown = ttk.Combobox(main_frame, textvariable=fret_var, values=names, state="readonly", width=28)
+        fret_dropdown.grid(row=0, column=1, sticky="ew", padx=5, pady=5)
+
+        slots_var = tk.StringVar()
+        ttk.Label(main_frame, text="Slots:").grid(row=1, column=0, sticky="e", padx=5, pady=5)
+        slots_entry = ttk.Entry(main_frame, textvariable=slots_var, width=28)
+        slots_entry.grid(row=1, column=1, sticky="ew", padx=5, pady=5)
+        ttk.Label(main_frame, text="Click modules on the PCB, or list slots such as 3, 7, 12-14").grid(
+            row=2, column=0, columnspan=2, padx=5, pady=5)
+
+        self.reengrave = {'popup': popup, 'file_path': None, 'instance': None, 'slots': set(), 'slots_var': slots_var}
+
+        def select_fret(event=None):
+            file_path = candidates[names.index(fret_var.get())]
+            self.reengrave.update(file_path=file_path, instance=self.exported_frets[file_path][2], slots=set())
+            slots_var.set("")
+            self.draw_pcb()
+
+        # Take the typed slot list as the selection; False if it is not valid for this fret
+        def apply_slots(event=None) -> bool:
+            try:
+                slots = set(layout_engine.parse_slots(slots_var.get(), len(self.pcb_data['Modules'])))
+            except layout_engine.LayoutError as e:
+                messagebox.showerror("Re-engrave", str(e))
+                return False
+            not_engraved = slots - set(self.engraved_slots(self.reengrave['instance']))
+            if not_engraved:
+                messagebox.showerror("Re-engrave", f"Slots {layout_engine.format_slots(not_engraved)} "
+                                     "were not engraved on this fret")
+                return False
+            self.reengrave['slots'] = slots
+            self.draw_pcb()
+            return True
+
+        def engrave():
+            if not apply_slots():
+                return
+            if not self.reengrave['slots']:
+                messagebox.showerror("Re-engrave", "Select the modules to engrave again")
+                return
+            file_path, slots = self.reengrave['file_path'], sorted(self.reengrave['slots'])
+            self.close_reengrave()
+            reengrave_path = self.export_reengrave(file_path, slots)
+            if reengrave_path:
+                self.engrave_file(reengrave_path)
+
+        fret_dropdown.bind("<<ComboboxSelected>>", select_fret)
+        slots_entry.bind("<Return>", apply_slots)
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=3, column=0, columnspan=2, pady=20)
+        ttk.Button(button_frame, text="Engrave", command=engrave, style='TButton').pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=self.close_reengrave, style='TButton').pack(side=tk.LEFT, padx=5)
+
+        select_fret()
+        slots_entry.focus_set()
+
+
 # 7. Main
 
 if __name__ == "__main__":
+    # A frozen Windows build would otherwise start the whole app again in worker processes
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="Quadica Production Layout App")
+    parser.add_argument('--profile-seconds', type=float, help="profile startup and the next N seconds")
+    parser.add_argument('--profile-actions', type=int, help="profile startup and the next N operator actions")
+    args = parser.parse_args()
+
     root = tk.Tk()
+    if args.profile_seconds or args.profile_actions:
+        layout_profiler.start(os.path.dirname(os.path.abspath(LOG_FILE)), seconds=args.profile_seconds,
+                              actions=args.profile_actions, schedule=root.after, trigger="command line")
     app = PCBViewer(root)
     root.mainloop()
\ No newline at end of file
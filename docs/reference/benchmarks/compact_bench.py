@@ -0,0 +1,129 @@
+"""Compact SVG export: file size, generation and parse time, and unchanged geometry.
+
+Exports every fret of a synthetic production list in the default form and in
+compact form (`render_svg(..., compact=True)`: shared text attributes on one
+group, each distinct code a `<symbol>` placed with `<use>`, positions rounded
+to 0.001 mm), with `<text>` elements and, given a font, with glyph outlines.
+Reports file sizes, the time to render and write each file and the time to
+parse it back as XML. Every compact file is then resolved back to placed codes
+(content, position, rotation, size) and checked against the default file: same
+codes in the same order, positions and sizes within the rounding. The check is
+shared with `tests/test_compact_svg.py`.
+
+    python compact_bench.py --modules 120
+    python compact_bench.py --large --font Roboto-Thin.ttf
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+REFERENCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# The geometry check lives in the test suite
+sys.path.insert(0, REFERENCE_DIR)
+sys.path.insert(0, os.path.join(REFERENCE_DIR, "tests"))
+
+from headless import load_app  # noqa: E402
+from synthetic import DEFAULT_PCBS, SyntheticPCB, available_pcbs, build_dataset  # noqa: E402
+from test_compact_svg import Placement, mismatched_files, placements  # noqa: E402
+
+LARGE_PCB = SyntheticPCB("sz-100", 10, 10, 4, pitch=19.0)
+
+
+def export_files(layout_engine, frets, directory: str, **options) -> Tuple[Dict[str, Any], List[List[Placement]]]:
+    os.makedirs(directory, exist_ok=True)
+    render, parse, sizes, files = [], [], [], []
+    for name, layout, instance in frets:
+        file_path = os.path.join(directory, name)
+        start = time.perf_counter()
+        layout_engine.write_svg(layout_engine.render_svg(layout, instance, file_path, **options))
+        render.append(time.perf_counter() - start)
+        sizes.append(os.path.getsize(file_path))
+        start = time.perf_counter()
+        root = ElementTree.parse(file_path).getroot()
+        parse.append(time.perf_counter() - start)
+        files.append(placements(root))
+    return {
+        'files': len(sizes),
+        'kib_total': round(sum(sizes) / 1024, 1),
+        'kib_per_file': round(statistics.mean(sizes) / 1024, 2) if sizes else 0.0,
+        'render_write_ms_median': round(statistics.median(render) * 1000, 3) if render else 0.0,
+        'parse_ms_median': round(statistics.median(parse) * 1000, 3) if parse else 0.0,
+    }, files
+
+
+def compare(layout_engine, frets, work_dir: str, name: str, **options) -> Dict[str, Any]:
+    default, expected = export_files(layout_engine, frets, os.path.join(work_dir, name), **options)
+    compact, actual = export_files(layout_engine, frets, os.path.join(work_dir, name + "-compact"),
+                                   compact=True, **options)
+    mismatched = mismatched_files(expected, actual)
+    return {
+        'default': default,
+        'compact': compact,
+        'size_ratio': round(compact['kib_total'] / default['kib_total'], 3) if default['kib_total'] else 0.0,
+        'placements': sum(len(placed) for placed in expected),
+        'mismatched_files': mismatched,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare default and compact SVG export")
+    parser.add_argument('--modules', type=int, default=120, help="modules per PCB type")
+    parser.add_argument('--large', action='store_true', help="add a 100-module array with 400 texts per fret")
+    parser.add_argument('--font', help="also compare glyph-outline export, with a library built from this font")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    load_app()  # puts the app directory, and with it layout_engine, on the path
+    import layout_engine
+
+    pcbs = DEFAULT_PCBS + ([LARGE_PCB] if args.large else [])
+    work_dir = tempfile.mkdtemp(prefix="compact-bench-")
+    glyphs_path: Optional[str] = None
+    try:
+        data_dir = os.path.join(work_dir, "data")
+        production_file = build_dataset(data_dir, pcbs, args.modules, seed=args.seed)
+        offsets = available_pcbs(pcbs)
+        production_data = layout_engine.load_production_data(production_file, offsets, [])
+        frets = []
+        for pcb in pcbs:
+            layout = layout_engine.apply_offsets(layout_engine.compile_layout(pcb.name, data_dir), pcb.name, offsets)
+            instances = layout_engine.plan_instances(production_data, pcb.name, layout)
+            frets.extend((layout_engine.export_file_name(instance, n), layout, instance)
+                         for n, instance in enumerate(instances, start=1) if instance.data)
+
+        modes = {'text': compare(layout_engine, frets, work_dir, "text")}
+        if args.font:
+            glyphs_path = os.path.join(work_dir, "glyphs.json")
+            with open(glyphs_path, 'w', encoding='utf-8') as f:
+                json.dump(layout_engine.build_library(args.font), f, separators=(',', ':'))
+            layout_engine.load_glyph_library(glyphs_path)
+            modes['outline'] = compare(layout_engine, frets, work_dir, "outline", outline_glyphs=glyphs_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'modules_per_type': args.modules,
+        'pcb_types': [pcb.name for pcb in pcbs],
+        **modes,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    return 1 if any(mode['mismatched_files'] for mode in modes.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""End-to-end engraving cycle benchmark.
+
+Generates a synthetic production list and layouts, then drives the layout
+app's own export and batch-export code against a simulated LightBurn. Every
+stage from parsing the production list to closing the file in LightBurn is
+timed; the operator's engraving time is not included.
+
+    python cycle_bench.py --modules 200 --runs 3 --output results.json
+    python cycle_bench.py --mode bundle --modules 200 --runs 3
+    python cycle_bench.py --baseline baseline.json --output results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import StageTimer, headless_viewer_class, load_app  # noqa: E402
+from lightburn_sim import SimulatedLightBurn, simulated_controller_class  # noqa: E402
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset  # noqa: E402
+
+STAGES = ['parse', 'plan', 'reflow', 'render_svg', 'write', 'load', 'close']
+
+
+# Run one full cycle: parse, then plan and export every PCB type in the list
+def run_cycle(app, viewer_class, controller, data_dir: str, export_dir: str, mode: str, timer: StageTimer) -> Dict[str, int]:
+    app.WORKING_DIRECTORY = data_dir
+    app.EXPORT_DIRECTORY = export_dir
+
+    viewer = viewer_class(available_pcbs(DEFAULT_PCBS), lightburn=controller, timer=timer)
+    viewer.production_data = viewer.load_production_data(os.path.join(data_dir, "production list.csv"))
+
+    frets = 0
+    for pcb_type in sorted(viewer.unique_pcb_types):
+        if not viewer.load_pcb_type(pcb_type):
+            continue
+        frets += sum(1 for instance in viewer.pcb_instances if instance.data)
+        if mode in ('batch', 'bundle'):
+            viewer.batch_export_svg()
+        else:
+            while viewer.pcb_instances and viewer.pcb_instances[0].data:
+                if not viewer.export_svg():
+                    break
+
+    files = [name for name in os.listdir(export_dir) if not name.endswith(app.layout_engine.bundle.TOC_EXTENSION)]
+    return {'frets': frets, 'files': len(files)}
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    app = load_app()
+    viewer_class = headless_viewer_class(app)
+    controller_class = simulated_controller_class(app)
+    app.BUNDLE_EXPORT = args.mode == 'bundle'
+
+    work_dir = tempfile.mkdtemp(prefix="cycle-bench-")
+    timer = StageTimer()
+    server = SimulatedLightBurn(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                                loss=args.loss, load_latency=args.load_latency / 1000)
+    controller = controller_class(server, timer=timer, timeout=args.timeout)
+    cycles: List[Dict[str, Any]] = []
+    try:
+        data_dir = os.path.join(work_dir, "data")
+        build_dataset(data_dir, DEFAULT_PCBS, args.modules, seed=args.seed)
+        for run in range(args.runs):
+            export_dir = os.path.join(work_dir, f"export-{run}")
+            os.makedirs(export_dir)
+            start = time.perf_counter()
+            counts = run_cycle(app, viewer_class, controller, data_dir, export_dir, args.mode, timer)
+            counts['wall_ms'] = (time.perf_counter() - start) * 1000
+            cycles.append(counts)
+    finally:
+        controller.cleanup()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    frets = sum(cycle['frets'] for cycle in cycles) or 1
+    wall_ms = sum(cycle['wall_ms'] for cycle in cycles)
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'config': {
+            'mode': args.mode,
+            'modules_per_type': args.modules,
+            'pcb_types': [pcb.name for pcb in DEFAULT_PCBS],
+            'runs': args.runs,
+            'latency_ms': args.latency,
+            'jitter_ms': args.jitter,
+            'load_latency_ms': args.load_latency,
+            'loss': args.loss,
+            'seed': args.seed,
+        },
+        'cycles': cycles,
+        'per_fret_ms': wall_ms / frets,
+        'lightburn': dict(server.counts),
+        'stages': timer.summary(),
+    }
+
+
+# Compare stage means with a saved baseline; returns the regressed stage names
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    rows = [('per_fret', baseline.get('per_fret_ms'), results.get('per_fret_ms'))]
+    for stage in STAGES:
+        old = baseline.get('stages', {}).get(stage, {}).get('mean_ms')
+        new = results.get('stages', {}).get(stage, {}).get('mean_ms')
+        rows.append((stage, old, new))
+
+    print(f"{'stage':<12}{'baseline ms':>14}{'current ms':>14}{'change':>10}")
+    for name, old, new in rows:
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSED"
+        print(f"{name:<12}{old:>14.3f}{new:>14.3f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the export-to-engraving-finished cycle")
+    parser.add_argument('--mode', choices=['batch', 'bundle', 'export'], default='batch',
+                        help="drive Batch Export, Batch Export with BUNDLE_EXPORT or repeated single Export SVG")
+    parser.add_argument('--modules', type=int, default=120, help="modules per PCB type in the production list")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=5.0, help="LightBurn reply latency in ms")
+    parser.add_argument('--load-latency', type=float, default=50.0, help="LightBurn LOADFILE latency in ms")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency in ms")
+    parser.add_argument('--loss', type=float, default=0.0, help="fraction of UDP commands dropped")
+    parser.add_argument('--timeout', type=float, default=1.0, help="controller receive timeout in seconds")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    parser.add_argument('--baseline', help="compare against a previous results JSON")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed slowdown before a stage fails")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Cycle time regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
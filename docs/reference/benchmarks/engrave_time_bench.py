@@ -0,0 +1,142 @@
+"""Engrave-time estimator check: calibration from a log and estimate accuracy.
+
+Runs Batch Export of a synthetic production list through the headless viewer
+with the engrave time log switched on. The simulated operator takes a random
+handling time around the true one to place and frame each fret, presses
+"Laser Started", and confirms the fret after the engraving time a "true" laser
+profile gives for it, plus random operator delay. The log is then calibrated with `layout_engine.engrave_time` and the
+fitted profile is compared with the true one, on the logged frets and on
+frets from a second production list it has not seen.
+
+    python engrave_time_bench.py --modules 120 --jitter 0.1
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import headless_viewer_class, load_app  # noqa: E402
+from lightburn_sim import SimulatedLightBurn, simulated_controller_class  # noqa: E402
+from soak_test import AutoMessagebox  # noqa: E402
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset  # noqa: E402
+
+
+# Headless viewer whose operator handles each fret, starts the laser and takes the true engrave time
+# (scaled down) to confirm it
+def timed_viewer_class(app, true_profile, rng: random.Random, jitter: float, time_scale: float):
+    class TimedViewer(headless_viewer_class(app)):
+        def show_batch_engraving_confirmation(self, file_paths, current_index):
+            file_path = file_paths[current_index]
+            handling = true_profile.handling_seconds * rng.uniform(0.5, 1.5)
+            actual = true_profile.engrave_seconds(self.fret_works[file_path]) * (1 + rng.uniform(0, jitter))
+            # Pretend the file was loaded and the engraving started that long ago instead of sleeping through it
+            self.engraving_started(file_path)
+            self.engrave_loaded[file_path] = self.engrave_started[file_path] - handling
+            self.engrave_started[file_path] -= actual * (1 - time_scale)
+            self.engrave_loaded[file_path] -= actual * (1 - time_scale)
+            time.sleep(actual * time_scale)
+            self.finish_engraving(file_path)
+            self.process_batch_files(file_paths, current_index + 1)
+
+    return TimedViewer
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    app = load_app()
+    import layout_engine
+    from layout_engine.engrave_time import calibrate, mean_error, read_samples
+
+    true_profile = layout_engine.LaserProfile("bench", setup_seconds=8.0, glyph_seconds=0.035,
+                                              mark_speed=180.0, jump_speed=2500.0, handling_seconds=20.0)
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="engrave-time-")
+    try:
+        app.WORKING_DIRECTORY = os.path.join(work_dir, "data")
+        app.EXPORT_DIRECTORY = os.path.join(work_dir, "export")
+        app.ENGRAVE_TIME_LOG = os.path.join(work_dir, "engrave_times.jsonl")
+        app.LASER_NAME = "bench"
+        app.messagebox = AutoMessagebox()
+        build_dataset(app.WORKING_DIRECTORY, DEFAULT_PCBS, args.modules, seed=args.seed)
+
+        controller = simulated_controller_class(app)(SimulatedLightBurn(latency=0.0))
+        viewer = timed_viewer_class(app, true_profile, rng, args.jitter, args.time_scale)(available_pcbs(DEFAULT_PCBS),
+                                                                                          lightburn=controller)
+        viewer.production_data = viewer.load_production_data(os.path.join(app.WORKING_DIRECTORY,
+                                                                          "production list.csv"))
+        for pcb_type in sorted(viewer.unique_pcb_types):
+            if viewer.load_pcb_type(pcb_type):
+                viewer.batch_export_svg()
+        controller.cleanup()
+
+        samples = read_samples(app.ENGRAVE_TIME_LOG)['bench']
+        start = time.perf_counter()
+        fitted = calibrate(samples, "bench")
+        calibrate_ms = (time.perf_counter() - start) * 1000
+
+        # Frets of a production list the calibration has not seen, with their true times
+        unseen_dir = os.path.join(work_dir, "unseen")
+        build_dataset(unseen_dir, DEFAULT_PCBS, args.modules, seed=args.seed + 1)
+        pcbs = available_pcbs(DEFAULT_PCBS)
+        production_data = layout_engine.load_production_data(os.path.join(unseen_dir, "production list.csv"),
+                                                              pcbs, [])
+        estimator = layout_engine.EngraveEstimator(fitted)
+        errors, estimate_ms = [], []
+        for pcb in DEFAULT_PCBS:
+            layout = layout_engine.apply_offsets(layout_engine.compile_layout(pcb.name, unseen_dir), pcb.name, pcbs)
+            for instance in layout_engine.plan_instances(production_data, pcb.name, layout):
+                if not instance.data:
+                    continue
+                start = time.perf_counter()
+                work = estimator.work(layout, instance)
+                estimate_ms.append((time.perf_counter() - start) * 1000)
+                true = true_profile.engrave_seconds(work) * (1 + args.jitter / 2)
+                errors.append(abs(fitted.engrave_seconds(work) - true) / true)
+
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'modules_per_type': args.modules,
+            'jitter': args.jitter,
+            'logged_engravings': len(samples),
+            'true_profile': true_profile.__dict__,
+            'fitted_profile': fitted.__dict__,
+            'calibrate_ms': round(calibrate_ms, 2),
+            'logged_mean_error_s': round(mean_error(fitted, samples), 2),
+            'unseen_frets': len(errors),
+            'unseen_mean_error': round(statistics.mean(errors), 4),
+            'unseen_max_error': round(max(errors), 4),
+            'estimate_ms_median': round(statistics.median(estimate_ms), 3),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Calibrate the engrave time estimator from a simulated log")
+    parser.add_argument('--modules', type=int, default=120, help="modules per PCB type")
+    parser.add_argument('--jitter', type=float, default=0.1, help="operator delay as a fraction of engrave time")
+    parser.add_argument('--time-scale', type=float, default=0.001, help="fraction of engrave time actually slept")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    # Operator delay is up to `jitter`; estimates within that of the true time are as good as it gets
+    return 0 if results['unseen_mean_error'] <= args.jitter else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
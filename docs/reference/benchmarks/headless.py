@@ -0,0 +1,195 @@
+"""Run the layout app's data and export code paths without a display.
+
+`load_app()` imports `Production Layout App v1.4.py` as a module and
+`HeadlessViewer` subclasses its `PCBViewer`, skipping the Tk window, the Google
+Sheets fetches and the operator dialogs while leaving the parsing, planning,
+reflow and SVG export methods untouched. Each core stage is timed into a
+`StageTimer`.
+"""
+
+import importlib.util
+import os
+import statistics
+import sys
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Production Layout App v1.4.py")
+
+_app_module = None
+
+
+# Import the layout app script once and reuse it
+def load_app():
+    global _app_module
+    if _app_module is None:
+        # The app imports its helper modules from its own directory
+        app_dir = os.path.dirname(APP_PATH)
+        if app_dir not in sys.path:
+            sys.path.insert(0, app_dir)
+        spec = importlib.util.spec_from_file_location("production_layout_app", APP_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        # Simulated engravings would spoil the calibration log
+        module.ENGRAVE_TIME_LOG = None
+        _app_module = module
+    return _app_module
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for stage, values in self.samples.items():
+            ordered = sorted(values)
+            result[stage] = {
+                'count': len(values),
+                'total_ms': sum(values) * 1000,
+                'mean_ms': statistics.fmean(values) * 1000,
+                'p50_ms': _percentile(ordered, 0.50) * 1000,
+                'p95_ms': _percentile(ordered, 0.95) * 1000,
+                'max_ms': ordered[-1] * 1000,
+            }
+        return result
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class _Var:
+    """Minimal stand-in for the tk.StringVar the viewer reads the PCB name from."""
+
+    def __init__(self, value: str = ""):
+        self.value = value
+
+    def get(self) -> str:
+        return self.value
+
+    def set(self, value: str):
+        self.value = value
+
+
+# Build a HeadlessViewer class bound to the loaded app module
+def headless_viewer_class(app):
+    class HeadlessViewer(app.PCBViewer):
+        def __init__(self, available_pcbs, lightburn=None, ir_leds=None, timer: StageTimer = None, store=None,
+                     claims=None, jobs=None, export_cache=None, estimator=None, prefetcher=None):
+            self.root = None
+            self.pcb_data_dir = app.WORKING_DIRECTORY
+            self.pcb_data = None
+            self.production_data = []
+            self.current_pcb_type = None
+            self.current_instance_index = 0
+            self.pcb_instances = []
+            self.file_number = 1
+            self.row_checkboxes = []
+            self.col_checkboxes = []
+            self.unique_pcb_types = set()
+            self.image_cache = {}
+            self.pcb_images = {}
+            self.batch_id = "N/A"
+            self.program_settings = {}
+            self.ir_leds = ir_leds or []
+            self.available_pcbs = available_pcbs
+            self.store = store
+            self.claims = claims
+            self.fret_claims = {}
+            self.jobs = jobs
+            self.export_cache = export_cache
+            self.prefetcher = prefetcher
+            self.estimator = estimator or app.layout_engine.EngraveEstimator(app.layout_engine.LaserProfile())
+            self.fret_works = {}
+            self.engrave_loaded = {}
+            self.engrave_started = {}
+            self.exported_frets = OrderedDict()
+            self.reengrave = None
+            self.lightburn = lightburn
+            self.pcb_var = _Var()
+            self.timer = timer or StageTimer()
+
+        # Core stages, timed
+        def load_production_data(self, file_path):
+            with self.timer.time('parse'):
+                return super().load_production_data(file_path)
+
+        def load_pcb_type(self, pcb_name):
+            self.pcb_var.set(pcb_name.upper())
+            with self.timer.time('plan'):
+                return super().load_pcb_type(pcb_name)
+
+        def redistribute_data(self):
+            with self.timer.time('reflow'):
+                super().redistribute_data()
+
+        def render_svg(self, current_instance, file_path):
+            with self.timer.time('render_svg'):
+                return super().render_svg(current_instance, file_path)
+
+        def render_bundle(self, instances, file_path):
+            with self.timer.time('render_svg'):
+                return super().render_bundle(instances, file_path)
+
+        def write_svg(self, dwg):
+            with self.timer.time('write'):
+                super().write_svg(dwg)
+
+        # LightBurn is already running in the simulator
+        def launch_lightburn(self):
+            pass
+
+        def process_batch_files(self, file_paths, current_index=0):
+            # Skip the "Complete" message box at the end of the batch
+            if current_index < len(file_paths):
+                super().process_batch_files(file_paths, current_index)
+
+        # The operator presses "Engraving Finished" immediately
+        def show_engraving_confirmation(self, file_path):
+            self.finish_engraving(file_path)
+
+        def show_batch_engraving_confirmation(self, file_paths, current_index):
+            self.finish_engraving(file_paths[current_index])
+            self.process_batch_files(file_paths, current_index + 1)
+
+        def process_bundle_frets(self, steps, current_index=0):
+            if current_index < len(steps):
+                super().process_bundle_frets(steps, current_index)
+
+        def show_bundle_fret_confirmation(self, steps, current_index):
+            self.finish_bundle_fret(steps, current_index)
+            self.process_bundle_frets(steps, current_index + 1)
+
+        # Tk-only work is skipped
+        def draw_pcb(self):
+            pass
+
+        def update_navigation_buttons(self):
+            pass
+
+        def update_instance_label(self):
+            pass
+
+        def update_checkbox_states(self):
+            pass
+
+        def cleanup_cache(self):
+            pass
+
+    return HeadlessViewer
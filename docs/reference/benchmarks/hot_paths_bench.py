@@ -0,0 +1,195 @@
+"""Micro-benchmarks for the layout app's data and layout hot paths.
+
+Each case runs one `PCBViewer` method through the headless viewer on generated
+inputs at 1x, 10x and 100x of a normal production list and array size, and
+reports wall time and peak traced memory.
+
+    python hot_paths_bench.py --scales 1 10 --output hot-paths.json
+    python hot_paths_bench.py --only load_pcb_data --scales 1 10 100
+    python hot_paths_bench.py --baseline hot-paths.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import replace
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import headless_viewer_class, load_app  # noqa: E402
+from synthetic import DEFAULT_PCBS, SyntheticPCB, available_pcbs, write_layout, write_production_list  # noqa: E402
+
+# 1x is a normal day: ~120 modules per PCB type and the array sizes in DEFAULT_PCBS
+BASE_MODULES_PER_TYPE = 120
+BENCH_PCB = DEFAULT_PCBS[1]
+# The Google Sheets PCB list has roughly this many entries
+AVAILABLE_PCB_COUNT = 80
+
+CASES = ['load_production_data', 'parse_production_row', 'determine_pcb_type', 'load_pcb_data',
+         'initialize_pcb_instances', 'redistribute_data', 'export_svg']
+
+
+# Time `fn` up to `repeat` times, then once more under tracemalloc for the peak.
+# Slow cases stop repeating once `budget` seconds are used and skip the traced run.
+def measure(fn: Callable[[], Any], repeat: int, setup: Callable[[], Any] = None, budget: float = 30.0) -> Dict[str, Any]:
+    times = []
+    while len(times) < repeat and (not times or sum(times) < budget):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    peak_kib = None
+    if sum(times) < budget:
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            fn()
+            peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'repeat': len(times),
+        'median_ms': statistics.median(times) * 1000,
+        'min_ms': min(times) * 1000,
+        'peak_kib': peak_kib,
+    }
+
+
+# PCB list padded with unrelated entries so type resolution scans a realistic dictionary
+def realistic_available_pcbs(pcbs: List[SyntheticPCB]) -> Dict[str, Dict[str, float]]:
+    result = available_pcbs(pcbs)
+    for i in range(AVAILABLE_PCB_COUNT - len(result)):
+        result[f"zz-{i:02d}"] = {'x_offset': 0, 'y_offset': 0}
+    return result
+
+
+# Scale an array by adding rows, keeping the module pitch
+def scaled_pcb(pcb: SyntheticPCB, scale: int) -> SyntheticPCB:
+    return replace(pcb, name=f"bx-{scale:03d}", rows=pcb.rows * scale)
+
+
+def run_scale(app, viewer_class, work_dir: str, scale: int, only: List[str], repeat: int,
+              budget: float) -> Dict[str, Dict[str, Any]]:
+    data_dir = os.path.join(work_dir, f"scale-{scale}")
+    export_dir = os.path.join(data_dir, "export")
+    os.makedirs(export_dir)
+    app.WORKING_DIRECTORY = data_dir
+    app.EXPORT_DIRECTORY = export_dir
+
+    bench_pcb = scaled_pcb(BENCH_PCB, scale)
+    pcbs = DEFAULT_PCBS + [bench_pcb]
+    write_layout(bench_pcb, data_dir)
+    production_file = os.path.join(data_dir, "production list.csv")
+    # Every type gets `scale` times the normal volume; the bench type fills `scale` of its own frets
+    write_production_list(production_file, pcbs, BASE_MODULES_PER_TYPE * scale)
+
+    viewer = viewer_class(realistic_available_pcbs(pcbs))
+    with open(production_file, newline='') as f:
+        rows = list(csv.reader(f))[1:]
+    production_data = viewer.load_production_data(production_file)
+    product_names = [row[1] for row in rows]
+
+    def select():
+        viewer.production_data = production_data
+        viewer.load_pcb_type(bench_pcb.name)
+
+    def mark_faulty():
+        select()
+        # Knock out the first row of the first fret so every later fret reflows
+        for i in range(bench_pcb.columns):
+            viewer.pcb_instances[0].faulty_modules[i] = True
+
+    def export_first():
+        select()
+        viewer.current_instance_index = 0
+
+    def run_export():
+        viewer.export_svg(batch_mode=True)
+
+    cases = {
+        'load_production_data': (lambda: viewer.load_production_data(production_file), None),
+        'parse_production_row': (lambda: [viewer.parse_production_row(row) for row in rows], None),
+        'determine_pcb_type': (lambda: [viewer.determine_pcb_type(name) for name in product_names], None),
+        'load_pcb_data': (lambda: viewer.load_pcb_data(bench_pcb.name), None),
+        'initialize_pcb_instances': (viewer.initialize_pcb_instances, select),
+        'redistribute_data': (viewer.redistribute_data, mark_faulty),
+        'export_svg': (run_export, export_first),
+    }
+
+    results = {}
+    for name in CASES:
+        if only and name not in only:
+            continue
+        fn, setup = cases[name]
+        results[name] = measure(fn, repeat, setup, budget)
+        results[name]['inputs'] = {'production_rows': len(rows), 'modules_per_fret': bench_pcb.modules_count}
+        peak = results[name]['peak_kib']
+        peak_text = f"{peak:>12.0f} KiB" if peak is not None else f"{'-':>12}    "
+        print(f"{name:<26}{scale:>5}x{results[name]['median_ms']:>12.2f} ms{peak_text}", file=sys.stderr)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark the data and layout hot paths")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--only', nargs='+', choices=CASES, help="run only these cases")
+    parser.add_argument('--repeat', type=int, default=5, help="timed repetitions per case")
+    parser.add_argument('--budget', type=float, default=30.0,
+                        help="seconds per case before repetitions and the memory run are skipped")
+    parser.add_argument('--output', help="write results JSON to this file")
+    parser.add_argument('--baseline', help="compare medians against a previous results JSON")
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    app = load_app()
+    viewer_class = headless_viewer_class(app)
+    work_dir = tempfile.mkdtemp(prefix="hot-paths-")
+    try:
+        cases = {f"{scale}x": run_scale(app, viewer_class, work_dir, scale, args.only, args.repeat, args.budget)
+                 for scale in args.scales}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'cases': cases,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressed = []
+        for scale, scale_cases in cases.items():
+            for name, result in scale_cases.items():
+                old = baseline.get('cases', {}).get(scale, {}).get(name, {}).get('median_ms')
+                if old and (result['median_ms'] - old) / old > args.tolerance:
+                    regressed.append(f"{name}@{scale}")
+        if regressed:
+            print(f"Regressed: {', '.join(regressed)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
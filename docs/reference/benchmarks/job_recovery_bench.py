@@ -0,0 +1,172 @@
+"""Crash-and-resume benchmark for the Batch Export job journal.
+
+A child process runs Batch Export for every PCB type in a synthetic production
+list against the simulated LightBurn, journalling to a job directory, and is
+killed outright (`os._exit`, no cleanup) after `--crash-after` frets have been
+engraved. The benchmark then opens the journal as a restarted app would,
+resumes every unfinished job and reports how long recovery took, how many
+files had to be exported again and whether any fret was engraved twice or
+not at all.
+
+    python job_recovery_bench.py --modules 400 --crash-after 25
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import headless_viewer_class, load_app  # noqa: E402
+from lightburn_sim import SimulatedLightBurn, simulated_controller_class  # noqa: E402
+from soak_test import AutoMessagebox  # noqa: E402
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset  # noqa: E402
+
+
+# Headless viewer that records every file the operator confirms, and can die mid-batch
+def recording_viewer_class(app, engraved_log: str, crash_after: int = 0):
+    class RecordingViewer(headless_viewer_class(app)):
+        engraved = 0
+
+        def show_batch_engraving_confirmation(self, file_paths, current_index):
+            if crash_after and self.engraved >= crash_after:
+                os._exit(1)
+            self.finish_engraving(file_paths[current_index])
+            self.engraved += 1
+            with open(engraved_log, 'a') as f:
+                f.write(os.path.basename(file_paths[current_index]) + "\n")
+            self.process_batch_files(file_paths, current_index + 1)
+
+    return RecordingViewer
+
+
+def setup_app(work_dir: str):
+    app = load_app()
+    app.WORKING_DIRECTORY = os.path.join(work_dir, "data")
+    app.EXPORT_DIRECTORY = os.path.join(work_dir, "export")
+    app.messagebox = AutoMessagebox()
+    return app
+
+
+# Child process: Batch Export every PCB type until killed
+def run_child(work_dir: str, crash_after: int):
+    app = setup_app(work_dir)
+    import layout_engine
+
+    controller = simulated_controller_class(app)(SimulatedLightBurn(latency=0.0))
+    jobs = layout_engine.JobQueue(os.path.join(work_dir, "jobs"))
+    viewer = recording_viewer_class(app, os.path.join(work_dir, "engraved_before.txt"), crash_after)(
+        available_pcbs(DEFAULT_PCBS), lightburn=controller, jobs=jobs)
+    viewer.production_data = viewer.load_production_data(os.path.join(app.WORKING_DIRECTORY, "production list.csv"))
+    for pcb_type in sorted(viewer.unique_pcb_types):
+        if viewer.load_pcb_type(pcb_type):
+            viewer.batch_export_svg()
+
+
+def _read_lines(path: str) -> List[str]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    load_app()  # puts the app directory, and with it layout_engine, on the path
+    import layout_engine
+
+    work_dir = tempfile.mkdtemp(prefix="job-recovery-")
+    try:
+        build_dataset(os.path.join(work_dir, "data"), DEFAULT_PCBS, args.modules, seed=args.seed)
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', work_dir,
+                                '--crash-after', str(args.crash_after)])
+        export_dir = os.path.join(work_dir, "export")
+        before = {name: os.stat(os.path.join(export_dir, name)).st_mtime_ns for name in os.listdir(export_dir)}
+        engraved_before = _read_lines(os.path.join(work_dir, "engraved_before.txt"))
+
+        # Restart: replay the journal, then re-export missing files and engrave the rest
+        app = setup_app(work_dir)
+        controller = simulated_controller_class(app)(SimulatedLightBurn(latency=0.0))
+        start = time.perf_counter()
+        jobs = layout_engine.JobQueue(os.path.join(work_dir, "jobs"))
+        replay = time.perf_counter() - start
+        unfinished = jobs.unfinished()
+        states = [job.counts() for job in unfinished]
+
+        viewer = recording_viewer_class(app, os.path.join(work_dir, "engraved_after.txt"))(
+            available_pcbs(DEFAULT_PCBS), lightburn=controller, jobs=jobs)
+        first_load = None
+        original_load = controller.load_file
+
+        def load_file(file_path):
+            nonlocal first_load
+            if first_load is None:
+                first_load = time.perf_counter() - start
+            return original_load(file_path)
+
+        controller.load_file = load_file
+        # One job is resumed per prompt, as at a station
+        remaining = len(unfinished)
+        while remaining:
+            viewer.offer_resume()
+            if len(jobs.unfinished()) >= remaining:
+                break
+            remaining = len(jobs.unfinished())
+        total = time.perf_counter() - start
+        jobs.close()
+        controller.cleanup()
+
+        after = {name: os.stat(os.path.join(export_dir, name)).st_mtime_ns for name in os.listdir(export_dir)}
+        engraved_after = _read_lines(os.path.join(work_dir, "engraved_after.txt"))
+        engraved = engraved_before + engraved_after
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'child_exit': child.returncode,
+            'modules_per_type': args.modules,
+            'journal_kib': os.path.getsize(jobs.path) // 1024,
+            'unfinished_jobs': len(states),
+            'fret_states_at_restart': states,
+            'replay_ms': round(replay * 1000, 2),
+            'ready_to_engrave_ms': round(first_load * 1000, 2) if first_load is not None else None,
+            'resume_total_ms': round(total * 1000, 2),
+            'files': len(after),
+            're_exported': sorted(name for name in after if before.get(name) != after[name]),
+            'engraved_before_crash': len(engraved_before),
+            'engraved_after_resume': len(engraved_after),
+            'engraved_twice': sorted({name for name in engraved if engraved.count(name) > 1}),
+            'never_engraved': sorted(set(after) - set(engraved)),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Crash a batch export and time its resume from the job journal")
+    parser.add_argument('--modules', type=int, default=400, help="modules per PCB type")
+    parser.add_argument('--crash-after', type=int, default=25, help="frets engraved before the crash")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    parser.add_argument('--child', metavar='WORK_DIR', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child, args.crash_after)
+        return 0
+
+    results = run_benchmark(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps({key: value for key, value in results.items() if key != 'fret_states_at_restart'}, indent=2))
+    failed = results['engraved_twice'] or results['never_engraved'] or results['child_exit'] == 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""LightBurn project export versus SVG export: generation time and file size.
+
+Exports every fret of a synthetic production list as an SVG and as a LightBurn
+project (`render_lbrn2`, from `--template` or the built-in template), with
+`<text>` codes and, given a font, with glyph outlines. Reports the time to
+render and write each file, the file sizes and the time to parse them back as
+XML. Every project is checked against its SVG: the same codes in the same
+order, at the same positions with y flipped into LightBurn's work area.
+
+    python lightburn_bench.py --modules 120
+    python lightburn_bench.py --large --font Roboto-Thin.ttf --template lightburn_templates/default.lbrn2
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compact_bench import LARGE_PCB, placements  # noqa: E402
+from headless import load_app  # noqa: E402
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset  # noqa: E402
+
+TOLERANCE = 0.0001  # projects keep 4 decimals
+
+# (text or None for an outline group, x, y) of each code of a project, in LightBurn coordinates
+ProjectCode = Tuple[Any, float, float]
+
+
+def project_codes(root, template_shapes: int) -> List[ProjectCode]:
+    codes = []
+    for shape in root.findall('Shape')[template_shapes:]:
+        transform = [float(value) for value in shape.find('XForm').text.split()]
+        codes.append((shape.get('Str'), transform[4], transform[5]))
+    return codes
+
+
+def _time_files(frets, directory: str, extension: str, export) -> Tuple[Dict[str, Any], List[Any]]:
+    os.makedirs(directory, exist_ok=True)
+    render, parse, sizes, roots = [], [], [], []
+    for name, layout, instance in frets:
+        file_path = os.path.join(directory, os.path.splitext(name)[0] + extension)
+        start = time.perf_counter()
+        export(layout, instance, file_path)
+        render.append(time.perf_counter() - start)
+        sizes.append(os.path.getsize(file_path))
+        start = time.perf_counter()
+        roots.append(ElementTree.parse(file_path).getroot())
+        parse.append(time.perf_counter() - start)
+    return {
+        'files': len(sizes),
+        'kib_per_file': round(statistics.mean(sizes) / 1024, 2) if sizes else 0.0,
+        'render_write_ms_median': round(statistics.median(render) * 1000, 3) if render else 0.0,
+        'parse_ms_median': round(statistics.median(parse) * 1000, 3) if parse else 0.0,
+    }, roots
+
+
+def compare(layout_engine, frets, work_dir: str, name: str, template, **options) -> Dict[str, Any]:
+    def export_svg(layout, instance, file_path):
+        layout_engine.write_svg(layout_engine.render_svg(layout, instance, file_path, **options))
+
+    def export_project(layout, instance, file_path):
+        layout_engine.write_lbrn2(layout_engine.render_lbrn2(layout, instance, template, **options), file_path)
+
+    svg, svg_roots = _time_files(frets, os.path.join(work_dir, name), ".svg", export_svg)
+    project, project_roots = _time_files(frets, os.path.join(work_dir, name + "-lbrn2"), ".lbrn2", export_project)
+
+    template_shapes = len(template.root.findall('Shape'))
+    mismatched = 0
+    for svg_root, project_root in zip(svg_roots, project_roots):
+        expected = placements(svg_root)
+        actual = project_codes(project_root, template_shapes)
+        if len(expected) != len(actual) or any(
+                (text is not None and text != content) or abs(x - sx) > TOLERANCE
+                or abs(y - (layout_engine.lightburn_export.WORK_AREA_HEIGHT - sy)) > TOLERANCE
+                for (content, sx, sy, _, _), (text, x, y) in zip(expected, actual)):
+            mismatched += 1
+    return {'svg': svg, 'lbrn2': project, 'mismatched_files': mismatched}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare LightBurn project and SVG export")
+    parser.add_argument('--modules', type=int, default=120, help="modules per PCB type")
+    parser.add_argument('--large', action='store_true', help="add a 100-module array with 400 texts per fret")
+    parser.add_argument('--font', help="also compare glyph-outline export, with a library built from this font")
+    parser.add_argument('--template', help="LightBurn template (default: built-in)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    load_app()  # puts the app directory, and with it layout_engine, on the path
+    import layout_engine
+
+    pcbs = DEFAULT_PCBS + ([LARGE_PCB] if args.large else [])
+    template = layout_engine.load_template(args.template)
+    work_dir = tempfile.mkdtemp(prefix="lightburn-bench-")
+    try:
+        data_dir = os.path.join(work_dir, "data")
+        production_file = build_dataset(data_dir, pcbs, args.modules, seed=args.seed)
+        offsets = available_pcbs(pcbs)
+        production_data = layout_engine.load_production_data(production_file, offsets, [])
+        frets = []
+        for pcb in pcbs:
+            layout = layout_engine.apply_offsets(layout_engine.compile_layout(pcb.name, data_dir), pcb.name, offsets)
+            instances = layout_engine.plan_instances(production_data, pcb.name, layout)
+            frets.extend((layout_engine.export_file_name(instance, n), layout, instance)
+                         for n, instance in enumerate(instances, start=1) if instance.data)
+
+        modes = {'text': compare(layout_engine, frets, work_dir, "text", template)}
+        if args.font:
+            glyphs_path = os.path.join(work_dir, "glyphs.json")
+            with open(glyphs_path, 'w', encoding='utf-8') as f:
+                json.dump(layout_engine.build_library(args.font), f, separators=(',', ':'))
+            layout_engine.load_glyph_library(glyphs_path)
+            modes['outline'] = compare(layout_engine, frets, work_dir, "outline", template,
+                                       outline_glyphs=glyphs_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'modules_per_type': args.modules,
+        'pcb_types': [pcb.name for pcb in pcbs],
+        'template': template.name,
+        **modes,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    return 1 if any(mode['mismatched_files'] for mode in modes.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
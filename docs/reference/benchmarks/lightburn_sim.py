@@ -0,0 +1,112 @@
+"""A stand-in for LightBurn's UDP command interface.
+
+LightBurn listens for commands on one UDP port and answers on another. The
+simulator does the same on localhost, with configurable per-command latency,
+jitter and packet loss, so export/load/close cycles can be measured without a
+laser station.
+"""
+
+import logging
+import random
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+
+class SimulatedLightBurn:
+    def __init__(self, latency: float = 0.005, jitter: float = 0.0, loss: float = 0.0,
+                 load_latency: Optional[float] = None, udp_ip: str = "127.0.0.1", seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.load_latency = latency if load_latency is None else load_latency
+        self.udp_ip = udp_ip
+        self.reply_port = None
+        self.counts: Dict[str, int] = {'received': 0, 'dropped': 0, 'answered': 0}
+        self.loaded_files = []
+        self._rng = random.Random(seed)
+        self._stop = threading.Event()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((udp_ip, 0))
+        self._sock.settimeout(0.1)
+        self._thread = threading.Thread(target=self._serve, name="lightburn-sim", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._sock.getsockname()[1]
+
+    def start(self, reply_port: int):
+        self.reply_port = reply_port
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self._sock.close()
+
+    # Delay that LightBurn would take to act on a command
+    def _delay_for(self, command: str) -> float:
+        base = self.load_latency if command.startswith("LOADFILE:") else self.latency
+        if self.jitter:
+            base += self._rng.uniform(0, self.jitter)
+        return base
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                data, _ = self._sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            command = data.decode()
+            self.counts['received'] += 1
+            if self.loss and self._rng.random() < self.loss:
+                self.counts['dropped'] += 1
+                continue
+
+            time.sleep(self._delay_for(command))
+            if command.startswith("LOADFILE:"):
+                self.loaded_files.append(command[len("LOADFILE:"):])
+            try:
+                self._sock.sendto(b"OK", (self.udp_ip, self.reply_port))
+                self.counts['answered'] += 1
+            except OSError as e:
+                logging.debug(f"Simulated LightBurn reply failed: {e}")
+
+
+# Build a LightBurnController subclass that talks to the simulator instead of real windows
+def simulated_controller_class(app):
+    class SimulatedLightBurnController(app.LightBurnController):
+        def __init__(self, server: SimulatedLightBurn, timer=None, timeout: float = 1.0):
+            super().__init__(udp_ip=server.udp_ip, udp_out_port=server.port, udp_in_port=0)
+            self.in_sock.settimeout(timeout)
+            self.udp_in_port = self.in_sock.getsockname()[1]
+            server.start(self.udp_in_port)
+            self.server = server
+            self.timer = timer
+
+        def load_file(self, filepath: str) -> bool:
+            start = time.perf_counter()
+            success = super().load_file(filepath)
+            if self.timer:
+                self.timer.record('load' if success else 'load_failed', time.perf_counter() - start)
+            return success
+
+        def force_close(self) -> bool:
+            start = time.perf_counter()
+            super().force_close()
+            if self.timer:
+                self.timer.record('close', time.perf_counter() - start)
+
+        # There are no windows to close, so use LightBurn's own close command
+        def _force_close_windows(self) -> None:
+            self.send_command("FORCECLOSE")
+
+        def cleanup(self):
+            super().cleanup()
+            self.server.stop()
+
+    return SimulatedLightBurnController
@@ -0,0 +1,192 @@
+"""Micro-ID dot codes: exhaustive round trip, encode speed, and fret export cost.
+
+Encodes every serial number of the 20-bit space in chunks (`micro_id.encode`,
+vectorized with NumPy) and decodes it back, checking that each grid decodes to
+its serial and is valid, that serial 0 and every single-cell error (any of the
+25 cells flipped, on every code) are rejected, and that a sample of grids
+matches a plain transcription of the spec's encoding algorithm (the checks
+shared with `tests/test_micro_id.py`). Then exports the frets of a synthetic
+production list with a Micro-ID on every module, with the fragment cache cold
+and warm, reads every code back from the SVG and checks its serial and
+position.
+
+    python micro_id_bench.py
+    python micro_id_bench.py --modules 400 --chunk 65536
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+REFERENCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# The round trip checks live in the test suite
+sys.path.insert(0, REFERENCE_DIR)
+sys.path.insert(0, os.path.join(REFERENCE_DIR, "tests"))
+
+from headless import load_app  # noqa: E402
+from synthetic import SyntheticPCB, available_pcbs, build_dataset  # noqa: E402
+from test_micro_id import flips_accepted, reference_grid  # noqa: E402
+
+SVG = "{http://www.w3.org/2000/svg}"
+MICRO_ID_PCB = SyntheticPCB("sz-id", 6, 6, 1, pitch=16.0, micro_id=True)
+SAMPLE = 2000
+TOLERANCE = 0.0005 + 1e-9
+
+
+def round_trip(micro_id, chunk: int, seed: int) -> Dict[str, Any]:
+    failures: Dict[str, int] = {'round_trip': 0, 'flips_accepted': 0, 'reference': 0}
+    encode_seconds = decode_seconds = 0.0
+    start = time.perf_counter()
+    for first in range(micro_id.MIN_SERIAL, micro_id.MAX_SERIAL + 1, chunk):
+        serials = np.arange(first, min(first + chunk, micro_id.MAX_SERIAL + 1), dtype=np.int64)
+        t = time.perf_counter()
+        grids = micro_id.encode(serials)
+        encode_seconds += time.perf_counter() - t
+        t = time.perf_counter()
+        decoded, valid = micro_id.decode(grids)
+        decode_seconds += time.perf_counter() - t
+        failures['round_trip'] += int(np.count_nonzero((decoded != serials) | ~valid))
+
+        # Every single-cell error must be caught: anchors by the anchor check, the rest by parity
+        failures['flips_accepted'] += flips_accepted(grids)
+    total_seconds = time.perf_counter() - start
+
+    # Serial 0 encodes (the technical range includes it) but is outside the business range
+    zero = np.array(reference_grid(0), dtype=np.uint8)
+    zero_rejected = not micro_id.decode(zero)[1]
+    try:
+        micro_id.encode([0])
+        encode_zero_rejected = False
+    except micro_id.MicroIDError:
+        encode_zero_rejected = True
+
+    rng = random.Random(seed)
+    sample = [micro_id.MIN_SERIAL, micro_id.MAX_SERIAL] + [rng.randint(micro_id.MIN_SERIAL, micro_id.MAX_SERIAL)
+                                                           for _ in range(SAMPLE)]
+    for serial, grid in zip(sample, micro_id.encode(sample)):
+        if grid.tolist() != reference_grid(serial):
+            failures['reference'] += 1
+
+    return {
+        'serials': micro_id.MAX_SERIAL - micro_id.MIN_SERIAL + 1,
+        'single_cell_errors': (micro_id.MAX_SERIAL - micro_id.MIN_SERIAL + 1) * 25,
+        'encode_ms': round(encode_seconds * 1000, 1),
+        'decode_ms': round(decode_seconds * 1000, 1),
+        'total_seconds': round(total_seconds, 2),
+        'reference_sample': len(sample),
+        'serial_0_rejected': bool(zero_rejected and encode_zero_rejected),
+        'formatting': [micro_id.format_serial(1), micro_id.format_serial(micro_id.MAX_SERIAL)],
+        'failures': failures,
+    }
+
+
+# Placed codes of an exported SVG: serial, center and decoded grid
+def read_codes(micro_id, root: ElementTree.Element) -> List[Tuple[int, float, float, np.ndarray]]:
+    codes = []
+    for group in root.iter(f"{SVG}g"):
+        match = re.fullmatch(r"micro-id-(\d{8})", group.get('id', ""))
+        if not match:
+            continue
+        left, top = (float(value) for value in re.fullmatch(r"translate\((\S+) (\S+)\)",
+                                                             group.get('transform')).groups())
+        grid = np.zeros((5, 5), dtype=np.uint8)
+        for circle in group.iter(f"{SVG}circle"):
+            x, y = float(circle.get('cx')), float(circle.get('cy'))
+            if (x, y) == micro_id.ORIENTATION_DOT:
+                continue
+            grid[round((y - micro_id.EDGE_OFFSET) / micro_id.DOT_PITCH),
+                 round((x - micro_id.EDGE_OFFSET) / micro_id.DOT_PITCH)] = 1
+        codes.append((int(match.group(1)), left + micro_id.CODE_SIZE / 2, top + micro_id.CODE_SIZE / 2, grid))
+    return codes
+
+
+def export_frets(layout_engine, modules: int, seed: int, work_dir: str) -> Dict[str, Any]:
+    micro_id = layout_engine.micro_id
+    data_dir = os.path.join(work_dir, "data")
+    # Serial numbers near the top of the range, as the business system assigns them late in its life
+    production_file = build_dataset(data_dir, [MICRO_ID_PCB], modules, seed=seed,
+                                    first_serial=micro_id.MAX_SERIAL - modules + 1)
+    offsets = available_pcbs([MICRO_ID_PCB])
+    production_data = layout_engine.load_production_data(production_file, offsets, [])
+    layout = layout_engine.apply_offsets(layout_engine.compile_layout(MICRO_ID_PCB.name, data_dir),
+                                         MICRO_ID_PCB.name, offsets)
+    instances = [instance for instance in layout_engine.plan_instances(production_data, MICRO_ID_PCB.name, layout)
+                 if instance.data]
+
+    timings: Dict[str, float] = {}
+    mismatched = codes_read = 0
+    for mode in ("without", "cold", "warm"):
+        if mode == "cold":
+            micro_id.clear_cache()
+        start = time.perf_counter()
+        for n, instance in enumerate(instances, start=1):
+            file_path = os.path.join(work_dir, f"{mode}_{n:03d}.svg")
+            layout_engine.write_svg(layout_engine.render_svg(layout, instance, file_path,
+                                                             micro_ids=mode != "without"))
+        timings[mode] = (time.perf_counter() - start) * 1000 / len(instances)
+
+    for n, instance in enumerate(instances, start=1):
+        expected = layout_engine.micro_id_elements(layout, instance)
+        actual = read_codes(micro_id, ElementTree.parse(os.path.join(work_dir, f"warm_{n:03d}.svg")).getroot())
+        codes_read += len(actual)
+        decoded, valid = micro_id.decode(np.array([grid for _, _, _, grid in actual]).reshape(-1, 5, 5))
+        if len(expected) != len(actual) or not valid.all() or any(
+                serial != read_serial or serial != int(decoded_serial)
+                or abs(x - ax) > TOLERANCE or abs(y - ay) > TOLERANCE
+                for (serial, x, y), (read_serial, ax, ay, _), decoded_serial in zip(expected, actual, decoded)):
+            mismatched += 1
+
+    return {
+        'frets': len(instances),
+        'codes': codes_read,
+        'export_ms_per_fret': {mode: round(ms, 3) for mode, ms in timings.items()},
+        'cached_fragments': micro_id.cache_size(),
+        'mismatched_frets': mismatched,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check and time Micro-ID encoding and export")
+    parser.add_argument('--modules', type=int, default=200, help="modules in the synthetic production list")
+    parser.add_argument('--chunk', type=int, default=2 ** 18, help="serials encoded per call")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    load_app()  # puts the app directory, and with it layout_engine, on the path
+    import layout_engine
+    import layout_engine.micro_id
+
+    work_dir = tempfile.mkdtemp(prefix="micro-id-bench-")
+    try:
+        results = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'round_trip': round_trip(layout_engine.micro_id, args.chunk, args.seed),
+            'export': export_frets(layout_engine, args.modules, args.seed, work_dir),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    failed = (any(results['round_trip']['failures'].values()) or not results['round_trip']['serial_0_rejected']
+              or results['export']['mismatched_frets'])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Fixture nesting versus one fret per file: laser loads, engrave time, export time.
+
+Exports every fret of a synthetic production list once per file and once
+nested in a fixture (`render_nested_svg`, from `--fixture` or a built-in
+2 x 2 fixture), for the PCB types the fixture takes and fits. Reports the
+files (laser loads) each way, the estimated engrave time with the default
+laser profile, whose setup time is paid once per load, and the time to render
+and write the files. Every nested file is checked to hold the texts of its
+frets' single files, in order, moved from the work area centre to their slots.
+
+    python nesting_bench.py --modules 120
+    python nesting_bench.py --modules 400 --fixture fixtures/sz-quad.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compact_bench import placements  # noqa: E402
+from headless import load_app  # noqa: E402
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset  # noqa: E402
+
+TOLERANCE = 0.0001
+QUAD = {"name": "quad", "slots": [[55, 55], [155, 55], [55, 155], [155, 155]]}
+
+
+def compare_type(layout_engine, fixture, layout, instances, work_dir: str) -> Dict[str, Any]:
+    laser = layout_engine.LaserProfile()
+    center = layout_engine.svg_export.WORK_AREA_CENTER
+    single_dir, nested_dir = os.path.join(work_dir, "single"), os.path.join(work_dir, "nested")
+    os.makedirs(single_dir, exist_ok=True)
+    os.makedirs(nested_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    single_roots, single_seconds = [], 0.0
+    for n, instance in enumerate(instances, start=1):
+        file_path = os.path.join(single_dir, layout_engine.export_file_name(instance, n))
+        layout_engine.write_svg(layout_engine.render_svg(layout, instance, file_path))
+        single_roots.append(ElementTree.parse(file_path).getroot())
+        single_seconds += laser.estimate(layout_engine.engrave_time.fret_work(
+            layout_engine.svg_export.fret_elements(layout, instance)))
+    single_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    nested_files, nested_seconds, mismatched = 0, 0.0, 0
+    first = 0
+    for load in fixture.loads(instances):
+        frets = [(layout, instance) for instance in load]
+        file_path = os.path.join(nested_dir, layout_engine.nested_file_name(load, first + 1))
+        layout_engine.write_svg(layout_engine.render_nested_svg(frets, fixture, file_path))
+        nested_files += 1
+        nested_seconds += laser.estimate(layout_engine.engrave_time.fret_work(
+            layout_engine.nesting.nested_elements(frets, fixture)))
+
+        expected = []
+        for root, (slot_x, slot_y) in zip(single_roots[first:first + len(load)], fixture.slots):
+            expected.extend((text, x + slot_x - center[0], y + slot_y - center[1])
+                            for text, x, y, _, _ in placements(root))
+        actual = placements(ElementTree.parse(file_path).getroot())
+        if len(expected) != len(actual) or any(
+                text != content or abs(x - ax) > TOLERANCE or abs(y - ay) > TOLERANCE
+                for (text, x, y), (content, ax, ay, _, _) in zip(expected, actual)):
+            mismatched += 1
+        first += len(load)
+    nested_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'frets': len(instances),
+        'single': {'files': len(instances), 'engrave_seconds': round(single_seconds, 1),
+                   'export_ms_per_fret': round(single_ms / len(instances), 3)},
+        'nested': {'files': nested_files, 'engrave_seconds': round(nested_seconds, 1),
+                   'export_ms_per_fret': round(nested_ms / len(instances), 3)},
+        'mismatched_files': mismatched,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare fixture-nested and single-fret export")
+    parser.add_argument('--modules', type=int, default=120, help="modules per PCB type")
+    parser.add_argument('--fixture', help="fixture definition JSON (default: 2 x 2 slots, 100 mm apart)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    load_app()  # puts the app directory, and with it layout_engine, on the path
+    import layout_engine
+
+    work_dir = tempfile.mkdtemp(prefix="nesting-bench-")
+    types: Dict[str, Any] = {}
+    try:
+        fixture_path = args.fixture
+        if not fixture_path:
+            fixture_path = os.path.join(work_dir, "quad.json")
+            with open(fixture_path, 'w') as f:
+                json.dump(QUAD, f)
+        fixture = layout_engine.load_fixture(fixture_path)
+
+        data_dir = os.path.join(work_dir, "data")
+        production_file = build_dataset(data_dir, DEFAULT_PCBS, args.modules, seed=args.seed)
+        offsets = available_pcbs(DEFAULT_PCBS)
+        production_data = layout_engine.load_production_data(production_file, offsets, [])
+        for pcb in DEFAULT_PCBS:
+            if not fixture.accepts(pcb.name):
+                continue
+            layout = layout_engine.apply_offsets(layout_engine.compile_layout(pcb.name, data_dir), pcb.name, offsets)
+            try:
+                layout_engine.check_fit(fixture, layout, pcb.name)
+            except layout_engine.FixtureError as e:
+                types[pcb.name] = {'skipped': str(e)}
+                continue
+            instances = [instance for instance in layout_engine.plan_instances(production_data, pcb.name, layout)
+                         if instance.data]
+            types[pcb.name] = compare_type(layout_engine, fixture, layout, instances,
+                                           os.path.join(work_dir, pcb.name))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'modules_per_type': args.modules,
+        'fixture': {'name': fixture.name, 'slots': len(fixture.slots)},
+        'pcb_types': types,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    return 1 if any(result.get('mismatched_files') for result in types.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Text export versus glyph-outline export: file size and generation time.
+
+Builds a glyph library from a TrueType font, then exports every fret of a
+synthetic production list twice, once with `<text>` elements and once with
+outlines (`render_svg(..., outline_glyphs=...)`), and reports the time to
+render and write each file, the file sizes, and the time to parse them back as
+XML (a rough stand-in for the import, which LightBurn does not report). Every
+outline file is checked to hold one path per text of the text file.
+
+    python outline_bench.py --font Roboto-Thin.ttf --modules 120
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import load_app  # noqa: E402
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset  # noqa: E402
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def _median_ms(values: List[float]) -> float:
+    return round(statistics.median(values) * 1000, 3) if values else 0.0
+
+
+def export_files(layout_engine, frets, directory: str, **options) -> Dict[str, Any]:
+    os.makedirs(directory, exist_ok=True)
+    render, parse, sizes, elements = [], [], [], []
+    for name, layout, instance in frets:
+        file_path = os.path.join(directory, name)
+        start = time.perf_counter()
+        layout_engine.write_svg(layout_engine.render_svg(layout, instance, file_path, **options))
+        render.append(time.perf_counter() - start)
+        sizes.append(os.path.getsize(file_path))
+        start = time.perf_counter()
+        root = ElementTree.parse(file_path).getroot()
+        parse.append(time.perf_counter() - start)
+        elements.append(len(root.findall(f"{SVG}text")) + len(root.findall(f"{SVG}path")))
+    return {
+        'files': len(sizes),
+        'kib_total': round(sum(sizes) / 1024, 1),
+        'kib_per_file': round(statistics.mean(sizes) / 1024, 2) if sizes else 0.0,
+        'render_write_ms_median': _median_ms(render),
+        'parse_ms_median': _median_ms(parse),
+        'elements': elements,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare text and glyph-outline SVG export")
+    parser.add_argument('--font', required=True, help="TrueType font to build the glyph library from")
+    parser.add_argument('--modules', type=int, default=120, help="modules per PCB type")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    load_app()  # puts the app directory, and with it layout_engine, on the path
+    import layout_engine
+
+    work_dir = tempfile.mkdtemp(prefix="outline-bench-")
+    try:
+        start = time.perf_counter()
+        library = layout_engine.build_library(args.font)
+        build_ms = (time.perf_counter() - start) * 1000
+        glyphs_path = os.path.join(work_dir, "glyphs.json")
+        with open(glyphs_path, 'w', encoding='utf-8') as f:
+            json.dump(library, f, separators=(',', ':'))
+
+        data_dir = os.path.join(work_dir, "data")
+        production_file = build_dataset(data_dir, DEFAULT_PCBS, args.modules, seed=args.seed)
+        pcbs = available_pcbs(DEFAULT_PCBS)
+        production_data = layout_engine.load_production_data(production_file, pcbs, [])
+        frets = []
+        for pcb in DEFAULT_PCBS:
+            layout = layout_engine.apply_offsets(layout_engine.compile_layout(pcb.name, data_dir), pcb.name, pcbs)
+            instances = layout_engine.plan_instances(production_data, pcb.name, layout)
+            frets.extend((layout_engine.export_file_name(instance, n), layout, instance)
+                         for n, instance in enumerate(instances, start=1) if instance.data)
+
+        text = export_files(layout_engine, frets, os.path.join(work_dir, "text"))
+        # The first outline export also loads the library; warm it so the medians compare rendering
+        layout_engine.load_glyph_library(glyphs_path)
+        outline = export_files(layout_engine, frets, os.path.join(work_dir, "outline"), outline_glyphs=glyphs_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    mismatched = sum(1 for a, b in zip(text.pop('elements'), outline.pop('elements')) if a != b)
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'font': os.path.basename(args.font),
+        'glyphs': len(library['glyphs']),
+        'library_build_ms': round(build_ms, 1),
+        'modules_per_type': args.modules,
+        'text': text,
+        'outline': outline,
+        'mismatched_files': mismatched,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
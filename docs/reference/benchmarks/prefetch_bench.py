@@ -0,0 +1,187 @@
+"""Export latency with and without background pre-rendering of export files.
+
+Runs the operator's workflow on a synthetic production list twice, with an
+export cache in a fresh directory each time: load the list, select each PCB
+type and click Export for every fret. Once with an `ExportPrefetcher`, pausing
+after loading the list, after each selection and after each click as the
+operator checks the fret and the laser engraves it, and once without. Reports
+the time per Export click and per type selection (which stages the type's
+frets), what staging the production list costs the viewer thread and how long
+the worker took, and checks that both runs exported identical files.
+
+Then edits a staged fret (marks a slot faulty) and checks that its export
+matches a fresh render rather than the file staged before the edit, and that
+the prefetcher removed the stale file from the cache.
+
+    python prefetch_bench.py
+    python prefetch_bench.py --modules 400 --frets 30
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import headless_viewer_class, load_app  # noqa: E402
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset  # noqa: E402
+
+
+# Headless viewer that leaves engraving out, so an Export click is only the export
+def export_only_viewer_class(app):
+    class ExportOnlyViewer(headless_viewer_class(app)):
+        def engrave_file(self, file_path):
+            pass
+
+    return ExportOnlyViewer
+
+
+def _read(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+# Load the production list, then export every fret of every PCB type one click at a time
+def run_workflow(app, layout_engine, work_dir: str, prefetch: bool) -> Dict[str, Any]:
+    app.EXPORT_DIRECTORY = os.path.join(work_dir, "export")
+    cache = layout_engine.ExportCache(os.path.join(work_dir, "cache"))
+    prefetcher = layout_engine.ExportPrefetcher(cache, app.WORKING_DIRECTORY) if prefetch else None
+    viewer = export_only_viewer_class(app)(available_pcbs(DEFAULT_PCBS), export_cache=cache, prefetcher=prefetcher)
+    idle_seconds = 0.0
+    clicks, selects = [], []
+    try:
+        viewer.production_data = viewer.load_production_data(os.path.join(app.WORKING_DIRECTORY,
+                                                                          "production list.csv"))
+        start = time.perf_counter()
+        viewer.prefetch_types()
+        stage_seconds = time.perf_counter() - start
+        if prefetcher:
+            start = time.perf_counter()
+            prefetcher.wait()
+            idle_seconds += time.perf_counter() - start
+        for pcb_type in sorted(viewer.unique_pcb_types):
+            start = time.perf_counter()
+            if not viewer.load_pcb_type(pcb_type):
+                continue
+            selects.append(time.perf_counter() - start)
+            if prefetcher:
+                start = time.perf_counter()
+                prefetcher.wait()
+                idle_seconds += time.perf_counter() - start
+            while viewer.pcb_instances[viewer.current_instance_index].data:
+                start = time.perf_counter()
+                viewer.export_svg()
+                clicks.append(time.perf_counter() - start)
+                if prefetcher:
+                    # The fret engraves
+                    start = time.perf_counter()
+                    prefetcher.wait()
+                    idle_seconds += time.perf_counter() - start
+        stats = prefetcher.stats() if prefetcher else {}
+    finally:
+        if prefetcher:
+            prefetcher.close()
+    files = {name: _read(os.path.join(app.EXPORT_DIRECTORY, name)) for name in os.listdir(app.EXPORT_DIRECTORY)}
+    return {
+        'files': files,
+        'result': {
+            'ms_per_click_mean': round(statistics.mean(clicks) * 1000, 2),
+            'ms_per_click_max': round(max(clicks) * 1000, 2),
+            'ms_per_type_selection_mean': round(statistics.mean(selects) * 1000, 2),
+            'cache_hits': cache.hits,
+            'cache_misses': cache.misses,
+            'staging_ms_on_viewer_thread': round(stage_seconds * 1000, 1),
+            'background_seconds': round(idle_seconds, 2),
+            **({'prefetch': stats} if stats else {}),
+        },
+    }
+
+
+# Edit a staged fret after its stage was rendered; its export must show the edit, and the stale file must go
+def check_edit(app, layout_engine, work_dir: str) -> Dict[str, Any]:
+    app.EXPORT_DIRECTORY = os.path.join(work_dir, "export-edit")
+    cache = layout_engine.ExportCache(os.path.join(work_dir, "cache-edit"))
+    prefetcher = layout_engine.ExportPrefetcher(cache, app.WORKING_DIRECTORY)
+    viewer = headless_viewer_class(app)(available_pcbs(DEFAULT_PCBS), export_cache=cache, prefetcher=prefetcher)
+    try:
+        viewer.production_data = viewer.load_production_data(os.path.join(app.WORKING_DIRECTORY,
+                                                                          "production list.csv"))
+        pcb_type = sorted(viewer.unique_pcb_types)[0]
+        viewer.load_pcb_type(pcb_type)
+        prefetcher.wait()
+        instance = viewer.pcb_instances[0]
+        options = viewer.svg_options()
+        file_name = layout_engine.export_file_name(instance, viewer.file_number)
+        stale = cache.path_for(layout_engine.fret_key(viewer.pcb_data, instance, file_name, **options))
+        staged_before = os.path.isfile(stale)
+
+        instance.faulty_modules[0] = not instance.faulty_modules[0]
+        viewer.redistribute_data()
+        prefetcher.wait()
+        instance = viewer.pcb_instances[0]
+        reference = os.path.join(work_dir, file_name)
+        layout_engine.write_svg(layout_engine.render_svg(viewer.pcb_data, instance, reference, **options))
+        viewer.export_svg(batch_mode=True)
+        exported = os.path.join(app.EXPORT_DIRECTORY, file_name)
+        stats = prefetcher.stats()
+    finally:
+        prefetcher.close()
+    return {
+        'staged_before_edit': staged_before,
+        'export_matches_fresh_render': _read(exported) == _read(reference),
+        'stale_file_removed': not os.path.exists(stale),
+        'discarded': stats['discarded'],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time Export clicks with and without export prefetch")
+    parser.add_argument('--modules', type=int, default=200, help="modules in the synthetic production list")
+    parser.add_argument('--frets', type=int, default=20, help="frets per PCB type to render ahead")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    app = load_app()
+    import layout_engine
+
+    work_dir = tempfile.mkdtemp(prefix="prefetch-bench-")
+    try:
+        app.WORKING_DIRECTORY = os.path.join(work_dir, "data")
+        app.PREFETCH_FRETS = args.frets
+        build_dataset(app.WORKING_DIRECTORY, DEFAULT_PCBS, args.modules, seed=args.seed)
+        without = run_workflow(app, layout_engine, os.path.join(work_dir, "without"), prefetch=False)
+        with_prefetch = run_workflow(app, layout_engine, os.path.join(work_dir, "with"), prefetch=True)
+        edit = check_edit(app, layout_engine, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    identical = without['files'] == with_prefetch['files']
+    output = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'modules': args.modules,
+        'prefetch_frets': args.frets,
+        'files': len(without['files']),
+        'without_prefetch': without['result'],
+        'with_prefetch': with_prefetch['result'],
+        'identical_exports': identical,
+        'edit': edit,
+        'cpus': os.cpu_count(),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+    print(json.dumps(output, indent=2))
+    ok = identical and edit['export_matches_fresh_render'] and edit['stale_file_removed']
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
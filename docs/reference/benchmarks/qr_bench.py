@@ -0,0 +1,310 @@
+"""QR codes: decode check, encode speed, and export time and size of code-heavy frets.
+
+Encodes random payloads of every length class at all four error correction
+levels and reads each matrix back with a plain reader written here (format
+information, zigzag placement, block de-interleaving, Reed-Solomon syndromes
+and the byte-mode payload), and checks that the merged rectangles of each
+matrix cover exactly its dark modules. Then exports the frets of a synthetic
+production list with a QR code on every module and one per fret, with the
+matrix cache cold and warm, reads every code back from the SVG, and compares
+the file size with one `<rect>` per dark module, as the WordPress plugin
+draws its codes.
+
+    python qr_bench.py
+    python qr_bench.py --modules 800 --payloads 500
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import string
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import svgwrite
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import load_app  # noqa: E402
+from synthetic import SyntheticPCB, available_pcbs, build_dataset  # noqa: E402
+
+SVG = "{http://www.w3.org/2000/svg}"
+QR_PCB = SyntheticPCB("sz-qr", 20, 20, 1, pitch=9.0, qr=3.0)
+MODULE_URL = "https://quadi.ca/m/{serial}"
+FRET_URL = "https://quadi.ca/f/{name}"
+TOLERANCE = 0.0001 + 1e-9
+
+# GF(256) for the syndrome check, built here rather than taken from qr.py
+EXP = [0] * 510
+value = 1
+for power in range(255):
+    EXP[power] = EXP[power + 255] = value
+    value = (value << 1) ^ (0x11D if value & 0x80 else 0)
+LOG = {EXP[power]: power for power in range(255)}
+
+
+def gf_multiply(a: int, b: int) -> int:
+    return EXP[LOG[a] + LOG[b]] if a and b else 0
+
+
+# All 32 valid format words, by (level bits, mask)
+def format_words() -> Dict[int, int]:
+    words = {}
+    for data in range(32):
+        remainder = data << 10
+        for bit in range(14, 9, -1):
+            if remainder >> bit & 1:
+                remainder ^= 0x537 << (bit - 10)
+        words[(data << 10 | remainder) ^ 0x5412] = data
+    return words
+
+
+FORMAT_WORDS = format_words()
+LEVELS = {1: 'L', 0: 'M', 3: 'Q', 2: 'H'}
+
+
+# Read a matrix back to its payload and error correction level; None and the reason when it does not read
+def read_matrix(qr, modules: np.ndarray) -> Tuple[Optional[str], str]:
+    size = len(modules)
+    version = (size - 17) // 4
+    # Format word, copy around the top left finder: bits 0-7 down column 8, bits 8-14 along row 8
+    cells = [(i, 8) for i in range(6)] + [(7, 8), (8, 8), (8, 7)] + [(8, 14 - i) for i in range(9, 15)]
+    word = sum(int(modules[cell]) << i for i, cell in enumerate(cells))
+    if word not in FORMAT_WORDS:
+        return None, "format"
+    copy_cells = [(8, size - 1 - i) for i in range(8)] + [(size - 15 + i, 8) for i in range(8, 15)]
+    if sum(int(modules[cell]) << i for i, cell in enumerate(copy_cells)) != word:
+        return None, "format copy"
+    level, mask = LEVELS[FORMAT_WORDS[word] >> 3], FORMAT_WORDS[word] & 7
+
+    reserved = qr._function_patterns(version)[1]
+    i, j = np.indices((size, size))
+    condition = [(i + j) % 2 == 0, i % 2 == 0, j % 3 == 0, (i + j) % 3 == 0, (i // 2 + j // 3) % 2 == 0,
+                 (i * j) % 2 + (i * j) % 3 == 0, ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+                 ((i + j) % 2 + (i * j) % 3) % 2 == 0][mask]
+    unmasked = modules ^ (condition & ~reserved)
+    bits: List[int] = []
+    col, upward = size - 1, True
+    while col > 0:
+        if col == 6:
+            col -= 1
+        for row in (range(size - 1, -1, -1) if upward else range(size)):
+            for c in (col, col - 1):
+                if not reserved[row, c]:
+                    bits.append(int(unmasked[row, c]))
+        col -= 2
+        upward = not upward
+    codewords = [int("".join(map(str, bits[k:k + 8])), 2) for k in range(0, len(bits) - 7, 8)]
+
+    # De-interleave: data codewords column by column over the blocks (short blocks first), then EC codewords
+    blocks_count, ec_length = qr._EC_BLOCKS[level][version], qr._EC_CODEWORDS[level][version]
+    data_total = len(codewords) - blocks_count * ec_length
+    short_length = data_total // blocks_count
+    long_blocks = data_total % blocks_count
+    lengths = [short_length + (b >= blocks_count - long_blocks) for b in range(blocks_count)]
+    blocks: List[List[int]] = [[] for _ in range(blocks_count)]
+    position = 0
+    for k in range(max(lengths)):
+        for b in range(blocks_count):
+            if k < lengths[b]:
+                blocks[b].append(codewords[position])
+                position += 1
+    for k in range(ec_length):
+        for b in range(blocks_count):
+            blocks[b].append(codewords[position])
+            position += 1
+    for block in blocks:
+        for root in range(ec_length):
+            syndrome = 0
+            for codeword in block:
+                syndrome = gf_multiply(syndrome, EXP[root]) ^ codeword
+            if syndrome:
+                return None, "syndrome"
+
+    data = [codeword for block, length in zip(blocks, lengths) for codeword in block[:length]]
+    stream = "".join(f"{codeword:08b}" for codeword in data)
+    if stream[:4] != "0100":
+        return None, "mode"
+    count_bits = 8 if version < 10 else 16
+    length = int(stream[4:4 + count_bits], 2)
+    start = 4 + count_bits
+    payload = bytes(int(stream[start + 8 * k:start + 8 * k + 8], 2) for k in range(length))
+    return payload.decode('utf-8'), level
+
+
+def check_encoder(qr, count: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + "/:.-_?=&%"
+    payloads = [MODULE_URL.format(serial=f"{n:08d}") for n in (1, 1048575)]
+    payloads += ["".join(rng.choice(alphabet) for _ in range(rng.choice((1, 8, 30, 80, 200, 600, 1200))))
+                 for _ in range(count)]
+    failures: Dict[str, int] = {}
+    versions = set()
+    checked = 0
+    start = time.perf_counter()
+    for payload in payloads:
+        for level in qr.ERROR_LEVELS:
+            try:
+                modules = qr.matrix(payload, level)
+            except qr.QRCodeError:
+                # Too long for this level
+                continue
+            checked += 1
+            versions.add((len(modules) - 17) // 4)
+            read, reason = read_matrix(qr, np.asarray(modules))
+            if read != payload or reason != level:
+                key = reason if read is None else "payload"
+                failures[key] = failures.get(key, 0) + 1
+            covered = np.zeros_like(modules, dtype=np.int32)
+            for col, row, width, height in qr.rectangles(modules):
+                covered[row:row + height, col:col + width] += 1
+            if not np.array_equal(covered, modules):
+                failures['rectangles'] = failures.get('rectangles', 0) + 1
+    return {
+        'symbols': checked,
+        'versions': [min(versions), max(versions)],
+        'seconds': round(time.perf_counter() - start, 2),
+        'failures': failures,
+    }
+
+
+def time_encoding(qr, count: int) -> Dict[str, float]:
+    payloads = [MODULE_URL.format(serial=f"{n:08d}") for n in range(1, count + 1)]
+    qr.clear_cache()
+    start = time.perf_counter()
+    for payload in payloads:
+        qr.path_data(payload)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for payload in payloads:
+        qr.path_data(payload)
+    warm = time.perf_counter() - start
+    return {'cold_ms_per_code': round(cold * 1000 / count, 3), 'warm_us_per_code': round(warm * 1e6 / count, 2)}
+
+
+# The same codes drawn as one square per dark module
+def write_rect_svg(qr, elements, file_path: str):
+    dwg = svgwrite.Drawing(file_path, size=('210mm', '210mm'), viewBox="0 0 210 210")
+    for payload, x, y, size in elements:
+        modules = qr.matrix(payload)
+        pitch = size / len(modules)
+        group = dwg.g(fill="#000000")
+        for row, col in zip(*np.nonzero(modules)):
+            group.add(dwg.rect(insert=(round(x - size / 2 + col * pitch, 4), round(y - size / 2 + row * pitch, 4)),
+                               size=(round(pitch, 4), round(pitch, 4))))
+        dwg.add(group)
+    dwg.save()
+
+
+# Placed codes of an exported SVG: matrix, left, top and scale of each
+def read_codes(root: ElementTree.Element) -> List[Any]:
+    codes = []
+    for path in root.iter(f"{SVG}path"):
+        left, top, scale = (float(value) for value in re.fullmatch(r"translate\((\S+) (\S+)\) scale\((\S+)\)",
+                                                                    path.get('transform')).groups())
+        rects = [tuple(int(value) for value in match) for match in
+                 re.findall(r"M(\d+) (\d+)h(\d+)v(\d+)h-\d+z", path.get('d'))]
+        size = max(col + width for col, _, width, _ in rects)
+        size = max(size, max(row + height for _, row, _, height in rects))
+        modules = np.zeros((size, size), dtype=np.uint8)
+        for col, row, width, height in rects:
+            modules[row:row + height, col:col + width] = 1
+        codes.append((modules, left, top, scale))
+    return codes
+
+
+def export_frets(layout_engine, qr, modules: int, seed: int, work_dir: str) -> Dict[str, Any]:
+    data_dir = os.path.join(work_dir, "data")
+    production_file = build_dataset(data_dir, [QR_PCB], modules, seed=seed, first_serial=1)
+    offsets = available_pcbs([QR_PCB])
+    production_data = layout_engine.load_production_data(production_file, offsets, [])
+    layout = layout_engine.apply_offsets(layout_engine.compile_layout(QR_PCB.name, data_dir), QR_PCB.name, offsets)
+    instances = [instance for instance in layout_engine.plan_instances(production_data, QR_PCB.name, layout)
+                 if instance.data]
+
+    timings: Dict[str, float] = {}
+    sizes: Dict[str, int] = {}
+    for mode in ("without", "cold", "warm"):
+        if mode == "cold":
+            qr.clear_cache()
+        options = {} if mode == "without" else {'module_qr': MODULE_URL, 'fret_qr': FRET_URL}
+        start = time.perf_counter()
+        for n, instance in enumerate(instances, start=1):
+            file_path = os.path.join(work_dir, mode, layout_engine.export_file_name(instance, n))
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            layout_engine.write_svg(layout_engine.render_svg(layout, instance, file_path, **options))
+        timings[mode] = (time.perf_counter() - start) * 1000 / len(instances)
+        sizes[mode] = sum(os.path.getsize(os.path.join(work_dir, mode, name))
+                          for name in os.listdir(os.path.join(work_dir, mode)))
+
+    mismatched = codes_read = 0
+    rect_bytes = 0
+    for n, instance in enumerate(instances, start=1):
+        file_path = os.path.join(work_dir, "warm", layout_engine.export_file_name(instance, n))
+        expected = layout_engine.qr_elements(layout, instance, os.path.splitext(os.path.basename(file_path))[0],
+                                             MODULE_URL, FRET_URL)
+        actual = read_codes(ElementTree.parse(file_path).getroot())
+        codes_read += len(actual)
+        if len(expected) != len(actual) or any(
+                not np.array_equal(modules, qr.matrix(payload)) or abs(left - (x - size / 2)) > TOLERANCE
+                or abs(top - (y - size / 2)) > TOLERANCE or abs(scale * len(modules) - size) > 1e-4
+                for (payload, x, y, size), (modules, left, top, scale) in zip(expected, actual)):
+            mismatched += 1
+        rect_path = os.path.join(work_dir, "rects.svg")
+        write_rect_svg(qr, expected, rect_path)
+        rect_bytes += os.path.getsize(rect_path)
+
+    return {
+        'frets': len(instances),
+        'codes': codes_read,
+        'export_ms_per_fret': {mode: round(ms, 2) for mode, ms in timings.items()},
+        'kib_per_fret': {mode: round(size / 1024 / len(instances), 1) for mode, size in sizes.items()},
+        'code_kib_per_fret': {
+            'merged_paths': round((sizes['warm'] - sizes['without']) / 1024 / len(instances), 1),
+            'rect_per_module': round(rect_bytes / 1024 / len(instances), 1),
+        },
+        'mismatched_frets': mismatched,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check and time QR encoding and export")
+    parser.add_argument('--modules', type=int, default=800, help="modules in the synthetic production list")
+    parser.add_argument('--payloads', type=int, default=200, help="random payloads to decode back")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    load_app()  # puts the app directory, and with it layout_engine, on the path
+    import layout_engine
+    import layout_engine.qr as qr
+
+    work_dir = tempfile.mkdtemp(prefix="qr-bench-")
+    try:
+        results = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'decode_check': check_encoder(qr, args.payloads, args.seed),
+            'encoding': time_encoding(qr, 1000),
+            'export': export_frets(layout_engine, qr, args.modules, args.seed, work_dir),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    failed = results['decode_check']['failures'] or results['export']['mismatched_frets']
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Micro-ID scan verification: finds planted defects, scans per second, worker scaling.
+
+Exports a synthetic production list with a Serial column through a production
+store (so every fret has its slot assignments and serials), then renders
+a scan of each engraved fret as `scan_verify` expects it: a greyscale PNG of
+the PCB outline at `--resolution` px/mm, with blur, noise, uneven lighting and
+each code up to 0.1 mm off its layout position. A few slots of each fret get a
+defect: a missing data dot (Read Error), another module's serial (mismatch),
+no code at all or no orientation dot. The scans are verified once in this
+process and once per `--jobs` value in worker processes, and every slot's
+result is checked against what was planted, as in `tests/test_scan_verify.py`.
+
+    python scan_verify_bench.py
+    python scan_verify_bench.py --modules 400 --resolution 30 --jobs 1 2 4
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+REFERENCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Scans are rendered and checked as in the test suite
+sys.path.insert(0, REFERENCE_DIR)
+sys.path.insert(0, os.path.join(REFERENCE_DIR, "tests"))
+
+from headless import load_app  # noqa: E402
+from micro_id_bench import MICRO_ID_PCB  # noqa: E402
+from synthetic import available_pcbs, build_dataset  # noqa: E402
+from test_scan_verify import DEFECTS, expected_result, render_scan  # noqa: E402
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check and time Micro-ID verification of fret scans")
+    parser.add_argument('--modules', type=int, default=200, help="modules in the synthetic production list")
+    parser.add_argument('--resolution', type=float, default=40.0, help="scan resolution in px/mm")
+    parser.add_argument('--jobs', type=int, nargs='+', default=[2], help="worker process counts to time")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    load_app()  # puts the app directory, and with it layout_engine, on the path
+    import layout_engine
+    import layout_engine.micro_id as micro_id
+    import layout_engine.scan_verify as scan_verify
+
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="scan-verify-bench-")
+    try:
+        data_dir, scan_dir = os.path.join(work_dir, "data"), os.path.join(work_dir, "scans")
+        os.makedirs(scan_dir)
+        production_file = build_dataset(data_dir, [MICRO_ID_PCB], args.modules, seed=args.seed,
+                                        first_serial=rng.randint(micro_id.MIN_SERIAL,
+                                                                 micro_id.MAX_SERIAL - args.modules + 1))
+        offsets = available_pcbs([MICRO_ID_PCB])
+        store = layout_engine.ProductionStore(os.path.join(work_dir, "production.sqlite"))
+        store.import_csv(production_file, offsets, [])
+        production_data = store.modules(store.current_batches(production_file), MICRO_ID_PCB.name)
+        layout = layout_engine.compile_layout(MICRO_ID_PCB.name, data_dir)
+        instances = [instance for instance in layout_engine.plan_instances(production_data, MICRO_ID_PCB.name,
+                                                                           layout) if instance.data]
+
+        # Export (recording the slot assignments) and engrave, planting defects
+        start = time.perf_counter()
+        planted: Dict[str, Dict[int, Optional[str]]] = {}
+        scan_paths = []
+        for n, instance in enumerate(instances, start=1):
+            file_name = layout_engine.export_file_name(instance, n)
+            store.assign_fret(instance, file_name, micro_ids=True)
+            slots = {int(row['slot']): int(row['serial']) for row in store.fret_modules(file_name)}
+            defects = dict(zip(rng.sample(sorted(slots), min(len(DEFECTS), len(slots))), DEFECTS))
+            codes = {}
+            for slot, serial in slots.items():
+                defect = defects.get(slot)
+                if defect == "wrong_serial":
+                    serial = serial % micro_id.MAX_SERIAL + 1
+                codes[slot] = (serial, defect)
+            path = os.path.join(scan_dir, os.path.splitext(file_name)[0] + ".png")
+            render_scan(micro_id, layout, codes, path, args.resolution, rng)
+            planted[os.path.basename(path)] = {slot: defect for slot, (_, defect) in codes.items()}
+            scan_paths.append(path)
+        render_seconds = time.perf_counter() - start
+
+        scans, skipped = scan_verify.plan_scans(store, data_dir, scan_paths)
+        store.close()
+
+        runs: Dict[str, Any] = {}
+        wrong = 0
+        for run, jobs in enumerate([1] + [jobs for jobs in args.jobs if jobs != 1]):
+            start = time.perf_counter()
+            entries = scan_verify.verify_scans(scans, jobs)
+            seconds = time.perf_counter() - start
+            codes_read = sum(len(entry.get('slots', [])) for entry in entries)
+            runs[f"jobs_{jobs}"] = {'seconds': round(seconds, 3), 'scans_per_second': round(len(scans) / seconds, 2),
+                                    'ms_per_code': round(seconds * 1000 / max(codes_read, 1), 3)}
+            if not run:
+                results: Dict[str, int] = {}
+                for entry in entries:
+                    for result in entry.get('slots', []):
+                        defect = planted[entry['scan']].get(result['slot'])
+                        key = defect or ("ok" if result['ok'] else "unexpected_failure")
+                        results[key] = results.get(key, 0) + 1
+                        if not expected_result(scan_verify, result, defect):
+                            wrong += 1
+                    if 'error' in entry:
+                        wrong += len(planted[entry['scan']])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'scans': len(scan_paths),
+        'resolution_px_per_mm': args.resolution,
+        'render_seconds': round(render_seconds, 2),
+        'skipped': skipped,
+        'results': results,
+        'wrong_results': wrong,
+        'runs': runs,
+        'cpus': os.cpu_count(),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+    print(json.dumps(output, indent=2))
+    return 1 if wrong or skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
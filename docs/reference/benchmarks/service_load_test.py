@@ -0,0 +1,203 @@
+"""Load test for the layout service (`python -m layout_engine.service`).
+
+Concurrent clients send single-fret `/render` requests (or `/jobs` requests
+that are polled until done) with generated module data, and the test reports
+throughput, latency percentiles and errors.
+
+    # Start a service on generated layouts and load it
+    python service_load_test.py --start --workers 4 --clients 16 --requests 2000
+
+    # Load an already running service that has the synthetic layouts
+    python service_load_test.py --url http://127.0.0.1:8765 --clients 8
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import StageTimer  # noqa: E402
+from synthetic import DEFAULT_PCBS, SyntheticPCB, available_pcbs, write_layout  # noqa: E402
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LED_CODES = ['A1', 'B2', 'C3', 'D4', 'E5', 'F6', 'G7', 'H8']
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Write layouts and a PCB list CSV, then start the service and wait until it answers
+def start_service(work_dir: str, args) -> Tuple[subprocess.Popen, str]:
+    for pcb in DEFAULT_PCBS:
+        write_layout(pcb, work_dir)
+    pcb_list = os.path.join(work_dir, "pcbs.csv")
+    with open(pcb_list, 'w') as f:
+        f.write("pcb,x_offset,y_offset\n")
+        for name, offsets in available_pcbs(DEFAULT_PCBS).items():
+            f.write(f"{name},{offsets['x_offset']},{offsets['y_offset']}\n")
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'layout_engine.service', work_dir, '--pcb-list', pcb_list, '--port', str(port),
+         '--workers', str(args.workers), '--batch-window-ms', str(args.batch_window_ms),
+         '--max-pending', str(args.max_pending)],
+        cwd=ENGINE_DIR)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{url}/health", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit("Layout service did not start")
+
+
+def make_payload(pcb: SyntheticPCB, modules: int, rng: random.Random) -> Dict[str, Any]:
+    return {
+        'pcb_type': pcb.name,
+        'batch_id': "LOAD",
+        'modules': [{
+            'led_codes': [rng.choice(LED_CODES) for _ in range(pcb.led_count)],
+            'lens_code': "L01" if pcb.lens else None,
+            'connector_code': "C02" if pcb.connector else None,
+            'order_number': str(100000 + rng.randrange(500)),
+        } for _ in range(modules)],
+    }
+
+
+class Client(threading.Thread):
+    def __init__(self, url: str, mode: str, count: int, seed: int, timer: StageTimer, statuses: Counter,
+                 lock: threading.Lock):
+        super().__init__(daemon=True)
+        self.url = url
+        self.mode = mode
+        self.count = count
+        self.rng = random.Random(seed)
+        self.timer = timer
+        self.statuses = statuses
+        self.lock = lock
+
+    def run(self):
+        session = requests.Session()
+        for _ in range(self.count):
+            pcb = self.rng.choice(DEFAULT_PCBS)
+            start = time.perf_counter()
+            try:
+                if self.mode == 'render':
+                    payload = make_payload(pcb, self.rng.randint(1, pcb.modules_count), self.rng)
+                    status = session.post(f"{self.url}/render", json=payload, timeout=60).status_code
+                else:
+                    payload = make_payload(pcb, pcb.modules_count * self.rng.randint(2, 10), self.rng)
+                    status = self.run_job(session, payload)
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.statuses[str(status)] += 1
+                if status == 200:
+                    self.timer.record(self.mode, elapsed)
+
+    def run_job(self, session: requests.Session, payload: Dict[str, Any]):
+        response = session.post(f"{self.url}/jobs", json=payload, timeout=60)
+        if response.status_code != 202:
+            return response.status_code
+        job_url = f"{self.url}/jobs/{response.json()['job_id']}"
+        while True:
+            job = session.get(job_url, timeout=60).json()
+            if job['status'] == 'done':
+                return 200
+            if job['status'] == 'failed':
+                return 'job_failed'
+            time.sleep(0.005)
+
+
+def run_load(url: str, args) -> Dict[str, Any]:
+    timer = StageTimer()
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    per_client = [args.requests // args.clients + (1 if i < args.requests % args.clients else 0)
+                  for i in range(args.clients)]
+    clients = [Client(url, args.mode, count, args.seed + i, timer, statuses, lock)
+               for i, count in enumerate(per_client)]
+
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    wall = time.perf_counter() - start
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'url': url,
+        'mode': args.mode,
+        'clients': args.clients,
+        'requests': args.requests,
+        'wall_s': wall,
+        'throughput_rps': statuses.get('200', 0) / wall if wall else 0.0,
+        'statuses': dict(statuses),
+        'latency': timer.summary().get(args.mode),
+        'service': requests.get(f"{url}/health", timeout=5).json(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the layout service")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help="base URL of a running service")
+    target.add_argument('--start', action='store_true', help="start a service on generated layouts")
+    parser.add_argument('--mode', choices=['render', 'jobs'], default='render')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="service workers (--start)")
+    parser.add_argument('--batch-window-ms', type=float, default=5.0, help="service batch window (--start)")
+    parser.add_argument('--max-pending', type=int, default=512, help="service queue limit (--start)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    process: Optional[subprocess.Popen] = None
+    work_dir = tempfile.mkdtemp(prefix="service-load-")
+    try:
+        if args.start:
+            process, url = start_service(work_dir, args)
+        else:
+            url = args.url.rstrip('/')
+        results = run_load(url, args)
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    failed = sum(count for status, count in results['statuses'].items() if status != '200')
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""Memory soak test for long operator shifts.
+
+Runs the real `PCBViewer` window (on Xvfb when there is no display) and drives
+it with thousands of operator actions: PCB selections, fret navigation, row,
+column and module toggles, exports against the simulated LightBurn, window
+resizes and data refreshes. Every `--sample-every` actions it records process
+RSS, traced Python memory, the number of Tk widgets, Tcl commands and images.
+
+Growth is fitted over the samples after warm-up and projected over a 10 hour
+shift; the run fails if any projection is over its limit.
+
+    python soak_test.py --actions 20000 --output soak.json
+    xvfb-run -s "-screen 0 1920x1080x24" python soak_test.py --actions 2000
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import psutil
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import load_app  # noqa: E402
+from lightburn_sim import SimulatedLightBurn, simulated_controller_class  # noqa: E402
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset  # noqa: E402
+
+# A 10 hour shift at roughly 30 operator actions a minute
+SHIFT_ACTIONS = 18000
+
+# Allowed growth per metric, projected over SHIFT_ACTIONS
+LIMITS = {
+    'rss_kib': 50 * 1024,
+    'traced_kib': 8 * 1024,
+    'widgets': 20,
+    'tcl_commands': 100,
+    'images': 20,
+}
+
+# Relative frequency of each operator action
+ACTIONS = {
+    'select': 8,
+    'next': 10,
+    'prev': 6,
+    'toggle_module': 12,
+    'toggle_row': 4,
+    'toggle_column': 4,
+    'export': 6,
+    'resize': 2,
+    'refresh': 1,
+}
+
+
+# Start Xvfb on a free display number unless a display is already available
+def ensure_display() -> Optional[subprocess.Popen]:
+    if os.environ.get('DISPLAY'):
+        return None
+    xvfb = shutil.which('Xvfb')
+    if not xvfb:
+        raise SystemExit("No DISPLAY and Xvfb is not installed; install xvfb or run under xvfb-run")
+
+    for number in range(99, 199):
+        if os.path.exists(f"/tmp/.X11-unix/X{number}") or os.path.exists(f"/tmp/.X{number}-lock"):
+            continue
+        process = subprocess.Popen([xvfb, f":{number}", '-screen', '0', '1920x1080x24', '-nolisten', 'tcp'],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                os.environ['DISPLAY'] = f":{number}"
+                return process
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+        process.kill()
+    raise SystemExit("Could not start Xvfb")
+
+
+# Stand-in for tkinter.messagebox so dialogs never block the run
+class AutoMessagebox:
+    def __init__(self):
+        self.errors: List[str] = []
+
+    def showinfo(self, title, message, **options):
+        return 'ok'
+
+    def showwarning(self, title, message, **options):
+        return 'ok'
+
+    def showerror(self, title, message, **options):
+        self.errors.append(f"{title}: {message}")
+        return 'ok'
+
+    def askyesno(self, title, message, **options):
+        return True
+
+
+# Plain PCB background images, so the image cache is exercised as on the stations
+def write_pcb_images(directory: str):
+    for pcb in DEFAULT_PCBS:
+        Image.new('RGB', (800, 800), (210, 220, 200)).save(os.path.join(directory, f"{pcb.name}.png"))
+
+
+# Build a PCBViewer subclass for the soak: real window, no Google Sheets or LightBurn process
+def soak_viewer_class(app, pcbs: Dict[str, Dict[str, float]], controller):
+    import tkinter as tk
+
+    class SoakRoot(tk.Tk):
+        # "zoomed" is a Windows-only window state
+        def state(self, newstate=None):
+            if newstate == 'zoomed':
+                newstate = 'normal'
+            return super().state(newstate)
+
+    class SoakViewer(app.PCBViewer):
+        def __init__(self):
+            super().__init__(SoakRoot())
+            self.lightburn.cleanup()
+            self.lightburn = controller
+
+        def get_monitors(self):
+            return [app.Monitor(0, 0, 1920, 1080)]
+
+        def load_program_settings(self):
+            return {}
+
+        def load_available_pcbs(self):
+            return dict(pcbs)
+
+        def launch_lightburn(self):
+            pass
+
+        # The operator presses "Engraving Finished" immediately
+        def show_engraving_confirmation(self, file_path):
+            self.finish_engraving(file_path)
+
+        def show_batch_engraving_confirmation(self, file_paths, current_index):
+            self.finish_engraving(file_paths[current_index])
+            self.process_batch_files(file_paths, current_index + 1)
+
+    return SoakViewer
+
+
+def count_widgets(widget) -> int:
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def sample(viewer, process: psutil.Process, action: int, started: float) -> Dict[str, Any]:
+    root = viewer.root
+    return {
+        'action': action,
+        'elapsed_s': round(time.perf_counter() - started, 2),
+        'rss_kib': process.memory_info().rss // 1024,
+        'traced_kib': tracemalloc.get_traced_memory()[0] // 1024 if tracemalloc.is_tracing() else None,
+        'widgets': count_widgets(root),
+        'tcl_commands': len(root.tk.call('info', 'commands')),
+        'images': len(root.image_names()),
+        'canvas_items': len(viewer.canvas.find_all()),
+    }
+
+
+class Operator:
+    def __init__(self, viewer, seed: int):
+        self.viewer = viewer
+        self.rng = random.Random(seed)
+        self.names = list(ACTIONS)
+        self.weights = [ACTIONS[name] for name in self.names]
+        self.counts = {name: 0 for name in self.names}
+
+    def step(self):
+        name = self.rng.choices(self.names, self.weights)[0]
+        viewer = self.viewer
+        # Nothing but selecting or refreshing makes sense before a PCB is shown
+        if not viewer.pcb_data and name not in ('select', 'refresh'):
+            name = 'select'
+        getattr(self, f"do_{name}")()
+        self.counts[name] += 1
+        viewer.root.update()
+
+    def do_select(self):
+        values = [value for value in self.viewer.pcb_dropdown['values'] if value != "Select a PCB"]
+        if values:
+            self.viewer.pcb_var.set(self.rng.choice(values))
+            self.viewer.on_pcb_selected()
+
+    def do_next(self):
+        self.viewer.next_pcb()
+
+    def do_prev(self):
+        self.viewer.prev_pcb()
+
+    def do_toggle_module(self):
+        viewer = self.viewer
+        module = self.rng.choice(viewer.pcb_data['Modules'])
+        viewer.calculate_scale()
+        offset_x = (viewer.canvas.winfo_width() - viewer.pcb_data['Width'] * viewer.scale) / 2
+        offset_y = (viewer.canvas.winfo_height() - viewer.pcb_data['Height'] * viewer.scale) / 2
+        event = type('Event', (), {'x': offset_x + module['x'] * viewer.scale,
+                                   'y': offset_y + module['y'] * viewer.scale})()
+        viewer.toggle_module_faulty(event)
+
+    def do_toggle_row(self):
+        if self.viewer.row_checkboxes:
+            row = self.rng.randrange(len(self.viewer.row_checkboxes))
+            var = self.viewer.row_checkboxes[row][1]
+            var.set(not var.get())
+            self.viewer.toggle_row(row)
+
+    def do_toggle_column(self):
+        if self.viewer.col_checkboxes:
+            col = self.rng.randrange(len(self.viewer.col_checkboxes))
+            var = self.viewer.col_checkboxes[col][1]
+            var.set(not var.get())
+            self.viewer.toggle_column(col)
+
+    def do_export(self):
+        viewer = self.viewer
+        if viewer.pcb_instances and viewer.pcb_instances[viewer.current_instance_index].data:
+            viewer.export_svg()
+        else:
+            # The type is used up; re-selecting it plans the full list again
+            self.do_select()
+
+    def do_resize(self):
+        width = self.rng.choice([1280, 1600, 1920])
+        self.viewer.root.geometry(f"{width}x{width * 9 // 16}")
+        self.viewer.root.update()
+        self.viewer.redraw_pcb()
+
+    def do_refresh(self):
+        self.viewer.refresh_production_data()
+
+
+# Least-squares growth per action over the samples after warm-up, projected over a shift
+def project_growth(samples: List[Dict[str, Any]], metric: str) -> Optional[float]:
+    points = [(s['action'], s[metric]) for s in samples if s[metric] is not None]
+    if len(points) < 3:
+        return None
+    slope = statistics.linear_regression([p[0] for p in points], [p[1] for p in points]).slope
+    return slope * SHIFT_ACTIONS
+
+
+def run_soak(args) -> Dict[str, Any]:
+    app = load_app()
+    work_dir = tempfile.mkdtemp(prefix="soak-")
+    data_dir = os.path.join(work_dir, "data")
+    export_dir = os.path.join(work_dir, "export")
+    os.makedirs(export_dir)
+    app.WORKING_DIRECTORY = data_dir
+    app.EXPORT_DIRECTORY = export_dir
+    app.PRODUCTION_FILE_PATH = build_dataset(data_dir, DEFAULT_PCBS, args.modules, seed=args.seed)
+    app.LOG_FILE = os.path.join(work_dir, "pcb_viewer.log")
+    write_pcb_images(data_dir)
+    messagebox = app.messagebox = AutoMessagebox()
+
+    server = SimulatedLightBurn(latency=0.0)
+    controller = simulated_controller_class(app)(server)
+    viewer = soak_viewer_class(app, available_pcbs(DEFAULT_PCBS), controller)()
+    viewer.root.update()
+
+    operator = Operator(viewer, args.seed)
+    process = psutil.Process()
+    samples = []
+    if args.tracemalloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        for action in range(1, args.actions + 1):
+            operator.step()
+            if action % args.sample_every == 0:
+                samples.append(sample(viewer, process, action, started))
+                if args.verbose:
+                    print(json.dumps(samples[-1]), file=sys.stderr)
+            # Keep the disk use of a long run bounded
+            if action % 500 == 0:
+                for name in os.listdir(export_dir):
+                    os.remove(os.path.join(export_dir, name))
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        viewer.on_closing()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    warm = [s for s in samples if s['action'] > args.actions * args.warmup]
+    growth = {metric: project_growth(warm, metric) for metric in LIMITS}
+    failed = [metric for metric, value in growth.items() if value is not None and value > LIMITS[metric]]
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'actions': args.actions,
+        'action_counts': operator.counts,
+        'errors': messagebox.errors[:20],
+        'error_count': len(messagebox.errors),
+        'shift_actions': SHIFT_ACTIONS,
+        'projected_shift_growth': growth,
+        'limits': LIMITS,
+        'failed': failed,
+        'samples': samples,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Soak the layout app UI and check memory stays flat")
+    parser.add_argument('--actions', type=int, default=SHIFT_ACTIONS, help="operator actions to simulate")
+    parser.add_argument('--sample-every', type=int, default=100)
+    parser.add_argument('--warmup', type=float, default=0.1, help="fraction of the run ignored for growth fits")
+    parser.add_argument('--modules', type=int, default=120, help="modules per PCB type in the production list")
+    parser.add_argument('--no-tracemalloc', dest='tracemalloc', action='store_false',
+                        help="skip traced memory (roughly halves the run time)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    parser.add_argument('--verbose', action='store_true', help="print each sample as it is taken")
+    args = parser.parse_args(argv)
+
+    xvfb = ensure_display()
+    try:
+        results = run_soak(args)
+    finally:
+        if xvfb:
+            xvfb.terminate()
+            xvfb.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    summary = {key: results[key] for key in ('actions', 'error_count', 'projected_shift_growth', 'failed')}
+    print(json.dumps(summary, indent=2))
+    if results['failed']:
+        print(f"Memory grows over a shift: {', '.join(results['failed'])}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""Several laser stations engraving one production list through shared fret claims.
+
+Each station is a separate process running the layout app headless, with its
+own simulated LightBurn, against one claims file. A station repeatedly picks
+a PCB type, plans the modules still free, exports the first fret (which
+claims it), "engraves" it for `--engrave-ms` and confirms. One station can be
+made to crash after a number of frets, leaving a claim behind that the others
+must reclaim once its lease runs out.
+
+Afterwards every module must have been engraved exactly once. Throughput is
+reported per station count so scaling can be compared.
+
+    python station_sim.py --stations 1 2 4 --modules 60
+    python station_sim.py --stations 3 --crash-after 2 --lease 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import headless_viewer_class, load_app  # noqa: E402
+from lightburn_sim import SimulatedLightBurn, simulated_controller_class  # noqa: E402
+from soak_test import AutoMessagebox  # noqa: E402
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset  # noqa: E402
+
+
+# Not an Exception, so the app's error handling around LightBurn does not swallow it
+class StationCrash(BaseException):
+    pass
+
+
+def station_viewer_class(app, engrave_seconds: float, crash_after: int, log_path: str):
+    class StationViewer(headless_viewer_class(app)):
+        engraved = 0
+
+        # The operator engraves the fret, then presses "Engraving Finished"
+        def show_engraving_confirmation(self, file_path):
+            claim = self.fret_claims.get(file_path)
+            if crash_after and self.engraved >= crash_after:
+                raise StationCrash(file_path)
+            time.sleep(engrave_seconds)
+            self.finish_engraving(file_path)
+            self.engraved += 1
+            with open(log_path, 'a') as f:
+                f.write(json.dumps({'file': os.path.basename(file_path), 'modules': claim.module_keys}) + "\n")
+
+    return StationViewer
+
+
+# One station process: engrave until no free modules and no outstanding claims are left
+def run_station(index: int, args, data_dir: str, export_dir: str, claims_path: str, log_dir: str) -> Dict[str, Any]:
+    app = load_app()
+    import layout_engine
+
+    app.WORKING_DIRECTORY = data_dir
+    app.EXPORT_DIRECTORY = os.path.join(export_dir, f"station-{index}")
+    app.messagebox = AutoMessagebox()
+    crash_after = args.crash_after if index == 0 else 0
+    viewer_class = station_viewer_class(app, args.engrave_ms / 1000, crash_after,
+                                        os.path.join(log_dir, f"station-{index}.jsonl"))
+
+    server = SimulatedLightBurn(latency=0.0)
+    controller = simulated_controller_class(app)(server)
+    claims = layout_engine.FretClaims(claims_path, station=f"station-{index}", lease_seconds=args.lease)
+    viewer = viewer_class(available_pcbs(DEFAULT_PCBS), lightburn=controller, claims=claims)
+    # Spread the stations over the PCB types so they do not all start on the same fret
+    viewer.file_number = 1 + index * 10000
+    viewer.production_data = viewer.load_production_data(os.path.join(data_dir, "production list.csv"))
+    pcb_types = sorted(viewer.unique_pcb_types)
+    pcb_types = pcb_types[index % len(pcb_types):] + pcb_types[:index % len(pcb_types)]
+
+    start = time.perf_counter()
+    status = 'finished'
+    try:
+        while True:
+            exported = False
+            for pcb_type in pcb_types:
+                if viewer.load_pcb_type(pcb_type) and viewer.pcb_instances[0].data and viewer.export_svg():
+                    exported = True
+                    break
+            if not exported:
+                if not claims.pending():
+                    break
+                # Frets still claimed elsewhere; wait in case one is abandoned and needs reclaiming
+                time.sleep(min(args.lease / 4, 0.5))
+    except StationCrash:
+        status = 'crashed'
+    finally:
+        controller.cleanup()
+        if status == 'crashed':
+            # Leave the claim behind as a crashed station would
+            claims.close()
+        else:
+            claims.release_station()
+            claims.close()
+
+    return {'station': index, 'status': status, 'frets': viewer.engraved,
+            'seconds': round(time.perf_counter() - start, 3), 'errors': len(app.messagebox.errors)}
+
+
+def _station_entry(queue, *args):
+    queue.put(run_station(*args))
+
+
+def run_stations(stations: int, args) -> Dict[str, Any]:
+    work_dir = tempfile.mkdtemp(prefix="station-sim-")
+    try:
+        data_dir = os.path.join(work_dir, "data")
+        export_dir = os.path.join(work_dir, "export")
+        log_dir = os.path.join(work_dir, "logs")
+        os.makedirs(log_dir)
+        build_dataset(data_dir, DEFAULT_PCBS, args.modules, seed=args.seed)
+        claims_path = os.path.join(work_dir, "fret_claims.sqlite")
+
+        # Stations start from fresh interpreters, as they would on separate machines
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        start = time.perf_counter()
+        processes = [context.Process(target=_station_entry,
+                                     args=(queue, i, args, data_dir, export_dir, claims_path, log_dir))
+                     for i in range(stations)]
+        for process in processes:
+            process.start()
+        results = sorted((queue.get() for _ in processes), key=lambda result: result['station'])
+        for process in processes:
+            process.join()
+        wall = time.perf_counter() - start
+
+        engraved: Counter = Counter()
+        frets = 0
+        for name in os.listdir(log_dir):
+            with open(os.path.join(log_dir, name)) as f:
+                for line in f:
+                    frets += 1
+                    engraved.update(json.loads(line)['modules'])
+        expected = args.modules * len(DEFAULT_PCBS)
+        # Throughput over the stations' working time; interpreter start-up is not station work
+        working = max(result['seconds'] for result in results)
+        return {
+            'stations': stations,
+            'wall_s': round(wall, 3),
+            'working_s': round(working, 3),
+            'frets': frets,
+            'frets_per_s': round(frets / working, 3) if working else 0.0,
+            'modules_expected': expected,
+            'modules_engraved': len(engraved),
+            'duplicates': sum(1 for count in engraved.values() if count > 1),
+            'per_station': results,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate several stations sharing fret claims")
+    parser.add_argument('--stations', type=int, nargs='+', default=[1, 2, 4], help="station counts to run")
+    parser.add_argument('--modules', type=int, default=200, help="modules per PCB type")
+    parser.add_argument('--engrave-ms', type=float, default=200.0, help="simulated engraving time per fret")
+    parser.add_argument('--lease', type=float, default=3.0, help="claim lease in seconds")
+    parser.add_argument('--crash-after', type=int, default=0,
+                        help="station 0 crashes mid-fret after this many frets (0: never)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    runs: List[Dict[str, Any]] = [run_stations(stations, args) for stations in args.stations]
+    results = {'created': datetime.now().isoformat(timespec='seconds'), 'engrave_ms': args.engrave_ms,
+               'modules_per_type': args.modules, 'runs': runs}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    base = runs[0]['frets_per_s'] / runs[0]['stations'] if runs[0]['frets_per_s'] else 0.0
+    failed = False
+    for run in runs:
+        scaling = run['frets_per_s'] / (base * run['stations']) if base else 0.0
+        ok = run['duplicates'] == 0 and run['modules_engraved'] == run['modules_expected']
+        failed = failed or not ok
+        print(f"{run['stations']} stations: {run['frets']} frets in {run['working_s']:.1f}s "
+              f"({run['frets_per_s']:.2f}/s, {scaling:.0%} of linear), "
+              f"{run['modules_engraved']}/{run['modules_expected']} modules, {run['duplicates']} duplicates"
+              + ("" if ok else "  FAILED"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Production store benchmark: refresh and selection time against history size.
+
+Fills a SQLite production store with older batches, then times what the
+operator does with the current production list in the layout app: a refresh
+(import of the list plus reading back its batches) and selecting each PCB type
+(query, planning and layout). With the indexes in place the timings should be
+flat however many batches the store already holds.
+
+    python store_bench.py --history 0 100 1000 --output store.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import StageTimer, headless_viewer_class, load_app  # noqa: E402
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset, write_production_list  # noqa: E402
+
+
+# Import `batches` older production lists into the store
+def fill_history(store, work_dir: str, batches: int, modules: int, pcbs: Dict[str, Dict[str, float]]):
+    history_file = os.path.join(work_dir, "history.csv")
+    for number in range(batches):
+        write_production_list(history_file, DEFAULT_PCBS, modules, batch_id=f"H{number:05d}", seed=number)
+        store.import_csv(history_file, pcbs, [], force=True)
+
+
+def run_history(app, viewer_class, history: int, args) -> Dict[str, Any]:
+    import layout_engine
+
+    work_dir = tempfile.mkdtemp(prefix="store-bench-")
+    try:
+        data_dir = os.path.join(work_dir, "data")
+        production_file = build_dataset(data_dir, DEFAULT_PCBS, args.modules, seed=args.seed)
+        app.WORKING_DIRECTORY = data_dir
+        pcbs = available_pcbs(DEFAULT_PCBS)
+
+        store = layout_engine.ProductionStore(os.path.join(work_dir, "production.sqlite"))
+        fill_start = time.perf_counter()
+        fill_history(store, work_dir, history, args.modules, pcbs)
+        fill_seconds = time.perf_counter() - fill_start
+
+        timer = StageTimer()
+        viewer = viewer_class(pcbs, timer=timer, store=store)
+        for run in range(args.runs):
+            # Touch the list so every refresh re-imports it, as after an edit of the sheet
+            os.utime(production_file, (time.time(), time.time() + run))
+            with timer.time('refresh'):
+                viewer.production_data = viewer.load_production_data(production_file)
+            for pcb_type in sorted(viewer.unique_pcb_types):
+                with timer.time('select'):
+                    viewer.load_pcb_type(pcb_type)
+        store.close()
+
+        return {
+            'history_batches': history,
+            'history_modules': history * args.modules * len(DEFAULT_PCBS),
+            'fill_s': round(fill_seconds, 2),
+            'db_kib': os.path.getsize(os.path.join(work_dir, "production.sqlite")) // 1024,
+            'stages': timer.summary(),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time refresh and PCB selection against production store size")
+    parser.add_argument('--history', type=int, nargs='+', default=[0, 100, 500],
+                        help="older batches already in the store, one run per value")
+    parser.add_argument('--modules', type=int, default=120, help="modules per PCB type in each batch")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    app = load_app()
+    viewer_class = headless_viewer_class(app)
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'modules_per_type': args.modules,
+        'runs': [run_history(app, viewer_class, history, args) for history in args.history],
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    for run in results['runs']:
+        stages = run['stages']
+        print(f"{run['history_batches']:>6} batches ({run['history_modules']} modules, {run['db_kib']} KiB): "
+              f"refresh p50 {stages['refresh']['p50_ms']:.1f} ms, select p50 {stages['select']['p50_ms']:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Synthetic production lists and PCB layouts for the benchmark tools.
+
+The generated files use the same shapes the layout app reads from the shared
+drive: a `production list.csv` with batch/product/order columns followed by the
+short codes from C7 onwards (and optionally a Serial column, as the business
+system assigns them), and one `{pcb}.csv` layout per PCB type with
+GEOMETRY, MODULE, CIRCLE, MTEXT and POINT elements.
+"""
+
+import csv
+import os
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+LAYOUT_COLUMNS = ['Element', 'X', 'Y', 'Diameter', 'Height', 'Width', 'Columns', 'Rows',
+                  'Rotation', 'TextHeight', 'TextString']
+PRODUCTION_COLUMNS = 14
+
+
+@dataclass
+class SyntheticPCB:
+    name: str
+    rows: int
+    columns: int
+    led_count: int
+    connector: bool = False
+    lens: bool = False
+    pitch: float = 20.0
+    micro_id: bool = False
+    qr: float = 0.0  # side of each module's QR code in mm, the fret's being twice that; 0 for none
+
+    @property
+    def modules_count(self) -> int:
+        return self.rows * self.columns
+
+
+# Roughly the mix of array sizes found in a normal production list
+DEFAULT_PCBS = [
+    SyntheticPCB("sz-01", 6, 6, 1, pitch=16.0),
+    SyntheticPCB("sz-04", 4, 5, 4, pitch=22.0),
+    SyntheticPCB("sp-03", 5, 5, 3, pitch=20.0),
+    SyntheticPCB("sw-12", 3, 4, 3, connector=True, lens=True, pitch=30.0),
+]
+
+
+# Write a layout CSV for a synthetic PCB type and return its path
+def write_layout(pcb: SyntheticPCB, directory: str) -> str:
+    width = pcb.columns * pcb.pitch
+    height = pcb.rows * pcb.pitch
+    module_size = pcb.pitch * 0.9
+    text_height = round(pcb.pitch * 0.08, 3)
+
+    rows = [
+        {'Element': 'GEOMETRY', 'Height': height, 'Width': width, 'Columns': pcb.columns, 'Rows': pcb.rows},
+        {'Element': 'MODULE', 'Height': module_size, 'Width': module_size},
+        {'Element': 'POINT', 'X': width / 2, 'Y': height / 2},
+    ]
+    for r in range(pcb.rows):
+        for c in range(pcb.columns):
+            x = (c + 0.5) * pcb.pitch
+            y = (r + 0.5) * pcb.pitch
+            rows.append({'Element': 'CIRCLE', 'X': x, 'Y': y, 'Diameter': module_size * 0.6})
+            for j in range(pcb.led_count):
+                dx = (j - (pcb.led_count - 1) / 2) * module_size / (pcb.led_count + 1)
+                rows.append({'Element': 'MTEXT', 'X': x + dx, 'Y': y - module_size * 0.3,
+                             'Rotation': 90 * (j % 2), 'TextHeight': text_height, 'TextString': f"P{j + 1}"})
+            if pcb.connector:
+                rows.append({'Element': 'MTEXT', 'X': x - module_size * 0.3, 'Y': y + module_size * 0.3,
+                             'Rotation': 0, 'TextHeight': text_height, 'TextString': 'C1'})
+            if pcb.lens:
+                rows.append({'Element': 'MTEXT', 'X': x + module_size * 0.3, 'Y': y + module_size * 0.3,
+                             'Rotation': 0, 'TextHeight': text_height, 'TextString': 'L1'})
+            if pcb.micro_id:
+                rows.append({'Element': 'MTEXT', 'X': x + module_size * 0.3, 'Y': y,
+                             'Rotation': 0, 'TextHeight': text_height, 'TextString': 'ID'})
+            if pcb.qr:
+                rows.append({'Element': 'MTEXT', 'X': x - module_size * 0.3, 'Y': y,
+                             'Rotation': 0, 'TextHeight': pcb.qr, 'TextString': 'QR'})
+    if pcb.qr:
+        # Above the outline, in no module
+        rows.append({'Element': 'MTEXT', 'X': width / 2, 'Y': -pcb.qr * 1.5,
+                     'Rotation': 0, 'TextHeight': pcb.qr * 2, 'TextString': 'QR'})
+
+    file_path = os.path.join(directory, f"{pcb.name}.csv")
+    with open(file_path, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=LAYOUT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return file_path
+
+
+# Build a single production list row in the shared-drive column order
+def production_row(pcb: SyntheticPCB, batch_id: str, order_number: str, rng: random.Random) -> List[str]:
+    led_codes = [f"{rng.choice('ABCDEFGHJK')}{rng.randint(0, 9)}" for _ in range(pcb.led_count)]
+    product_name = f"{pcb.name.upper()}-{''.join(led_codes)}"
+    row = [batch_id, product_name, order_number, '1', 'Processing', '']
+    row.extend(led_codes)
+    if pcb.lens:
+        row.append(f"L{rng.randint(10, 99)}")
+    if pcb.connector:
+        row.append(f"C{rng.randint(10, 99)}")
+    # The spreadsheet export pads every row to the same width
+    return row + [''] * (PRODUCTION_COLUMNS - len(row))
+
+
+# Write a production list with `modules_per_type` modules for every PCB type; with `first_serial`, a Serial
+# column numbers the modules in list order from it
+def write_production_list(file_path: str, pcbs: List[SyntheticPCB], modules_per_type: int,
+                          batch_id: str = "B0001", seed: int = 1, first_serial: Optional[int] = None) -> int:
+    rng = random.Random(seed)
+    rows = []
+    for pcb in pcbs:
+        for i in range(modules_per_type):
+            order_number = str(100000 + (i // 3))
+            rows.append(production_row(pcb, batch_id, order_number, rng))
+    rng.shuffle(rows)
+    header = ['Batch', 'Product', 'Order', 'Qty', 'Status', 'Notes'] + [f"Code {i + 1}"
+                                                                       for i in range(PRODUCTION_COLUMNS - 6)]
+    if first_serial is not None:
+        header.append('Serial')
+        for serial, row in enumerate(rows, start=first_serial):
+            row.append(f"{serial:08d}")
+
+    with open(file_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return len(rows)
+
+
+# Offsets in the shape returned by PCBViewer.load_available_pcbs()
+def available_pcbs(pcbs: List[SyntheticPCB]) -> Dict[str, Dict[str, float]]:
+    return {pcb.name: {'x_offset': 0.25, 'y_offset': -0.25} for pcb in pcbs}
+
+
+# Write layouts and a production list into `directory` and return the production list path
+def build_dataset(directory: str, pcbs: List[SyntheticPCB], modules_per_type: int, seed: int = 1,
+                  first_serial: Optional[int] = None) -> str:
+    os.makedirs(directory, exist_ok=True)
+    for pcb in pcbs:
+        write_layout(pcb, directory)
+    production_file = os.path.join(directory, "production list.csv")
+    write_production_list(production_file, pcbs, modules_per_type, seed=seed, first_serial=first_serial)
+    return production_file
@@ -0,0 +1,115 @@
+"""Laser head travel of exported frets, in layout order and travel-optimized order.
+
+Plans every fret of a synthetic production list, then for each fret reports the
+estimated head travel with the texts in layout order (module by module) and in
+the order `render_svg(..., optimize_travel=True)` writes, with the time the
+ordering took. Each optimized file is also checked to hold exactly the same
+text elements as the layout-order file, so only the order changed.
+
+    python travel_bench.py --modules 120 --output travel.json
+    python travel_bench.py --large  # adds a 10 x 10 array with 4 LEDs per module
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from headless import load_app  # noqa: E402
+from synthetic import DEFAULT_PCBS, SyntheticPCB, available_pcbs, build_dataset  # noqa: E402
+
+LARGE_PCB = SyntheticPCB("sz-100", 10, 10, 4, pitch=19.0)
+BUDGET_MS = 50.0
+
+
+def _text_elements(dwg) -> List[str]:
+    return sorted(element.tostring() for element in dwg.elements if element.elementname == 'text')
+
+
+def run_type(layout_engine, pcb_type: str, production_data, data_dir: str, pcbs) -> Dict[str, Any]:
+    layout = layout_engine.apply_offsets(layout_engine.compile_layout(pcb_type, data_dir), pcb_type, pcbs)
+    instances = [instance for instance in layout_engine.plan_instances(production_data, pcb_type, layout)
+                 if instance.data]
+    before, after, ms, texts = [], [], [], []
+    mismatched = 0
+    for instance in instances:
+        report = layout_engine.travel_report(layout, instance)
+        before.append(report['before_mm'])
+        after.append(report['after_mm'])
+        ms.append(report['ms'])
+        texts.append(report['elements'])
+        plain = layout_engine.render_svg(layout, instance, "fret.svg")
+        ordered = layout_engine.render_svg(layout, instance, "fret.svg", optimize_travel=True)
+        if _text_elements(plain) != _text_elements(ordered):
+            mismatched += 1
+
+    return {
+        'pcb_type': pcb_type,
+        'frets': len(instances),
+        'texts_per_fret': max(texts, default=0),
+        'travel_before_mm': round(statistics.mean(before), 1) if before else 0.0,
+        'travel_after_mm': round(statistics.mean(after), 1) if after else 0.0,
+        'reduction': round(1 - sum(after) / sum(before), 3) if sum(before) else 0.0,
+        'order_ms_median': round(statistics.median(ms), 2) if ms else 0.0,
+        'order_ms_max': round(max(ms), 2) if ms else 0.0,
+        'mismatched_files': mismatched,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare laser head travel in layout and optimized order")
+    parser.add_argument('--modules', type=int, default=120, help="modules per PCB type")
+    parser.add_argument('--large', action='store_true', help="add a 100-module array with 400 texts per fret")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    load_app()  # puts the app directory, and with it layout_engine, on the path
+    import layout_engine
+
+    pcbs = DEFAULT_PCBS + ([LARGE_PCB] if args.large else [])
+    work_dir = tempfile.mkdtemp(prefix="travel-bench-")
+    try:
+        data_dir = os.path.join(work_dir, "data")
+        production_file = build_dataset(data_dir, pcbs, args.modules, seed=args.seed)
+        offsets = available_pcbs(pcbs)
+        production_data = layout_engine.load_production_data(production_file, offsets, [])
+        start = time.perf_counter()
+        types = [run_type(layout_engine, pcb.name, production_data, data_dir, offsets) for pcb in pcbs]
+        seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'modules_per_type': args.modules,
+        'seconds': round(seconds, 3),
+        'types': types,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    for result in types:
+        ok = result['mismatched_files'] == 0 and result['order_ms_max'] <= BUDGET_MS
+        failed = failed or not ok
+        print(f"{result['pcb_type']:8} {result['frets']:3} frets x {result['texts_per_fret']:3} texts: "
+              f"{result['travel_before_mm']:7.0f} -> {result['travel_after_mm']:6.0f} mm per fret "
+              f"(-{result['reduction']:.0%}), ordering {result['order_ms_median']:.1f} ms median, "
+              f"{result['order_ms_max']:.1f} ms max" + ("" if ok else "  FAILED"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Layout and export engine for the Production Layout App.
+
+Everything needed to turn a production list into engraving files, with no Tk
+imports: the production loader, PCB type resolution, the layout compiler, the
+fret planner, the SVG exporter with its travel ordering, glyph outlines,
+cache and background pre-rendering, Micro-ID dot codes, QR codes, LightBurn
+project export, fixture nesting of several frets per job, multi-fret job
+bundles, engrave time estimates, the engraving job journal, the optional
+SQLite production store and multi-station fret claims, plus the logging setup
+(`layout_logging`) and stage timing histograms (`layout_metrics`) they report
+through.
+Functions raise `LayoutEngineError` subclasses instead of showing dialogs, so
+the same code runs in the viewer, command-line tools, benchmarks and worker
+processes.
+"""
+
+from .bundle import (BundleError, bundle_capacity, bundle_contents, bundle_file_name, read_toc, render_bundle_lbrn2,
+                     render_bundle_svg, write_toc)
+from .claims import Claim, FretClaims, module_key
+from .config import fetch_available_pcbs, fetch_program_settings, parse_available_pcbs, parse_program_settings
+from .engrave_time import (CalibrationError, EngraveEstimator, LaserProfile, format_duration, load_profiles,
+                           log_engraving)
+from .errors import ClaimConflict, ConfigError, LayoutEngineError, LayoutError, ProductionDataError
+from .export_cache import ExportCache, fret_key
+from .glyphs import GlyphError, build_library, load_glyph_library
+from .jobs import JobQueue, JobStateError
+from .layout import apply_offsets, compile_layout, format_slots, parse_slots
+from .lightburn_export import LightBurnTemplateError, load_template, render_lbrn2, template_path, write_lbrn2
+from .micro_id import MicroIDError, format_serial, parse_serial
+from .models import PCBInstance, ProductionData
+from .nesting import (Fixture, FixtureError, check_fit, load_fixture, nested_file_name, render_nested_lbrn2,
+                      render_nested_svg)
+from .planner import empty_instance, plan_instances, redistribute
+from .prefetch import ExportPrefetcher
+from .production import assign_row_keys, determine_pcb_type, load_production_data, parse_production_row
+from .qr import QRCodeError, fret_payload, module_payload
+from .store import ProductionStore
+from .svg_export import (add_rotated_text, export_file_name, micro_id_elements, qr_elements, render_svg, travel_report,
+                         write_svg)
+
+__all__ = [
+    'ClaimConflict', 'ConfigError', 'LayoutEngineError', 'LayoutError', 'ProductionDataError',
+    'PCBInstance', 'ProductionData',
+    'fetch_available_pcbs', 'fetch_program_settings', 'parse_available_pcbs', 'parse_program_settings',
+    'assign_row_keys', 'determine_pcb_type', 'load_production_data', 'parse_production_row',
+    'ProductionStore',
+    'Claim', 'FretClaims', 'module_key',
+    'JobQueue', 'JobStateError',
+    'ExportCache', 'ExportPrefetcher', 'fret_key',
+    'GlyphError', 'build_library', 'load_glyph_library',
+    'CalibrationError', 'EngraveEstimator', 'LaserProfile', 'format_duration', 'load_profiles', 'log_engraving',
+    'apply_offsets', 'compile_layout', 'format_slots', 'parse_slots',
+    'empty_instance', 'plan_instances', 'redistribute',
+    'add_rotated_text', 'export_file_name', 'micro_id_elements', 'qr_elements', 'render_svg', 'travel_report',
+    'write_svg',
+    'MicroIDError', 'format_serial', 'parse_serial',
+    'QRCodeError', 'fret_payload', 'module_payload',
+    'LightBurnTemplateError', 'load_template', 'render_lbrn2', 'template_path', 'write_lbrn2',
+    'Fixture', 'FixtureError', 'check_fit', 'load_fixture', 'nested_file_name', 'render_nested_lbrn2',
+    'render_nested_svg',
+    'BundleError', 'bundle_capacity', 'bundle_contents', 'bundle_file_name', 'read_toc', 'render_bundle_lbrn2',
+    'render_bundle_svg', 'write_toc',
+]
@@ -0,0 +1,41 @@
+"""Build a glyph outline library from a TrueType font for outline text export.
+
+    python -m layout_engine.build_glyphs "Roboto-Thin.ttf" -o glyphs/roboto-thin.json
+    python -m layout_engine.build_glyphs "Roboto-Thin.ttf" -o glyphs/roboto-thin.json --characters 0123456789ABC
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+from . import layout_logging
+from .glyphs import DEFAULT_CHARACTERS, GlyphError, build_library
+
+log = logging.getLogger(layout_logging.BUILD_GLYPHS)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build a glyph outline library from a TrueType font")
+    parser.add_argument('font', help="TrueType font file, e.g. Roboto-Thin.ttf")
+    parser.add_argument('-o', '--output', required=True, help="glyph library JSON to write")
+    parser.add_argument('--characters', default=DEFAULT_CHARACTERS, help="characters to include")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+    try:
+        library = build_library(args.font, args.characters)
+    except (OSError, GlyphError) as e:
+        log.error(f"Could not build glyph library: {e}")
+        return 1
+    directory = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(library, f, separators=(',', ':'))
+    print(f"{len(library['glyphs'])} glyphs of {library['font']} -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
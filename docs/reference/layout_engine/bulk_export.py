@@ -0,0 +1,306 @@
+"""Export engraving SVGs for a whole production list from the command line.
+
+Reads the production list and the Text Position Data folder, resolves every
+PCB type, plans its frets and writes one SVG per fret, the same files Batch
+Export produces in the viewer. PCB types are exported in parallel worker
+processes. A `manifest.json` listing every file with its frets, module counts,
+orders and estimated engrave time is written next to the SVGs. With a
+fixture, the PCB types it takes are nested several frets per file instead (see
+`nesting.py`).
+
+    python -m layout_engine.bulk_export "production list.csv" "Text Position Data" -o export
+    python -m layout_engine.bulk_export list.csv layouts -o export --pcb-list pcbs.csv --settings settings.csv
+    python -m layout_engine.bulk_export list.csv layouts -o export --cache export_cache
+    python -m layout_engine.bulk_export list.csv layouts -o export --optimize-travel
+    python -m layout_engine.bulk_export list.csv layouts -o export --laser-profiles laser_profiles.json --laser UV1
+    python -m layout_engine.bulk_export list.csv layouts -o export --outline-glyphs glyphs/roboto-thin.json
+    python -m layout_engine.bulk_export list.csv layouts -o export --compact
+    python -m layout_engine.bulk_export list.csv layouts -o export --lightburn-templates lightburn_templates
+    python -m layout_engine.bulk_export list.csv layouts -o export --fixture fixtures/sz-quad.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from . import layout_logging
+from .config import fetch_available_pcbs, fetch_program_settings, parse_available_pcbs, parse_program_settings
+from .errors import LayoutEngineError
+from .engrave_time import LaserProfile, format_duration, fret_work, load_profiles
+from .export_cache import ExportCache
+from .layout import apply_offsets, compile_layout
+from .lightburn_export import PROJECT_EXTENSION, load_template, render_lbrn2, template_path, write_lbrn2
+from .models import ProductionData
+from .nesting import (Fixture, FixtureError, check_fit, load_fixture, nested_elements, nested_file_name, render_nested_lbrn2,
+                      render_nested_svg)
+from .planner import plan_instances
+from .production import load_production_data
+from .svg_export import export_file_name, fret_elements, order_elements, render_svg, write_svg
+
+log = logging.getLogger(layout_logging.BULK_EXPORT)
+
+# Same Google Sheets exports the viewer reads
+PCB_LIST_URL = "https://docs.google.com/spreadsheets/d/1h8EJrRsPvCfTVxdSzLcAE-ID2eZ-scdMx913gR_Z1ZU/export?format=csv&gid=0"
+PROGRAM_SETTINGS_URL = "https://docs.google.com/spreadsheets/d/1h8EJrRsPvCfTVxdSzLcAE-ID2eZ-scdMx913gR_Z1ZU/export?format=csv&gid=852408781"
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _is_url(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+def _read_text(path: str) -> str:
+    with open(path, newline='') as f:
+        return f.read()
+
+
+# PCB list from a Google Sheets URL or a local CSV export of it
+def read_available_pcbs(source: str) -> Dict[str, Dict[str, float]]:
+    return fetch_available_pcbs(source) if _is_url(source) else parse_available_pcbs(_read_text(source))
+
+
+def read_program_settings(source: str) -> Dict[str, Any]:
+    return fetch_program_settings(source) if _is_url(source) else parse_program_settings(_read_text(source))
+
+
+# Export every fret of one PCB type; runs in a worker process
+def export_pcb_type(pcb_type: str, production_data: List[ProductionData], layout_dir: str, output_dir: str,
+                    available_pcbs: Dict[str, Dict[str, float]], cache_dir: Optional[str] = None,
+                    optimize_travel: bool = False, laser: Optional[LaserProfile] = None,
+                    outline_glyphs: Optional[str] = None, compact: bool = False,
+                    lightburn_templates: Optional[str] = None, fixture: Optional[Fixture] = None) -> Dict[str, Any]:
+    start = time.perf_counter()
+    laser = laser or LaserProfile()
+    result: Dict[str, Any] = {'pcb_type': pcb_type, 'modules': len(production_data), 'files': []}
+    cache = ExportCache(cache_dir) if cache_dir else None
+    try:
+        layout = apply_offsets(compile_layout(pcb_type, layout_dir), pcb_type, available_pcbs)
+        instances = plan_instances(production_data, pcb_type, layout)
+        result['modules_per_fret'] = len(layout['Modules'])
+        template = None
+        if lightburn_templates is not None:
+            template = load_template(template_path(lightburn_templates, pcb_type))
+            result['template'] = template.name
+
+        nest = fixture is not None and fixture.accepts(pcb_type)
+        if nest:
+            try:
+                check_fit(fixture, layout, pcb_type)
+            except FixtureError as e:
+                # A fixture for any PCB type only takes those that fit; one naming the type must fit it
+                if fixture.pcb_types:
+                    raise
+                log.info(f"{e}; exporting one fret per file")
+                nest = False
+        if nest:
+            result['fixture'] = fixture.name
+        extension = PROJECT_EXTENSION if template is not None else ".svg"
+        options: Dict[str, Any] = {}
+        if optimize_travel:
+            options['optimize_travel'] = True
+        if outline_glyphs:
+            options['outline_glyphs'] = outline_glyphs
+        if compact and template is None:
+            options['compact'] = True
+
+        frets = [(fret, instance) for fret, instance in enumerate(instances, start=1) if instance.data]
+        file_number = 1
+        for load in (fixture.loads(frets) if nest else [[fret] for fret in frets]):
+            load_instances = [instance for _, instance in load]
+            if nest:
+                # One file per fixture load; loads are not cached, the export cache holds single frets
+                file_name = nested_file_name(load_instances, file_number, extension)
+                file_path = os.path.join(output_dir, file_name)
+                nested = [(layout, instance) for instance in load_instances]
+                if template is not None:
+                    write_lbrn2(render_nested_lbrn2(nested, fixture, template, **options), file_path)
+                else:
+                    write_svg(render_nested_svg(nested, fixture, file_path, **options))
+                elements = nested_elements(nested, fixture)
+            else:
+                instance = load_instances[0]
+                file_name = export_file_name(instance, file_number, extension)
+                file_path = os.path.join(output_dir, file_name)
+                if template is not None:
+                    write_lbrn2(render_lbrn2(layout, instance, template, **options), file_path)
+                elif cache:
+                    cache.export(layout, instance, file_path, **options)
+                else:
+                    write_svg(render_svg(layout, instance, file_path, **options))
+                elements = fret_elements(layout, instance)
+            if optimize_travel:
+                elements, travel = order_elements(elements)
+            entry = {
+                'file': file_name,
+                **({'frets': [fret for fret, _ in load]} if nest else {'fret': load[0][0]}),
+                'modules': sum(len(instance.data) for instance in load_instances),
+                'orders': sorted({data.order_number for instance in load_instances for data in instance.data}),
+                'engrave_seconds': round(laser.estimate(fret_work(elements)), 1),
+            }
+            if optimize_travel:
+                entry['travel_mm'] = {'before': travel['before_mm'], 'after': travel['after_mm']}
+            result['files'].append(entry)
+            file_number += len(load)
+    except LayoutEngineError as e:
+        result['error'] = str(e)
+    except OSError as e:
+        result['error'] = f"Failed to write {'project' if lightburn_templates is not None else 'SVG'}: {e}"
+
+    if cache:
+        result['cache'] = {'hits': cache.hits, 'misses': cache.misses}
+    result['frets'] = sum(len(entry.get('frets', [entry.get('fret')])) for entry in result['files'])
+    result['engrave_seconds'] = round(sum(entry['engrave_seconds'] for entry in result['files']), 1)
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def build_manifest(production_file: str, output_dir: str, results: List[Dict[str, Any]],
+                   seconds: float, laser: Optional[LaserProfile] = None) -> Dict[str, Any]:
+    orders: Dict[str, List[str]] = {}
+    for result in results:
+        for entry in result['files']:
+            for order in entry['orders']:
+                orders.setdefault(order, []).append(entry['file'])
+
+    travel = [entry['travel_mm'] for result in results for entry in result['files'] if 'travel_mm' in entry]
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'production_list': os.path.abspath(production_file),
+        'output_dir': os.path.abspath(output_dir),
+        'seconds': round(seconds, 3),
+        'laser': asdict(laser or LaserProfile()),
+        'totals': {
+            'pcb_types': len(results),
+            'files': sum(len(result['files']) for result in results),
+            'modules': sum(entry['modules'] for result in results for entry in result['files']),
+            'orders': len(orders),
+            'failed_types': sorted(result['pcb_type'] for result in results if 'error' in result),
+            'cache_hits': sum(result.get('cache', {}).get('hits', 0) for result in results),
+            'cache_misses': sum(result.get('cache', {}).get('misses', 0) for result in results),
+            'travel_before_mm': round(sum(entry['before'] for entry in travel), 1),
+            'travel_after_mm': round(sum(entry['after'] for entry in travel), 1),
+            'engrave_seconds': round(sum(result.get('engrave_seconds', 0.0) for result in results), 1),
+        },
+        'pcb_types': {result['pcb_type']: result for result in results},
+        'orders': orders,
+    }
+
+
+def bulk_export(production_file: str, layout_dir: str, output_dir: str,
+                available_pcbs: Dict[str, Dict[str, float]], ir_leds: List[str],
+                pcb_types: Optional[List[str]] = None, jobs: Optional[int] = None,
+                cache_dir: Optional[str] = None, optimize_travel: bool = False,
+                laser: Optional[LaserProfile] = None, outline_glyphs: Optional[str] = None,
+                compact: bool = False, lightburn_templates: Optional[str] = None,
+                fixture: Optional[Fixture] = None) -> Dict[str, Any]:
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    production_data = load_production_data(production_file, available_pcbs, ir_leds)
+
+    by_type: Dict[str, List[ProductionData]] = {}
+    for data in production_data:
+        by_type.setdefault(data.pcb_type, []).append(data)
+    if pcb_types:
+        wanted = {pcb_type.lower() for pcb_type in pcb_types}
+        by_type = {pcb_type: rows for pcb_type, rows in by_type.items() if pcb_type.lower() in wanted}
+
+    # Largest types first so the slowest layouts start early
+    order = sorted(by_type, key=lambda pcb_type: len(by_type[pcb_type]), reverse=True)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(order) or 1))
+    log.info(f"Exporting {len(production_data)} modules across {len(order)} PCB types with {jobs} workers")
+
+    if jobs == 1:
+        results = [export_pcb_type(pcb_type, by_type[pcb_type], layout_dir, output_dir, available_pcbs, cache_dir,
+                                   optimize_travel, laser, outline_glyphs, compact, lightburn_templates, fixture)
+                   for pcb_type in order]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(export_pcb_type, pcb_type, by_type[pcb_type], layout_dir, output_dir,
+                                   available_pcbs, cache_dir, optimize_travel, laser, outline_glyphs, compact,
+                                   lightburn_templates, fixture)
+                       for pcb_type in order]
+            results = [future.result() for future in futures]
+
+    for result in results:
+        if 'error' in result:
+            log.error(f"{result['pcb_type']}: {result['error']}")
+        else:
+            log.info(f"{result['pcb_type']}: {result['frets']} frets, {result['modules']} modules "
+                     f"in {result['seconds']:.2f}s, about {format_duration(result['engrave_seconds'])} to engrave")
+
+    if cache_dir:
+        ExportCache(cache_dir).evict()
+
+    results.sort(key=lambda result: result['pcb_type'])
+    manifest = build_manifest(production_file, output_dir, results, time.perf_counter() - start, laser)
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export engraving SVGs for every PCB type in a production list")
+    parser.add_argument('production_list', help="production list CSV")
+    parser.add_argument('layout_dir', help="Text Position Data folder with one <pcb>.csv layout per PCB type")
+    parser.add_argument('-o', '--output-dir', required=True)
+    parser.add_argument('--pcb-list', default=PCB_LIST_URL, help="PCB list URL or CSV file (offsets)")
+    parser.add_argument('--settings', default=PROGRAM_SETTINGS_URL, help="program settings URL or CSV file (IR LEDs)")
+    parser.add_argument('--pcb-type', action='append', dest='pcb_types', help="only export this type (repeatable)")
+    parser.add_argument('-j', '--jobs', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--cache', metavar='DIR', help="reuse identical frets from this export cache directory")
+    parser.add_argument('--optimize-travel', action='store_true',
+                        help="write texts in the order that shortens laser head travel")
+    parser.add_argument('--outline-glyphs', metavar='FILE',
+                        help="write texts as outlines from this glyph library (see layout_engine.build_glyphs)")
+    parser.add_argument('--compact', action='store_true',
+                        help="write each distinct code once and place it with <use>, positions to 0.001 mm")
+    parser.add_argument('--lightburn-templates', metavar='DIR', nargs='?', const="",
+                        help="write LightBurn projects (.lbrn2) from <pcb type>.lbrn2 or default.lbrn2 templates "
+                             "in DIR (built-in template without DIR) instead of SVGs")
+    parser.add_argument('--fixture', metavar='FILE',
+                        help="nest several frets per file in the slots of this fixture definition (JSON) for the "
+                             "PCB types it takes")
+    parser.add_argument('--laser-profiles', help="laser profiles JSON for engrave time estimates")
+    parser.add_argument('--laser', default="default", help="laser profile to estimate with")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+    try:
+        available_pcbs = read_available_pcbs(args.pcb_list)
+        ir_leds = read_program_settings(args.settings).get('ir_leds', [])
+        laser = load_profiles(args.laser_profiles).get(args.laser, LaserProfile(args.laser))
+        fixture = load_fixture(args.fixture) if args.fixture else None
+        manifest = bulk_export(args.production_list, args.layout_dir, args.output_dir, available_pcbs, ir_leds,
+                               pcb_types=args.pcb_types, jobs=args.jobs, cache_dir=args.cache,
+                               optimize_travel=args.optimize_travel, laser=laser,
+                               outline_glyphs=args.outline_glyphs, compact=args.compact,
+                               lightburn_templates=args.lightburn_templates, fixture=fixture)
+    except Exception as e:
+        log.error(f"Bulk export failed: {e}")
+        return 1
+
+    totals = manifest['totals']
+    print(f"{totals['files']} files, {totals['modules']} modules, {totals['orders']} orders "
+          f"in {manifest['seconds']:.2f}s -> {os.path.join(args.output_dir, MANIFEST_NAME)}")
+    calibration = f"{laser.samples} engravings" if laser.samples else "uncalibrated"
+    print(f"Estimated engrave time: {format_duration(totals['engrave_seconds'])} on {laser.name} ({calibration})")
+    if args.cache:
+        print(f"Export cache: {totals['cache_hits']} hits, {totals['cache_misses']} misses")
+    if args.optimize_travel:
+        print(f"Head travel: {totals['travel_before_mm'] / 1000:.1f} m in layout order, "
+              f"{totals['travel_after_mm'] / 1000:.1f} m optimized")
+    return 1 if totals['failed_types'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""One job file per batch: every fret of a batch in a single document.
+
+Batch Export normally writes one file per fret and loads each into LightBurn
+in turn. A bundle holds all the frets of a batch instead, each under its own
+name, so the file is written and loaded once and the operator steps from fret
+to fret inside it. Every fret engraves in the same fixture position, so the
+frets overlap in the work area:
+
+- SVG: each fret is a group `<g id="fret-003">`, in fret order, after a single
+  alignment cross; select the group and engrave the selection.
+- LightBurn project: each fret is a group on its own layer named `fret-003`,
+  a copy of the layer of the template's code shape. Only the first fret's
+  layer has output on; switch output to the next layer after each fret.
+  LightBurn has 30 layers, so a project holds at most 30 frets less the
+  template's own layers (see `bundle_capacity`).
+
+Next to the bundle, `<name>.toc.json` lists every fret with its group/layer
+name, the name it would have had as a single file, its module count and its
+orders.
+"""
+
+import copy
+import json
+import os
+import xml.etree.ElementTree as ElementTree
+from typing import Any, Dict, List, Optional, Tuple
+
+import svgwrite
+
+from . import layout_metrics
+from .errors import LayoutEngineError
+from .lightburn_export import LightBurnTemplate, code_shapes
+from .micro_id import add_micro_ids
+from .models import PCBInstance
+from .qr import add_qr_codes
+from .svg_export import (add_center_cross, add_texts, export_file_name, fret_elements, fret_file_stem,
+                         micro_id_elements, new_drawing, qr_elements)
+
+BUNDLE_SUFFIX = "_bundle"
+TOC_EXTENSION = ".toc.json"
+LIGHTBURN_LAYERS = 30  # C00 to C29
+
+
+class BundleError(LayoutEngineError):
+    pass
+
+
+# Group id in an SVG bundle and layer name in a LightBurn bundle, e.g. "fret-003"
+def fret_name(number: int) -> str:
+    return f"fret-{number:03d}"
+
+
+# File name of a bundle from its first and last fret numbers, e.g. "1234_sz-04_001-006_bundle.svg"
+def bundle_file_name(instances: List[PCBInstance], first_number: int, extension: str = ".svg") -> str:
+    first_prod_data = instances[0].data[0]
+    last_number = first_number + len(instances) - 1
+    return (f"{first_prod_data.batch_id}_{first_prod_data.pcb_type}_{first_number:03d}-{last_number:03d}"
+            f"{BUNDLE_SUFFIX}{extension}")
+
+
+# Table of contents entries of a bundle, in fret order
+def bundle_contents(instances: List[PCBInstance], first_number: int, extension: str = ".svg") -> List[Dict[str, Any]]:
+    return [{
+        'fret': number,
+        'name': fret_name(number),
+        'file': export_file_name(instance, number, extension),
+        'modules': len(instance.data),
+        'orders': sorted({data.order_number for data in instance.data}),
+    } for number, instance in enumerate(instances, start=first_number)]
+
+
+def toc_path(file_path: str) -> str:
+    return os.path.splitext(file_path)[0] + TOC_EXTENSION
+
+
+# Write the table of contents next to a bundle; returns its path
+def write_toc(file_path: str, contents: List[Dict[str, Any]]) -> str:
+    path = toc_path(file_path)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'bundle': os.path.basename(file_path), 'frets': contents}, f, indent=2)
+    return path
+
+
+def read_toc(file_path: str) -> List[Dict[str, Any]]:
+    try:
+        with open(toc_path(file_path), encoding='utf-8') as f:
+            return json.load(f)['frets']
+    except OSError as e:
+        raise BundleError(f"No table of contents for {file_path}") from e
+    except (ValueError, KeyError, TypeError) as e:
+        raise BundleError(f"Invalid table of contents for {file_path}: {e}") from e
+
+
+# Build the SVG bundle of `instances`, numbered from `first_number`, without writing it to disk. The
+# options are those of render_svg and apply to each fret; a fret's QR code {name} is its single-file name.
+@layout_metrics.timed("svg_export")
+def render_bundle_svg(layout: Dict[str, Any], instances: List[PCBInstance], file_path: str, first_number: int = 1,
+                      optimize_travel: bool = False, outline_glyphs: Optional[str] = None,
+                      compact: bool = False, micro_ids: bool = False, module_qr: Optional[str] = None,
+                      fret_qr: Optional[str] = None) -> svgwrite.Drawing:
+    dwg = new_drawing(file_path)
+    add_center_cross(dwg, layout)
+    symbols: Dict[Tuple[str, float], str] = {}
+    for number, instance in enumerate(instances, start=first_number):
+        group = dwg.g(id=fret_name(number))
+        add_texts(dwg, fret_elements(layout, instance), optimize_travel, outline_glyphs, compact, group, symbols)
+        if micro_ids:
+            add_micro_ids(dwg, micro_id_elements(layout, instance), group)
+        if module_qr or fret_qr:
+            name = fret_file_stem(export_file_name(instance, number))
+            add_qr_codes(dwg, qr_elements(layout, instance, name, module_qr, fret_qr), parent=group)
+        dwg.add(group)
+    return dwg
+
+
+# Layers of a template the frets of a LightBurn bundle can use
+def bundle_capacity(template: LightBurnTemplate) -> int:
+    return LIGHTBURN_LAYERS - len(template.root.findall('CutSetting'))
+
+
+def _set_value(setting: ElementTree.Element, tag: str, value: str):
+    element = setting.find(tag)
+    if element is None:
+        element = ElementTree.SubElement(setting, tag)
+    element.set('Value', value)
+
+
+# Build the LightBurn bundle of `instances`, numbered from `first_number`, without writing it to disk
+@layout_metrics.timed("lbrn2_export")
+def render_bundle_lbrn2(layout: Dict[str, Any], instances: List[PCBInstance], template: LightBurnTemplate,
+                        first_number: int = 1, optimize_travel: bool = False,
+                        outline_glyphs: Optional[str] = None) -> ElementTree.ElementTree:
+    used = {setting.find('index').get('Value') for setting in template.root.findall('CutSetting')}
+    free = [str(index) for index in range(LIGHTBURN_LAYERS) if str(index) not in used]
+    if len(instances) > len(free):
+        raise BundleError(f"{template.name} leaves {len(free)} layers for frets, not {len(instances)}")
+    # Fret layers copy the settings of the code shape's layer
+    layer = next((setting for setting in template.root.findall('CutSetting')
+                  if setting.find('index').get('Value') == template.cut_index), None)
+    if layer is None:
+        layer = ElementTree.Element('CutSetting', {'type': 'Cut'})
+
+    root = template.project()
+    position = max((i + 1 for i, child in enumerate(root) if child.tag == 'CutSetting'), default=0)
+    for n, (number, instance) in enumerate(enumerate(instances, start=first_number)):
+        setting = copy.deepcopy(layer)
+        _set_value(setting, 'index', free[n])
+        _set_value(setting, 'name', fret_name(number))
+        _set_value(setting, 'doOutput', "0" if n else "1")
+        root.insert(position + n, setting)
+
+        group = ElementTree.SubElement(root, 'Shape', {'Type': 'Group'})
+        ElementTree.SubElement(group, 'XForm').text = "1 0 0 1 0 0"
+        ElementTree.SubElement(group, 'Children').extend(
+            code_shapes(template, fret_elements(layout, instance), optimize_travel, outline_glyphs, free[n]))
+    return ElementTree.ElementTree(root)
@@ -0,0 +1,50 @@
+"""Calibrate per-laser engrave time profiles from the layout app's engrave time log.
+
+Fits every laser in the log (or only those given with --laser) and writes the
+profiles JSON the viewer and the bulk exporter read their estimates from.
+Lasers with too few logged engravings keep their previous profile.
+
+    python -m layout_engine.calibrate engrave_times.jsonl -p laser_profiles.json
+    python -m layout_engine.calibrate engrave_times.jsonl -p laser_profiles.json --laser UV1
+"""
+
+import argparse
+import logging
+import sys
+
+from . import layout_logging
+from .engrave_time import CalibrationError, calibrate, load_profiles, mean_error, read_samples, save_profiles
+
+log = logging.getLogger(layout_logging.CALIBRATE)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Calibrate laser engrave-time profiles from logged engravings")
+    parser.add_argument('log', help="engrave time log written by the layout app")
+    parser.add_argument('-p', '--profiles', required=True, help="laser profiles JSON to update")
+    parser.add_argument('--laser', action='append', dest='lasers', help="only calibrate this laser (repeatable)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+    profiles = load_profiles(args.profiles)
+    failed = False
+    for laser, samples in sorted(read_samples(args.log).items()):
+        if args.lasers and laser not in args.lasers:
+            continue
+        try:
+            profile = calibrate(samples, laser, profiles.get(laser))
+        except CalibrationError as e:
+            log.error(str(e))
+            failed = True
+            continue
+        profiles[laser] = profile
+        print(f"{laser}: setup {profile.setup_seconds:.1f} s, {profile.glyph_seconds * 1000:.0f} ms/glyph, "
+              f"mark {profile.mark_speed:.0f} mm/s, jump {profile.jump_speed:.0f} mm/s, "
+              f"handling {profile.handling_seconds:.0f} s "
+              f"from {len(samples)} engravings, mean error {mean_error(profile, samples):.1f} s")
+    save_profiles(args.profiles, profiles)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Fret claiming for several laser stations working from one production list.
+
+Every station plans its frets from the same `production list.csv`. Before a
+fret is exported its modules are claimed in a SQLite file on the shared drive,
+under an expiring lease held by the station. When the operator confirms the
+engraving the claim is completed; modules of completed claims and of live
+claims held by other stations are left out when a station plans its frets.
+A claim whose lease runs out (the station crashed or was closed mid-fret) is
+reclaimed by the next station that needs those modules.
+
+Modules are identified by batch ID and production list row key, so stations
+can mark different modules faulty or reflow their frets differently and still
+never engrave a module twice. Modules added by hand in the app have no row
+key and are not coordinated.
+
+The file uses a rollback journal rather than WAL, which needs shared memory
+and does not work over network shares. Leases use wall-clock time, so station
+clocks should be kept in sync (Windows time service is enough).
+"""
+
+import logging
+import socket
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+from . import layout_logging
+from .errors import ClaimConflict
+from .models import ProductionData
+
+log = logging.getLogger(layout_logging.DATA)
+
+DEFAULT_LEASE_SECONDS = 15 * 60
+
+CLAIMED = "claimed"
+DONE = "done"
+RELEASED = "released"
+EXPIRED = "expired"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    id INTEGER PRIMARY KEY,
+    station TEXT NOT NULL,
+    batch_id TEXT NOT NULL,
+    pcb_type TEXT NOT NULL,
+    file_name TEXT,
+    status TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    lease_expires REAL NOT NULL,
+    completed_at REAL
+);
+CREATE INDEX IF NOT EXISTS claims_status ON claims (status, lease_expires);
+CREATE INDEX IF NOT EXISTS claims_batch_type ON claims (batch_id, pcb_type);
+CREATE TABLE IF NOT EXISTS claimed_modules (
+    module_key TEXT PRIMARY KEY,
+    claim_id INTEGER NOT NULL REFERENCES claims (id)
+);
+CREATE INDEX IF NOT EXISTS claimed_modules_claim ON claimed_modules (claim_id);
+"""
+
+
+@dataclass
+class Claim:
+    id: int
+    station: str
+    module_keys: List[str]
+    lease_expires: float
+
+
+# Shared identity of a production list module, or None for modules added in the app
+def module_key(data: ProductionData) -> Optional[str]:
+    return f"{data.batch_id}/{data.row_key}" if data.row_key else None
+
+
+class FretClaims:
+    def __init__(self, path: str, station: Optional[str] = None, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.station = station or socket.gethostname()
+        self.lease_seconds = lease_seconds
+        # Transactions are managed explicitly so claims can take the write lock up front
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    # Free the modules of other stations' claims whose lease has run out; returns the number of claims
+    def _expire(self, now: float) -> int:
+        expired = [row[0] for row in self.conn.execute(
+            "SELECT id FROM claims WHERE status = ? AND lease_expires < ?", (CLAIMED, now))]
+        for claim_id in expired:
+            self.conn.execute("DELETE FROM claimed_modules WHERE claim_id = ?", (claim_id,))
+            self.conn.execute("UPDATE claims SET status = ? WHERE id = ?", (EXPIRED, claim_id))
+        if expired:
+            log.info(f"Reclaimed {len(expired)} abandoned fret claims")
+        return len(expired)
+
+    def reclaim_expired(self) -> int:
+        with self._transaction():
+            return self._expire(time.time())
+
+    # Keys held by completed claims or by other stations' live claims
+    def taken(self, keys: Iterable[str]) -> Set[str]:
+        keys = [key for key in keys if key]
+        now = time.time()
+        taken = set()
+        # Chunked to stay under SQLite's bound parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            taken.update(row[0] for row in self.conn.execute(
+                f"SELECT m.module_key FROM claimed_modules m JOIN claims c ON c.id = m.claim_id"
+                f" WHERE m.module_key IN ({placeholders})"
+                f" AND (c.status = ? OR (c.status = ? AND c.station != ? AND c.lease_expires >= ?))",
+                chunk + [DONE, CLAIMED, self.station, now]))
+        return taken
+
+    # The production rows still free for this station to plan
+    def available(self, production_data: List[ProductionData]) -> List[ProductionData]:
+        taken = self.taken(module_key(data) for data in production_data)
+        return [data for data in production_data if module_key(data) not in taken]
+
+    # Claim the modules of one fret; raises ClaimConflict if any are taken
+    def claim(self, modules: List[ProductionData], batch_id: str, pcb_type: str) -> Claim:
+        keys = [key for key in (module_key(data) for data in modules) if key]
+        now = time.time()
+        with self._transaction():
+            self._expire(now)
+            taken = self.taken(keys)
+            if taken:
+                raise ClaimConflict(f"{len(taken)} modules are claimed or engraved by another station", taken)
+
+            claim_id = self.conn.execute(
+                "INSERT INTO claims (station, batch_id, pcb_type, status, claimed_at, lease_expires)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (self.station, batch_id, pcb_type, CLAIMED, now, now + self.lease_seconds)).lastrowid
+            # This station's own unfinished claims on these modules (e.g. from before a restart) are taken over
+            self.conn.executemany(
+                "INSERT INTO claimed_modules (module_key, claim_id) VALUES (?, ?)"
+                " ON CONFLICT (module_key) DO UPDATE SET claim_id = excluded.claim_id",
+                [(key, claim_id) for key in keys])
+        return Claim(claim_id, self.station, keys, now + self.lease_seconds)
+
+    # Extend the lease of every live claim of this station
+    def renew(self) -> int:
+        now = time.time()
+        with self._transaction():
+            return self.conn.execute(
+                "UPDATE claims SET lease_expires = ? WHERE station = ? AND status = ?",
+                (now + self.lease_seconds, self.station, CLAIMED)).rowcount
+
+    # Returns False if the lease had already run out and the modules may have gone to another station
+    def complete(self, claim: Claim, file_name: Optional[str] = None) -> bool:
+        with self._transaction():
+            status = self.conn.execute("SELECT status FROM claims WHERE id = ?", (claim.id,)).fetchone()[0]
+            self.conn.execute("UPDATE claims SET status = ?, completed_at = ?, file_name = COALESCE(?, file_name)"
+                              " WHERE id = ?", (DONE, time.time(), file_name, claim.id))
+        if status != CLAIMED:
+            log.warning(f"Claim {claim.id} was {status} before it was completed; its modules may be engraved twice")
+        return status == CLAIMED
+
+    def set_file(self, claim: Claim, file_name: str):
+        with self._transaction():
+            self.conn.execute("UPDATE claims SET file_name = ? WHERE id = ?", (file_name, claim.id))
+
+    def release(self, claim: Claim):
+        with self._transaction():
+            self.conn.execute("DELETE FROM claimed_modules WHERE claim_id = ?", (claim.id,))
+            self.conn.execute("UPDATE claims SET status = ? WHERE id = ? AND status = ?",
+                              (RELEASED, claim.id, CLAIMED))
+
+    # Release every unfinished claim of this station, e.g. when the app is closed
+    def release_station(self) -> int:
+        with self._transaction():
+            claim_ids = [row[0] for row in self.conn.execute(
+                "SELECT id FROM claims WHERE station = ? AND status = ?", (self.station, CLAIMED))]
+            for claim_id in claim_ids:
+                self.conn.execute("DELETE FROM claimed_modules WHERE claim_id = ?", (claim_id,))
+                self.conn.execute("UPDATE claims SET status = ? WHERE id = ?", (RELEASED, claim_id))
+        return len(claim_ids)
+
+    # Claims of any station still waiting for completion, including abandoned ones not yet reclaimed
+    def pending(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM claims c WHERE status = ?"
+                                 " AND EXISTS (SELECT 1 FROM claimed_modules m WHERE m.claim_id = c.id)",
+                                 (CLAIMED,)).fetchone()[0]
+
+    # Module and claim counts for a batch, by claim status and station
+    def progress(self, batch_id: str, pcb_type: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        query = ("SELECT c.status, c.station, COUNT(m.module_key) AS modules, COUNT(DISTINCT c.id) AS claims"
+                 " FROM claims c LEFT JOIN claimed_modules m ON m.claim_id = c.id WHERE c.batch_id = ?"
+                 + (" AND c.pcb_type = ?" if pcb_type else "") + " GROUP BY c.status, c.station")
+        params = [batch_id] + ([pcb_type] if pcb_type else [])
+        result: Dict[str, Dict[str, int]] = {}
+        for status, station, modules, claims in self.conn.execute(query, params):
+            entry = result.setdefault(station, {})
+            entry[f"{status}_modules"] = modules
+            entry[f"{status}_claims"] = claims
+        return result
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
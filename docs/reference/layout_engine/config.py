@@ -0,0 +1,76 @@
+"""Program settings and the master PCB list (Google Sheets CSV exports).
+
+Network failures propagate as `requests.RequestException`; anything else is
+raised as `ConfigError`.
+"""
+
+import csv
+import logging
+from io import StringIO
+from typing import Any, Dict
+
+import requests
+
+from . import layout_logging, layout_metrics
+from .errors import ConfigError
+
+log = logging.getLogger(layout_logging.CONFIG)
+
+
+def _fetch_csv(url: str) -> str:
+    response = requests.get(url)
+    if response.status_code != 200:
+        raise ConfigError(f"Failed to fetch {url}: {response.status_code}")
+    return response.text
+
+
+# Parse the program settings sheet; the IR LED list becomes a list of upper-case codes
+def parse_program_settings(csv_text: str) -> Dict[str, Any]:
+    settings = {}
+    try:
+        for row in csv.DictReader(StringIO(csv_text)):
+            setting = row.get('setting', '').strip()
+            value = row.get('value', '').strip()
+
+            # Special handling for IR LED list (check both possible names)
+            if setting in ['ir_leds', 'ir_leds_list']:
+                settings['ir_leds'] = [led.strip().upper() for led in value.split(',') if led.strip()]
+            else:
+                settings[setting] = value
+    except Exception as e:
+        raise ConfigError(f"Invalid program settings: {e}") from e
+
+    log.info(f"Successfully loaded {len(settings)} program settings")
+    log.debug("Program settings: %s", settings)
+    return settings
+
+
+# Parse the PCB list into {pcb name: {'x_offset', 'y_offset'}}
+def parse_available_pcbs(csv_text: str) -> Dict[str, Dict[str, float]]:
+    pcbs = {}
+    try:
+        for row in csv.DictReader(StringIO(csv_text)):
+            pcb_name = row['pcb'].strip()
+            # Convert offset values, defaulting to 0 if empty or invalid
+            try:
+                x_offset = float(row['x_offset']) if row['x_offset'] else 0
+                y_offset = float(row['y_offset']) if row['y_offset'] else 0
+            except (ValueError, TypeError):
+                x_offset = 0
+                y_offset = 0
+            pcbs[pcb_name] = {'x_offset': x_offset, 'y_offset': y_offset}
+    except Exception as e:
+        raise ConfigError(f"Invalid PCB list: {e}") from e
+
+    log.info(f"Successfully loaded {len(pcbs)} PCBs")
+    return pcbs
+
+
+@layout_metrics.timed("config_fetch")
+def fetch_program_settings(url: str) -> Dict[str, Any]:
+    return parse_program_settings(_fetch_csv(url))
+
+
+@layout_metrics.timed("config_fetch")
+def fetch_available_pcbs(url: str) -> Dict[str, Dict[str, float]]:
+    return parse_available_pcbs(_fetch_csv(url))
@@ -0,0 +1,268 @@
+"""Engrave-time estimates for frets and batches, calibrated per laser.
+
+A fret's time is modelled as
+
+    handling + setup + (glyphs + shapes) * glyph_seconds + (stroke_mm + fill_mm) / mark_speed
+        + travel_mm / jump_speed
+
+where the work terms come from what the export writes: the glyph count, the
+marked stroke length (glyphs times text height times the average stroke
+length of a Roboto Thin digit or capital), the Micro-ID dots and QR code
+rectangles with the hatch length that fills them, and the jumps between all of
+these in the order they are engraved. Each laser has a `LaserProfile` with its
+own parameters. With the engrave time log on, the viewer logs the work of
+every engraving with the operator's handling time (loading the file into
+LightBurn to "Laser Started") and the engraving time ("Laser Started" to
+"Engraving Finished"). `calibrate` fits the engraving terms to the engraving
+times by least squares and takes the median handling time (see
+`layout_engine.calibrate` for the command line).
+"""
+
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import layout_logging, micro_id, qr
+from .errors import LayoutEngineError
+from .export_cache import fret_key
+from .micro_id import MicroIDElement
+from .models import PCBInstance
+from .qr import QRElement
+from .svg_export import TextElement, fret_elements, fret_file_stem, micro_id_elements, order_elements, qr_elements
+from .travel import travel_length
+
+log = logging.getLogger(layout_logging.EXPORT)
+
+# Average stroke length of a Roboto Thin digit or capital, in multiples of the text height
+STROKE_PER_HEIGHT = 2.6
+# Line interval of the fill that marks Micro-ID dots and QR rectangles, in mm
+HATCH_INTERVAL = 0.05
+# Fewer logged engravings than this do not pin down four parameters
+MIN_SAMPLES = 8
+# Smallest singular value of the unit-scaled work columns for a term to count as resolvable; logged
+# lengths are rounded to 0.01 mm, which alone leaves collinear columns some 1e-5 apart
+RANK_TOLERANCE = 1e-3
+
+
+class CalibrationError(LayoutEngineError):
+    pass
+
+
+@dataclass
+class FretWork:
+    glyphs: int
+    stroke_mm: float
+    travel_mm: float
+    shapes: int = 0  # Micro-ID dots and QR code rectangles, each started and stopped like a glyph
+    fill_mm: float = 0.0  # hatch lines filling those shapes
+
+
+# A logged engraving: its work, the engraving time and the operator's handling time before it (None in
+# entries logged before the two were timed apart, whose engraving time includes the handling)
+Sample = Tuple[FretWork, float, Optional[float]]
+
+
+@dataclass
+class LaserProfile:
+    name: str = "default"
+    setup_seconds: float = 5.0  # starting the job (and, until calibrated, the handling before it)
+    glyph_seconds: float = 0.02  # laser on/off and corner delays per glyph
+    mark_speed: float = 300.0  # mm/s while marking
+    jump_speed: float = 3000.0  # mm/s between texts
+    samples: int = 0  # logged engravings the profile was calibrated from
+    handling_seconds: float = 0.0  # loading the file and framing until the operator starts the job
+
+    # From loading the file to the end of the engraving
+    def estimate(self, work: FretWork) -> float:
+        return self.handling_seconds + self.engrave_seconds(work)
+
+    # From starting the job to its end
+    def engrave_seconds(self, work: FretWork) -> float:
+        return (self.setup_seconds + (work.glyphs + work.shapes) * self.glyph_seconds
+                + (work.stroke_mm + work.fill_mm) / self.mark_speed + work.travel_mm / self.jump_speed)
+
+
+# Work of engraving the texts `elements` in the given order, then the Micro-IDs and QR codes as the
+# export writes them after the texts
+def fret_work(elements: List[TextElement], micro_ids: Sequence[MicroIDElement] = (),
+              qr_codes: Sequence[QRElement] = ()) -> FretWork:
+    glyphs = sum(len(text) for text, _, _, _, _ in elements)
+    stroke = sum(len(text) * height * STROKE_PER_HEIGHT for text, _, _, _, height in elements)
+    shapes, fill_area = 0, 0.0
+    if micro_ids:
+        # Every set cell is a dot, plus the orientation dot
+        dots = int(micro_id.encode([serial for serial, _, _ in micro_ids]).sum()) + len(micro_ids)
+        shapes += dots
+        fill_area += dots * math.pi * (micro_id.DOT_DIAMETER / 2) ** 2
+    for payload, _, _, size in qr_codes:
+        modules = qr.matrix(payload)
+        shapes += len(qr.rectangles(modules))
+        fill_area += int(modules.sum()) * (size / len(modules)) ** 2
+    points = np.array([(x, y) for _, x, y, _, _ in elements] + [(x, y) for _, x, y in micro_ids]
+                      + [(x, y) for _, x, y, _ in qr_codes], dtype=float).reshape(-1, 2)
+    return FretWork(glyphs, round(stroke, 2), round(travel_length(points, range(len(points))), 2), shapes,
+                    round(fill_area / HATCH_INTERVAL, 2))
+
+
+class EngraveEstimator:
+    """Per-fret estimates for one laser, cached by fret content so the viewer can refresh them freely.
+
+    `micro_ids`, `module_qr` and `fret_qr` are the render_svg options of the exported files, so their codes
+    are counted as work.
+    """
+
+    def __init__(self, profile: LaserProfile, optimize_travel: bool = False, max_entries: int = 512,
+                 micro_ids: bool = False, module_qr: Optional[str] = None, fret_qr: Optional[str] = None):
+        self.profile = profile
+        self.optimize_travel = optimize_travel
+        self.max_entries = max_entries
+        self.micro_ids = micro_ids
+        self.module_qr = module_qr
+        self.fret_qr = fret_qr
+        self._works: 'OrderedDict[str, FretWork]' = OrderedDict()
+
+    # Work of the whole fret, or of only some modules (see fret_elements); `file_name` is the name a
+    # fret QR code carries
+    def work(self, layout: Dict[str, Any], instance: PCBInstance,
+             slots: Optional[Collection[int]] = None, file_name: str = "") -> FretWork:
+        options: Dict[str, Any] = {'optimize_travel': self.optimize_travel, 'micro_ids': self.micro_ids,
+                                   'module_qr': self.module_qr, 'fret_qr': self.fret_qr}
+        if slots is not None:
+            options['slots'] = sorted(slots)
+        key = fret_key(layout, instance, file_name, **options)
+        work = self._works.get(key)
+        if work is None:
+            elements = fret_elements(layout, instance, slots)
+            if self.optimize_travel:
+                elements = order_elements(elements)[0]
+            micro_ids = micro_id_elements(layout, instance, slots) if self.micro_ids else []
+            qr_codes = qr_elements(layout, instance, fret_file_stem(file_name), self.module_qr, self.fret_qr,
+                                   slots) if self.module_qr or self.fret_qr else []
+            work = self._works[key] = fret_work(elements, micro_ids, qr_codes)
+            while len(self._works) > self.max_entries:
+                self._works.popitem(last=False)
+        else:
+            self._works.move_to_end(key)
+        return work
+
+    def fret_seconds(self, layout: Dict[str, Any], instance: PCBInstance) -> float:
+        if not instance.data:
+            return 0.0
+        return self.profile.estimate(self.work(layout, instance))
+
+    def batch_seconds(self, layout: Dict[str, Any], instances: List[PCBInstance]) -> float:
+        return sum(self.fret_seconds(layout, instance) for instance in instances)
+
+
+# "45 s", "3 min 20 s", "1 h 05 min"
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds} s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} min {seconds:02d} s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} h {minutes:02d} min"
+
+
+def load_profiles(path: str) -> Dict[str, LaserProfile]:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    names = {field.name for field in fields(LaserProfile)}
+    return {name: LaserProfile(**{key: value for key, value in entry.items() if key in names})
+            for name, entry in entries.items()}
+
+
+def save_profiles(path: str, profiles: Dict[str, LaserProfile]):
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({name: asdict(profile) for name, profile in sorted(profiles.items())}, f, indent=2)
+    os.replace(temp_path, path)
+
+
+# Append one engraving to the log that `calibrate` learns from: `seconds` from starting the job to its
+# end, `handling_seconds` from loading the file to starting the job
+def log_engraving(path: str, laser: str, file_name: str, work: FretWork, seconds: float,
+                  handling_seconds: Optional[float] = None):
+    entry = {'time': time.time(), 'laser': laser, 'file': file_name, **asdict(work), 'seconds': round(seconds, 2)}
+    if handling_seconds is not None:
+        entry['handling_seconds'] = round(handling_seconds, 2)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+
+
+# Logged engravings, per laser
+def read_samples(path: str) -> Dict[str, List[Sample]]:
+    samples: Dict[str, List[Sample]] = {}
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, start=1):
+            try:
+                entry = json.loads(line)
+                work = FretWork(entry['glyphs'], entry['stroke_mm'], entry['travel_mm'], entry.get('shapes', 0),
+                                entry.get('fill_mm', 0.0))
+                handling = entry.get('handling_seconds')
+                samples.setdefault(entry['laser'], []).append(
+                    (work, float(entry['seconds']), None if handling is None else float(handling)))
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                log.warning(f"Ignoring unreadable line {number} of {path}")
+    return samples
+
+
+# Columns of the work matrix: the setup constant, per-shape, marked length and jump length
+def _features(work: FretWork) -> List[float]:
+    return [1.0, work.glyphs + work.shapes, work.stroke_mm + work.fill_mm, work.travel_mm]
+
+
+# Terms the data can resolve: a term whose column the others (nearly) reproduce cannot be told apart
+# from them, e.g. the marked length when every fret uses one text height and it is a multiple of the
+# glyph count. Terms are taken in order of preference; mark speed comes last as it is a known setting.
+def _resolvable(features: np.ndarray) -> np.ndarray:
+    columns = features / np.maximum(np.linalg.norm(features, axis=0), 1e-12)
+    free = np.zeros(features.shape[1], dtype=bool)
+    for term in (0, 1, 3, 2):
+        free[term] = True
+        if np.linalg.matrix_rank(columns[:, free], tol=RANK_TOLERANCE) < free.sum():
+            free[term] = False
+    return free
+
+
+# Fit a laser's parameters to logged engravings. Terms the data cannot resolve (collinear with the
+# others, or fitted negative, e.g. when every fret had the same glyph count) keep their value from `prior`.
+# The handling time is the median logged one, robust to the odd break between loading and starting.
+def calibrate(samples: List[Sample], name: str, prior: Optional[LaserProfile] = None) -> LaserProfile:
+    if len(samples) < MIN_SAMPLES:
+        raise CalibrationError(f"{name}: {len(samples)} logged engravings, at least {MIN_SAMPLES} needed")
+    prior = prior or LaserProfile(name)
+    features = np.array([_features(work) for work, _, _ in samples])
+    seconds = np.array([actual for _, actual, _ in samples])
+    coefficients = np.array([prior.setup_seconds, prior.glyph_seconds, 1 / prior.mark_speed, 1 / prior.jump_speed])
+    handling = [value for _, _, value in samples if value is not None]
+
+    free = _resolvable(features)
+    while free.any():
+        fixed = features[:, ~free] @ coefficients[~free]
+        fit = np.linalg.lstsq(features[:, free], seconds - fixed, rcond=None)[0]
+        if (fit > 0).all():
+            coefficients[free] = fit
+            break
+        # Hold the worst term at its prior value and fit the rest again
+        free[np.flatnonzero(free)[fit.argmin()]] = False
+
+    return LaserProfile(name, round(float(coefficients[0]), 3), round(float(coefficients[1]), 4),
+                        round(1 / float(coefficients[2]), 1), round(1 / float(coefficients[3]), 1), len(samples),
+                        round(float(np.median(handling)), 2) if handling else prior.handling_seconds)
+
+
+# Mean absolute error of a profile's engraving times over logged engravings, in seconds
+def mean_error(profile: LaserProfile, samples: List[Sample]) -> float:
+    return float(np.mean([abs(profile.engrave_seconds(work) - actual) for work, actual, _ in samples]))
@@ -0,0 +1,25 @@
+"""Exceptions raised by the layout engine; callers decide how to report them."""
+
+
+class LayoutEngineError(Exception):
+    pass
+
+
+class ConfigError(LayoutEngineError):
+    pass
+
+
+class ProductionDataError(LayoutEngineError):
+    pass
+
+
+class LayoutError(LayoutEngineError):
+    pass
+
+
+class ClaimConflict(LayoutEngineError):
+    """Some modules of a fret are claimed or already engraved by another station."""
+
+    def __init__(self, message, taken):
+        super().__init__(message)
+        self.taken = taken
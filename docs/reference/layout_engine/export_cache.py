@@ -0,0 +1,232 @@
+"""Content-addressed cache of exported fret SVGs.
+
+A fret's SVG depends only on the compiled layout (module text positions and
+the center point), the PCB offsets and, slot by slot, the LED codes, lens and
+connector codes and whether the slot is faulty; with Micro-IDs also on their
+positions and the modules' serial numbers, and with QR codes also on their
+payloads, positions and sizes (a fret's own code can carry the file's name),
+and with outline glyphs also on the glyph library's content. Those are hashed
+into a key; the first export of a key renders the file and keeps a copy in the
+cache directory, later exports of the same key copy the cached file into place
+instead of rendering it again. Copies rather than hard links keep an exported
+file edited afterwards (e.g. in LightBurn) from changing the cache. `stage` renders a fret into the cache ahead of its export (see
+prefetch.py).
+
+Entries are evicted oldest-used first once the cache is over `max_bytes`, and
+when they have not been used for `max_age` seconds. Hit and miss counts are
+kept on the cache and, when metrics are enabled, recorded as the `export_cache`
+stage labelled `result="hit"` or `result="miss"`.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import layout_logging, layout_metrics
+from .models import PCBInstance
+from .svg_export import fret_file_stem, qr_elements, render_svg, write_svg
+
+log = logging.getLogger(layout_logging.EXPORT)
+
+# Change when render_svg output changes, so files rendered by older code are not reused
+RENDER_VERSION = 1
+
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+# Render options naming a file the output is drawn from, so the file's content is part of the key
+FILE_OPTIONS = ('outline_glyphs',)
+
+_digests: Dict[Tuple[str, float, int], str] = {}
+_digests_lock = threading.Lock()
+
+
+# SHA-256 of a file, hashed again only when its mtime or size changes; None if it cannot be read
+def _file_digest(path: str) -> Optional[str]:
+    try:
+        stat = os.stat(path)
+        signature = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+        with _digests_lock:
+            if signature in _digests:
+                return _digests[signature]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+    with _digests_lock:
+        _digests[signature] = digest
+    return digest
+
+
+def _layout_fields(layout: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'center': [layout['CenterPoint']['x'], layout['CenterPoint']['y']],
+        'offsets': [layout.get('x_offset', 0), layout.get('y_offset', 0)],
+        'modules': [[module['led_positions'], module['connector_position'], module['lens_position']]
+                    for module in layout['Modules']],
+    }
+
+
+# Slot by slot: ("F",) for a faulty slot, the module's codes, or None for an empty slot
+def _slot_fields(layout: Dict[str, Any], instance: PCBInstance) -> List[Optional[Tuple]]:
+    slots: List[Optional[Tuple]] = []
+    data_index = 0
+    for i in range(len(layout['Modules'])):
+        if instance.faulty_modules[i]:
+            slots.append(("F",))
+        elif data_index < len(instance.data):
+            data = instance.data[data_index]
+            slots.append((data.led_codes, data.lens_code, data.connector_code))
+            data_index += 1
+        else:
+            slots.append(None)
+    return slots
+
+
+# Content key of a fret's SVG; `options` are any render options that change the output. `file_name` is
+# the exported file's name, which a fret_qr template can put in the file.
+def fret_key(layout: Dict[str, Any], instance: PCBInstance, file_name: str = "", **options: Any) -> str:
+    content = {
+        'version': RENDER_VERSION,
+        'layout': _layout_fields(layout),
+        'slots': _slot_fields(layout, instance),
+        'options': options,
+    }
+    if options.get('micro_ids'):
+        # Micro-IDs add the ID positions and each module's serial number to the output
+        content['micro_ids'] = {'positions': [module.get('micro_id_position') for module in layout['Modules']],
+                                'serials': [data.serial for data in instance.data]}
+    files = {option: _file_digest(options[option]) for option in FILE_OPTIONS if options.get(option)}
+    if files:
+        content['files'] = files
+    if options.get('module_qr') or options.get('fret_qr'):
+        content['qr'] = qr_elements(layout, instance, fret_file_stem(file_name), options.get('module_qr'),
+                                    options.get('fret_qr'))
+    # Layout values can be NumPy scalars; str() keeps them stable without importing NumPy
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+# Copy `source` to `destination`, replacing any existing file in one step
+def _place(source: str, destination: str):
+    directory = os.path.dirname(os.path.abspath(destination))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(source, temp_path)
+        os.replace(temp_path, destination)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class ExportCache:
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES, max_age: float = DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.svg")
+
+    # Write the fret's SVG to `file_path`, from the cache if possible; returns True on a hit
+    def export(self, layout: Dict[str, Any], instance: PCBInstance, file_path: str, **options: Any) -> bool:
+        start = time.perf_counter()
+        key = fret_key(layout, instance, os.path.basename(file_path), **options)
+        cached = self.path_for(key)
+        hit = os.path.isfile(cached)
+        if hit:
+            _place(cached, file_path)
+            # The cache file's mtime records its last use for eviction
+            os.utime(cached)
+        else:
+            write_svg(render_svg(layout, instance, file_path, **options))
+            try:
+                os.makedirs(os.path.dirname(cached), exist_ok=True)
+                _place(file_path, cached)
+            except OSError as e:
+                log.warning(f"Could not add {os.path.basename(file_path)} to the export cache: {e}")
+
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        layout_metrics.observe("export_cache", time.perf_counter() - start, result="hit" if hit else "miss")
+        return hit
+
+    # Render a fret into the cache without exporting it, as export() would under `file_name`; returns its key
+    # and whether it was rendered (False when the cache already held it)
+    def stage(self, layout: Dict[str, Any], instance: PCBInstance, file_name: str, **options: Any) -> Tuple[str, bool]:
+        key = fret_key(layout, instance, file_name, **options)
+        cached = self.path_for(key)
+        if os.path.isfile(cached):
+            return key, False
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        # Rendered under its export name, which a fret QR code can carry
+        temp_dir = tempfile.mkdtemp(dir=os.path.dirname(cached))
+        try:
+            file_path = os.path.join(temp_dir, file_name)
+            write_svg(render_svg(layout, instance, file_path, **options))
+            _place(file_path, cached)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return key, True
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".svg"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    # Remove entries unused for max_age, then the least recently used until under max_bytes
+    def evict(self) -> int:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.max_age
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self.evictions += removed
+        if removed:
+            log.info(f"Evicted {removed} files from the export cache, {total // 1024} KiB left")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries),
+            }
@@ -0,0 +1,341 @@
+"""Glyph outline library for exporting text as vector paths.
+
+LightBurn has to find "Roboto Thin" and lay the text out every time it imports
+an exported file, and the engraved size depends on `CHAR_HEIGHT_RATIO` and on
+the hair spaces between characters. With a glyph library the exporter writes
+each code as one `<path>` instead: the library holds, per character, the
+outline (in em units, y down, on the baseline) and the advance width, read
+once from the font file. The engraved cap height is then exactly the layout's
+text height, and the output no longer depends on the fonts installed.
+
+The library is built from a TrueType font with the reader below, so neither
+the app nor the build needs a font package (see `layout_engine.build_glyphs`).
+"""
+
+import json
+import logging
+import os
+import string
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import layout_logging
+from .errors import LayoutEngineError
+
+log = logging.getLogger(layout_logging.EXPORT)
+
+DEFAULT_CHARACTERS = string.digits + string.ascii_uppercase + string.ascii_lowercase + "-./+#"
+HAIR_SPACE = chr(8202)
+PRECISION = 5  # decimals of an em kept in the library, well under a micron at engraving sizes
+
+# One outline command: ["M", x, y], ["L", x, y], ["Q", cx, cy, x, y] or ["Z"]
+Command = List[Any]
+
+
+class GlyphError(LayoutEngineError):
+    pass
+
+
+class TrueTypeFont:
+    """Just enough of a TrueType (glyf) font to read outlines, advances and the cap height."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        self.name = os.path.basename(path)
+        try:
+            num_tables = struct.unpack_from('>H', self.data, 4)[0]
+            self.tables = {}
+            for i in range(num_tables):
+                tag, _, offset, length = struct.unpack_from('>4sIII', self.data, 12 + 16 * i)
+                self.tables[tag.decode('latin-1')] = (offset, length)
+            if 'glyf' not in self.tables:
+                raise GlyphError(f"{self.name} has no TrueType outlines (CFF fonts are not supported)")
+            head = self.tables['head'][0]
+            self.units_per_em = struct.unpack_from('>H', self.data, head + 18)[0]
+            long_offsets = struct.unpack_from('>h', self.data, head + 50)[0] == 1
+            self.num_glyphs = struct.unpack_from('>H', self.data, self.tables['maxp'][0] + 4)[0]
+            self._read_loca(long_offsets)
+            self._read_hmtx()
+            self.cmap = self._read_cmap()
+        except (KeyError, struct.error) as e:
+            raise GlyphError(f"Cannot read font {self.name}: {e}") from e
+
+    def _read_loca(self, long_offsets: bool):
+        offset = self.tables['loca'][0]
+        count = self.num_glyphs + 1
+        if long_offsets:
+            self.loca = list(struct.unpack_from(f'>{count}I', self.data, offset))
+        else:
+            self.loca = [value * 2 for value in struct.unpack_from(f'>{count}H', self.data, offset)]
+
+    def _read_hmtx(self):
+        metrics = struct.unpack_from('>H', self.data, self.tables['hhea'][0] + 34)[0]
+        offset = self.tables['hmtx'][0]
+        self.advances = [struct.unpack_from('>H', self.data, offset + 4 * i)[0] for i in range(metrics)]
+
+    def advance(self, glyph: int) -> int:
+        return self.advances[min(glyph, len(self.advances) - 1)]
+
+    # Unicode code point -> glyph index, from a format 4 or 12 Windows Unicode subtable
+    def _read_cmap(self) -> Dict[int, int]:
+        cmap = self.tables['cmap'][0]
+        count = struct.unpack_from('>H', self.data, cmap + 2)[0]
+        subtables = {}
+        for i in range(count):
+            platform, encoding, offset = struct.unpack_from('>HHI', self.data, cmap + 4 + 8 * i)
+            subtables[(platform, encoding)] = cmap + offset
+        for key in ((3, 10), (0, 4), (3, 1), (0, 3)):
+            if key in subtables:
+                offset = subtables[key]
+                table_format = struct.unpack_from('>H', self.data, offset)[0]
+                if table_format == 4:
+                    return self._cmap_format4(offset)
+                if table_format == 12:
+                    return self._cmap_format12(offset)
+        raise GlyphError(f"{self.name} has no Unicode character map")
+
+    def _cmap_format4(self, offset: int) -> Dict[int, int]:
+        segments = struct.unpack_from('>H', self.data, offset + 6)[0] // 2
+        ends = struct.unpack_from(f'>{segments}H', self.data, offset + 14)
+        starts_at = offset + 16 + 2 * segments
+        starts = struct.unpack_from(f'>{segments}H', self.data, starts_at)
+        deltas = struct.unpack_from(f'>{segments}h', self.data, starts_at + 2 * segments)
+        ranges_at = starts_at + 4 * segments
+        ranges = struct.unpack_from(f'>{segments}H', self.data, ranges_at)
+        mapping = {}
+        for i in range(segments):
+            for code in range(starts[i], ends[i] + 1):
+                if code == 0xFFFF:
+                    continue
+                if ranges[i] == 0:
+                    glyph = (code + deltas[i]) & 0xFFFF
+                else:
+                    address = ranges_at + 2 * i + ranges[i] + 2 * (code - starts[i])
+                    glyph = struct.unpack_from('>H', self.data, address)[0]
+                    if glyph:
+                        glyph = (glyph + deltas[i]) & 0xFFFF
+                if glyph:
+                    mapping[code] = glyph
+        return mapping
+
+    def _cmap_format12(self, offset: int) -> Dict[int, int]:
+        groups = struct.unpack_from('>I', self.data, offset + 12)[0]
+        mapping = {}
+        for i in range(groups):
+            start, end, glyph = struct.unpack_from('>III', self.data, offset + 16 + 12 * i)
+            for code in range(start, end + 1):
+                mapping[code] = glyph + code - start
+        return mapping
+
+    # Contours of a glyph as lists of (x, y, on_curve) in font units, components resolved
+    def contours(self, glyph: int, depth: int = 0) -> List[List[Tuple[float, float, bool]]]:
+        start, end = self.loca[glyph], self.loca[glyph + 1]
+        if start == end:
+            return []  # a space
+        offset = self.tables['glyf'][0] + start
+        num_contours = struct.unpack_from('>h', self.data, offset)[0]
+        if num_contours >= 0:
+            return self._simple_contours(offset, num_contours)
+        if depth > 8:
+            raise GlyphError(f"Glyph {glyph} of {self.name} nests components too deeply")
+        return self._composite_contours(offset, depth)
+
+    def _simple_contours(self, offset: int, num_contours: int) -> List[List[Tuple[float, float, bool]]]:
+        position = offset + 10
+        ends = struct.unpack_from(f'>{num_contours}H', self.data, position)
+        position += 2 * num_contours
+        instructions = struct.unpack_from('>H', self.data, position)[0]
+        position += 2 + instructions
+        count = ends[-1] + 1 if ends else 0
+
+        flags = []
+        while len(flags) < count:
+            flag = self.data[position]
+            position += 1
+            flags.append(flag)
+            if flag & 8:
+                flags.extend([flag] * self.data[position])
+                position += 1
+
+        def coordinates(short_bit, same_bit):
+            nonlocal position
+            values, value = [], 0
+            for flag in flags:
+                if flag & short_bit:
+                    delta = self.data[position]
+                    position += 1
+                    value += delta if flag & same_bit else -delta
+                elif not flag & same_bit:
+                    value += struct.unpack_from('>h', self.data, position)[0]
+                    position += 2
+                values.append(value)
+            return values
+
+        xs = coordinates(2, 16)
+        ys = coordinates(4, 32)
+        contours, first = [], 0
+        for last in ends:
+            contours.append([(xs[i], ys[i], bool(flags[i] & 1)) for i in range(first, last + 1)])
+            first = last + 1
+        return contours
+
+    def _composite_contours(self, offset: int, depth: int) -> List[List[Tuple[float, float, bool]]]:
+        position = offset + 10
+        contours = []
+        while True:
+            flags, component = struct.unpack_from('>HH', self.data, position)
+            position += 4
+            if flags & 1:
+                dx, dy = struct.unpack_from('>hh', self.data, position)
+                position += 4
+            else:
+                dx, dy = struct.unpack_from('>bb', self.data, position)
+                position += 2
+            if not flags & 2:
+                dx = dy = 0  # point-matched components do not occur in the characters we export
+            xx, xy, yx, yy = 1.0, 0.0, 0.0, 1.0
+            if flags & 8:
+                xx = yy = struct.unpack_from('>h', self.data, position)[0] / 16384
+                position += 2
+            elif flags & 0x40:
+                xx, yy = (value / 16384 for value in struct.unpack_from('>hh', self.data, position))
+                position += 4
+            elif flags & 0x80:
+                xx, xy, yx, yy = (value / 16384 for value in struct.unpack_from('>hhhh', self.data, position))
+                position += 8
+            for contour in self.contours(component, depth + 1):
+                contours.append([(x * xx + y * yx + dx, x * xy + y * yy + dy, on) for x, y, on in contour])
+            if not flags & 0x20:
+                return contours
+
+    def cap_height(self) -> int:
+        if 'OS/2' in self.tables:
+            offset, length = self.tables['OS/2']
+            if length >= 90 and struct.unpack_from('>H', self.data, offset)[0] >= 2:
+                return struct.unpack_from('>h', self.data, offset + 88)[0]
+        # Older fonts: the top of "H"
+        return max(y for contour in self.contours(self.cmap[ord('H')]) for _, y, _ in contour)
+
+
+# TrueType contours to M/L/Q/Z commands in em units, y flipped to SVG's downward axis
+def _outline(contours: List[List[Tuple[float, float, bool]]], units: int) -> List[Command]:
+    def point(x, y):
+        return [round(x / units, PRECISION), round(-y / units, PRECISION)]
+
+    commands: List[Command] = []
+    for contour in contours:
+        if not contour:
+            continue
+        # Start on an on-curve point, or between two off-curve points if there is none
+        start = next((i for i, (_, _, on) in enumerate(contour) if on), None)
+        if start is None:
+            (x0, y0, _), (x1, y1, _) = contour[0], contour[1]
+            points = [((x0 + x1) / 2, (y0 + y1) / 2, True)] + contour[1:] + contour[:1]
+        else:
+            points = contour[start:] + contour[:start]
+        commands.append(['M'] + point(*points[0][:2]))
+        control = None
+        for x, y, on in points[1:] + points[:1]:
+            if on:
+                commands.append(['Q'] + point(*control) + point(x, y) if control else ['L'] + point(x, y))
+                control = None
+            elif control:
+                # Two off-curve points in a row imply an on-curve point between them
+                middle = ((control[0] + x) / 2, (control[1] + y) / 2)
+                commands.append(['Q'] + point(*control) + point(*middle))
+                control = (x, y)
+            else:
+                control = (x, y)
+        if control:
+            commands.append(['Q'] + point(*control) + point(*points[0][:2]))
+        commands.append(['Z'])
+    return commands
+
+
+# Read the outlines of `characters` from a TrueType font into a library dictionary
+def build_library(font_path: str, characters: str = DEFAULT_CHARACTERS) -> Dict[str, Any]:
+    font = TrueTypeFont(font_path)
+    units = font.units_per_em
+    glyphs = {}
+    for character in dict.fromkeys(characters + HAIR_SPACE):
+        glyph = font.cmap.get(ord(character))
+        if glyph is None:
+            if character != HAIR_SPACE:
+                log.warning(f"{font.name} has no glyph for {character!r}")
+            continue
+        glyphs[character] = {'advance': round(font.advance(glyph) / units, PRECISION),
+                             'outline': _outline(font.contours(glyph), units)}
+    return {'font': font.name, 'cap_height': round(font.cap_height() / units, PRECISION), 'glyphs': glyphs}
+
+
+def _number(value: float) -> str:
+    text = f"{value:.4f}".rstrip('0').rstrip('.')
+    return "0" if text in ("", "-0") else text
+
+
+class GlyphLibrary:
+    """Glyph outlines of one font, with the centred path of every code built once."""
+
+    def __init__(self, library: Dict[str, Any]):
+        self.font = library['font']
+        self.cap_height = library['cap_height']
+        self.glyphs = library['glyphs']
+        # The <text> export puts a hair space between characters; keep the same spacing
+        self.spacing = self.glyphs.get(HAIR_SPACE, {}).get('advance', 1 / 24)
+        self._paths: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    # Outline commands of `text` in em units, centred on x = 0 with the baseline at y = 0; None if a
+    # character is missing from the library
+    def commands(self, text: str) -> Optional[List[Command]]:
+        if any(character not in self.glyphs for character in text):
+            return None
+        width = sum(self.glyphs[character]['advance'] for character in text) + self.spacing * (len(text) - 1)
+        x, commands = -width / 2, []
+        for character in text:
+            for command in self.glyphs[character]['outline']:
+                commands.append([command[0]] + [value + (x if i % 2 == 0 else 0)
+                                                for i, value in enumerate(command[1:])])
+            x += self.glyphs[character]['advance'] + self.spacing
+        return commands
+
+    # Path data of `text`, as `commands`; None if a character is missing from the library
+    def path(self, text: str) -> Optional[str]:
+        with self._lock:
+            if text in self._paths:
+                return self._paths[text]
+        commands = self.commands(text)
+        if commands is None:
+            log.warning(f"{self.font} glyph library lacks a character of {text!r}; writing it as text")
+            path = None
+        else:
+            path = "".join(command[0] + " ".join(_number(value) for value in command[1:]) for command in commands)
+        with self._lock:
+            self._paths[text] = path
+        return path
+
+
+_libraries: Dict[str, Tuple[float, GlyphLibrary]] = {}
+_libraries_lock = threading.Lock()
+
+
+# The glyph library at `path`, read once and again only when the file changes
+def load_glyph_library(path: str) -> GlyphLibrary:
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError as e:
+        raise GlyphError(f"Glyph library {path} not found") from e
+    with _libraries_lock:
+        cached = _libraries.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    try:
+        with open(path, encoding='utf-8') as f:
+            library = GlyphLibrary(json.load(f))
+    except (ValueError, KeyError) as e:
+        raise GlyphError(f"Invalid glyph library {path}: {e}") from e
+    with _libraries_lock:
+        _libraries[path] = (mtime, library)
+    return library
@@ -0,0 +1,270 @@
+"""Durable engraving jobs: an append-only journal of plan, export and engrave events.
+
+A Batch Export becomes a job whose frets each move through
+
+    planned -> exported -> loaded -> engraved
+
+(or to `skipped` when the operator abandons the job). Every transition is
+appended to `jobs.jsonl` as one JSON line. Lines are flushed as they are
+written and fsync'd in groups: immediately for events that must not be lost
+(an engraved fret, the end of a plan), otherwise once `sync_every` events or
+`sync_seconds` have accumulated. After a crash the journal is replayed, a
+truncated last line is ignored, and unfinished jobs can be resumed: frets whose
+file is still on disk are not exported again, and engraved frets are skipped.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import layout_logging, layout_metrics
+from .errors import LayoutEngineError
+from .models import PCBInstance, ProductionData
+
+log = logging.getLogger(layout_logging.EXPORT)
+
+JOURNAL_NAME = "jobs.jsonl"
+
+PLANNED = "planned"
+EXPORTED = "exported"
+LOADED = "loaded"
+ENGRAVED = "engraved"
+SKIPPED = "skipped"
+
+# Allowed fret state changes; a fret can be exported again (a resumed job whose file was lost)
+# and loaded again (LightBurn was restarted before the operator confirmed)
+TRANSITIONS = {
+    PLANNED: {EXPORTED, SKIPPED},
+    EXPORTED: {EXPORTED, LOADED, SKIPPED},
+    LOADED: {EXPORTED, LOADED, ENGRAVED, SKIPPED},
+    ENGRAVED: set(),
+    SKIPPED: set(),
+}
+FINAL_STATES = {ENGRAVED, SKIPPED}
+
+
+class JobStateError(LayoutEngineError):
+    pass
+
+
+@dataclass
+class FretJob:
+    index: int
+    file_name: str
+    modules: List[Dict[str, Any]]
+    faulty_modules: List[bool]
+    state: str = PLANNED
+    file_path: Optional[str] = None
+    file_size: Optional[int] = None
+
+    # The fret as the viewer had it when the job was planned
+    def instance(self, rows: int, columns: int) -> PCBInstance:
+        instance = PCBInstance(len(self.faulty_modules), rows, columns)
+        instance.data = [ProductionData(**module) for module in self.modules]
+        instance.faulty_modules = list(self.faulty_modules)
+        return instance
+
+    # The exported file is still there and the size recorded at export
+    def file_intact(self) -> bool:
+        return bool(self.file_path) and os.path.isfile(self.file_path) and \
+            (self.file_size is None or os.path.getsize(self.file_path) == self.file_size)
+
+
+@dataclass
+class Job:
+    job_id: str
+    pcb_type: str
+    batch_id: str
+    rows: int
+    columns: int
+    created: float
+    frets: List[FretJob] = field(default_factory=list)
+
+    @property
+    def finished(self) -> bool:
+        return all(fret.state in FINAL_STATES for fret in self.frets)
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for fret in self.frets:
+            counts[fret.state] = counts.get(fret.state, 0) + 1
+        return counts
+
+
+class Journal:
+    """Append-only JSON lines file with grouped fsyncs."""
+
+    def __init__(self, path: str, sync_every: int = 32, sync_seconds: float = 0.5):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_seconds = sync_seconds
+        self._file = open(path, 'a', encoding='utf-8')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, event: Dict[str, Any], sync: bool = False):
+        self._file.write(json.dumps(event, separators=(',', ':')) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if sync or self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_seconds:
+            self.sync()
+
+    def sync(self):
+        if self._unsynced:
+            with layout_metrics.span("journal_fsync"):
+                os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+
+# Read the events of a journal, ignoring a last line cut short by a crash
+def read_events(path: str) -> List[Dict[str, Any]]:
+    events = []
+    if not os.path.exists(path):
+        return events
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, start=1):
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                log.warning(f"Ignoring unreadable line {number} of {path}")
+    return events
+
+
+class JobQueue:
+    def __init__(self, directory: str, sync_every: int = 32, sync_seconds: float = 0.5):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, JOURNAL_NAME)
+        self.jobs: Dict[str, Job] = {}
+        self._replay()
+        self._compact()
+        self.journal = Journal(self.path, sync_every, sync_seconds)
+
+    def close(self):
+        self.journal.close()
+
+    @layout_metrics.timed("journal_replay")
+    def _replay(self):
+        for event in read_events(self.path):
+            kind = event.get('event')
+            if kind == 'job':
+                self.jobs[event['job']] = Job(event['job'], event['pcb_type'], event['batch_id'], event['rows'],
+                                              event['columns'], event['created'])
+            elif kind == 'plan' and event['job'] in self.jobs:
+                self.jobs[event['job']].frets.append(FretJob(event['fret'], event['file'], event['modules'],
+                                                             event['faulty']))
+            elif kind == 'state' and event['job'] in self.jobs:
+                fret = self.jobs[event['job']].frets[event['fret']]
+                fret.state = event['state']
+                if 'modules' in event:
+                    fret.modules = event['modules']
+                    fret.faulty_modules = event['faulty']
+                if 'path' in event:
+                    fret.file_path = event['path']
+                    fret.file_size = event.get('size')
+
+    # Rewrite the journal with only the unfinished jobs so it does not grow over the weeks, and
+    # whenever a crash cut its last line short, so the next event does not land on that line
+    def _compact(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        if not finished and _ends_cleanly(self.path) and os.path.getsize(self.path) < 1024 * 1024:
+            return
+        for job_id in finished:
+            del self.jobs[job_id]
+        temp_path = self.path + ".tmp"
+        journal = Journal(temp_path, sync_every=1 << 30)
+        for job in self.jobs.values():
+            for event in _job_events(job):
+                journal.append(event)
+        journal.close()
+        os.replace(temp_path, self.path)
+
+    # Journal a new job with its frets in the planned state; returns the job
+    def plan(self, pcb_type: str, batch_id: str, rows: int, columns: int,
+             frets: List[Tuple[str, PCBInstance]]) -> Job:
+        job = Job(uuid.uuid4().hex[:12], pcb_type, batch_id, rows, columns, time.time())
+        for index, (file_name, instance) in enumerate(frets):
+            job.frets.append(FretJob(index, file_name, [asdict(data) for data in instance.data],
+                                     list(instance.faulty_modules)))
+        events = _job_events(job)
+        for event in events[:-1]:
+            self.journal.append(event)
+        self.journal.append(events[-1], sync=True)
+        self.jobs[job.job_id] = job
+        return job
+
+    # Move a fret to its next state. An export records the file, and the fret's modules if they
+    # changed since planning (e.g. modules another station had taken were dropped).
+    def advance(self, job: Job, fret: FretJob, state: str, file_path: Optional[str] = None,
+                instance: Optional[PCBInstance] = None):
+        if state not in TRANSITIONS[fret.state]:
+            raise JobStateError(f"Fret {fret.index} of job {job.job_id} cannot go from {fret.state} to {state}")
+        event: Dict[str, Any] = {'event': 'state', 'job': job.job_id, 'fret': fret.index, 'state': state,
+                                 'time': time.time()}
+        if instance is not None:
+            modules = [asdict(data) for data in instance.data]
+            if modules != fret.modules or instance.faulty_modules != fret.faulty_modules:
+                fret.modules = event['modules'] = modules
+                fret.faulty_modules = event['faulty'] = list(instance.faulty_modules)
+        if file_path:
+            fret.file_path = file_path
+            fret.file_size = os.path.getsize(file_path)
+            event['path'] = file_path
+            event['size'] = fret.file_size
+        fret.state = state
+        # Engraving is the one step that cannot be repeated safely, so it is on disk before we go on
+        self.journal.append(event, sync=state in (ENGRAVED, SKIPPED))
+
+    # Mark every fret not yet engraved as skipped
+    def abandon(self, job: Job):
+        for fret in job.frets:
+            if fret.state not in FINAL_STATES:
+                self.advance(job, fret, SKIPPED)
+        self.journal.sync()
+
+    def unfinished(self) -> List[Job]:
+        return sorted((job for job in self.jobs.values() if not job.finished), key=lambda job: job.created)
+
+    # The unfinished fret exported to `file_path`
+    def find_fret(self, file_path: str) -> Optional[Tuple[Job, FretJob]]:
+        for job in self.jobs.values():
+            for fret in job.frets:
+                if fret.file_path == file_path and fret.state not in FINAL_STATES:
+                    return job, fret
+        return None
+
+
+# The journal exists and is empty or ends with a complete line
+def _ends_cleanly(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _job_events(job: Job) -> List[Dict[str, Any]]:
+    events: List[Dict[str, Any]] = [{'event': 'job', 'job': job.job_id, 'pcb_type': job.pcb_type,
+                                     'batch_id': job.batch_id, 'rows': job.rows, 'columns': job.columns,
+                                     'created': job.created}]
+    for fret in job.frets:
+        events.append({'event': 'plan', 'job': job.job_id, 'fret': fret.index, 'file': fret.file_name,
+                       'modules': fret.modules, 'faulty': fret.faulty_modules})
+        if fret.state != PLANNED:
+            state: Dict[str, Any] = {'event': 'state', 'job': job.job_id, 'fret': fret.index, 'state': fret.state}
+            if fret.file_path:
+                state['path'] = fret.file_path
+                state['size'] = fret.file_size
+            events.append(state)
+    return events
@@ -0,0 +1,165 @@
+"""Compile a PCB layout CSV (Text Position Data) into module positions.
+
+The compiled layout is a plain dict: outline `Height`/`Width`, `Rows`,
+`Columns`, the `CenterPoint` and one entry per module in `Modules` with the
+positions of its LED, connector and lens text, and of its Micro-ID and QR
+code when the layout has `ID` and `QR` texts marking them. A `QR` text outside
+every module marks the fret's own QR code, `QRPosition` (None without one).
+"""
+
+import os
+from typing import Any, Dict, Iterable, List
+
+import pandas as pd
+
+from . import layout_metrics
+from .errors import LayoutError
+
+REQUIRED_COLUMNS = ['Element', 'X', 'Y', 'Diameter', 'Height', 'Width', 'Columns', 'Rows']
+
+
+# Load PCB data from a CSV file and process it into a structured format
+@layout_metrics.timed("layout_load")
+def compile_layout(pcb_name: str, directory: str) -> Dict[str, Any]:
+    file_path = os.path.join(directory, f"{pcb_name}.csv")
+    try:
+        df = pd.read_csv(file_path)
+    except Exception as e:
+        raise LayoutError(str(e)) from e
+
+    # Check if required columns are present
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise LayoutError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    # Extract geometry data
+    geometry = df[df['Element'] == 'GEOMETRY']
+    if geometry.empty:
+        raise LayoutError("No GEOMETRY data found in the CSV file")
+
+    # Extract MODULE data
+    module_data = df[df['Element'] == 'MODULE']
+    if module_data.empty:
+        raise LayoutError("No MODULE data found in the CSV file")
+
+    module_width = module_data['Width'].iloc[0]
+    module_height = module_data['Height'].iloc[0]
+
+    circles = df[df['Element'] == 'CIRCLE']
+    text = df[df['Element'] == 'MTEXT']
+
+    # Load the center point from the "Point" element
+    point = df[df['Element'] == 'POINT']
+    if point.empty:
+        raise LayoutError("No POINT data found in the CSV file")
+    center_point = {'x': point['X'].iloc[0], 'y': point['Y'].iloc[0]}
+
+    try:
+        # Create a list of module positions
+        modules = []
+        for _, circle in circles.iterrows():
+            module = {
+                'x': circle['X'],
+                'y': circle['Y'],
+                'diameter': circle['Diameter'],
+                'width': module_width,
+                'height': module_height,
+                'faulty': False,
+                'led_positions': [],
+                'connector_position': None,
+                'lens_position': None,
+                'micro_id_position': None,
+                'qr_position': None
+            }
+
+            # Calculate the rectangular bounding box
+            left = circle['X'] - module_width / 2
+            right = circle['X'] + module_width / 2
+            top = circle['Y'] - module_height / 2
+            bottom = circle['Y'] + module_height / 2
+
+            for _, t in text.iterrows():
+                # Check if the text is within the rectangular bounding box
+                if left <= t['X'] <= right and top <= t['Y'] <= bottom:
+                    position = {
+                        'x': t['X'],
+                        'y': t['Y'],
+                        'rotation': t['Rotation'],
+                        'height': t['TextHeight']
+                    }
+                    if t['TextString'].startswith('P'):
+                        module['led_positions'].append(position)
+                    elif t['TextString'].startswith('C'):
+                        module['connector_position'] = position
+                    elif t['TextString'].startswith('L'):
+                        module['lens_position'] = position
+                    elif t['TextString'].startswith('ID'):
+                        # Center of the module's Micro-ID; it is never rotated
+                        module['micro_id_position'] = position
+                    elif t['TextString'].startswith('QR'):
+                        # Center of the module's QR code; the text height is its side
+                        module['qr_position'] = position
+
+            modules.append(module)
+
+        # A QR text in no module box marks the fret's code
+        fret_qr_position = None
+        for _, t in text.iterrows():
+            if t['TextString'].startswith('QR') and not any(
+                    abs(t['X'] - module['x']) <= module_width / 2 and abs(t['Y'] - module['y']) <= module_height / 2
+                    for module in modules):
+                fret_qr_position = {'x': t['X'], 'y': t['Y'], 'rotation': t['Rotation'], 'height': t['TextHeight']}
+    except Exception as e:
+        raise LayoutError(str(e)) from e
+
+    return {
+        'Height': geometry['Height'].iloc[0],
+        'Width': geometry['Width'].iloc[0],
+        'Columns': geometry['Columns'].iloc[0],
+        'Rows': geometry['Rows'].iloc[0],
+        'Modules': modules,
+        'CenterPoint': center_point,
+        'QRPosition': fret_qr_position
+    }
+
+
+# Attach the PCB list's engraving offsets for this PCB type to a compiled layout
+def apply_offsets(layout: Dict[str, Any], pcb_name: str, available_pcbs: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    offset_data = available_pcbs.get(pcb_name.lower(), {'x_offset': 0, 'y_offset': 0})
+    layout['x_offset'] = offset_data['x_offset']
+    layout['y_offset'] = offset_data['y_offset']
+    return layout
+
+
+# Module slots from a list such as "3, 7, 12-14", numbered from 1 in layout order, as 0-based module indices
+def parse_slots(text: str, modules_count: int) -> List[int]:
+    slots = set()
+    for part in text.replace(';', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        try:
+            start, end = int(first), int(last or first)
+        except ValueError:
+            raise LayoutError(f"Invalid slot {part!r}; use numbers and ranges such as 3, 7, 12-14")
+        if start > end:
+            raise LayoutError(f"Invalid slot range {part!r}")
+        if start < 1 or end > modules_count:
+            raise LayoutError(f"Slot {part} is outside 1-{modules_count}")
+        slots.update(range(start - 1, end))
+    return sorted(slots)
+
+
+# The inverse of parse_slots, with consecutive slots joined into ranges
+def format_slots(slots: Iterable[int]) -> str:
+    parts: List[str] = []
+    start = previous = None
+    for slot in sorted(set(slots)) + [None]:
+        if start is not None and slot != previous + 1:
+            parts.append(str(start + 1) if start == previous else f"{start + 1}-{previous + 1}")
+            start = None
+        if start is None:
+            start = slot
+        previous = slot
+    return ", ".join(parts)
@@ -0,0 +1,132 @@
+"""Logging setup for the Production Layout App.
+
+Records are handed to a QueueHandler on the calling (UI) thread and written by
+a QueueListener thread, so disk and console I/O never block Tk. The log file is
+JSON lines, rotated by size (or by time) with old files gzip-compressed.
+
+Each part of the app logs to its own `layout.*` logger so levels can be set per
+subsystem; debug calls on hot paths use lazy %-formatting so they cost a level
+check when disabled.
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+ROOT_LOGGER = "layout"
+
+# Subsystem loggers used by the app
+LIGHTBURN = f"{ROOT_LOGGER}.lightburn"
+CONFIG = f"{ROOT_LOGGER}.config"
+DATA = f"{ROOT_LOGGER}.data"
+UI = f"{ROOT_LOGGER}.ui"
+EXPORT = f"{ROOT_LOGGER}.export"
+
+# Loggers of the instrumentation and the command-line tools
+METRICS = f"{ROOT_LOGGER}.metrics"
+PROFILER = f"{ROOT_LOGGER}.profiler"
+BULK_EXPORT = f"{ROOT_LOGGER}.bulk_export"
+SERVICE = f"{ROOT_LOGGER}.service"
+CALIBRATE = f"{ROOT_LOGGER}.calibrate"
+BUILD_GLYPHS = f"{ROOT_LOGGER}.build_glyphs"
+SCAN_VERIFY = f"{ROOT_LOGGER}.scan_verify"
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# Rotated files are renamed to *.gz and compressed
+def _gzip_namer(name: str) -> str:
+    return f"{name}.gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _file_handler(path: str, max_bytes: int, backup_count: int, rotate_when: Optional[str]) -> logging.Handler:
+    if rotate_when:
+        handler = logging.handlers.TimedRotatingFileHandler(path, when=rotate_when, backupCount=backup_count,
+                                                            encoding='utf-8', delay=True)
+    else:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                       encoding='utf-8', delay=True)
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(JsonLinesFormatter())
+    return handler
+
+
+def setup_logging(log_file: str, level: int = logging.INFO, levels: Optional[Dict[str, int]] = None,
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 10,
+                  rotate_when: Optional[str] = None, console: bool = True) -> logging.handlers.QueueListener:
+    """Route all logging through a background listener writing `log_file`.
+
+    `levels` maps logger names (e.g. "layout.lightburn") to levels; `rotate_when`
+    switches from size rotation to TimedRotatingFileHandler (e.g. "midnight").
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_dir = os.path.dirname(log_file)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    handlers = [_file_handler(log_file, max_bytes, backup_count, rotate_when)]
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
+        handlers.append(stream)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    for name, subsystem_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(subsystem_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+# Flush queued records and stop the listener thread
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
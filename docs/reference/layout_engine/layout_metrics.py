@@ -0,0 +1,226 @@
+"""Hot-path timing for the Production Layout App.
+
+Stages are timed with the `timed` decorator or the `span` context manager and
+collected into in-process histograms. Nothing is recorded until `enable()` is
+called; while disabled a span is a shared no-op object and a timed function
+costs one flag check.
+
+Histograms are exported in the Prometheus text format, either to a file that
+is rewritten every `interval` seconds (node_exporter textfile collector
+compatible) or from a small HTTP endpoint on localhost.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from . import layout_logging
+
+METRIC_NAME = "layout_stage_seconds"
+
+log = logging.getLogger(layout_logging.METRICS)
+
+# Bucket upper bounds in seconds, from a single row parse up to a LightBurn start
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+_enabled = False
+_lock = threading.Lock()
+_histograms: Dict[Tuple[Tuple[str, str], ...], 'Histogram'] = {}
+_exporter: Optional['_Exporter'] = None
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+# Record one duration for a stage (and optional extra labels such as the LightBurn command)
+def observe(stage: str, seconds: float, **labels: str):
+    if not _enabled:
+        return
+    key = (('stage', stage),) + tuple(sorted(labels.items()))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@contextmanager
+def _span(stage: str, labels: Dict[str, str]):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, **labels)
+
+
+# Time a block of code: `with span("file_write"): ...`
+def span(stage: str, **labels: str):
+    if not _enabled:
+        return _NULL_SPAN
+    return _span(stage, labels)
+
+
+# Decorator form of `span` for whole functions and methods
+def timed(stage: str):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# Copy of the current histograms keyed by their label tuples
+def snapshot() -> Dict[Tuple[Tuple[str, str], ...], Dict[str, object]]:
+    with _lock:
+        return {key: {'buckets': list(h.counts), 'sum': h.total, 'count': h.count}
+                for key, h in _histograms.items()}
+
+
+def _format_labels(pairs) -> str:
+    return ','.join(f'{name}="{value}"' for name, value in pairs)
+
+
+# Render all histograms in the Prometheus text exposition format
+def render_prometheus() -> str:
+    lines: List[str] = [
+        f"# HELP {METRIC_NAME} Duration of Production Layout App stages.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    for key, data in sorted(snapshot().items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS, data['buckets']):
+            cumulative += count
+            le = "+Inf" if bound == float('inf') else repr(bound)
+            lines.append(f"{METRIC_NAME}_bucket{{{_format_labels(key + (('le', le),))}}} {cumulative}")
+        lines.append(f"{METRIC_NAME}_sum{{{_format_labels(key)}}} {data['sum']:.6f}")
+        lines.append(f"{METRIC_NAME}_count{{{_format_labels(key)}}} {data['count']}")
+    return "\n".join(lines) + "\n"
+
+
+# Atomically replace `path` with the current metrics
+def write_metrics_file(path: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') not in ('', '/metrics'):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Exporter:
+    def __init__(self, path: Optional[str], port: Optional[int], interval: float):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._server = None
+        self._threads = []
+
+        if port:
+            self._server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            self._threads.append(threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True))
+        if path:
+            self._threads.append(threading.Thread(target=self._write_loop, name="metrics-file", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        if not self.path:
+            return
+        try:
+            write_metrics_file(self.path)
+        except OSError as e:
+            log.warning(f"Failed to write metrics file {self.path}: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        self.flush()
+
+
+# Enable collection and export to a file every `interval` seconds and/or an HTTP port
+def start(path: Optional[str] = None, port: Optional[int] = None, interval: float = 60.0):
+    global _exporter
+    enable()
+    if _exporter is None and (path or port):
+        _exporter = _Exporter(path, port, interval)
+        log.info(f"Metrics export started (file={path}, port={port}, interval={interval}s)")
+
+
+# Write a final export and stop the background threads
+def shutdown():
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
@@ -0,0 +1,257 @@
+"""LightBurn project (.lbrn2) files for one fret, from a per-PCB-type template.
+
+An exported SVG is imported, converted and given its layer settings by
+LightBurn for every fret. A project file skips all of that: it starts from a
+template saved in LightBurn that already holds the layers (cut settings:
+speed, power, passes) and any fixed shapes, and the exporter adds one shape
+per code. The template for a PCB type is `<template dir>/<pcb type>.lbrn2`,
+else `<template dir>/default.lbrn2`, else a built-in single-layer template.
+
+A template marks where the codes go with one text shape whose text is
+`{code}`; each code is written as a copy of that shape, so its layer, font and
+alignment are set in LightBurn. With a glyph library the codes are written as
+outline paths on the same layer instead (see `glyphs.py`).
+
+LightBurn's work area has y pointing up from the bottom left corner; the
+exporter flips the SVG layout (y down, 210 x 210 mm) accordingly.
+"""
+
+import logging
+import math
+import os
+import threading
+import xml.etree.ElementTree as ElementTree
+from functools import lru_cache
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from . import layout_logging, layout_metrics
+from .errors import LayoutEngineError
+from .glyphs import Command, GlyphLibrary, load_glyph_library
+from .models import PCBInstance
+from .svg_export import TextElement, fret_elements, order_elements
+
+log = logging.getLogger(layout_logging.EXPORT)
+
+PROJECT_EXTENSION = ".lbrn2"
+DEFAULT_TEMPLATE = "default"
+CODE_MARKER = "{code}"
+WORK_AREA_HEIGHT = 210.0  # mm; LightBurn y = WORK_AREA_HEIGHT - SVG y
+
+# Used when there is no template file: one layer with LightBurn's default settings and the code
+# shape centred on its baseline, like the SVG export
+BUILT_IN_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<LightBurnProject AppVersion="1.4.00" FormatVersion="1" MaterialHeight="0" MirrorX="False" MirrorY="False">
+    <CutSetting type="Cut">
+        <index Value="0"/>
+        <name Value="C00"/>
+    </CutSetting>
+    <Shape Type="Text" CutIndex="0" Font="Roboto Thin,-1,100,5,25,0,0,0,0,0" Str="{code}" H="1" LS="0" LnS="0"
+           Ah="1" Av="0" Weld="0" HasBackupPath="0">
+        <XForm>1 0 0 1 0 0</XForm>
+    </Shape>
+</LightBurnProject>
+"""
+
+
+class LightBurnTemplateError(LayoutEngineError):
+    pass
+
+
+def _number(value: float) -> str:
+    text = f"{value:.4f}".rstrip('0').rstrip('.')
+    return "0" if text in ("", "-0") else text
+
+
+def _xform(a: float, b: float, c: float, d: float, e: float, f: float) -> ElementTree.Element:
+    element = ElementTree.Element('XForm')
+    element.text = " ".join(_number(value) for value in (a, b, c, d, e, f))
+    return element
+
+
+class LightBurnTemplate:
+    """A project template: everything but the code shape, which becomes the prototype for every code."""
+
+    def __init__(self, root: ElementTree.Element, name: str = "built-in"):
+        if root.tag != 'LightBurnProject':
+            raise LightBurnTemplateError(f"{name} is not a LightBurn project")
+        self.name = name
+        self.prototype = next((shape for shape in root.findall('Shape')
+                               if shape.get('Type') == 'Text' and shape.get('Str') == CODE_MARKER), None)
+        if self.prototype is None:
+            raise LightBurnTemplateError(f"{name} has no text shape reading {CODE_MARKER}")
+        root.remove(self.prototype)
+        # Drop the indentation LightBurn saves with, so it does not end up between generated shapes
+        for element in root.iter():
+            if element.text and not element.text.strip():
+                element.text = None
+            if element.tail and not element.tail.strip():
+                element.tail = None
+        self.root = root
+        self.cut_index = self.prototype.get('CutIndex', "0")
+
+    # A new project document holding the template's contents; they are shared, not copied
+    def project(self) -> ElementTree.Element:
+        root = ElementTree.Element(self.root.tag, self.root.attrib)
+        root.extend(list(self.root))
+        return root
+
+    # Text shape for one code, `height` being the cap height in mm, on the code shape's layer or `cut_index`
+    def text_shape(self, text: str, x: float, y: float, angle: float, height: float,
+                   cut_index: Optional[str] = None) -> ElementTree.Element:
+        shape = ElementTree.Element('Shape', self.prototype.attrib)
+        shape.set('Str', text)
+        if cut_index is not None:
+            shape.set('CutIndex', cut_index)
+        shape.set('H', _number(height))
+        # SVG rotate(-a) with y down is a rotation by +a with y up
+        radians = math.radians(angle)
+        cos, sin = math.cos(radians), math.sin(radians)
+        shape.append(_xform(cos, sin, -sin, cos, x, WORK_AREA_HEIGHT - y))
+        return shape
+
+
+_templates: Dict[str, Tuple[float, LightBurnTemplate]] = {}
+_templates_lock = threading.Lock()
+
+
+# Template file for a PCB type, or None for the built-in template
+def template_path(template_dir: Optional[str], pcb_type: str) -> Optional[str]:
+    if not template_dir:
+        return None
+    for name in (pcb_type, DEFAULT_TEMPLATE):
+        path = os.path.join(template_dir, name + PROJECT_EXTENSION)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+# The template at `path` (None for the built-in one), read once and again only when the file changes
+def load_template(path: Optional[str]) -> LightBurnTemplate:
+    if path is None:
+        return LightBurnTemplate(ElementTree.fromstring(BUILT_IN_TEMPLATE))
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError as e:
+        raise LightBurnTemplateError(f"LightBurn template {path} not found") from e
+    with _templates_lock:
+        cached = _templates.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    try:
+        template = LightBurnTemplate(ElementTree.parse(path).getroot(), os.path.basename(path))
+    except ElementTree.ParseError as e:
+        raise LightBurnTemplateError(f"Invalid LightBurn template {path}: {e}") from e
+    log.debug(f"Loaded LightBurn template {path}")
+    with _templates_lock:
+        _templates[path] = (mtime, template)
+    return template
+
+
+# One closed contour of outline commands as a LightBurn path: vertices with optional incoming (c1)
+# and outgoing (c0) Bézier control points, and primitives joining them. Quadratic curves become cubic.
+def _path_shape(contour: List[Command], cut_index: str) -> ElementTree.Element:
+    vertices: List[List[Any]] = [[contour[0][1], contour[0][2], None, None]]
+    primitives: List[Tuple[str, int, int]] = []
+    for command in contour[1:]:
+        x0, y0 = vertices[-1][:2]
+        if command[0] == 'Q':
+            cx, cy, x, y = command[1:]
+            vertices[-1][3] = (x0 + 2 / 3 * (cx - x0), y0 + 2 / 3 * (cy - y0))
+            incoming = (x + 2 / 3 * (cx - x), y + 2 / 3 * (cy - y))
+        else:
+            x, y = command[1:]
+            incoming = None
+        primitives.append(('B' if incoming else 'L', len(vertices) - 1, len(vertices)))
+        vertices.append([x, y, incoming, None])
+    # Contours end on their start point; close onto the first vertex instead of repeating it
+    if len(vertices) > 1 and vertices[-1][:2] == vertices[0][:2]:
+        vertices[0][2] = vertices.pop()[2]
+        kind, start, _ = primitives.pop()
+        primitives.append((kind, start, 0))
+    else:
+        primitives.append(('L', len(vertices) - 1, 0))
+
+    parts = []
+    for x, y, incoming, outgoing in vertices:
+        parts.append(f"V{_number(x)} {_number(y)}")
+        parts.append(f"c0x{_number(outgoing[0])}c0y{_number(outgoing[1])}" if outgoing else "c0x1")
+        parts.append(f"c1x{_number(incoming[0])}c1y{_number(incoming[1])}" if incoming else "c1x1")
+    shape = ElementTree.Element('Shape', {'Type': 'Path', 'CutIndex': cut_index})
+    shape.append(_xform(1, 0, 0, 1, 0, 0))
+    ElementTree.SubElement(shape, 'VertList').text = "".join(parts)
+    ElementTree.SubElement(shape, 'PrimList').text = "".join(f"{kind}{start} {end}"
+                                                             for kind, start, end in primitives)
+    return shape
+
+
+# Outline paths of a code in em units, built once per library and code; None if the library lacks a
+# character. The elements are shared between projects, which only ever serialize them.
+@lru_cache(maxsize=4096)
+def _outline_shapes(library: GlyphLibrary, text: str, cut_index: str) -> Optional[Tuple[ElementTree.Element, ...]]:
+    if library.path(text) is None:  # logs the missing character once
+        return None
+    contours: List[List[Command]] = []
+    for command in library.commands(text):
+        if command[0] == 'M':
+            contours.append([command])
+        elif command[0] != 'Z':
+            contours[-1].append(command)
+    return tuple(_path_shape(contour, cut_index) for contour in contours)
+
+
+# A code as a group of outline paths, scaled so the cap height is `height`, or None (see above)
+def _outline_group(template: LightBurnTemplate, library: GlyphLibrary, text: str, x: float, y: float,
+                   angle: float, height: float, cut_index: Optional[str] = None) -> Optional[ElementTree.Element]:
+    shapes = _outline_shapes(library, text, cut_index if cut_index is not None else template.cut_index)
+    if shapes is None:
+        return None
+    # Em units are y down like the SVG: rotate as the SVG export does, then flip y into LightBurn's
+    scale = height / library.cap_height
+    radians = math.radians(angle)
+    cos, sin = math.cos(radians), math.sin(radians)
+    group = ElementTree.Element('Shape', {'Type': 'Group'})
+    group.append(_xform(scale * cos, scale * sin, scale * sin, -scale * cos, x, WORK_AREA_HEIGHT - y))
+    ElementTree.SubElement(group, 'Children').extend(shapes)
+    return group
+
+
+# Build the LightBurn project for a PCB instance without writing it to disk. The options are those of
+# render_svg, so a project engraves the same texts, in the same order, as the SVG would.
+@layout_metrics.timed("lbrn2_export")
+def render_lbrn2(layout: Dict[str, Any], current_instance: PCBInstance, template: LightBurnTemplate,
+                 optimize_travel: bool = False, outline_glyphs: Optional[str] = None,
+                 slots: Optional[Collection[int]] = None) -> ElementTree.ElementTree:
+    return build_project(template, fret_elements(layout, current_instance, slots), optimize_travel, outline_glyphs)
+
+
+# A project engraving `elements` (work area mm, as the SVG export places them)
+def build_project(template: LightBurnTemplate, elements: List[TextElement], optimize_travel: bool = False,
+                  outline_glyphs: Optional[str] = None) -> ElementTree.ElementTree:
+    root = template.project()
+    root.extend(code_shapes(template, elements, optimize_travel, outline_glyphs))
+    return ElementTree.ElementTree(root)
+
+
+# One shape per code of `elements`, on the code shape's layer or `cut_index`
+def code_shapes(template: LightBurnTemplate, elements: List[TextElement], optimize_travel: bool = False,
+                outline_glyphs: Optional[str] = None, cut_index: Optional[str] = None) -> List[ElementTree.Element]:
+    if optimize_travel:
+        elements = order_elements(elements)[0]
+    library = load_glyph_library(outline_glyphs) if outline_glyphs else None
+
+    shapes = []
+    for text, x, y, rotation, height in elements:
+        # Same flip as add_rotated_text
+        adjusted_angle = (rotation + 180) % 360
+        shape = None
+        if library is not None:
+            shape = _outline_group(template, library, text, x, y, adjusted_angle, height, cut_index)
+        shapes.append(shape if shape is not None
+                      else template.text_shape(text, x, y, adjusted_angle, height, cut_index))
+    return shapes
+
+
+# Write a rendered LightBurn project to disk
+@layout_metrics.timed("file_write")
+def write_lbrn2(project: ElementTree.ElementTree, file_path: str):
+    project.write(file_path, encoding='UTF-8', xml_declaration=True)
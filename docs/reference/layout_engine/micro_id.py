@@ -0,0 +1,156 @@
+"""Quadica 5x5 Micro-ID dot codes (see quadica-micro-id-specs.md).
+
+A Micro-ID is a 1 x 1 mm grid of 5 x 5 dot positions: four corner anchors,
+always on, and in row-major order between them the 20-bit serial number (most
+significant bit first) followed by an even parity bit. A fixed orientation
+dot sits in the quiet zone left of the top-left anchor. Serial numbers run
+from 1 to 1,048,575 and are written as 8-digit strings ("00000001").
+
+Grids are NumPy arrays of shape (..., 5, 5), so whole ranges of serials
+encode and decode in one call. A placed code is a group of circles, built once
+per serial and kept in a bounded cache: exports of the same modules (the
+export cache missing, re-engraving, resuming a batch) reuse the group.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+import svgwrite
+
+from .errors import LayoutEngineError
+
+MIN_SERIAL = 1  # 0 is reserved for "no serial assigned"
+MAX_SERIAL = 2 ** 20 - 1
+SERIAL_DIGITS = 8
+
+GRID_SIZE = 5
+CODE_SIZE = 1.0  # mm
+DOT_DIAMETER = 0.10  # mm
+DOT_PITCH = 0.225  # mm, center to center
+EDGE_OFFSET = 0.05  # mm, grid edge to the first dot center
+ORIENTATION_DOT = (-0.175, 0.05)  # mm from the grid's top-left corner
+
+ANCHORS = ((0, 0), (0, 4), (4, 0), (4, 4))
+# Cells holding bits 19 to 0 and then the parity bit: every other cell, in row-major order
+STREAM_CELLS = tuple((row, col) for row in range(GRID_SIZE) for col in range(GRID_SIZE)
+                     if (row, col) not in ANCHORS)
+PARITY_CELL = STREAM_CELLS[-1]
+
+_ANCHOR_INDEX = tuple(np.array(axis) for axis in zip(*ANCHORS))
+_DATA_INDEX = tuple(np.array(axis) for axis in zip(*STREAM_CELLS[:-1]))
+_SHIFTS = np.arange(19, -1, -1, dtype=np.int64)
+
+FRAGMENT_CACHE_SIZE = 16384
+
+# One placed code: (serial, x, y), the code's center in work area mm
+MicroIDElement = Tuple[int, float, float]
+
+
+class MicroIDError(LayoutEngineError):
+    pass
+
+
+def format_serial(serial: int) -> str:
+    return f"{serial:0{SERIAL_DIGITS}d}"
+
+
+# Serial number from an integer or its 8-digit string
+def parse_serial(value) -> int:
+    if isinstance(value, str):
+        if len(value) != SERIAL_DIGITS or not value.isdigit():
+            raise MicroIDError(f"Serial number {value!r} must be {SERIAL_DIGITS} digits")
+        value = int(value)
+    if not MIN_SERIAL <= value <= MAX_SERIAL:
+        raise MicroIDError(f"Serial number {value} is outside {MIN_SERIAL}-{MAX_SERIAL}")
+    return value
+
+
+# Dot grids of an array of serial numbers: shape (..., 5, 5), 1 where a dot is burned
+def encode(serials) -> np.ndarray:
+    serials = np.asarray(serials, dtype=np.int64)
+    out_of_range = (serials < MIN_SERIAL) | (serials > MAX_SERIAL)
+    if out_of_range.any():
+        raise MicroIDError(f"Serial number {serials[out_of_range].flat[0]} is outside {MIN_SERIAL}-{MAX_SERIAL}")
+    bits = ((serials[..., None] >> _SHIFTS) & 1).astype(np.uint8)
+    grids = np.zeros(serials.shape + (GRID_SIZE, GRID_SIZE), dtype=np.uint8)
+    grids[(...,) + _ANCHOR_INDEX] = 1
+    grids[(...,) + _DATA_INDEX] = bits
+    grids[(...,) + PARITY_CELL] = bits.sum(axis=-1, dtype=np.uint8) & 1
+    return grids
+
+
+# Serial numbers of dot grids (..., 5, 5), and whether each is valid: anchors on, even parity and
+# a serial in range. Invalid grids still get the serial their data bits read as.
+def decode(grids) -> Tuple[np.ndarray, np.ndarray]:
+    grids = np.asarray(grids, dtype=np.uint8)
+    bits = grids[(...,) + _DATA_INDEX].astype(np.int64)
+    serials = (bits << _SHIFTS).sum(axis=-1)
+    parity_ok = (bits.sum(axis=-1) + grids[(...,) + PARITY_CELL]) % 2 == 0
+    anchors_ok = grids[(...,) + _ANCHOR_INDEX].all(axis=-1)
+    return serials, parity_ok & anchors_ok & (serials >= MIN_SERIAL)
+
+
+# Dot centers of a grid in mm from the grid's top-left corner, the orientation dot first
+def dot_centers(grid: np.ndarray) -> List[Tuple[float, float]]:
+    rows, cols = np.nonzero(grid)
+    return [ORIENTATION_DOT] + [(EDGE_OFFSET + col * DOT_PITCH, EDGE_OFFSET + row * DOT_PITCH)
+                                for row, col in zip(rows.tolist(), cols.tolist())]
+
+
+_fragments: 'OrderedDict[int, svgwrite.container.Group]' = OrderedDict()
+_fragments_lock = threading.Lock()
+
+
+def _fragment(grid: np.ndarray) -> svgwrite.container.Group:
+    group = svgwrite.container.Group(debug=False)
+    for x, y in dot_centers(grid):
+        group.add(svgwrite.shapes.Circle(center=(round(x, 3), round(y, 3)), r=DOT_DIAMETER / 2, debug=False))
+    return group
+
+
+# Groups of circles drawing each serial around the grid's top-left corner, from the cache where
+# possible; the codes missing from it are encoded together. The groups are shared between drawings,
+# which only ever serialize them.
+def fragments(serials: List[int]) -> List[svgwrite.container.Group]:
+    with _fragments_lock:
+        found = {serial: _fragments[serial] for serial in serials if serial in _fragments}
+        for serial in found:
+            _fragments.move_to_end(serial)
+    missing = sorted(set(serials) - set(found))
+    if missing:
+        for serial, grid in zip(missing, encode(missing)):
+            found[serial] = _fragment(grid)
+        with _fragments_lock:
+            for serial in missing:
+                _fragments[serial] = found[serial]
+            while len(_fragments) > FRAGMENT_CACHE_SIZE:
+                _fragments.popitem(last=False)
+    return [found[serial] for serial in serials]
+
+
+# Add Micro-IDs to a drawing, or to `parent`, a group in it
+def add_micro_ids(dwg: svgwrite.Drawing, elements: List[MicroIDElement], parent=None):
+    if not elements:
+        return
+    group = dwg.g(fill="#000000")
+    half = CODE_SIZE / 2
+    for (serial, x, y), fragment in zip(elements, fragments([serial for serial, _, _ in elements])):
+        placed = dwg.g(id=f"micro-id-{format_serial(serial)}",
+                       transform=f"translate({round(x - half, 4)} {round(y - half, 4)})")
+        placed.add(fragment)
+        group.add(placed)
+    (dwg if parent is None else parent).add(group)
+
+
+def cache_size() -> int:
+    return len(_fragments)
+
+
+def clear_cache(serials: Optional[List[int]] = None):
+    with _fragments_lock:
+        if serials is None:
+            _fragments.clear()
+        for serial in serials or []:
+            _fragments.pop(serial, None)
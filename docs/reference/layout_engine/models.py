@@ -0,0 +1,50 @@
+"""Production rows and fret (PCB array) instances."""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class ProductionData:
+    product_name: str
+    pcb_type: str
+    batch_id: str
+    order_number: str
+    led_codes: List[str]
+    lens_code: Optional[str]
+    connector_code: Optional[str]
+    module_id: Optional[int] = None  # row ID in the production store, when one is used
+    serial: Optional[int] = None  # Micro-ID serial number assigned by the business system, see production.py
+    row_key: Optional[str] = None  # identity of the production list row, see assign_row_keys()
+
+
+@dataclass
+class PCBInstance:
+    data: List[ProductionData]
+    faulty_modules: List[bool]
+    rows: int
+    columns: int
+
+    def __init__(self, modules_count, rows, columns):
+        self.data = []
+        self.faulty_modules = [False] * modules_count
+        self.rows = rows
+        self.columns = columns
+
+    def clear_data(self):
+        self.data = []
+
+    def reset_faulty_modules(self):
+        self.faulty_modules = [False] * len(self.faulty_modules)
+
+    def clear_all(self):
+        self.clear_data()
+        self.reset_faulty_modules()
+
+    def is_row_faulty(self, row):
+        start = row * self.columns
+        end = start + self.columns
+        return all(self.faulty_modules[start:end])
+
+    def is_column_faulty(self, col):
+        return all(self.faulty_modules[i] for i in range(col, len(self.faulty_modules), self.columns))
@@ -0,0 +1,156 @@
+"""Several frets per laser run, placed by a fixture in the 210 x 210 mm work area.
+
+A single-fret job centres the fret's `CenterPoint` in the work area. A fixture
+holds several small frets at once; its definition is a JSON file naming it,
+listing its slot origins (where each fret's `CenterPoint` lands, in work area
+mm from the top left corner like the SVG) and, optionally, the PCB types it
+takes:
+
+    {"name": "sz-quad", "pcb_types": ["sz-01", "sz-04"],
+     "slots": [[55, 55], [155, 55], [55, 155], [155, 155]]}
+
+The per-PCB-type x/y offsets still apply on top of the slot origin, so the
+calibration of single-fret jobs carries over. Frets are nested in planning
+order, one fixture load per file: one alignment cross per slot and every text
+of every fret, so one laser run engraves the whole load.
+"""
+
+import json
+import xml.etree.ElementTree as ElementTree
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import svgwrite
+
+from . import layout_metrics
+from .errors import LayoutEngineError
+from .lightburn_export import LightBurnTemplate, build_project
+from .micro_id import MicroIDElement, add_micro_ids
+from .models import PCBInstance
+from .qr import QRElement, add_qr_codes
+from .svg_export import (TextElement, add_center_cross, add_texts, fret_elements, fret_file_stem, micro_id_elements,
+                         new_drawing, qr_elements)
+
+WORK_AREA_SIZE = 210.0
+
+# One fret of a load: its compiled layout (with offsets applied) and instance
+NestedFret = Tuple[Dict[str, Any], PCBInstance]
+
+
+class FixtureError(LayoutEngineError):
+    pass
+
+
+@dataclass
+class Fixture:
+    name: str
+    slots: List[Tuple[float, float]]
+    pcb_types: List[str] = field(default_factory=list)  # empty: any PCB type that fits
+
+    def accepts(self, pcb_type: str) -> bool:
+        return not self.pcb_types or pcb_type.lower() in (name.lower() for name in self.pcb_types)
+
+    # The frets in loads of at most one per slot, in order
+    def loads(self, frets: List[Any]) -> List[List[Any]]:
+        return [frets[i:i + len(self.slots)] for i in range(0, len(frets), len(self.slots))]
+
+
+def load_fixture(path: str) -> Fixture:
+    try:
+        with open(path, encoding='utf-8') as f:
+            definition = json.load(f)
+        slots = [(float(x), float(y)) for x, y in definition['slots']]
+        fixture = Fixture(str(definition.get('name', path)), slots, list(definition.get('pcb_types', [])))
+    except OSError as e:
+        raise FixtureError(f"Fixture definition {path} not found") from e
+    except (ValueError, KeyError, TypeError) as e:
+        raise FixtureError(f"Invalid fixture definition {path}: {e}") from e
+    if not fixture.slots:
+        raise FixtureError(f"Fixture {fixture.name} has no slots")
+    for x, y in fixture.slots:
+        if not (0 <= x <= WORK_AREA_SIZE and 0 <= y <= WORK_AREA_SIZE):
+            raise FixtureError(f"Fixture {fixture.name}: slot ({x:g}, {y:g}) is outside the work area")
+    return fixture
+
+
+# Outline of a fret in each slot: (left, top, right, bottom) in work area mm
+def _footprints(fixture: Fixture, layout: Dict[str, Any]) -> List[Tuple[float, float, float, float]]:
+    center_x, center_y = layout['CenterPoint']['x'], layout['CenterPoint']['y']
+    width, height = float(layout['Width']), float(layout['Height'])
+    footprints = []
+    for x, y in fixture.slots:
+        left = x - center_x + layout.get('x_offset', 0)
+        top = y - center_y + layout.get('y_offset', 0)
+        footprints.append((left, top, left + width, top + height))
+    return footprints
+
+
+# Raise FixtureError unless a fret of this layout fits every slot inside the work area without
+# overlapping its neighbours
+def check_fit(fixture: Fixture, layout: Dict[str, Any], pcb_type: Optional[str] = None):
+    name = f"{pcb_type} " if pcb_type else ""
+    footprints = _footprints(fixture, layout)
+    for n, (left, top, right, bottom) in enumerate(footprints, start=1):
+        if left < 0 or top < 0 or right > WORK_AREA_SIZE or bottom > WORK_AREA_SIZE:
+            raise FixtureError(f"Fixture {fixture.name}: a {name}fret in slot {n} leaves the work area")
+        for m, other in enumerate(footprints[n:], start=n + 1):
+            if left < other[2] and other[0] < right and top < other[3] and other[1] < bottom:
+                raise FixtureError(f"Fixture {fixture.name}: {name}frets in slots {n} and {m} overlap")
+
+
+# File name of a load, from its first and last fret numbers, e.g. "1234_sz-04_005-008.svg"
+def nested_file_name(instances: List[PCBInstance], first_number: int, extension: str = ".svg") -> str:
+    first_prod_data = instances[0].data[0]
+    last_number = first_number + len(instances) - 1
+    return f"{first_prod_data.batch_id}_{first_prod_data.pcb_type}_{first_number:03d}-{last_number:03d}{extension}"
+
+
+# The texts of a load, fret by fret in slot order
+def nested_elements(frets: List[NestedFret], fixture: Fixture) -> List[TextElement]:
+    if len(frets) > len(fixture.slots):
+        raise FixtureError(f"Fixture {fixture.name} holds {len(fixture.slots)} frets, not {len(frets)}")
+    elements: List[TextElement] = []
+    for (layout, instance), origin in zip(frets, fixture.slots):
+        elements.extend(fret_elements(layout, instance, origin=origin))
+    return elements
+
+
+# The Micro-IDs and QR codes of a load, fret by fret in slot order; `name` is every fret QR code's {name}
+def nested_codes(frets: List[NestedFret], fixture: Fixture, name: str, micro_ids: bool = False,
+                 module_qr: Optional[str] = None,
+                 fret_qr: Optional[str] = None) -> Tuple[List[MicroIDElement], List[QRElement]]:
+    codes: List[MicroIDElement] = []
+    qr_codes: List[QRElement] = []
+    for (layout, instance), origin in zip(frets, fixture.slots):
+        if micro_ids:
+            codes.extend(micro_id_elements(layout, instance, origin=origin))
+        if module_qr or fret_qr:
+            qr_codes.extend(qr_elements(layout, instance, name, module_qr, fret_qr, origin=origin))
+    return codes, qr_codes
+
+
+# Build the SVG for one fixture load without writing it to disk. The options are those of render_svg;
+# with optimize_travel the head travel is shortened across the whole load, and every fret's QR code {name}
+# is the load's file name.
+@layout_metrics.timed("svg_export")
+def render_nested_svg(frets: List[NestedFret], fixture: Fixture, file_path: str,
+                      optimize_travel: bool = False, outline_glyphs: Optional[str] = None,
+                      compact: bool = False, micro_ids: bool = False, module_qr: Optional[str] = None,
+                      fret_qr: Optional[str] = None) -> svgwrite.Drawing:
+    elements = nested_elements(frets, fixture)
+    dwg = new_drawing(file_path)
+    for (layout, _), origin in zip(frets, fixture.slots):
+        add_center_cross(dwg, layout, origin)
+    add_texts(dwg, elements, optimize_travel, outline_glyphs, compact)
+    codes, qr_codes = nested_codes(frets, fixture, fret_file_stem(file_path), micro_ids, module_qr, fret_qr)
+    add_micro_ids(dwg, codes)
+    add_qr_codes(dwg, qr_codes)
+    return dwg
+
+
+# Build the LightBurn project for one fixture load, as render_nested_svg builds the SVG
+@layout_metrics.timed("lbrn2_export")
+def render_nested_lbrn2(frets: List[NestedFret], fixture: Fixture, template: LightBurnTemplate,
+                        optimize_travel: bool = False,
+                        outline_glyphs: Optional[str] = None) -> ElementTree.ElementTree:
+    return build_project(template, nested_elements(frets, fixture), optimize_travel, outline_glyphs)
@@ -0,0 +1,67 @@
+"""Packing production rows onto frets, and reflowing them around faulty modules."""
+
+from typing import Any, Dict, List
+
+from . import layout_metrics
+from .models import PCBInstance, ProductionData
+
+
+# A fret with no modules assigned
+def empty_instance(layout: Dict[str, Any]) -> PCBInstance:
+    return PCBInstance(len(layout['Modules']), int(layout['Rows']), int(layout['Columns']))
+
+
+# Create PCB instances for every production row of one PCB type (always at least one)
+def plan_instances(production_data: List[ProductionData], pcb_type: str, layout: Dict[str, Any]) -> List[PCBInstance]:
+    instances = []
+    matching_production_data = [data for data in production_data if data.pcb_type == pcb_type]
+
+    modules_per_pcb = len(layout['Modules'])
+    for i in range(0, len(matching_production_data), modules_per_pcb):
+        instance = empty_instance(layout)
+        instance.data = matching_production_data[i:i+modules_per_pcb]
+        instances.append(instance)
+
+    if not instances:
+        instances.append(empty_instance(layout))
+    return instances
+
+
+# Redistribute production data across PCB instances after marking modules as faulty
+@layout_metrics.timed("reflow")
+def redistribute(instances: List[PCBInstance], layout: Dict[str, Any]) -> List[PCBInstance]:
+    all_data = [item for instance in instances for item in instance.data]
+    modules_per_pcb = len(layout['Modules'])
+
+    # Preserve existing instances and their faulty statuses
+    result = []
+    data_index = 0
+    for instance in instances:
+        new_instance = empty_instance(layout)
+        new_instance.faulty_modules = instance.faulty_modules.copy()  # Preserve faulty status
+
+        for i in range(modules_per_pcb):
+            if not new_instance.faulty_modules[i] and data_index < len(all_data):
+                new_instance.data.append(all_data[data_index])
+                data_index += 1
+
+        result.append(new_instance)
+
+        if data_index >= len(all_data):
+            break
+
+    # If there's still data left, create new instances as needed
+    while data_index < len(all_data):
+        new_instance = empty_instance(layout)
+        for i in range(modules_per_pcb):
+            if data_index < len(all_data):
+                new_instance.data.append(all_data[data_index])
+                data_index += 1
+            else:
+                break
+        result.append(new_instance)
+
+    # Ensure we have at least one instance
+    if not result:
+        result.append(empty_instance(layout))
+    return result
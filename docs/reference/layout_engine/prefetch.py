@@ -0,0 +1,284 @@
+"""Speculative rendering of the frets likely to be exported next.
+
+Once the production list is loaded the viewer knows every PCB type and fret
+it will export. An `ExportPrefetcher` renders those frets ahead of time into
+the export cache (export_cache.py), in one worker process at below-normal
+priority, so the viewer stays responsive. When the operator clicks Export or
+Batch Export, each file is already cached and only needs to be linked into
+place under its name.
+
+Work is staged per group, a PCB type, in the order it is likely needed:
+
+- `stage_frets` takes frets the viewer has planned: the selected PCB type,
+  with the operator's faulty slots and added modules, and their file names.
+  They go to the front of the queue.
+- `stage_type` takes a PCB type's production rows. The worker compiles its
+  layout, plans its frets as the viewer would and renders the first few.
+  Compiled layouts come back with the results (see `layout`), so selecting
+  the type need not read its layout CSV again.
+
+Staging a group again replaces its earlier work. Frets no longer wanted are
+dropped from the queue. Once the group's new work is done, files rendered for
+the replaced work are removed from the cache, unless an export has used them
+since. Cache entries are keyed by content, so an edited fret never picks up a
+file rendered before the edit. A fret the worker has not reached yet is
+rendered at export as before.
+
+The worker is started when the prefetcher is created, with an empty module
+standing in for `__main__`. A worker started by spawning (Windows, macOS)
+imports the parent's main module first, which in the app is the viewer
+script with Tk and the station configuration; this way it imports only
+layout_engine, for its tasks.
+"""
+
+import copy
+import logging
+import os
+import pickle
+import sys
+import threading
+import types
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from . import layout_logging
+from .export_cache import ExportCache
+from .models import PCBInstance, ProductionData
+from .planner import plan_instances
+from .service import LayoutCache
+from .svg_export import export_file_name
+
+log = logging.getLogger(layout_logging.EXPORT)
+
+BELOW_NORMAL_PRIORITY_CLASS = 0x4000  # Windows process priority of the worker
+WORKER_NICENESS = 10  # and elsewhere
+
+# What a task reports: (pcb_type, layout CSV mtime, compiled layout) when it compiled one, and the
+# (key, rendered) pair of each fret it staged
+TaskResult = Tuple[Optional[Tuple[str, float, Dict[str, Any]]], List[Tuple[str, bool]]]
+
+# Worker process state: its export cache and compiled layouts
+_cache: Optional[ExportCache] = None
+_layouts: Optional[LayoutCache] = None
+
+
+def _lower_priority():
+    try:
+        if os.name == 'nt':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            os.nice(WORKER_NICENESS)
+    except (OSError, AttributeError) as e:
+        log.debug(f"Export prefetch worker keeps normal priority: {e}")
+
+
+def _worker_cache(cache_dir: str) -> ExportCache:
+    global _cache
+    if _cache is None or _cache.directory != cache_dir:
+        _cache = ExportCache(cache_dir)
+    return _cache
+
+
+# Stage one planned fret, its layout and instance pickled; runs in the worker process
+def _stage_fret(cache_dir: str, layout: bytes, instance: bytes, file_name: str,
+                options: Dict[str, Any]) -> TaskResult:
+    return None, [_worker_cache(cache_dir).stage(pickle.loads(layout), pickle.loads(instance), file_name,
+                                                 **options)]
+
+
+# Compile a PCB type's layout, plan its frets and stage the first `count`; runs in the worker process
+def _stage_type(cache_dir: str, layout_dir: str, available_pcbs: Dict[str, Dict[str, float]], pcb_type: str,
+                production_data: List[ProductionData], count: int, first_number: int,
+                options: Dict[str, Any]) -> TaskResult:
+    global _layouts
+    if _layouts is None or _layouts.layout_dir != layout_dir or _layouts.available_pcbs != available_pcbs:
+        _layouts = LayoutCache(layout_dir, available_pcbs)
+    mtime = os.stat(os.path.join(layout_dir, f"{pcb_type}.csv")).st_mtime
+    layout = _layouts.get(pcb_type)
+    cache = _worker_cache(cache_dir)
+    instances = [instance for instance in plan_instances(production_data, pcb_type, layout) if instance.data]
+    staged = [cache.stage(layout, instance, export_file_name(instance, number), **options)
+              for number, instance in enumerate(instances[:count], start=first_number)]
+    return (pcb_type, mtime, layout), staged
+
+
+# Start the worker process now, while an empty module stands in for the parent's main module
+def _start_pool() -> ProcessPoolExecutor:
+    pool = ProcessPoolExecutor(max_workers=1, initializer=_lower_priority)
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        pool.submit(os.getpid).result()
+    finally:
+        sys.modules['__main__'] = main
+    return pool
+
+
+@dataclass
+class _Task:
+    group: str
+    generation: int
+    function: Callable[..., TaskResult]
+    args: Tuple
+
+
+class ExportPrefetcher:
+    """Renders frets into an export cache ahead of their export, in a low-priority worker process.
+
+    Create it from the main thread, before other threads start processes: the worker starts right away.
+    """
+
+    def __init__(self, cache: ExportCache, layout_dir: str):
+        self.cache = cache
+        self.layout_dir = layout_dir
+        self.rendered = 0  # frets rendered ahead
+        self.reused = 0  # frets the cache held already
+        self.discarded = 0  # files removed once their fret changed
+        self.failed = 0
+        self._pool = _start_pool()
+        self._condition = threading.Condition()
+        self._queue: Deque[_Task] = deque()
+        self._running: Optional[_Task] = None
+        self._closed = False
+        self._generations: Dict[str, int] = {}
+        self._staged: Dict[str, Set[str]] = {}  # group -> keys of its current work
+        self._stale: Dict[str, Set[str]] = {}  # group -> keys of replaced work, removed once the group settles
+        self._own: Dict[str, float] = {}  # key -> cache file mtime, for files this prefetcher rendered
+        self._layouts: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._thread = threading.Thread(target=self._run, name="export-prefetch", daemon=True)
+        self._thread.start()
+
+    # Replace the group's work with `tasks`, at the front of the queue or the back
+    def _replace(self, group: str, tasks: List[Tuple[Callable[..., TaskResult], Tuple]], front: bool):
+        with self._condition:
+            generation = self._generations.get(group, 0) + 1
+            self._generations[group] = generation
+            self._queue = deque(task for task in self._queue if task.group != group)
+            self._stale.setdefault(group, set()).update(self._staged.pop(group, set()))
+            self._staged[group] = set()
+            new_tasks = [_Task(group, generation, function, args) for function, args in tasks]
+            if front:
+                self._queue.extendleft(reversed(new_tasks))
+            else:
+                self._queue.extend(new_tasks)
+            self._settle(group)
+            self._condition.notify_all()
+
+    # Stage planned frets, (instance, file name) in the order they are likely exported. The layout and
+    # instances are pickled here, so the caller may go on editing them; that is also much cheaper than a
+    # deep copy, and the worker needs them pickled anyway.
+    def stage_frets(self, group: str, layout: Dict[str, Any], frets: List[Tuple[PCBInstance, str]],
+                    **options: Any):
+        layout_bytes = pickle.dumps(layout, pickle.HIGHEST_PROTOCOL)
+        self._replace(group, [(_stage_fret, (self.cache.directory, layout_bytes,
+                                             pickle.dumps(instance, pickle.HIGHEST_PROTOCOL), file_name, options))
+                              for instance, file_name in frets], front=True)
+
+    # Stage the first `count` frets of a PCB type as the viewer would plan them from `production_data`,
+    # numbered from `first_number`
+    def stage_type(self, pcb_type: str, production_data: List[ProductionData],
+                   available_pcbs: Dict[str, Dict[str, float]], count: int, first_number: int = 1, **options: Any):
+        rows = [data for data in production_data if data.pcb_type == pcb_type]
+        self._replace(pcb_type, [(_stage_type, (self.cache.directory, self.layout_dir, available_pcbs, pcb_type,
+                                                rows, count, first_number, options))], front=False)
+
+    # The layout of a PCB type compiled by the worker (offsets applied), while its CSV is unchanged; a copy
+    def layout(self, pcb_type: str) -> Optional[Dict[str, Any]]:
+        with self._condition:
+            cached = self._layouts.get(pcb_type)
+        if cached is None:
+            return None
+        try:
+            if os.stat(os.path.join(self.layout_dir, f"{pcb_type}.csv")).st_mtime != cached[0]:
+                return None
+        except OSError:
+            return None
+        return copy.deepcopy(cached[1])
+
+    # Wait until all staged work is done; returns False on timeout
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and self._running is None, timeout)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._queue.clear()
+            self._condition.notify_all()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'rendered': self.rendered,
+                'reused': self.reused,
+                'discarded': self.discarded,
+                'failed': self.failed,
+                'queued': len(self._queue) + (self._running is not None),
+                'layouts': len(self._layouts),
+            }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._closed)
+                if self._closed:
+                    return
+                task = self._running = self._queue.popleft()
+            try:
+                result: Optional[TaskResult] = self._pool.submit(task.function, *task.args).result()
+            except Exception as e:
+                if self._closed:
+                    return
+                log.warning(f"Could not prefetch {task.group} frets: {e}")
+                result = None
+            with self._condition:
+                self._running = None
+                if result is None:
+                    self.failed += 1
+                else:
+                    self._record(task, result)
+                self._settle(task.group)
+                self._condition.notify_all()
+
+    def _record(self, task: _Task, result: TaskResult):
+        compiled, staged = result
+        if compiled is not None:
+            pcb_type, mtime, layout = compiled
+            self._layouts[pcb_type] = (mtime, layout)
+        current = self._generations.get(task.group) == task.generation
+        for key, rendered in staged:
+            if rendered:
+                self.rendered += 1
+                try:
+                    self._own[key] = os.stat(self.cache.path_for(key)).st_mtime
+                except OSError:
+                    pass
+            else:
+                self.reused += 1
+            if current:
+                self._staged[task.group].add(key)
+                self._stale[task.group].discard(key)
+            elif key not in self._staged.get(task.group, ()):
+                self._stale.setdefault(task.group, set()).add(key)
+
+    # Once a group has no work left, remove the files of its replaced work that no export has used
+    def _settle(self, group: str):
+        if any(task.group == group for task in self._queue) or (self._running and self._running.group == group):
+            return
+        for key in self._stale.pop(group, set()) - self._staged.get(group, set()):
+            mtime = self._own.pop(key, None)
+            if mtime is None:
+                continue
+            path = self.cache.path_for(key)
+            try:
+                # export() touches the files it uses
+                if os.stat(path).st_mtime == mtime:
+                    os.remove(path)
+                    self.discarded += 1
+            except OSError:
+                pass
@@ -0,0 +1,199 @@
+"""Production list parsing and PCB type resolution.
+
+Micro-ID serial numbers are assigned by the business system (the WordPress
+plugin hands them out from its `quad_serial_numbers` table), never by the
+layout app. A production list that carries them has a `Serial` column, found
+by its header, with each module's serial as a number or 8-digit string.
+Modules without a valid serial get none; their Micro-IDs and `{serial}` QR
+codes are left out.
+"""
+
+import csv
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from . import layout_logging, layout_metrics
+from .errors import ProductionDataError
+from .micro_id import MicroIDError, parse_serial
+from .models import ProductionData
+
+log = logging.getLogger(layout_logging.DATA)
+
+# MR products are engraved on LXB boards
+MR_VARIANTS = {
+    "20T": "LXB-RT20bb",
+    "20S": "LXB-RS20ag",
+    "10S": "LXB-RS10ac",
+}
+
+SERIAL_HEADER = "serial"
+
+
+# Determine the PCB type based on the product name
+@layout_metrics.timed("pcb_type_resolution")
+def determine_pcb_type(product_name: str, available_pcbs: Iterable[str]) -> str:
+    parts = product_name.split('-')
+
+    determined_pcb_type = None
+
+    if parts[0] == "MR":
+        # Handle MR products
+        if len(parts) >= 3:
+            mr_variant = parts[-1]
+            determined_pcb_type = MR_VARIANTS.get(mr_variant)
+            if not determined_pcb_type:
+                log.warning(f"Unknown MR variant: {mr_variant}")
+
+    # Handle other product types (including fallback for unknown MR variants)
+    if not determined_pcb_type and len(parts) >= 2:
+        prefix = f"{parts[0]}-{parts[1]}"
+
+        # Try to find an exact match for the first two parts
+        for pcb in available_pcbs:
+            if prefix.lower() in pcb.lower():
+                determined_pcb_type = pcb
+                break
+
+        # If no exact match, try a more flexible match, but still requiring both parts
+        if not determined_pcb_type:
+            for pcb in available_pcbs:
+                if parts[0].lower() in pcb.lower() and parts[1].lower() in pcb.lower():
+                    # Additional check to ensure parts are adjacent or only separated by a character
+                    pcb_parts = pcb.lower().split('-')
+                    for i in range(len(pcb_parts) - 1):
+                        if pcb_parts[i] == parts[0].lower() and pcb_parts[i+1] == parts[1].lower():
+                            determined_pcb_type = pcb
+                            break
+                    if determined_pcb_type:
+                        break
+
+    # If no match found, use a default naming convention
+    if not determined_pcb_type:
+        log.warning(f"Unable to determine PCB type for product: {product_name}")
+        determined_pcb_type = f"{parts[0]}-{parts[1]}" if len(parts) >= 2 else product_name
+
+    return determined_pcb_type
+
+
+# Index of the Serial column in the production list header, if it has one
+def serial_column(header: List[str]) -> Optional[int]:
+    for index, name in enumerate(header):
+        if name.strip().lower() == SERIAL_HEADER:
+            return index
+    return None
+
+
+# Serial number in a Serial cell: None, with a warning, unless it is one the business system could assign
+def parse_serial_cell(cell: str) -> Optional[int]:
+    cell = cell.strip()
+    if not cell:
+        return None
+    try:
+        return parse_serial(int(cell) if cell.isdigit() else cell)
+    except MicroIDError as e:
+        log.warning(f"Ignoring serial number: {e}")
+        return None
+
+
+# Parse a single row of production data; returns None for rows that cannot be read. `serial_column` is the
+# index of the Serial column, when the list has one.
+def parse_production_row(row: List[str], available_pcbs: Iterable[str],
+                         serial_column: Optional[int] = None) -> Optional[ProductionData]:
+    try:
+        product_name = row[1] if len(row) > 1 else ""  # Product name is in the second column
+        pcb_type = determine_pcb_type(product_name, available_pcbs)
+        batch_id = row[0] if row else ""  # Batch ID is in the first column (C1)
+        order_number = row[2] if len(row) > 2 else ""  # Order number is in the third column (C3)
+        led_codes = []
+        lens_code = None
+        connector_code = None
+
+        # Start from C7 (index 6) and look for short codes
+        for index, cell in enumerate(row[6:], start=6):
+            if index == serial_column:
+                continue
+            if len(cell) == 2 and cell[0].isalpha() and cell[1].isdigit():
+                led_codes.append(cell)
+            elif len(cell) == 3:
+                if cell.startswith('L'):
+                    lens_code = cell
+                elif cell.startswith('C'):
+                    connector_code = cell
+
+        # If no short codes found in C7, it might be a single LED product
+        if not led_codes and len(row) > 6 and len(row[6]) == 2 and row[6][0].isalpha() and row[6][1].isdigit():
+            led_codes = [row[6]]
+
+        serial = None
+        if serial_column is not None and serial_column < len(row):
+            serial = parse_serial_cell(row[serial_column])
+
+        return ProductionData(product_name, pcb_type, batch_id, order_number, led_codes, lens_code, connector_code,
+                              serial=serial)
+    except Exception as e:
+        log.error(f"Error parsing row: {row}. Error: {str(e)}")
+        return None
+
+
+# Use the "-ir" board variant for modules carrying an IR LED, when that variant exists
+def resolve_ir_variant(parsed_data: ProductionData, available_pcbs: Dict[str, Dict[str, float]],
+                       ir_leds: List[str]):
+    has_ir = any(led_code in ir_leds for led_code in parsed_data.led_codes)
+
+    # Parse product name more carefully
+    parts = parsed_data.product_name.split('-')
+    if len(parts) >= 2:
+        # Handle the second part which might have a revision letter
+        base_number = ''.join(filter(str.isdigit, parts[1]))  # Extract just the numbers
+
+        # Create base PCB name without revision letter
+        ir_variant = f"{parts[0]}-{base_number}-ir".lower()
+
+        # Set PCB type based on IR presence and variant availability
+        if has_ir and ir_variant in available_pcbs:
+            parsed_data.pcb_type = ir_variant
+        else:
+            parsed_data.pcb_type = determine_pcb_type(parsed_data.product_name, available_pcbs)
+
+
+# Give every production list row a key that survives re-reads of the list: its contents plus
+# which repeat of them it is within the batch. Stations and the production store use it to
+# recognise the same module.
+def assign_row_keys(production_data: List[ProductionData]):
+    seen: Counter = Counter()
+    for data in production_data:
+        content = "|".join([data.order_number, data.product_name, ",".join(data.led_codes),
+                            data.lens_code or "", data.connector_code or ""])
+        seen[(data.batch_id, content)] += 1
+        data.row_key = f"{content}#{seen[(data.batch_id, content)]}"
+
+
+# Load and parse production data from a CSV file
+@layout_metrics.timed("csv_parse")
+def load_production_data(file_path: str, available_pcbs: Dict[str, Dict[str, float]],
+                         ir_leds: List[str]) -> List[ProductionData]:
+    production_data = []
+    try:
+        with open(file_path, 'r', newline='') as csvfile:
+            dialect = csv.Sniffer().sniff(csvfile.read(1024))
+            csvfile.seek(0)
+            csv_reader = csv.reader(csvfile, dialect)
+
+            column = serial_column(next(csv_reader, None) or [])
+
+            for row in csv_reader:
+                if len(row) > 6:
+                    parsed_data = parse_production_row(row, available_pcbs, column)
+                    if parsed_data:
+                        resolve_ir_variant(parsed_data, available_pcbs, ir_leds)
+                        production_data.append(parsed_data)
+    except Exception as e:
+        raise ProductionDataError(f"An error occurred while reading the production data: {str(e)}") from e
+    assign_row_keys(production_data)
+
+    pcb_types = {data.pcb_type for data in production_data}
+    log.info(f"Total parsed production data: {len(production_data)}")
+    log.info(f"Unique PCB types found: {len(pcb_types)}")
+    log.info(f"PCB types with IR variants: {[pcb for pcb in pcb_types if pcb.endswith('-ir')]}")
+    return production_data
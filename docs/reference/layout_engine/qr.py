@@ -0,0 +1,379 @@
+"""QR codes for module and fret labels, as merged-rectangle SVG paths.
+
+The encoder covers what labels need from ISO/IEC 18004: byte mode, all four
+error correction levels (H by default, as the WordPress plugin engraves) and
+versions 1 to 40, picking the smallest version that holds the payload and the
+mask with the lowest penalty score. Matrices are NumPy arrays, 1 for a dark
+module, without the quiet zone.
+
+A matrix is drawn as one path: horizontal runs of dark modules, with runs of
+the same span on consecutive rows merged into one rectangle. Engraving one
+filled path per code is far less than one square per module. Matrices and
+path data are cached per payload, so re-exporting a fret re-encodes nothing.
+
+Placement comes from the layout: a `QR` text inside a module marks that
+module's code, a `QR` text outside every module the fret's code, each centred
+on the text with the text height as its side in mm. Payloads are URL templates
+(see `module_payload` and `fret_payload`).
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import svgwrite
+
+from .errors import LayoutEngineError
+from .micro_id import format_serial
+from .models import ProductionData
+
+ERROR_LEVELS = "LMQH"
+DEFAULT_ERROR_LEVEL = "H"
+_FORMAT_BITS = {'L': 1, 'M': 0, 'Q': 3, 'H': 2}
+
+# Error correction codewords per block and number of blocks, by level and version (index 0 unused)
+_EC_CODEWORDS = {
+    'L': (0, 7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28, 28, 28, 30, 30, 26, 28,
+          30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    'M': (0, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26, 26, 28, 28, 28, 28, 28,
+          28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28),
+    'Q': (0, 13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30, 28, 30, 30, 30, 30, 28,
+          30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    'H': (0, 17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28, 30, 24, 30, 30, 30, 30,
+          30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+}
+_EC_BLOCKS = {
+    'L': (0, 1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8, 8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17,
+          18, 19, 19, 20, 21, 22, 24, 25),
+    'M': (0, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16, 17, 17, 18, 20, 21, 23, 25, 26, 28, 29,
+          31, 33, 35, 37, 38, 40, 43, 45, 47, 49),
+    'Q': (0, 1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20, 23, 23, 25, 27, 29, 34, 34, 35, 38,
+          40, 43, 45, 48, 51, 53, 56, 59, 62, 65, 68),
+    'H': (0, 1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25, 25, 34, 30, 32, 35, 37, 40, 42, 45,
+          48, 51, 54, 57, 60, 63, 66, 70, 74, 77, 81),
+}
+
+# GF(256) with the QR polynomial x^8 + x^4 + x^3 + x^2 + 1
+_EXP = [0] * 512
+_LOG = [0] * 256
+_value = 1
+for _power in range(255):
+    _EXP[_power] = _value
+    _LOG[_value] = _power
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11D
+for _power in range(255, 512):
+    _EXP[_power] = _EXP[_power - 255]
+
+# One placed QR code: (payload, x, y, size), centre and side in work area mm
+QRElement = Tuple[str, float, float, float]
+
+
+class QRCodeError(LayoutEngineError):
+    pass
+
+
+def _size(version: int) -> int:
+    return version * 4 + 17
+
+
+def _alignment_positions(version: int) -> List[int]:
+    if version == 1:
+        return []
+    count = version // 7 + 2
+    step = (version * 8 + count * 3 + 5) // (count * 4 - 4) * 2
+    return [6] + [_size(version) - 7 - i * step for i in reversed(range(count - 1))]
+
+
+# Modules left for data and error correction once the function patterns are placed
+def _raw_modules(version: int) -> int:
+    modules = (16 * version + 128) * version + 64
+    if version >= 2:
+        count = version // 7 + 2
+        modules -= (25 * count - 10) * count - 55
+        if version >= 7:
+            modules -= 36
+    return modules
+
+
+def _data_codewords(version: int, level: str) -> int:
+    return _raw_modules(version) // 8 - _EC_CODEWORDS[level][version] * _EC_BLOCKS[level][version]
+
+
+@lru_cache(maxsize=64)
+def _generator(degree: int) -> Tuple[int, ...]:
+    polynomial = [1]
+    for i in range(degree):
+        polynomial = [a ^ (_EXP[_LOG[b] + i] if b else 0) for a, b in zip(polynomial + [0], [0] + polynomial)]
+    return tuple(polynomial[1:])
+
+
+def _error_correction(data: List[int], degree: int) -> List[int]:
+    generator = _generator(degree)
+    remainder = [0] * degree
+    for byte in data:
+        factor = byte ^ remainder.pop(0)
+        remainder.append(0)
+        if factor:
+            log_factor = _LOG[factor]
+            for i, coefficient in enumerate(generator):
+                remainder[i] ^= _EXP[_LOG[coefficient] + log_factor]
+    return remainder
+
+
+# All codewords of a payload, data and error correction blocks interleaved, and the version chosen
+def _codewords(payload: bytes, level: str) -> Tuple[List[int], int]:
+    for version in range(1, 41):
+        count_bits = 8 if version < 10 else 16
+        capacity = _data_codewords(version, level) * 8
+        if 4 + count_bits + len(payload) * 8 <= capacity:
+            break
+    else:
+        raise QRCodeError(f"{len(payload)} bytes do not fit a QR code at error correction level {level}")
+
+    bits = f"0100{len(payload):0{count_bits}b}" + "".join(f"{byte:08b}" for byte in payload)
+    bits += "0" * min(4, capacity - len(bits))
+    bits += "0" * (-len(bits) % 8)
+    data = [int(bits[i:i + 8], 2) for i in range(0, len(bits), 8)]
+    data += [0xEC, 0x11] * ((capacity // 8 - len(data)) // 2 + 1)
+    data = data[:capacity // 8]
+
+    blocks_count = _EC_BLOCKS[level][version]
+    ec_length = _EC_CODEWORDS[level][version]
+    raw_codewords = _raw_modules(version) // 8
+    short_blocks = blocks_count - raw_codewords % blocks_count
+    short_length = raw_codewords // blocks_count - ec_length
+    blocks, ec_blocks, start = [], [], 0
+    for i in range(blocks_count):
+        length = short_length + (i >= short_blocks)
+        blocks.append(data[start:start + length])
+        ec_blocks.append(_error_correction(blocks[-1], ec_length))
+        start += length
+    codewords = [block[i] for i in range(short_length + 1) for block in blocks if i < len(block)]
+    codewords += [block[i] for i in range(ec_length) for block in ec_blocks]
+    return codewords, version
+
+
+def _bch(value: int, bits: int, generator: int) -> int:
+    remainder = value
+    for _ in range(bits):
+        remainder = (remainder << 1) ^ ((remainder >> (bits - 1)) * generator)
+    return value << bits | remainder
+
+
+# Function patterns of a version: modules (dark where set) and the mask of reserved positions, read-only
+@lru_cache(maxsize=40)
+def _function_patterns(version: int) -> Tuple[np.ndarray, np.ndarray]:
+    size = _size(version)
+    modules = np.zeros((size, size), dtype=np.uint8)
+    reserved = np.zeros((size, size), dtype=bool)
+
+    modules[6, :] = modules[:, 6] = (np.arange(size) % 2 == 0)
+    reserved[6, :] = reserved[:, 6] = True
+    offsets = np.arange(-4, 5)
+    distance = np.maximum(np.abs(offsets)[:, None], np.abs(offsets)[None, :])
+    for row, col in ((3, 3), (3, size - 4), (size - 4, 3)):
+        rows, cols = np.meshgrid(row + offsets, col + offsets, indexing='ij')
+        inside = (rows >= 0) & (rows < size) & (cols >= 0) & (cols < size)
+        modules[rows[inside], cols[inside]] = ~np.isin(distance[inside], (2, 4))
+        reserved[rows[inside], cols[inside]] = True
+    positions = _alignment_positions(version)
+    for row in positions:
+        for col in positions:
+            if (row, col) in ((6, 6), (6, positions[-1]), (positions[-1], 6)):
+                continue
+            modules[row - 2:row + 3, col - 2:col + 3] = distance[2:7, 2:7] != 1
+            reserved[row - 2:row + 3, col - 2:col + 3] = True
+
+    # Format information, written once the mask is known, and the dark module
+    reserved[8, :9] = reserved[:9, 8] = True
+    reserved[8, size - 8:] = reserved[size - 8:, 8] = True
+    modules[size - 8, 8] = 1
+    if version >= 7:
+        bits = _bch(version, 12, 0x1F25)
+        for i in range(18):
+            a, b = size - 11 + i % 3, i // 3
+            modules[b, a] = modules[a, b] = (bits >> i) & 1
+            reserved[b, a] = reserved[a, b] = True
+    modules.flags.writeable = reserved.flags.writeable = False
+    return modules, reserved
+
+
+# Positions of the data modules in placement order: two-column strips, zigzagging up and down from the right
+@lru_cache(maxsize=40)
+def _data_positions(version: int) -> Tuple[np.ndarray, np.ndarray]:
+    size = _size(version)
+    reserved = _function_patterns(version)[1]
+    rows, cols = [], []
+    for right in range(size - 1, 0, -2):
+        if right <= 6:
+            right -= 1
+        upward = (right + 1) & 2 == 0
+        for vertical in range(size):
+            row = size - 1 - vertical if upward else vertical
+            for col in (right, right - 1):
+                if not reserved[row, col]:
+                    rows.append(row)
+                    cols.append(col)
+    return np.array(rows), np.array(cols)
+
+
+# The eight mask patterns of a symbol size, reserved modules included
+@lru_cache(maxsize=40)
+def _mask_patterns(size: int) -> np.ndarray:
+    i, j = np.indices((size, size))
+    return np.array([
+        (i + j) % 2 == 0,
+        i % 2 == 0,
+        j % 3 == 0,
+        (i + j) % 3 == 0,
+        (i // 2 + j // 3) % 2 == 0,
+        (i * j) % 2 + (i * j) % 3 == 0,
+        ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+        ((i + j) % 2 + (i * j) % 3) % 2 == 0,
+    ], dtype=np.uint8)
+
+
+def _write_format(modules: np.ndarray, level: str, mask: int):
+    size = len(modules)
+    bits = _bch(_FORMAT_BITS[level] << 3 | mask, 10, 0x537) ^ 0x5412
+    bit = [(bits >> i) & 1 for i in range(15)]
+    for i in range(6):
+        modules[i, 8] = bit[i]
+    modules[7, 8], modules[8, 8], modules[8, 7] = bit[6], bit[7], bit[8]
+    for i in range(9, 15):
+        modules[8, 14 - i] = bit[i]
+    for i in range(8):
+        modules[8, size - 1 - i] = bit[i]
+    for i in range(8, 15):
+        modules[size - 15 + i, 8] = bit[i]
+
+
+# Penalty scores of a stack of masked symbols (ISO/IEC 18004 section 7.8.3), all lines of all symbols at once
+def _penalties(symbols: np.ndarray) -> np.ndarray:
+    count, size = len(symbols), symbols.shape[1]
+    # Rows and columns of each symbol as the lines of one array
+    lines = np.concatenate((symbols, symbols.transpose(0, 2, 1)), axis=1)
+
+    # Runs of five or more modules of one colour; a separator value ends each line's last run
+    flat = np.pad(lines, ((0, 0), (0, 0), (0, 1)), constant_values=2).reshape(-1)
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    runs = np.diff(np.append(starts, len(flat)))
+    long = (runs >= 5) & (flat[starts] != 2)
+    scores = np.bincount(starts[long] // (2 * size * (size + 1)), runs[long] - 2, count).astype(np.int64)
+
+    # Finder-like 1:1:3:1:1 patterns preceded or followed by four light modules, the quiet zone counting as light
+    dark = np.pad(lines, ((0, 0), (0, 0), (4, 4))).astype(bool)
+    width = size - 6
+
+    def at(offset: int) -> np.ndarray:
+        return dark[..., offset:offset + width]
+
+    pattern = at(4) & ~at(5) & at(6) & at(7) & at(8) & ~at(9) & at(10)
+    light = ~(at(0) | at(1) | at(2) | at(3)) | ~(at(11) | at(12) | at(13) | at(14))
+    scores += 40 * np.count_nonzero(pattern & light, axis=(1, 2))
+
+    # 2 x 2 blocks of one colour
+    blocks = symbols[:, :-1, :-1] + symbols[:, 1:, :-1] + symbols[:, :-1, 1:] + symbols[:, 1:, 1:]
+    scores += 3 * np.count_nonzero((blocks == 0) | (blocks == 4), axis=(1, 2))
+    # Balance of dark and light
+    percent = symbols.sum(axis=(1, 2)) * 100 / (size * size)
+    scores += 10 * (np.abs(percent - 50) // 5).astype(np.int64)
+    return scores
+
+
+# The QR code matrix of a payload, 1 for a dark module, without the quiet zone. `mask` forces a mask
+# pattern (0-7) instead of the one with the lowest penalty.
+@lru_cache(maxsize=8192)
+def _cached_matrix(payload: str, level: str, mask: Optional[int]) -> np.ndarray:
+    codewords, version = _codewords(payload.encode('utf-8'), level)
+    patterns, reserved = _function_patterns(version)
+    modules = patterns.copy()
+    rows, cols = _data_positions(version)
+    bits = np.unpackbits(np.array(codewords, dtype=np.uint8))
+    modules[rows[:len(bits)], cols[:len(bits)]] = bits
+
+    masks = range(8) if mask is None else [mask]
+    candidates = modules ^ (_mask_patterns(len(modules))[list(masks)] & ~reserved)
+    for candidate, pattern in zip(candidates, masks):
+        _write_format(candidate, level, pattern)
+    matrix = candidates[int(np.argmin(_penalties(candidates))) if mask is None else 0].copy()
+    matrix.flags.writeable = False
+    return matrix
+
+
+def matrix(payload: str, level: str = DEFAULT_ERROR_LEVEL, mask: Optional[int] = None) -> np.ndarray:
+    if level not in ERROR_LEVELS:
+        raise QRCodeError(f"Unknown error correction level {level!r}, expected one of {ERROR_LEVELS}")
+    if mask is not None and not 0 <= mask <= 7:
+        raise QRCodeError(f"Mask pattern {mask} is outside 0-7")
+    if not payload:
+        raise QRCodeError("Empty QR code payload")
+    return _cached_matrix(payload, level, mask)
+
+
+# Dark modules as rectangles (col, row, width, height): runs along rows, merged down while the span repeats
+def rectangles(modules: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    changes = np.diff(np.pad(modules.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    rows, starts = np.nonzero(changes == 1)
+    ends = np.nonzero(changes == -1)[1]
+    open_runs: Dict[Tuple[int, int], List[int]] = {}  # span -> [first row, last row]
+    done: List[Tuple[int, int, int, int]] = []
+    for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+        run = open_runs.get((start, end))
+        if run is not None and run[1] == row - 1:
+            run[1] = row
+            continue
+        if run is not None:
+            done.append((start, run[0], end - start, run[1] - run[0] + 1))
+        open_runs[(start, end)] = [row, row]
+    done.extend((start, first, end - start, last - first + 1) for (start, end), (first, last) in open_runs.items())
+    return sorted(done, key=lambda rect: (rect[1], rect[0]))
+
+
+# Path data of a payload's code in module units, and its size in modules
+@lru_cache(maxsize=8192)
+def path_data(payload: str, level: str = DEFAULT_ERROR_LEVEL) -> Tuple[str, int]:
+    modules = matrix(payload, level)
+    return "".join(f"M{col} {row}h{width}v{height}h-{width}z"
+                   for col, row, width, height in rectangles(modules)), len(modules)
+
+
+# Add QR codes to a drawing, or to `parent`, a group in it: one filled path each, centred on its position
+def add_qr_codes(dwg: svgwrite.Drawing, elements: List[QRElement], level: str = DEFAULT_ERROR_LEVEL, parent=None):
+    if not elements:
+        return
+    group = dwg.g(fill="#000000")
+    for payload, x, y, size in elements:
+        d, modules = path_data(payload, level)
+        scale = size / modules
+        transform = f"translate({round(x - size / 2, 4)} {round(y - size / 2, 4)}) scale({scale:.6g})"
+        group.add(svgwrite.path.Path(d=d, transform=transform, debug=False))
+    (dwg if parent is None else parent).add(group)
+
+
+# Payload of a module's code from a URL template: {serial} (8 digits, the serial the business system
+# assigned, see production.py), {batch_id}, {order_number}, {pcb_type} and {product_name}. None when the
+# template needs a serial the module lacks.
+def module_payload(template: str, data: ProductionData) -> Optional[str]:
+    if data.serial is None and "{serial" in template:
+        return None
+    return template.format(serial=format_serial(data.serial) if data.serial is not None else "",
+                           batch_id=data.batch_id, order_number=data.order_number, pcb_type=data.pcb_type,
+                           product_name=data.product_name)
+
+
+# Payload of a fret's code from a URL template: {name} (the exported file's name without extension),
+# {batch_id} and {pcb_type}
+def fret_payload(template: str, name: str, data: ProductionData) -> str:
+    return template.format(name=name, batch_id=data.batch_id, pcb_type=data.pcb_type)
+
+
+def clear_cache():
+    _cached_matrix.cache_clear()
+    path_data.cache_clear()
+
+
+def cache_info() -> Dict[str, Any]:
+    return {'matrices': _cached_matrix.cache_info()._asdict(), 'paths': path_data.cache_info()._asdict()}
@@ -0,0 +1,321 @@
+"""Read engraved Micro-IDs back from fret scans and check their serial numbers.
+
+A scan is a PNG of one fret, the right way up as it sits in the fixture and
+cropped to the PCB outline: the layout's Width x Height around its
+CenterPoint. Its resolution follows from the image width; 25 px/mm (650 dpi)
+or more resolves the 0.1 mm dots. At every module's Micro-ID
+position the reader follows the decoding algorithm of the spec
+(quadica-micro-id-specs.md):
+
+- threshold the area around the position (Otsu's method);
+- find the code by its fixed dots, the four anchors and the orientation dot,
+  with the quiet zone around them clear, within `SEARCH` mm of the position;
+- fit an affine transform to the anchor centroids, failing with "Geometry fit
+  failed" beyond the spec's 0.015 mm placement tolerance;
+- sample the 25 cells and decode them, failing with "Read Error" on bad parity.
+
+Scans are named after the exported file of their fret, `1234_sz-04_007.png`
+for `1234_sz-04_007.svg`, or `1234_sz-04_001-006_bundle#fret-003.png` for one
+fret of a bundle; the production store records the serial number exported in
+each slot of that file, the one the business system assigned the module (see
+production.py). Slots whose export drew no Micro-ID (no serial, Micro-IDs
+off, or a LightBurn project) carry no code and are not read. Scans are read in parallel worker processes:
+
+    python -m layout_engine.scan_verify production.sqlite "Text Position Data" scans/*.png
+    python -m layout_engine.scan_verify production.sqlite layouts scans/*.png -j 4 -o report.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from . import layout_logging
+from .errors import LayoutEngineError
+from .layout import compile_layout
+from .micro_id import ANCHORS, CODE_SIZE, DOT_PITCH, EDGE_OFFSET, GRID_SIZE, ORIENTATION_DOT, decode
+from .store import ProductionStore
+
+log = logging.getLogger(layout_logging.SCAN_VERIFY)
+
+SEARCH = 0.3  # mm a code may sit from its layout position
+FIT_TOLERANCE = 0.015  # mm, the spec's dot placement tolerance
+SAMPLE_SIZE = 0.06  # mm, side of the square averaged at each dot position
+MIN_CONTRAST = 0.15  # between dots and background, below which there is no code to read
+
+ANCHORS_NOT_FOUND = "Anchors not found"
+ORIENTATION_NOT_DETECTED = "Orientation not detected"
+GEOMETRY_FIT_FAILED = "Geometry fit failed"
+READ_ERROR = "Read Error"
+
+REPORT_NAME = "scan_report.json"
+
+
+def _cell_center(row: int, col: int) -> Tuple[float, float]:
+    return EDGE_OFFSET + col * DOT_PITCH, EDGE_OFFSET + row * DOT_PITCH
+
+
+# Dot positions in mm from the grid's top-left corner
+_CELLS = np.array([_cell_center(row, col) for row in range(GRID_SIZE) for col in range(GRID_SIZE)])
+_ANCHOR_POINTS = np.array([_cell_center(row, col) for row, col in ANCHORS])
+_FIXED_POINTS = np.vstack([_ANCHOR_POINTS, [ORIENTATION_DOT]])
+# One pitch outside the outer dots, always clear: a code found one pitch off would put dots here
+_RING_POINTS = np.array([_cell_center(-1, i) for i in range(GRID_SIZE)]
+                        + [_cell_center(GRID_SIZE, i) for i in range(GRID_SIZE)]
+                        + [_cell_center(i, GRID_SIZE) for i in range(GRID_SIZE)]
+                        + [_cell_center(i, -1) for i in range(1, GRID_SIZE)])
+
+
+class ScanError(LayoutEngineError):
+    pass
+
+
+@dataclass
+class SlotResult:
+    slot: int
+    expected: int
+    read: Optional[int] = None  # None when the code could not be read
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.read == self.expected
+
+
+# Darkness of a scan, 0 (white) to 1 (black)
+def load_scan(path: str) -> np.ndarray:
+    try:
+        with Image.open(path) as image:
+            return 1.0 - np.asarray(image.convert('L'), dtype=np.float32) / 255.0
+    except OSError as e:
+        raise ScanError(f"Could not read scan {path}: {e}") from e
+
+
+# Threshold between dots and background by Otsu's method
+def _otsu(values: np.ndarray) -> float:
+    counts, edges = np.histogram(values, bins=64, range=(0.0, 1.0))
+    centers = (edges[:-1] + edges[1:]) / 2
+    weight = np.cumsum(counts)
+    total = weight[-1]
+    mean = np.cumsum(counts * centers)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (mean[-1] * weight / total - mean) ** 2 / (weight * (total - weight))
+    return float(centers[np.nanargmax(between[:-1])])
+
+
+# Fraction of marked pixels in squares of `radius` pixels around each point, from a summed-area table
+def _box_means(table: np.ndarray, xs: np.ndarray, ys: np.ndarray, radius: int) -> np.ndarray:
+    height, width = table.shape[0] - 1, table.shape[1] - 1
+    x, y = np.floor(xs).astype(int), np.floor(ys).astype(int)
+    x0, x1 = np.clip(x - radius, 0, width), np.clip(x + radius + 1, 0, width)
+    y0, y1 = np.clip(y - radius, 0, height), np.clip(y + radius + 1, 0, height)
+    area = np.maximum((x1 - x0) * (y1 - y0), 1)
+    return (table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]) / area
+
+
+# Dot grid of the code centred near (x, y) pixels, or the reason it cannot be read
+def _read_grid(darkness: np.ndarray, x: float, y: float, scale: float) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    # Work on the code, its quiet zone and the search margin
+    half = (CODE_SIZE / 2 + DOT_PITCH + SEARCH) * scale
+    left, top = max(int(x - half), 0), max(int(y - half), 0)
+    window = darkness[top:int(y + half) + 1, left:int(x + half) + 1]
+    if window.size == 0:
+        return None, ANCHORS_NOT_FOUND
+    marked = window > _otsu(window)
+    # Noise on a blank area splits too, into two classes of nearly the same darkness
+    if not marked.any() or marked.all() or float(window[marked].mean() - window[~marked].mean()) < MIN_CONTRAST:
+        return None, ANCHORS_NOT_FOUND
+    table = np.pad(marked.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0))).astype(np.float32)
+    radius = max(int(SAMPLE_SIZE / 2 * scale), 0)
+
+    # Every candidate position of the grid's top-left corner at once: fixed dots dark, ring clear
+    reach = int(round(SEARCH * scale))
+    shifts = np.arange(-reach, reach + 1)
+    corner_x = x - left - CODE_SIZE / 2 * scale + shifts[None, :, None]
+    corner_y = y - top - CODE_SIZE / 2 * scale + shifts[:, None, None]
+    fixed = _box_means(table, corner_x + _FIXED_POINTS[:, 0] * scale, corner_y + _FIXED_POINTS[:, 1] * scale, radius)
+    ring = _box_means(table, corner_x + _RING_POINTS[:, 0] * scale, corner_y + _RING_POINTS[:, 1] * scale, radius)
+    best = np.unravel_index(np.argmax(fixed.mean(axis=2) - ring.mean(axis=2)), fixed.shape[:2])
+    if fixed[best][:len(ANCHORS)].min() < 0.5:
+        return None, ANCHORS_NOT_FOUND
+    if fixed[best][len(ANCHORS)] < 0.5:
+        return None, ORIENTATION_NOT_DETECTED
+    corner = np.array([corner_x[0, best[1], 0], corner_y[best[0], 0, 0]])
+
+    # Anchor centroids, each within half a pitch of where the search put it
+    reach = max(int(DOT_PITCH / 2 * scale), 1)
+    centroids = []
+    for point in corner + _ANCHOR_POINTS * scale:
+        px, py = int(point[0]), int(point[1])
+        x0, y0 = max(px - reach, 0), max(py - reach, 0)
+        rows, cols = np.nonzero(marked[y0:py + reach + 1, x0:px + reach + 1])
+        if not rows.size:
+            return None, ANCHORS_NOT_FOUND
+        centroids.append((x0 + cols.mean() + 0.5, y0 + rows.mean() + 0.5))
+
+    # Least-squares affine transform from grid mm to window pixels. A centroid is only known to about
+    # half a pixel, so coarse scans are held to that rather than to the spec's tolerance.
+    ideal = np.hstack([_ANCHOR_POINTS, np.ones((len(ANCHORS), 1))])
+    transform, *_ = np.linalg.lstsq(ideal, np.array(centroids), rcond=None)
+    residual = np.hypot(*(ideal @ transform - centroids).T).max() / scale
+    if residual > max(FIT_TOLERANCE, 0.5 / scale):
+        return None, GEOMETRY_FIT_FAILED
+
+    cells = np.hstack([_CELLS, np.ones((len(_CELLS), 1))]) @ transform
+    values = _box_means(table, cells[:, 0], cells[:, 1], radius)
+    return (values >= 0.5).astype(np.uint8).reshape(GRID_SIZE, GRID_SIZE), None
+
+
+# Read the Micro-IDs of a fret scan (`load_scan`) at the layout's positions: {slot: (serial, error)},
+# serial None when unreadable. With `slots` only those modules are read.
+def read_micro_ids(darkness: np.ndarray, layout: Dict[str, Any],
+                   slots: Optional[Collection[int]] = None) -> Dict[int, Tuple[Optional[int], Optional[str]]]:
+    width, height = float(layout['Width']), float(layout['Height'])
+    scale = darkness.shape[1] / width
+    if abs(darkness.shape[0] / scale - height) > 0.02 * height:
+        raise ScanError(f"A {darkness.shape[1]} x {darkness.shape[0]} px scan is not the shape of the "
+                        f"{width:g} x {height:g} mm PCB outline")
+    left = float(layout['CenterPoint']['x']) - width / 2
+    top = float(layout['CenterPoint']['y']) - height / 2
+
+    results: Dict[int, Tuple[Optional[int], Optional[str]]] = {}
+    grids: Dict[int, np.ndarray] = {}
+    for i, module in enumerate(layout['Modules']):
+        position = module.get('micro_id_position')
+        if not position or (slots is not None and i not in slots):
+            continue
+        grid, error = _read_grid(darkness, (float(position['x']) - left) * scale,
+                                 (float(position['y']) - top) * scale, scale)
+        if grid is None:
+            results[i] = (None, error)
+        else:
+            grids[i] = grid
+    if grids:
+        serials, valid = decode(np.stack(list(grids.values())))
+        for i, serial, ok in zip(grids, serials.tolist(), valid.tolist()):
+            results[i] = (serial, None) if ok else (None, READ_ERROR)
+    return dict(sorted(results.items()))
+
+
+# Check one scan against the serial numbers expected in its slots
+def verify_scan(path: str, layout: Dict[str, Any], expected: Dict[int, int]) -> List[SlotResult]:
+    read = read_micro_ids(load_scan(path), layout, expected)
+    results = []
+    for slot, serial in sorted(expected.items()):
+        found, error = read.get(slot, (None, "No Micro-ID position in the layout"))
+        results.append(SlotResult(slot, serial, found, error))
+    return results
+
+
+# Worker entry point: a scan's report entry
+def _verify_entry(path: str, layout: Dict[str, Any], expected: Dict[int, int]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    entry: Dict[str, Any] = {'scan': os.path.basename(path)}
+    try:
+        slots = verify_scan(path, layout, expected)
+    except LayoutEngineError as e:
+        entry['error'] = str(e)
+        return entry
+    entry['slots'] = [dict(asdict(result), ok=result.ok) for result in slots]
+    entry['mismatches'] = sum(not result.ok for result in slots)
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+# Check many scans, each (path, layout, expected serials by slot), in `jobs` worker processes
+def verify_scans(scans: List[Tuple[str, Dict[str, Any], Dict[int, int]]],
+                 jobs: Optional[int] = None) -> List[Dict[str, Any]]:
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(scans) or 1))
+    if jobs == 1:
+        return [_verify_entry(*scan) for scan in scans]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_verify_entry, *scan) for scan in scans]
+        return [future.result() for future in futures]
+
+
+# Exported file name a scan stands for: the fret's SVG, or a fret of a bundle; LightBurn projects carry no codes
+def _export_name(scan_path: str) -> str:
+    stem = os.path.splitext(os.path.basename(scan_path))[0]
+    base, _, fret = stem.partition('#')
+    return base + ".svg" + (f"#{fret}" if fret else "")
+
+
+# The layout and expected serials of each scan, from the production store
+def plan_scans(store: ProductionStore, layout_dir: str,
+               scan_paths: List[str]) -> Tuple[List[Tuple[str, Dict[str, Any], Dict[int, int]]], List[Dict[str, Any]]]:
+    layouts: Dict[str, Dict[str, Any]] = {}
+    scans, skipped = [], []
+    for path in scan_paths:
+        rows = store.fret_modules(_export_name(path))
+        if not rows:
+            skipped.append({'scan': os.path.basename(path), 'error': "No export of this fret in the production store"})
+            continue
+        if len({row['slot'] for row in rows}) < len(rows):
+            # Nested loads record every fret of the load under one file name
+            skipped.append({'scan': os.path.basename(path), 'error': "The file holds several frets"})
+            continue
+        pcb_type = str(rows[0]['pcb_type'])
+        if pcb_type not in layouts:
+            layouts[pcb_type] = compile_layout(pcb_type, layout_dir)
+        modules = layouts[pcb_type]['Modules']
+        expected = {int(row['slot']): int(row['serial']) for row in rows
+                    if row['micro_id'] and modules[int(row['slot'])].get('micro_id_position')}
+        if not expected:
+            skipped.append({'scan': os.path.basename(path), 'error': "No Micro-ID was exported on this fret"})
+            continue
+        scans.append((path, layouts[pcb_type], expected))
+    return scans, skipped
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check the Micro-IDs of engraved frets from scans")
+    parser.add_argument('store', help="production store (SQLite) the frets were exported with")
+    parser.add_argument('layout_dir', help="Text Position Data folder with one <pcb>.csv layout per PCB type")
+    parser.add_argument('scans', nargs='+', help="PNG scans named after the exported files")
+    parser.add_argument('-j', '--jobs', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('-o', '--output', default=REPORT_NAME, help=f"report JSON (default: {REPORT_NAME})")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+    start = time.perf_counter()
+    try:
+        store = ProductionStore(args.store)
+        try:
+            scans, entries = plan_scans(store, args.layout_dir, args.scans)
+        finally:
+            store.close()
+        entries.extend(verify_scans(scans, args.jobs))
+    except Exception as e:
+        log.error(f"Scan verification failed: {e}")
+        return 1
+
+    for entry in entries:
+        if 'error' in entry:
+            log.error(f"{entry['scan']}: {entry['error']}")
+        for result in entry.get('slots', []):
+            if not result['ok']:
+                found = result['error'] or f"read {result['read']:08d}"
+                log.warning(f"{entry['scan']} slot {result['slot'] + 1}: expected {result['expected']:08d}, {found}")
+    with open(args.output, 'w') as f:
+        json.dump({'seconds': round(time.perf_counter() - start, 3), 'scans': entries}, f, indent=2)
+
+    checked = [entry for entry in entries if 'slots' in entry]
+    slots = sum(len(entry['slots']) for entry in checked)
+    mismatches = sum(entry['mismatches'] for entry in checked)
+    print(f"{len(checked)} of {len(entries)} scans checked, {slots} codes, {mismatches} mismatches "
+          f"in {time.perf_counter() - start:.2f}s -> {args.output}")
+    return 1 if mismatches or len(checked) < len(entries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,521 @@
+"""Long-running local layout/export service.
+
+Keeps compiled layouts, the PCB list and PCB type resolutions in memory and
+renders fret SVGs for other systems (e.g. the qsa-engraving plugin) without a
+Python cold start per request. Listens on localhost HTTP or a Unix socket.
+
+    python -m layout_engine.service "Text Position Data" --pcb-list pcbs.csv --port 8765
+
+Endpoints (JSON bodies):
+
+    POST /render       {"pcb_type", "modules": [...], "faulty": [slot, ...]} -> one fret as SVG
+    POST /jobs         {"pcb_type", "modules": [...]} -> 202 {"job_id"}; frets are planned and rendered
+    GET  /jobs/<id>    job status and fret list
+    GET  /jobs/<id>/<n> SVG of fret n (1-based)
+    POST /reload       drop cached layouts and re-read the PCB list
+    GET  /health       queue, cache and worker counts
+    GET  /metrics      request timings in the Prometheus text format
+
+A module is {"led_codes": [...], "lens_code", "connector_code", "order_number",
+"batch_id", "product_name"}; only "led_codes" is required. "pcb_type" may be
+replaced by a "product_name" to resolve; either way the type must be on the
+PCB list, or the request is rejected with 400. Render requests arriving within
+`batch_window` of each other are grouped per PCB type into one worker task.
+"""
+
+import argparse
+import io
+import itertools
+import json
+import logging
+import os
+import queue
+import re
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import layout_logging, layout_metrics
+from .bulk_export import PCB_LIST_URL, read_available_pcbs
+from .errors import LayoutError
+from .layout import apply_offsets, compile_layout
+from .models import ProductionData
+from .planner import empty_instance, plan_instances
+from .production import determine_pcb_type
+from .svg_export import render_svg
+
+log = logging.getLogger(layout_logging.SERVICE)
+
+DEFAULT_PORT = 8765
+RENDER_TIMEOUT = 30.0  # seconds a /render request waits for its SVG
+MAX_JOBS = 200  # finished jobs kept for download
+
+# A PCB type names a layout file, so it must not reach outside the layout directory
+PLAIN_NAME = re.compile(r'[^./\\\x00][^/\\\x00]*')
+
+# One fret to render: faulty slot flags and the production rows in slot order
+RenderItem = Tuple[List[bool], List[ProductionData]]
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# Render frets of one layout to SVG text; runs in a worker process
+def render_frets(layout: Dict[str, Any], items: List[RenderItem]) -> List[str]:
+    svgs = []
+    for faulty, data in items:
+        instance = empty_instance(layout)
+        instance.faulty_modules = faulty
+        instance.data = data
+        output = io.StringIO()
+        render_svg(layout, instance, "fret.svg").write(output)
+        svgs.append(output.getvalue())
+    return svgs
+
+
+class LayoutCache:
+    """Compiled layouts with offsets applied, recompiled when the layout CSV changes."""
+
+    def __init__(self, layout_dir: str, available_pcbs: Dict[str, Dict[str, float]], max_entries: int = 128):
+        self.layout_dir = layout_dir
+        self.available_pcbs = available_pcbs
+        self.max_entries = max_entries
+        self._layouts: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._layouts)
+
+    def get(self, pcb_type: str) -> Dict[str, Any]:
+        if not PLAIN_NAME.fullmatch(pcb_type):
+            raise LayoutError(f"Invalid PCB type {pcb_type!r}")
+        path = os.path.join(self.layout_dir, f"{pcb_type}.csv")
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            raise LayoutError(f"No layout found for PCB type {pcb_type}")
+
+        with self._lock:
+            cached = self._layouts.get(pcb_type)
+            if cached and cached[0] == mtime:
+                self._layouts.move_to_end(pcb_type)
+                return cached[1]
+
+        layout = apply_offsets(compile_layout(pcb_type, self.layout_dir), pcb_type, self.available_pcbs)
+        with self._lock:
+            self._layouts[pcb_type] = (mtime, layout)
+            while len(self._layouts) > self.max_entries:
+                self._layouts.popitem(last=False)
+        return layout
+
+    def reset(self, available_pcbs: Dict[str, Dict[str, float]]):
+        with self._lock:
+            self.available_pcbs = available_pcbs
+            self._layouts.clear()
+
+
+class RenderBatcher:
+    """Groups single-fret render requests per PCB type and hands them to the worker pool."""
+
+    def __init__(self, pool, layouts: LayoutCache, window: float, max_batch: int, max_pending: int):
+        self.pool = pool
+        self.layouts = layouts
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.pending = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+        self._queue: 'queue.SimpleQueue[Optional[Tuple[str, RenderItem, Future]]]' = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._dispatch_loop, name="render-batcher", daemon=True)
+        self._thread.start()
+
+    # Reserve room for `count` frets or refuse the request
+    def reserve(self, count: int = 1):
+        with self._lock:
+            if self.pending + count > self.max_pending:
+                raise ServiceBusy(f"{self.pending} frets already queued")
+            self.pending += count
+
+    def release(self, count: int = 1):
+        with self._lock:
+            self.pending -= count
+
+    def submit(self, pcb_type: str, item: RenderItem) -> Future:
+        self.reserve()
+        future = Future()
+        future.add_done_callback(lambda _: self.release())
+        self._queue.put((pcb_type, item, future))
+        return future
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2.0)
+
+    def _dispatch_loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self._queue.put(None)
+                    break
+                batch.append(entry)
+
+            groups: Dict[str, List[Tuple[RenderItem, Future]]] = {}
+            for pcb_type, item, future in batch:
+                groups.setdefault(pcb_type, []).append((item, future))
+            for pcb_type, entries in groups.items():
+                self._submit_group(pcb_type, entries)
+
+    def _submit_group(self, pcb_type: str, entries: List[Tuple[RenderItem, Future]]):
+        try:
+            layout = self.layouts.get(pcb_type)
+            task = self.pool.submit(render_frets, layout, [item for item, _ in entries])
+        except Exception as e:
+            for _, future in entries:
+                future.set_exception(e)
+            return
+        self.batches += 1
+
+        def deliver(task: Future):
+            error = task.exception()
+            for index, (_, future) in enumerate(entries):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(task.result()[index])
+        task.add_done_callback(deliver)
+
+
+class Job:
+    def __init__(self, job_id: str, pcb_type: str, frets: int):
+        self.job_id = job_id
+        self.pcb_type = pcb_type
+        self.frets = frets
+        self.status = 'queued'
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.svgs: List[str] = []
+        self.error: Optional[str] = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'pcb_type': self.pcb_type,
+            'status': self.status,
+            'frets': self.frets,
+            'error': self.error,
+            'seconds': round(self.finished - self.created, 3) if self.finished else None,
+            'files': [f"/jobs/{self.job_id}/{n}" for n in range(1, len(self.svgs) + 1)],
+        }
+
+
+class LayoutService:
+    def __init__(self, layout_dir: str, pcb_list: str, workers: int,
+                 batch_window: float = 0.005, max_batch: int = 32, max_pending: int = 512):
+        self.pcb_list = pcb_list
+        self.available_pcbs = read_available_pcbs(pcb_list)
+        self.layouts = LayoutCache(layout_dir, self.available_pcbs)
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.batcher = RenderBatcher(self.pool, self.layouts, batch_window, max_batch, max_pending)
+        self.jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._job_ids = itertools.count(1)
+        self._jobs_lock = threading.Lock()
+        self._resolved: Dict[str, str] = {}
+        self.counts = {'render': 0, 'jobs': 0, 'errors': 0, 'busy': 0}
+        self._counts_lock = threading.Lock()
+        layout_metrics.enable()
+
+    # Count a request outcome; request threads call this concurrently
+    def count(self, name: str):
+        with self._counts_lock:
+            self.counts[name] += 1
+
+    def close(self):
+        self.batcher.stop()
+        self.pool.shutdown(cancel_futures=True)
+
+    def reload(self):
+        self.available_pcbs = read_available_pcbs(self.pcb_list)
+        self.layouts.reset(self.available_pcbs)
+        self._resolved = {}
+
+    # PCB type from the request, or resolved (and remembered) from a product name; only types on the PCB list
+    def pcb_type_for(self, payload: Dict[str, Any]) -> str:
+        pcb_type = payload.get('pcb_type')
+        product_name = payload.get('product_name')
+        if pcb_type:
+            if not isinstance(pcb_type, str):
+                raise RequestError(400, "pcb_type must be a string")
+        elif not product_name:
+            raise RequestError(400, "pcb_type or product_name is required")
+        elif not isinstance(product_name, str):
+            raise RequestError(400, "product_name must be a string")
+        else:
+            if product_name not in self._resolved:
+                self._resolved[product_name] = determine_pcb_type(product_name, self.available_pcbs)
+            pcb_type = self._resolved[product_name]
+        if not PLAIN_NAME.fullmatch(pcb_type) or pcb_type.lower() not in self.available_pcbs:
+            raise RequestError(400, f"Unknown PCB type {pcb_type!r}")
+        return pcb_type
+
+    @staticmethod
+    def production_rows(pcb_type: str, payload: Dict[str, Any]) -> List[ProductionData]:
+        modules = payload.get('modules')
+        if not isinstance(modules, list) or not modules:
+            raise RequestError(400, "modules must be a non-empty list")
+        rows = []
+        for module in modules:
+            led_codes = module.get('led_codes') if isinstance(module, dict) else None
+            if not isinstance(led_codes, list) or not all(isinstance(code, str) for code in led_codes):
+                raise RequestError(400, "every module needs a led_codes list of strings")
+            for field in ('product_name', 'lens_code', 'connector_code'):
+                if not isinstance(module.get(field), (str, type(None))):
+                    raise RequestError(400, f"module {field} must be a string")
+            rows.append(ProductionData(
+                product_name=module.get('product_name') or f"{pcb_type}-{''.join(led_codes)}",
+                pcb_type=pcb_type,
+                batch_id=str(module.get('batch_id', payload.get('batch_id', ''))),
+                order_number=str(module.get('order_number', '')),
+                led_codes=led_codes,
+                lens_code=module.get('lens_code'),
+                connector_code=module.get('connector_code'),
+            ))
+        return rows
+
+    # Render one fret and wait for the SVG
+    def render(self, payload: Dict[str, Any]) -> str:
+        with layout_metrics.span("service_render"):
+            pcb_type = self.pcb_type_for(payload)
+            layout = self.layouts.get(pcb_type)
+            rows = self.production_rows(pcb_type, payload)
+            slots = len(layout['Modules'])
+            faulty = [False] * slots
+            faulty_slots = payload.get('faulty', [])
+            if not isinstance(faulty_slots, list):
+                raise RequestError(400, "faulty must be a list of slot numbers")
+            for slot in faulty_slots:
+                if isinstance(slot, bool) or not isinstance(slot, int) or not 0 <= slot < slots:
+                    raise RequestError(400, f"faulty slot {slot!r} is not in 0..{slots - 1}")
+                faulty[slot] = True
+            if len(rows) > faulty.count(False):
+                raise RequestError(400, f"{len(rows)} modules do not fit the {faulty.count(False)} free slots "
+                                        f"of a {pcb_type} fret; use /jobs")
+            svg = self.batcher.submit(pcb_type, (faulty, rows)).result(timeout=RENDER_TIMEOUT)
+        self.count('render')
+        return svg
+
+    # Plan all frets for the modules and render them in the background
+    def submit_job(self, payload: Dict[str, Any]) -> Job:
+        pcb_type = self.pcb_type_for(payload)
+        layout = self.layouts.get(pcb_type)
+        rows = self.production_rows(pcb_type, payload)
+        instances = plan_instances(rows, pcb_type, layout)
+        self.batcher.reserve(len(instances))
+        try:
+            task = self.pool.submit(render_frets, layout, [(i.faulty_modules, i.data) for i in instances])
+        except Exception:
+            # A broken pool must not keep the room reserved, or the service would soon refuse everything
+            self.batcher.release(len(instances))
+            raise
+
+        job = Job(str(next(self._job_ids)), pcb_type, len(instances))
+        with self._jobs_lock:
+            self.jobs[job.job_id] = job
+            self._trim_jobs()
+        job.status = 'running'
+
+        def finish(task: Future):
+            self.batcher.release(len(instances))
+            job.finished = time.time()
+            layout_metrics.observe("service_job", job.finished - job.created)
+            if task.exception() is not None:
+                job.status, job.error = 'failed', str(task.exception())
+            else:
+                job.status, job.svgs = 'done', task.result()
+        task.add_done_callback(finish)
+        self.count('jobs')
+        return job
+
+    def _trim_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ('done', 'failed')]
+        for job_id in finished[:max(0, len(self.jobs) - MAX_JOBS)]:
+            del self.jobs[job_id]
+
+    def health(self) -> Dict[str, Any]:
+        with self._counts_lock:
+            counts = dict(self.counts)
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'pending_frets': self.batcher.pending,
+            'batches': self.batcher.batches,
+            'layouts_cached': len(self.layouts),
+            'pcb_types_known': len(self.available_pcbs),
+            'jobs': len(self.jobs),
+            'counts': counts,
+        }
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    service: LayoutService = None
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path == '/health':
+            self._send_json(200, self.service.health())
+        elif path == '/metrics':
+            self._send(200, layout_metrics.render_prometheus().encode(), 'text/plain; version=0.0.4')
+        elif match := re.fullmatch(r'/jobs/(\w+)(?:/(\d+))?', path):
+            job = self.service.jobs.get(match.group(1))
+            if job is None:
+                self._send_json(404, {'error': "unknown job"})
+            elif match.group(2) is None:
+                self._send_json(200, job.describe())
+            elif not 1 <= int(match.group(2)) <= len(job.svgs):
+                self._send_json(404, {'error': "no such fret (job not finished?)"})
+            else:
+                self._send(200, job.svgs[int(match.group(2)) - 1].encode(), 'image/svg+xml')
+        else:
+            self._send_json(404, {'error': "not found"})
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        try:
+            payload = self._read_json()
+            if path == '/render':
+                self._send(200, self.service.render(payload).encode(), 'image/svg+xml')
+            elif path == '/jobs':
+                job = self.service.submit_job(payload)
+                self._send_json(202, job.describe())
+            elif path == '/reload':
+                self.service.reload()
+                self._send_json(200, self.service.health())
+            else:
+                self._send_json(404, {'error': "not found"})
+        except RequestError as e:
+            self._fail(e.status, str(e))
+        except LayoutError as e:
+            self._fail(404, str(e))
+        except ServiceBusy as e:
+            self.service.count('busy')
+            self._send_json(503, {'error': f"Service busy: {e}"}, {'Retry-After': '1'})
+        except FutureTimeout:
+            self._fail(504, "Render timed out")
+        except Exception as e:
+            log.exception(f"Request to {path} failed")
+            self._fail(500, str(e))
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            raise RequestError(400, f"Invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise RequestError(400, "Request body must be a JSON object")
+        return payload
+
+    def _fail(self, status: int, message: str):
+        self.service.count('errors')
+        self._send_json(status, {'error': message})
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(body).encode(), 'application/json', headers)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug(format, *args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+# Serve `service` on localhost `port`, or on the Unix socket at `socket_path`
+def make_server(service: LayoutService, port: int = DEFAULT_PORT, socket_path: Optional[str] = None):
+    handler = type('ServiceHandler', (_ServiceHandler,), {'service': service})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return _UnixHTTPServer(socket_path, handler)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve layout rendering for other local systems")
+    parser.add_argument('layout_dir', help="Text Position Data folder")
+    parser.add_argument('--pcb-list', default=PCB_LIST_URL, help="PCB list URL or CSV file (offsets)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', help="listen on this Unix socket instead of a TCP port")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="render worker processes")
+    parser.add_argument('--batch-window-ms', type=float, default=5.0,
+                        help="how long to gather render requests into one batch")
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--max-pending', type=int, default=512, help="frets queued before returning 503")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+    service = LayoutService(args.layout_dir, args.pcb_list, args.workers,
+                            batch_window=args.batch_window_ms / 1000, max_batch=args.max_batch,
+                            max_pending=args.max_pending)
+    server = make_server(service, args.port, args.socket)
+    # Stop the worker processes too when the service is terminated
+    signal.signal(signal.SIGTERM, _interrupt)
+    log.info(f"Layout service listening on {args.socket or f'http://127.0.0.1:{args.port}'} "
+             f"with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""Optional SQLite production store.
+
+Ingests `production list.csv` (and modules added in the layout app) into
+indexed tables so the viewer reads only the batches and PCB type it is working
+on, however much history the database holds:
+
+    batches           one row per batch ID seen
+    orders            (batch_id, order_number)
+    modules           one row per module; CSV rows keep their ID across re-imports (by row key), and
+                      their Micro-ID serial from the production list (see production.py)
+    exports           one row per written file (or bundle fret), so its latest export can be told apart
+    fret_assignments  which export and slot each module was engraved in, with its serial and whether
+                      that export drew its Micro-ID
+    imports           size/mtime of the last import of each CSV, so unchanged files are skipped
+
+The database runs in WAL mode so several readers (stations, reports) can use
+it while one process writes.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from . import layout_logging, layout_metrics
+from .models import PCBInstance, ProductionData
+from .production import load_production_data
+
+log = logging.getLogger(layout_logging.DATA)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    batch_id TEXT NOT NULL,
+    order_number TEXT NOT NULL,
+    PRIMARY KEY (batch_id, order_number)
+);
+CREATE INDEX IF NOT EXISTS orders_order_number ON orders (order_number);
+CREATE TABLE IF NOT EXISTS modules (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    batch_id TEXT NOT NULL,
+    order_number TEXT,
+    product_name TEXT,
+    pcb_type TEXT,
+    led_codes TEXT,
+    lens_code TEXT,
+    connector_code TEXT,
+    serial INTEGER,
+    seq INTEGER NOT NULL,
+    present INTEGER NOT NULL DEFAULT 1,
+    created TEXT NOT NULL,
+    UNIQUE (source, batch_id, row_key)
+);
+CREATE INDEX IF NOT EXISTS modules_batch_type ON modules (batch_id, pcb_type, present);
+CREATE INDEX IF NOT EXISTS modules_pcb_type ON modules (pcb_type);
+CREATE INDEX IF NOT EXISTS modules_order_number ON modules (order_number);
+CREATE TABLE IF NOT EXISTS fret_assignments (
+    id INTEGER PRIMARY KEY,
+    module_id INTEGER NOT NULL REFERENCES modules (id),
+    batch_id TEXT NOT NULL,
+    pcb_type TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    serial INTEGER,
+    micro_id INTEGER,
+    export_id INTEGER,
+    assigned_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fret_assignments_module ON fret_assignments (module_id);
+CREATE INDEX IF NOT EXISTS fret_assignments_batch_type ON fret_assignments (batch_id, pcb_type);
+CREATE TABLE IF NOT EXISTS exports (
+    id INTEGER PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    exported_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS exports_file_name ON exports (file_name);
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    imported_at TEXT NOT NULL,
+    batch_ids TEXT NOT NULL
+);
+"""
+
+# Columns added after the first schema, added to stores created without them: (table, column, type)
+ADDED_COLUMNS = [
+    ("modules", "serial", "INTEGER"),
+    ("fret_assignments", "serial", "INTEGER"),
+    ("fret_assignments", "micro_id", "INTEGER"),
+    ("fret_assignments", "export_id", "INTEGER"),
+]
+# Indexes on added columns, created once the columns exist
+ADDED_INDEXES = """
+CREATE INDEX IF NOT EXISTS fret_assignments_export ON fret_assignments (export_id);
+"""
+
+CSV_SOURCE = "csv"
+MANUAL_SOURCE = "manual"
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class ProductionStore:
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._add_columns()
+        self.conn.executescript(ADDED_INDEXES)
+
+    def _add_columns(self):
+        for table, column, column_type in ADDED_COLUMNS:
+            if column not in {row['name'] for row in self.conn.execute(f"PRAGMA table_info({table})")}:
+                with self.conn:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def close(self):
+        self.conn.close()
+
+    # Import the production list unless it is unchanged since the last import; returns True if imported
+    @layout_metrics.timed("store_import")
+    def import_csv(self, file_path: str, available_pcbs: Dict[str, Dict[str, float]], ir_leds: List[str],
+                   force: bool = False) -> bool:
+        key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        previous = self.conn.execute("SELECT mtime, size FROM imports WHERE path = ?", (key,)).fetchone()
+        if not force and previous and previous['mtime'] == stat.st_mtime and previous['size'] == stat.st_size:
+            return False
+
+        production_data = load_production_data(file_path, available_pcbs, ir_leds)
+        batch_ids = sorted({data.batch_id for data in production_data})
+        now = _now()
+        with self.conn:
+            # Rows that disappeared from the list are kept (with their fret history) but hidden
+            self.conn.executemany("UPDATE modules SET present = 0 WHERE source = ? AND batch_id = ?",
+                                  [(CSV_SOURCE, batch_id) for batch_id in batch_ids])
+            self.conn.executemany(
+                "INSERT INTO modules (source, row_key, batch_id, order_number, product_name, pcb_type, led_codes,"
+                " lens_code, connector_code, serial, seq, present, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)"
+                " ON CONFLICT (source, batch_id, row_key) DO UPDATE SET"
+                " seq = excluded.seq, pcb_type = excluded.pcb_type, serial = COALESCE(excluded.serial, serial),"
+                " present = 1",
+                [(CSV_SOURCE, data.row_key, data.batch_id, data.order_number, data.product_name, data.pcb_type,
+                  ",".join(data.led_codes), data.lens_code, data.connector_code, data.serial, seq, now)
+                 for seq, data in enumerate(production_data)])
+            self._record_batches_and_orders(production_data, now)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO imports (path, mtime, size, imported_at, batch_ids) VALUES (?, ?, ?, ?, ?)",
+                (key, stat.st_mtime, stat.st_size, now, json.dumps(batch_ids)))
+        log.info(f"Imported {len(production_data)} modules in {len(batch_ids)} batches into {self.path}")
+        return True
+
+    def _record_batches_and_orders(self, production_data: Iterable[ProductionData], now: str):
+        rows = list(production_data)
+        self.conn.executemany(
+            "INSERT INTO batches (batch_id, first_seen, last_seen) VALUES (?, ?, ?)"
+            " ON CONFLICT (batch_id) DO UPDATE SET last_seen = excluded.last_seen",
+            [(batch_id, now, now) for batch_id in {data.batch_id for data in rows}])
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO orders (batch_id, order_number) VALUES (?, ?)",
+            {(data.batch_id, data.order_number) for data in rows})
+
+    # Batches listed in the last import of `file_path`
+    def current_batches(self, file_path: str) -> List[str]:
+        row = self.conn.execute("SELECT batch_ids FROM imports WHERE path = ?",
+                                (os.path.abspath(file_path),)).fetchone()
+        return json.loads(row['batch_ids']) if row else []
+
+    # Modules of the given batches (and PCB type), CSV rows in list order then layout-app additions
+    @layout_metrics.timed("store_query")
+    def modules(self, batch_ids: Sequence[str], pcb_type: Optional[str] = None) -> List[ProductionData]:
+        if not batch_ids:
+            return []
+        placeholders = ",".join("?" * len(batch_ids))
+        query = (f"SELECT * FROM modules WHERE batch_id IN ({placeholders}) AND present = 1"
+                 + (" AND pcb_type = ?" if pcb_type else "")
+                 + " ORDER BY batch_id, source = 'manual', seq")
+        params = list(batch_ids) + ([pcb_type] if pcb_type else [])
+        return [ProductionData(
+            product_name=row['product_name'],
+            pcb_type=row['pcb_type'],
+            batch_id=row['batch_id'],
+            order_number=row['order_number'],
+            led_codes=row['led_codes'].split(",") if row['led_codes'] else [],
+            lens_code=row['lens_code'],
+            connector_code=row['connector_code'],
+            module_id=row['id'],
+            serial=row['serial'],
+            row_key=row['row_key'] if row['source'] == CSV_SOURCE else None,
+        ) for row in self.conn.execute(query, params)]
+
+    # PCB types present in the given batches
+    def pcb_types(self, batch_ids: Sequence[str]) -> List[str]:
+        if not batch_ids:
+            return []
+        placeholders = ",".join("?" * len(batch_ids))
+        return [row[0] for row in self.conn.execute(
+            f"SELECT DISTINCT pcb_type FROM modules WHERE batch_id IN ({placeholders}) AND present = 1",
+            list(batch_ids))]
+
+    # Store a module added in the layout app; sets its module_id
+    def add_module(self, data: ProductionData) -> ProductionData:
+        now = _now()
+        with self.conn:
+            seq = self.conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM modules WHERE source = ? AND batch_id = ?",
+                                    (MANUAL_SOURCE, data.batch_id)).fetchone()[0]
+            cursor = self.conn.execute(
+                "INSERT INTO modules (source, row_key, batch_id, order_number, product_name, pcb_type, led_codes,"
+                " lens_code, connector_code, serial, seq, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (MANUAL_SOURCE, f"manual#{seq}", data.batch_id, data.order_number, data.product_name, data.pcb_type,
+                 ",".join(data.led_codes), data.lens_code, data.connector_code, data.serial, seq, now))
+            self._record_batches_and_orders([data], now)
+        data.module_id = cursor.lastrowid
+        return data
+
+    # Record which file and slot each module of an exported fret went to, the serial exported with it and
+    # whether the file draws Micro-IDs (`micro_ids`, the render option)
+    def assign_fret(self, instance: PCBInstance, file_name: str, micro_ids: bool = False):
+        self.assign_frets([instance], file_name, micro_ids)
+
+    # Record several frets written to one file (a nested load) as one export
+    def assign_frets(self, instances: Sequence[PCBInstance], file_name: str, micro_ids: bool = False):
+        now = _now()
+        with self.conn:
+            export_id = self.conn.execute("INSERT INTO exports (file_name, exported_at) VALUES (?, ?)",
+                                          (file_name, now)).lastrowid
+            rows = []
+            for instance in instances:
+                data_index = 0
+                for slot, faulty in enumerate(instance.faulty_modules):
+                    if faulty or data_index >= len(instance.data):
+                        continue
+                    data = instance.data[data_index]
+                    data_index += 1
+                    if data.module_id is not None:
+                        rows.append((data.module_id, data.batch_id, data.pcb_type, file_name, slot, data.serial,
+                                     int(micro_ids and data.serial is not None), export_id, now))
+            self.conn.executemany(
+                "INSERT INTO fret_assignments (module_id, batch_id, pcb_type, file_name, slot, serial, micro_id,"
+                " export_id, assigned_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    # Exported files and slots for a module, oldest first
+    def assignments(self, module_id: int) -> List[Dict[str, object]]:
+        return [dict(row) for row in self.conn.execute(
+            "SELECT file_name, slot, assigned_at FROM fret_assignments WHERE module_id = ? ORDER BY id",
+            (module_id,))]
+
+    # Modules engraved in an exported file, slot by slot, from its latest export; empty if never exported
+    # (or only before exports were recorded). `micro_id` is 1 where that export drew the module's Micro-ID.
+    def fret_modules(self, file_name: str) -> List[Dict[str, object]]:
+        rows = self.conn.execute(
+            "SELECT module_id, pcb_type, slot, serial, micro_id, assigned_at FROM fret_assignments"
+            " WHERE export_id = (SELECT MAX(id) FROM exports WHERE file_name = ?) ORDER BY slot, id",
+            (file_name,))
+        return [dict(row) for row in rows]
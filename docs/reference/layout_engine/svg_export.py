@@ -0,0 +1,352 @@
+"""SVG engraving files for one fret, in the 210 x 210 mm laser work area."""
+
+import logging
+import os
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+import numpy as np
+import svgwrite
+
+from . import layout_logging, layout_metrics
+from .glyphs import GlyphLibrary, load_glyph_library
+from .micro_id import MAX_SERIAL, MIN_SERIAL, MicroIDElement, add_micro_ids
+from .models import PCBInstance
+from .qr import QRElement, add_qr_codes, fret_payload, module_payload
+from .travel import order_points
+
+log = logging.getLogger(layout_logging.EXPORT)
+
+# Ratio of desired character height to total font height (whitespace above and below characters)
+CHAR_HEIGHT_RATIO = 0.7 / 0.498
+
+# One engraved text: (text, x, y, rotation, height), position in work area mm
+TextElement = Tuple[str, float, float, float, float]
+
+# Attributes every engraved text shares
+TEXT_STYLE = {
+    'text-anchor': "middle",
+    'font-family': "Roboto Thin, sans-serif",
+    'font-weight': "normal",
+    'font-style': "normal"
+}
+
+# Where a fret's CenterPoint lands in the 210 x 210 mm work area, unless a fixture puts it elsewhere
+WORK_AREA_CENTER = (105.0, 105.0)
+
+# Compact output rounds positions, angles and sizes to this many decimals (0.001 mm, far below the spot size)
+COMPACT_DECIMALS = 3
+
+
+# File name used for an exported fret, e.g. "1234_sz-04_007.svg"
+def export_file_name(instance: PCBInstance, file_number: int, extension: str = ".svg") -> str:
+    first_prod_data = instance.data[0]
+    return f"{first_prod_data.batch_id}_{first_prod_data.pcb_type}_{file_number:03d}{extension}"
+
+
+# Transform from layout coordinates to the 210x210 mm work area, centering the PCB on `origin`
+def _work_area_transform(layout: Dict[str, Any], origin: Tuple[float, float] = WORK_AREA_CENTER):
+    # Center point from PCB data (assumed to be in mm)
+    center_x, center_y = layout['CenterPoint']['x'], layout['CenterPoint']['y']
+
+    # Calculate offsets to center the PCB on the origin, the middle of the work area for a single fret
+    x_offset = origin[0] - center_x
+    y_offset = origin[1] - center_y
+
+    # Get PCB-specific offsets from the loaded PCB data
+    pcb_specific_x_offset = layout.get('x_offset', 0)
+    pcb_specific_y_offset = layout.get('y_offset', 0)
+
+    # Helper function to apply transformation (all values in mm)
+    def transform_coords(x, y):
+        new_x = x + x_offset + pcb_specific_x_offset
+        new_y = y + y_offset + pcb_specific_y_offset
+        return max(0, min(210, new_x)), max(0, min(210, new_y))
+
+    return transform_coords
+
+
+# The texts to engrave on a fret, module by module in layout order. With `slots` (module indices)
+# only those modules are engraved, in the same positions, for re-engraving a few bad marks.
+# `origin` is where the CenterPoint lands (see nesting.py for several frets per job).
+def fret_elements(layout: Dict[str, Any], current_instance: PCBInstance,
+                  slots: Optional[Collection[int]] = None,
+                  origin: Tuple[float, float] = WORK_AREA_CENTER) -> List[TextElement]:
+    transform_coords = _work_area_transform(layout, origin)
+    elements: List[TextElement] = []
+    data_index = 0
+    for i, module in enumerate(layout['Modules']):
+        if current_instance.faulty_modules[i]:
+            continue
+        elif data_index < len(current_instance.data):
+            prod_data = current_instance.data[data_index]
+            if slots is not None and i not in slots:
+                data_index += 1
+                continue
+
+            for j, led_pos in enumerate(module['led_positions']):
+                if j < len(prod_data.led_codes):
+                    led_code = prod_data.led_codes[j]
+                    x, y = transform_coords(led_pos['x'], led_pos['y'])
+                    elements.append((led_code, x, y, led_pos['rotation'], led_pos['height']))
+
+            # For connector_position
+            if module['connector_position'] and prod_data.connector_code:
+                pos = module['connector_position']
+                x, y = transform_coords(pos['x'], pos['y'])
+                elements.append((prod_data.connector_code, x, y, pos['rotation'], pos['height']))
+
+            # For lens_position
+            if module['lens_position'] and prod_data.lens_code:
+                pos = module['lens_position']
+                x, y = transform_coords(pos['x'], pos['y'])
+                elements.append((prod_data.lens_code, x, y, pos['rotation'], pos['height']))
+
+            data_index += 1
+
+    return elements
+
+
+# The Micro-IDs to engrave on a fret, (serial, x, y) module by module like fret_elements: one for each
+# module with a Micro-ID position in the layout and a serial number assigned by the business system (see
+# production.py). Modules without one, or with one a Micro-ID cannot carry, are left out with a warning.
+def micro_id_elements(layout: Dict[str, Any], current_instance: PCBInstance,
+                      slots: Optional[Collection[int]] = None,
+                      origin: Tuple[float, float] = WORK_AREA_CENTER) -> List[MicroIDElement]:
+    transform_coords = _work_area_transform(layout, origin)
+    elements: List[MicroIDElement] = []
+    unnumbered = 0
+    data_index = 0
+    for i, module in enumerate(layout['Modules']):
+        if current_instance.faulty_modules[i]:
+            continue
+        elif data_index < len(current_instance.data):
+            prod_data = current_instance.data[data_index]
+            data_index += 1
+            if (slots is not None and i not in slots) or not module.get('micro_id_position'):
+                continue
+            if prod_data.serial is None or not MIN_SERIAL <= prod_data.serial <= MAX_SERIAL:
+                unnumbered += 1
+                continue
+            pos = module['micro_id_position']
+            x, y = transform_coords(pos['x'], pos['y'])
+            elements.append((prod_data.serial, x, y))
+
+    if unnumbered:
+        log.warning(f"{unnumbered} modules have no valid serial number; their Micro-IDs are left out")
+    return elements
+
+
+# The QR codes to engrave on a fret, (payload, x, y, size), module by module like fret_elements and then
+# the fret's own: one for each module with a QR position in the layout when `module_qr` is given, and one at
+# the layout's QRPosition when `fret_qr` is. The templates are those of qr.module_payload and qr.fret_payload;
+# `name` fills {name}. With slots (see fret_elements) the fret's code is left out, it is engraved already.
+def qr_elements(layout: Dict[str, Any], current_instance: PCBInstance, name: str,
+                module_qr: Optional[str] = None, fret_qr: Optional[str] = None,
+                slots: Optional[Collection[int]] = None,
+                origin: Tuple[float, float] = WORK_AREA_CENTER) -> List[QRElement]:
+    transform_coords = _work_area_transform(layout, origin)
+    elements: List[QRElement] = []
+    unnumbered = 0
+    data_index = 0
+    for i, module in enumerate(layout['Modules']):
+        if current_instance.faulty_modules[i]:
+            continue
+        elif data_index < len(current_instance.data):
+            prod_data = current_instance.data[data_index]
+            data_index += 1
+            if not module_qr or (slots is not None and i not in slots) or not module.get('qr_position'):
+                continue
+            payload = module_payload(module_qr, prod_data)
+            if payload is None:
+                unnumbered += 1
+                continue
+            pos = module['qr_position']
+            x, y = transform_coords(pos['x'], pos['y'])
+            elements.append((payload, x, y, float(pos['height'])))
+
+    if fret_qr and slots is None and layout.get('QRPosition') and current_instance.data:
+        pos = layout['QRPosition']
+        x, y = transform_coords(pos['x'], pos['y'])
+        elements.append((fret_payload(fret_qr, name, current_instance.data[0]), x, y, float(pos['height'])))
+
+    if unnumbered:
+        log.warning(f"{unnumbered} modules have no serial number; their QR codes are left out")
+    return elements
+
+
+# Reorder texts to shorten head travel; returns the new order and the travel before and after
+def order_elements(elements: List[TextElement]) -> Tuple[List[TextElement], Dict[str, float]]:
+    points = np.array([(x, y) for _, x, y, _, _ in elements], dtype=float)
+    order, stats = order_points(points)
+    return [elements[i] for i in order], stats
+
+
+# Estimated head travel of a fret in layout order and in optimized order
+def travel_report(layout: Dict[str, Any], current_instance: PCBInstance) -> Dict[str, float]:
+    return order_elements(fret_elements(layout, current_instance))[1]
+
+
+# Build the SVG drawing for a PCB instance without writing it to disk.
+# With optimize_travel the texts are written, and so engraved, in travel-optimized order.
+# With outline_glyphs (a glyph library file, see glyphs.py) texts are written as outlines.
+# With compact each distinct code is written once as a <symbol> and placed with <use>.
+# With slots only those modules are written (see fret_elements).
+# With micro_ids each module's Micro-ID is written after the texts (see micro_id.py).
+# With module_qr or fret_qr, URL templates, the QR codes are written last (see qr_elements); {name} is the
+# file's name without extension.
+@layout_metrics.timed("svg_export")
+def render_svg(layout: Dict[str, Any], current_instance: PCBInstance, file_path: str,
+               optimize_travel: bool = False, outline_glyphs: Optional[str] = None,
+               compact: bool = False, slots: Optional[Collection[int]] = None,
+               micro_ids: bool = False, module_qr: Optional[str] = None,
+               fret_qr: Optional[str] = None) -> svgwrite.Drawing:
+    dwg = new_drawing(file_path)
+    add_center_cross(dwg, layout)
+    add_texts(dwg, fret_elements(layout, current_instance, slots), optimize_travel, outline_glyphs, compact)
+    if micro_ids:
+        add_micro_ids(dwg, micro_id_elements(layout, current_instance, slots))
+    if module_qr or fret_qr:
+        add_qr_codes(dwg, qr_elements(layout, current_instance, fret_file_stem(file_path), module_qr, fret_qr,
+                                      slots))
+    return dwg
+
+
+# The {name} of a fret's QR code: its file name without folder and extension
+def fret_file_stem(file_path: str) -> str:
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+# An empty 210 x 210 mm drawing with the work area outline
+def new_drawing(file_path: str) -> svgwrite.Drawing:
+    # Create SVG with 210x210 mm dimensions
+    dwg = svgwrite.Drawing(file_path, size=('210mm', '210mm'), viewBox="0 0 210 210")
+
+    # Add 205x205 mm square around the final output
+    dwg.add(dwg.rect(insert=(2.5, 2.5), size=(205, 205), fill='none', stroke='#FF0000', stroke_width=0.5))
+    return dwg
+
+
+# Alignment cross at a fret's center point
+def add_center_cross(dwg: svgwrite.Drawing, layout: Dict[str, Any], origin: Tuple[float, float] = WORK_AREA_CENTER):
+    transform_coords = _work_area_transform(layout, origin)
+
+    # Draw cross at the center point
+    center_x_transformed, center_y_transformed = transform_coords(layout['CenterPoint']['x'],
+                                                                  layout['CenterPoint']['y'])
+    cross_size = 2  # Size of the cross in mm
+    dwg.add(dwg.line(start=(center_x_transformed - cross_size, center_y_transformed),
+                     end=(center_x_transformed + cross_size, center_y_transformed),
+                     stroke='red', stroke_width=0.2))
+    dwg.add(dwg.line(start=(center_x_transformed, center_y_transformed - cross_size),
+                     end=(center_x_transformed, center_y_transformed + cross_size),
+                     stroke='red', stroke_width=0.2))
+
+
+# Add the texts to engrave, with the render options of render_svg, to the drawing or to `parent`, a group
+# in it. Compact texts added in several calls share `symbols` (see add_compact_texts).
+def add_texts(dwg: svgwrite.Drawing, elements: List[TextElement], optimize_travel: bool = False,
+              outline_glyphs: Optional[str] = None, compact: bool = False, parent=None,
+              symbols: Optional[Dict[Tuple[str, float], str]] = None):
+    if optimize_travel:
+        elements, stats = order_elements(elements)
+        layout_metrics.observe("travel_order", stats['ms'] / 1000)
+        log.debug(f"Head travel {stats['before_mm']:.0f} mm -> {stats['after_mm']:.0f} mm "
+                  f"over {stats['elements']} texts ({stats['ms']:.1f} ms)")
+
+    library = load_glyph_library(outline_glyphs) if outline_glyphs else None
+    if compact:
+        add_compact_texts(dwg, elements, library, parent, symbols)
+    elif library is not None:
+        for text, x, y, rotation, height in elements:
+            add_outlined_text(dwg, library, text, x, y, rotation, height, parent)
+    else:
+        for text, x, y, rotation, height in elements:
+            add_rotated_text(dwg, text, x, y, rotation, height, parent)
+
+
+# Write a rendered SVG drawing to disk
+@layout_metrics.timed("file_write")
+def write_svg(dwg: svgwrite.Drawing):
+    dwg.save()
+
+
+# Add text to an SVG drawing, or to `parent`, a group in it
+def add_rotated_text(dwg, text, x, y, angle, height, parent=None):
+    # Adjust the font size to compensate for the vertical spacing
+    adjusted_height = height * CHAR_HEIGHT_RATIO
+
+    # Adjust the rotation angle to flip the text
+    adjusted_angle = (angle + 180) % 360
+
+    transform = f"rotate({-adjusted_angle} {x} {y})"
+
+    # Insert half-spaces between characters for SVG export
+    half_space = chr(8202)
+    spaced_text = half_space.join(text)
+
+    # Use a dictionary for attributes to handle names with hyphens
+    text_attributes = {
+        'insert': (x, y),
+        'transform': transform,
+        'font-size': adjusted_height,
+        **TEXT_STYLE
+    }
+
+    # Add the text element using the attributes dictionary
+    (dwg if parent is None else parent).add(dwg.text(spaced_text, **text_attributes))
+
+
+# Add text as glyph outlines: one path per code, placed with a single transform and
+# scaled so the cap height is exactly `height`
+def add_outlined_text(dwg, library: GlyphLibrary, text, x, y, angle, height, parent=None):
+    path = library.path(text)
+    if path is None:
+        # A character the library lacks (logged once by the library)
+        add_rotated_text(dwg, text, x, y, angle, height, parent)
+        return
+
+    # Same flip as add_rotated_text
+    adjusted_angle = (angle + 180) % 360
+    scale = height / library.cap_height
+    transform = f"translate({x} {y}) rotate({-adjusted_angle}) scale({scale:.6g})"
+    # Not through dwg.path(): svgwrite would check the library's path data against its grammar on
+    # every save, which took longer than the rest of the export. Own parameters keep dwg's checks on.
+    (dwg if parent is None else parent).add(svgwrite.path.Path(d=path, transform=transform, debug=False))
+
+
+# Shortest decimal for `value` at compact precision: 12.5 rather than 12.500000000000002
+def _compact_number(value: float) -> str:
+    text = f"{value:.{COMPACT_DECIMALS}f}".rstrip('0').rstrip('.')
+    return "0" if text == "-0" else text
+
+
+# Add texts in compact form: each distinct (code, height) becomes one <symbol> in <defs>, drawn
+# at the origin, and every placement is a <use> with a single translate/rotate. The shared text
+# attributes sit once on the group holding the placements, which the symbol contents inherit.
+# The engraved geometry is that of add_rotated_text/add_outlined_text, rounded to COMPACT_DECIMALS.
+# Calls adding to one drawing pass the same `symbols` to define each code once.
+def add_compact_texts(dwg, elements: List[TextElement], library: Optional[GlyphLibrary] = None, parent=None,
+                      symbols: Optional[Dict[Tuple[str, float], str]] = None):
+    symbols = {} if symbols is None else symbols
+    group = dwg.g(**TEXT_STYLE)
+    for text, x, y, angle, height in elements:
+        symbol_id = symbols.get((text, height))
+        if symbol_id is None:
+            symbol_id = symbols[(text, height)] = f"c{len(symbols)}"
+            # Symbols clip to their viewport by default, and codes are drawn around the origin
+            symbol = dwg.symbol(id=symbol_id, overflow="visible")
+            path = library.path(text) if library is not None else None
+            if path is not None:
+                # As in add_outlined_text: path data is in em units, scaled to the cap height
+                scale = height / library.cap_height
+                symbol.add(svgwrite.path.Path(d=path, transform=f"scale({scale:.6g})", debug=False))
+            else:
+                symbol.add(dwg.text(chr(8202).join(text), insert=(0, 0),
+                                    font_size=_compact_number(height * CHAR_HEIGHT_RATIO)))
+            dwg.defs.add(symbol)
+
+        # Same flip as add_rotated_text
+        adjusted_angle = (angle + 180) % 360
+        transform = f"translate({_compact_number(x)} {_compact_number(y)}) rotate({_compact_number(-adjusted_angle)})"
+        group.add(dwg.use(f"#{symbol_id}", transform=transform))
+    (dwg if parent is None else parent).add(group)
@@ -0,0 +1,176 @@
+"""On-demand profiling for the Production Layout App.
+
+A capture runs cProfile on the UI thread together with tracemalloc, and stops
+after a number of seconds or a number of operator actions (whichever comes
+first). It then writes a timestamped text report plus the raw `.prof` stats
+(for snakeviz / pstats), tagged with what the station was working on.
+
+Operator actions are the Tk event handlers decorated with `action`; nested
+calls (Batch Export calling Export SVG) count once.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from layout_engine import layout_logging
+
+log = logging.getLogger(layout_logging.PROFILER)
+
+REPORT_TOP_FUNCTIONS = 60
+REPORT_TOP_ALLOCATIONS = 30
+
+_capture: Optional['ProfileCapture'] = None
+_tags_provider: Optional[Callable[[], Dict[str, Any]]] = None
+_action_depth = 0
+
+
+class ProfileCapture:
+    def __init__(self, output_dir: str, seconds: Optional[float], actions: Optional[int], trigger: str,
+                 on_finished: Optional[Callable[[Optional[str]], None]] = None):
+        self.output_dir = output_dir
+        self.on_finished = on_finished
+        self.seconds = seconds
+        self.actions = actions
+        self.trigger = trigger
+        self.actions_seen = 0
+        self.started = None
+        self.profiler = cProfile.Profile()
+        self._started_tracemalloc = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    # Stop profiling and write the report; returns the report path
+    def stop(self) -> str:
+        self.profiler.disable()
+        elapsed = time.perf_counter() - self.started
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        tags = _collect_tags()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        pcb_type = str(tags.get('pcb_type') or 'none').replace(os.sep, '_')
+        base_path = os.path.join(self.output_dir, f"profile-{stamp}-{pcb_type}")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.profiler.dump_stats(f"{base_path}.prof")
+
+        report = io.StringIO()
+        report.write(f"Production Layout App profile - {datetime.now().isoformat(timespec='seconds')}\n")
+        report.write(f"trigger: {self.trigger}\n")
+        report.write(f"duration: {elapsed:.2f}s (limit {self.seconds or '-'}s)\n")
+        report.write(f"actions: {self.actions_seen} (limit {self.actions or '-'})\n")
+        for key, value in tags.items():
+            report.write(f"{key}: {value}\n")
+        report.write(f"traced memory: current {current / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB\n")
+
+        report.write(f"\n== Top {REPORT_TOP_FUNCTIONS} functions by cumulative time ==\n")
+        stats = pstats.Stats(self.profiler, stream=report)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_TOP_FUNCTIONS)
+
+        report.write(f"\n== Top {REPORT_TOP_ALLOCATIONS} live allocations made during the capture ==\n")
+        for stat in snapshot.statistics('lineno')[:REPORT_TOP_ALLOCATIONS]:
+            report.write(f"{stat}\n")
+
+        with open(f"{base_path}.txt", 'w') as f:
+            f.write(report.getvalue())
+        return f"{base_path}.txt"
+
+
+def _collect_tags() -> Dict[str, Any]:
+    if _tags_provider is None:
+        return {}
+    try:
+        return _tags_provider()
+    except Exception as e:
+        log.warning(f"Failed to collect profile tags: {e}")
+        return {}
+
+
+# Register a callable returning the PCB type, instance count, batch size, etc.
+def set_tags_provider(provider: Callable[[], Dict[str, Any]]):
+    global _tags_provider
+    _tags_provider = provider
+
+
+def active() -> bool:
+    return _capture is not None
+
+
+def start(output_dir: str, seconds: Optional[float] = None, actions: Optional[int] = None,
+          schedule: Optional[Callable[[int, Callable[[], None]], Any]] = None, trigger: str = "manual",
+          on_finished: Optional[Callable[[Optional[str]], None]] = None) -> bool:
+    """Start a capture; `schedule(ms, callback)` (e.g. Tk's `after`) ends timed captures.
+
+    `on_finished(report_path)` is called however the capture ends. Returns False
+    if a capture is already running.
+    """
+    global _capture
+    if _capture is not None:
+        return False
+    if seconds and schedule is None:
+        raise ValueError("A schedule callable is needed for timed captures")
+
+    _capture = ProfileCapture(output_dir, seconds, actions, trigger, on_finished)
+    _capture.start()
+    if seconds:
+        capture = _capture
+        schedule(int(seconds * 1000), lambda: _stop_if_current(capture))
+    log.info(f"Profile capture started ({trigger}; seconds={seconds}, actions={actions})")
+    return True
+
+
+def _stop_if_current(capture: ProfileCapture):
+    if _capture is capture:
+        stop()
+
+
+# Stop the running capture and write its report; returns the report path
+def stop() -> Optional[str]:
+    global _capture
+    capture, _capture = _capture, None
+    if capture is None:
+        return None
+    try:
+        path = capture.stop()
+        log.info(f"Profile report written to {path}")
+    except Exception as e:
+        log.error(f"Failed to write profile report: {e}")
+        path = None
+    if capture.on_finished:
+        capture.on_finished(path)
+    return path
+
+
+# Count decorated Tk handlers as operator actions for action-limited captures
+def action(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        global _action_depth
+        if _capture is None:
+            return func(*args, **kwargs)
+        _action_depth += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _action_depth -= 1
+            capture = _capture
+            if _action_depth == 0 and capture is not None:
+                capture.actions_seen += 1
+                if capture.actions and capture.actions_seen >= capture.actions:
+                    stop()
+    return wrapper
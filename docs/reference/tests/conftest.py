@@ -0,0 +1,10 @@
+"""Put `layout_engine` and the benchmark helpers (`synthetic`, `headless`) on the path."""
+
+import os
+import sys
+
+REFERENCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (REFERENCE_DIR, os.path.join(REFERENCE_DIR, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
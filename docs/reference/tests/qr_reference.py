@@ -0,0 +1,481 @@
+"""Known-answer QR code matrices for test_qr.py.
+
+Drawn with python-qrcode 8.2 in byte mode, without a border and with the mask
+of each case forced. Where a case leaves the mask to the encoder (`mask` None),
+the matrix was drawn with the mask that segno 1.6.6's ISO/IEC 18004 penalty
+evaluation scores lowest among the eight candidates. Each row is hex: the
+modules left to right as bits, padded with zeros to whole hex digits.
+"""
+
+from typing import List, Optional, Tuple
+
+MODULE_URL = "https://quadi.ca/m/00012345"
+FRET_URL = "https://quadi.ca/f/1234_sz-04_001-006_bundle#fret-003?order=987654"
+BATCH_URL = "https://quadi.ca/b/4521?"
+
+
+# `count` 8-digit serials from `first`, as query parameters when `separator` is "&"
+def _serials(first: int, count: int, separator: str) -> str:
+    if separator == "&":
+        return separator.join(f"m{i}={serial:08d}" for i, serial in enumerate(range(first, first + count)))
+    return separator.join(f"{serial:08d}" for serial in range(first, first + count))
+
+
+# (payload, level, mask passed to qr.matrix, mask of the reference, version, rows)
+CASES: List[Tuple[str, str, Optional[int], int, int, Tuple[str, ...]]] = [
+    ("A", "L", 0, 0, 1, (
+        "fe5bf8",
+        "827208",
+        "badae8",
+        "ba52e8",
+        "ba2ae8",
+        "820a08",
+        "feabf8",
+        "00d800",
+        "eff620",
+        "b08230",
+        "5e6888",
+        "58c220",
+        "368aa8",
+        "009550",
+        "feb778",
+        "82fdc0",
+        "bad768",
+        "ba6230",
+        "bac888",
+        "828230",
+        "feeab8",
+    )),
+    (MODULE_URL, "H", None, 1, 4, (
+        "fe549ebf8",
+        "82bbf4208",
+        "ba895cae8",
+        "bacb4f2e8",
+        "bad53f2e8",
+        "82cf5d208",
+        "feaaaabf8",
+        "0077b1800",
+        "279ee25f0",
+        "f41443778",
+        "1f82df3a8",
+        "30644a110",
+        "0ee49fad8",
+        "e9f897a48",
+        "af25e1ea8",
+        "5ceb53818",
+        "cb4d82670",
+        "e4d249638",
+        "7f83071f8",
+        "3144a3240",
+        "eef16b108",
+        "5c9b78148",
+        "cefeab6a8",
+        "15b9aa058",
+        "e7b133fc0",
+        "00f2e78f8",
+        "fee110a88",
+        "82a62c898",
+        "ba3465f80",
+        "ba61ac5f0",
+        "babb518d8",
+        "824852a60",
+        "fe6c41ae8",
+    )),
+    (MODULE_URL, "M", 5, 5, 3, (
+        "fe374bf8",
+        "82d92208",
+        "bafa82e8",
+        "bacb62e8",
+        "ba5f12e8",
+        "8246e208",
+        "feaaabf8",
+        "00842000",
+        "82cb6e70",
+        "3d8219b0",
+        "f6186680",
+        "a4bb85c0",
+        "4e063708",
+        "e55e1398",
+        "06578be0",
+        "5966b0a8",
+        "fb037060",
+        "c83893b8",
+        "efa6d6c8",
+        "b59b8f80",
+        "9640bfb8",
+        "00f4e8c0",
+        "fe57dae0",
+        "82747898",
+        "ba25dfd0",
+        "ba0cbd70",
+        "ba5a3ff0",
+        "823103e8",
+        "fee0a0e0",
+    )),
+    ("https://quadi.ca/f/1234_sz-04_007", "Q", None, 2, 4, (
+        "fed615bf8",
+        "827b24208",
+        "ba2396ae8",
+        "ba55a5ae8",
+        "baa70a2e8",
+        "82d7f3a08",
+        "feaaaabf8",
+        "00211d000",
+        "7f58fb988",
+        "743d51378",
+        "8b754a8b0",
+        "3013600f8",
+        "be5e8e0c0",
+        "6ddb24f18",
+        "de7b08690",
+        "dc7b26ea0",
+        "62308ad88",
+        "f96e95778",
+        "9a9f2c1b0",
+        "d0f27e9f8",
+        "bef514858",
+        "f1172e648",
+        "afd1d5970",
+        "81efbf430",
+        "ab9991fc0",
+        "0086108b0",
+        "feda63ab0",
+        "82a5398e0",
+        "bad46efd0",
+        "bad381ca8",
+        "baaf4bf20",
+        "82e7a6ca0",
+        "fe1782f50",
+    )),
+    ("https://quadi.ca/f/1234_sz-04_001-006_bundle#fret-003?o=4521", "H", 7, 7, 7, (
+        "fedf10d78bf8",
+        "82e2ccfe1208",
+        "ba47ac4112e8",
+        "babc046b5ae8",
+        "bae92f86fae8",
+        "82b3c8bf8208",
+        "feaaaaaaabf8",
+        "001638e88000",
+        "127edf9451d8",
+        "45f2161144c8",
+        "8e32a136b1a8",
+        "4c2bf6764790",
+        "ceeec41ef3c8",
+        "88bbf3bc75e8",
+        "93125b585fe0",
+        "255fa2da5218",
+        "66d12810d150",
+        "c14cbfefc370",
+        "2f8000db9188",
+        "148e7a3caf10",
+        "aff35fe31fc8",
+        "98bc28ac08b8",
+        "3a86eabeeae8",
+        "c8cb68c3c898",
+        "2f8eefc70fd0",
+        "d17b07fee798",
+        "42c916a1c1a0",
+        "b8145384a310",
+        "8a576b3ee998",
+        "cc78bcae8e10",
+        "8ae5a477ced8",
+        "3553d69de2d8",
+        "07d296e41618",
+        "d1a33c455808",
+        "0a52ecafe7a8",
+        "79710e6230c0",
+        "9b045ffaefc8",
+        "00e508bdf8c8",
+        "fe667af65a90",
+        "825cf8a0d890",
+        "ba7a0fc6af88",
+        "baf4ce1c8f80",
+        "ba76c0b28da8",
+        "8274e5a07940",
+        "fe53008e6f10",
+    )),
+    (FRET_URL, "H", None, 4, 8, (
+        "fe2ae6d854bf8",
+        "82c816aef3a08",
+        "ba52e88c99ae8",
+        "ba28b1a4812e8",
+        "ba3b6fe3d82e8",
+        "82d6863cba208",
+        "feaaaaaaaabf8",
+        "00f48e2ee4000",
+        "0f0893e58bb10",
+        "d5da91a69a600",
+        "c644bc6a16e40",
+        "cd948b7dabdb0",
+        "ef81b3950e9b8",
+        "103ec4d79e3f0",
+        "27ff9a44e7250",
+        "61c93c7f0f490",
+        "2a52a44dad688",
+        "44243b5368220",
+        "8b61df28709e0",
+        "b85b544a67db8",
+        "0f925f9759af0",
+        "34bd4cb7c6780",
+        "afff63e442f80",
+        "48a7b62f618b8",
+        "8afc2eb5fcaa8",
+        "28f6ba32cf8d8",
+        "bfff17e407ff0",
+        "70bd20d668320",
+        "6647bb5e3e7c8",
+        "8d1299ff5f070",
+        "e308b8c597ce0",
+        "98a03eb674fa8",
+        "9b15ca7a76a30",
+        "a9d4e0cb062c0",
+        "9e2aa23d8b560",
+        "4cfe025b0cb38",
+        "3ff57aefa8f30",
+        "8004f980e7990",
+        "46a5298a66130",
+        "71c11a9ae8b60",
+        "e29823f2cafd0",
+        "00e08a281f8c0",
+        "fed95ea7acaf0",
+        "82804222af8a0",
+        "badd13ec88fe0",
+        "ba0884d8ca408",
+        "ba74d01556020",
+        "82128c90c95f0",
+        "fe1624dfa9c38",
+    )),
+    (FRET_URL + "&modules=" + _serials(1048560, 8, ","), "Q", 3, 3, 10, (
+        "fe159a7e59333f8",
+        "82f7217bed31208",
+        "baa1d6a7af4b2e8",
+        "ba70c6ae39152e8",
+        "ba086c3e8a152e8",
+        "82609623c2ee208",
+        "feaaaaaaaaaabf8",
+        "002791626696000",
+        "765746fea7d3830",
+        "c5802e6818249c8",
+        "4e8f662735ae418",
+        "70cb85cae86b118",
+        "6b38c4b16923440",
+        "cd3dccd60649658",
+        "ae4151ea57f4780",
+        "a40c1c8ad0ba0a8",
+        "af1ee98cf24e838",
+        "61b767ab2d16598",
+        "9ee1ae48fedbe60",
+        "8568ce02ecc7bc0",
+        "7f00d66621d2ce0",
+        "1ca14b66d821970",
+        "979e0c27642b540",
+        "50e5f5224b49110",
+        "5b5b973cff25940",
+        "34042c1ae740250",
+        "dfdc3b7f37e4fb0",
+        "88e2816254a88e0",
+        "fab056aad21cae8",
+        "58f12223a4ca8e8",
+        "ffd74ebfee43fc0",
+        "8955ed0799c4c48",
+        "3e0e9f4ea490770",
+        "a4895d61d92c958",
+        "d72472907427328",
+        "ecfb5e6c491f2d0",
+        "5f5fd70cbd04c98",
+        "15e9ba975b10910",
+        "ce00a2b49aa8d90",
+        "8466106c0dfde78",
+        "3f40fbd34d49fe8",
+        "5daf50936c02d88",
+        "7bec601e30025b0",
+        "24e4161409d2450",
+        "16961a59e190568",
+        "cd3d9440c024f38",
+        "a7a6f17e2132b08",
+        "f99b580b5d9b290",
+        "0268643fc862fc0",
+        "00db252202458c0",
+        "fe7621aad3f4a80",
+        "82d764a3d1b98b8",
+        "ba1277fe934dfb0",
+        "bada7260259bb30",
+        "ba9cba962656a20",
+        "828176cf8ff4648",
+        "fe0e427f7495e60",
+    )),
+    (BATCH_URL + _serials(100, 20, "&"), "L", 6, 6, 11, (
+        "fece1b9e7fffdbf8",
+        "826ebfe3ec5fda08",
+        "ba7c72da74bf7ae8",
+        "ba5b33356abaaae8",
+        "ba450bdfca64f2e8",
+        "8219e6e8e6946208",
+        "feaaaaaaaaaaabf8",
+        "0083fac890a14000",
+        "da3c323fe8b48208",
+        "e9acf0abaa3bab30",
+        "e6ea60a2bc178548",
+        "1449190f3f1a17b8",
+        "82366669e5bbe790",
+        "0cc81e840038e290",
+        "d3d5b14115d0ace8",
+        "f99ea8adb7372b28",
+        "6e8273b75969bab8",
+        "c424826fbce21f20",
+        "f236ff659d981df8",
+        "29087962f6307208",
+        "6b282f4d4877c708",
+        "6d42ccd04a222bf0",
+        "b6169aafd49ad158",
+        "8dddc64ea07e68e8",
+        "cead0e7cfbfdc198",
+        "b9c13ea78fbda740",
+        "36f960de8bd4f5f8",
+        "89298ef23b716a38",
+        "9fc6b43fdf09eff8",
+        "68d0c5f8a8e298a0",
+        "aaa1feea9b985af8",
+        "e8e43d7891a06888",
+        "3fd9afcfa9b4df88",
+        "39414edd2bba2bb0",
+        "0fbdacb63d13d618",
+        "109143cb21fb1128",
+        "c2ea67773fbff200",
+        "b0901f969f38e1d0",
+        "576cb634b3d03668",
+        "315aef8eb73538e8",
+        "f6edec4e9b69d538",
+        "7066bd9839f3ce68",
+        "a6a196fb1981d6d8",
+        "59f860e189c734d8",
+        "6e602e5677f2f2c8",
+        "344acdc8a4aa6eb0",
+        "ca6c6b39a30a9b58",
+        "c5a5208a217b1838",
+        "864ae1f6bbfaff18",
+        "198a59158e216390",
+        "3f40e65d8bd13aa8",
+        "e88c9368c69335b8",
+        "f23cb53fecadffb8",
+        "00dcc5f8d07298a0",
+        "fe6e9eeaec799af8",
+        "826f99a891b178c8",
+        "bad8475fe9a29f88",
+        "bacaacfcbbb2b548",
+        "ba423dafa5139298",
+        "82d2e3b7a97a7e38",
+        "fee8677ffbffa188",
+    )),
+    (BATCH_URL + _serials(1000, 60, "&"), "M", None, 2, 23, (
+        "fe75d244a3a89379214fc9628bf8",
+        "8241ad9ed1bc0a90bd0bc0bd2a08",
+        "ba960da3d083f16f42f43f46bae8",
+        "ba9bc8f9a6b452d828942725b2e8",
+        "ba8ecf5fe1359f90a69f9d653ae8",
+        "82bf1398fabd18d0b818d1bd1208",
+        "feaaaaaaaaaaaaaaaaaaaaaaabf8",
+        "00c2e668c742e8af46e8af42e800",
+        "be24544fb143cfc9348f91b2f3e0",
+        "b0d77c252161134f40107820c3d0",
+        "d742c959eb3d0340bd0591bd1248",
+        "050cb157b842ec2f02f26e42eb58",
+        "8322befe1cec8b38259d59e095a8",
+        "5d29e5e32784921f25e4106683a0",
+        "dea8ec8d19fc1350bd1ac1a80e18",
+        "1c29311a6c82f42f42e52f56ea40",
+        "77b97cc2ba2d0b5852cad8151638",
+        "5d1c645f79e4f650e0934bb11fd0",
+        "72965587aa3d03d0bd13d9348248",
+        "dc546dc89542f42f42f42e836f58",
+        "6369aeb36e20db4d748b39b41430",
+        "101fe411ed20a64d1c938ea564d0",
+        "ce6b766e133d1ad0fc13d0bd0f48",
+        "5d8d8c01a642a52f02f42f42ead8",
+        "afbc67ea8144ea9b252a59438528",
+        "6896df098800b34974965961f7d0",
+        "2aa0c5aa145c63d0bc02d1bd1028",
+        "0c4144cb7aa08c2b43f42f42e748",
+        "ef99d96fd5546f89310fd9749fa8",
+        "48a054b8d380a8893948d8049890",
+        "7aa4eeaaa25d7ac8259ad0ed0ac8",
+        "e8a70aa8f1a098b75ab8af12f8c8",
+        "2fbfef9f9a25efc6498f882c9fa8",
+        "34c60e38b8e55755789acf74f1d8",
+        "66b7b6a577bd15c93d1750bd01c8",
+        "01c59f6c0ac2ebb742fbab42fe50",
+        "2a2e47e03fa4d44634e40931ca28",
+        "e13fd1430ea4ca13a4cbc93d3848",
+        "f236a69cddbd1a56ad0a50bd02d0",
+        "89f342428242e28952e3af42b240",
+        "a6c2b9e21f74f84faa9c5f409b30",
+        "a0761666e6a4db0a76d254609c50",
+        "4ab2cd35df348a56bb0850ad07a8",
+        "31c284b9a2c3638964c3af42f448",
+        "3adcfeb453701c4933940d35f268",
+        "05f6ca27d5c7144939368a2cdcd0",
+        "837078ba1fb09ed0bd1e54bc03c8",
+        "c8a40527b00773af42e3ab43f258",
+        "6a95a03df1b41c594098792e5a38",
+        "958ad45163251650669acd35b850",
+        "c722992aeabd1850a91a40bd4388",
+        "75b119e75242f7af46e3ff42b258",
+        "3fd58a0f8c53ffc9019fa145ff98",
+        "089e3208a9f9488832d8fd0128f0",
+        "7ad6a9fab9bd1ad0bc1ab0dd7a88",
+        "28a87df8d042f8af47e8cd208888",
+        "dfe88b4f80e09fd9341fbe2a8fe8",
+        "05a83252c206884d618c32e2f2d0",
+        "db02bbca1ae913c0bd1414f81408",
+        "2df3a43f9f86e63f02f66b02f5c8",
+        "773791958db5838123f3cf2c8e68",
+        "118d292bdf688c79214c4d259350",
+        "1a0be1a3d8bc1290bd1640bd1448",
+        "19b025e3e043e26f42f02f42f7d8",
+        "0e9b590c272c03d81897bc25e830",
+        "e48dd2ef75b5ec10e6880b24d650",
+        "1ac3d59c10bd1450b81355bd0048",
+        "8c9ddc814d42f62f46e62a42ebc8",
+        "ab9e225c5e4393c93d8ba9a48e28",
+        "ccaf24f787616c4b000c0424d250",
+        "727cb78831bd1240bd1250bd1448",
+        "ec1892425b42f22f02f22f42f2d8",
+        "b7d191cbfabc93a02413c8718a28",
+        "1d032cacfc248c1b25ac08be9320",
+        "7aa1fd56fc3c1551bd1440b90518",
+        "74b17073ba42e1ae42e62f46f4c0",
+        "bf80afffd23c8fd1c29fc8649fb8",
+        "e8f655c892a5a8c860b8cd4088d0",
+        "3a8fc5cade3d0ad0bd1ad0bd0ac8",
+        "18e7cb188042e8af42e8af02f8d8",
+        "4ff8b26ff821dfcc758fb9249fb0",
+        "1d38f29793e4d5c89c929324af50",
+        "724c793c3cbd1250fd0c51bd1ac8",
+        "207b55436c62bc2f02faaf42e548",
+        "87d4d2255f20805d25c251d29ba8",
+        "b89039ea62e49daf64fb4960bb40",
+        "52de4258dcbd1251bd1c41bc0a68",
+        "1158b7a9f262f42a42eb3e52e4c0",
+        "6a0bca8b22546e01a08253741238",
+        "0996187cad7cd3c82492cc0413d0",
+        "e6554e8be0bd0c50ad15486592a8",
+        "754a33ee7242fe2f52b6b71aedd0",
+        "a79c43f32360404e4887402d97a8",
+        "b1a67f6880e2beccf493b37cae50",
+        "8ed0177040bd5850bd1c50bd1b48",
+        "116bfba9d2e2a82f42fb2b42e448",
+        "8ab6b8c40e52826d34e7c935dea8",
+        "8c3c38ee5a26d20b3cdba93b5f70",
+        "7ad918310c3b11d4bd1e50bd0a88",
+        "3d67f07954c4d2ab42ee2f42a558",
+        "ebfca1afcb338fd925cfde449fa8",
+        "00a2c6f8c63ed8ed26b8d46298d0",
+        "fe4d6d1aed7b1ad934dad0ad0ae8",
+        "82dcc398b7e4c8eec338af42f8c8",
+        "ba90fe1fbc259fd9f01f8c25ffe8",
+        "bad6563fd4441bc8e1524a24cdc8",
+        "ba899ff3aa7d0a58bd0ad4bc0048",
+        "821b989bac22f5af46f42b43f548",
+        "fe84416b9f85feb86493993843b8",
+    )),
+]
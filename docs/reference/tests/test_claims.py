@@ -0,0 +1,137 @@
+"""Fret claims never hand one module to two stations.
+
+Stations share one claims file. A claimed module is refused to the other
+stations until its lease runs out, a station restarting takes over its own
+claims, and completed modules are never planned again. Finally several
+processes claim frets from the same modules as fast as they can; every module
+must be engraved exactly once.
+"""
+
+import multiprocessing
+import random
+import time
+from typing import List
+
+import pytest
+
+import layout_engine
+from layout_engine import claims as claims_module
+
+MODULES = 96
+FRET = 6  # modules per claim
+STATIONS = 4
+
+
+def production_rows(count: int = MODULES) -> List[layout_engine.ProductionData]:
+    return [layout_engine.ProductionData(product_name=f"SZ-01-A{i}", pcb_type="sz-01", batch_id="B0001",
+                                         order_number=str(100000 + i // 3), led_codes=["A1"], lens_code=None,
+                                         connector_code=None, row_key=f"row{i}")
+            for i in range(count)]
+
+
+@pytest.fixture
+def claims_path(tmp_path):
+    return str(tmp_path / "fret_claims.sqlite")
+
+
+@pytest.fixture
+def open_claims(claims_path):
+    opened = []
+
+    def open_claims(station: str, lease_seconds: float = 60.0):
+        claims = layout_engine.FretClaims(claims_path, station=station, lease_seconds=lease_seconds)
+        opened.append(claims)
+        return claims
+    yield open_claims
+    for claims in opened:
+        claims.close()
+
+
+def test_claimed_modules_conflict_for_other_stations(open_claims):
+    first, second = open_claims("station-1"), open_claims("station-2")
+    rows = production_rows()
+    first.claim(rows[:FRET], "B0001", "sz-01")
+
+    with pytest.raises(layout_engine.ClaimConflict) as conflict:
+        second.claim(rows[FRET - 2:FRET + 2], "B0001", "sz-01")
+    assert conflict.value.taken == {claims_module.module_key(data) for data in rows[FRET - 2:FRET]}
+    assert second.available(rows) == rows[FRET:]
+    # The claiming station still plans its own modules
+    assert first.available(rows) == rows
+
+
+def test_expired_lease_is_reclaimed(open_claims):
+    crashed, other = open_claims("station-1", lease_seconds=0.2), open_claims("station-2")
+    rows = production_rows()
+    abandoned = crashed.claim(rows[:FRET], "B0001", "sz-01")
+    assert other.available(rows) == rows[FRET:]
+
+    time.sleep(0.3)
+    assert other.available(rows) == rows
+    claim = other.claim(rows[:FRET], "B0001", "sz-01")
+    assert other.complete(claim)
+    # The crashed station learns its modules went elsewhere
+    assert not crashed.complete(abandoned)
+
+
+def test_restarted_station_takes_over_its_claims(open_claims):
+    rows = production_rows()
+    before = open_claims("station-1")
+    old = before.claim(rows[:FRET], "B0001", "sz-01")
+    after = open_claims("station-1")
+    new = after.claim(rows[:FRET], "B0001", "sz-01")
+
+    assert new.id != old.id
+    assert after.pending() == 1
+    assert open_claims("station-2").available(rows) == rows[FRET:]
+
+
+def test_completed_modules_are_taken_for_every_station(open_claims):
+    first, second = open_claims("station-1"), open_claims("station-2")
+    rows = production_rows()
+    assert first.complete(first.claim(rows[:FRET], "B0001", "sz-01"), "0001_sz-01_001.svg")
+
+    assert first.available(rows) == rows[FRET:]
+    assert second.available(rows) == rows[FRET:]
+    with pytest.raises(layout_engine.ClaimConflict):
+        first.claim(rows[:1], "B0001", "sz-01")
+    assert first.progress("B0001") == {"station-1": {"done_modules": FRET, "done_claims": 1}}
+
+
+def test_released_modules_are_free_again(open_claims):
+    first, second = open_claims("station-1"), open_claims("station-2")
+    rows = production_rows()
+    first.release(first.claim(rows[:FRET], "B0001", "sz-01"))
+    assert second.available(rows) == rows
+
+
+# One station process: claim and complete random free frets until no module is left
+def engrave_all(claims_path: str, station: str, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    rows = production_rows()
+    claims = layout_engine.FretClaims(claims_path, station=station)
+    engraved = []
+    try:
+        while True:
+            free = claims.available(rows)
+            if not free:
+                return engraved
+            fret = rng.sample(free, min(FRET, len(free)))
+            try:
+                claim = claims.claim(fret, "B0001", "sz-01")
+            except layout_engine.ClaimConflict:
+                continue
+            assert claims.complete(claim)
+            engraved.extend(claim.module_keys)
+    finally:
+        claims.close()
+
+
+def test_no_module_is_engraved_twice_across_processes(claims_path):
+    layout_engine.FretClaims(claims_path).close()
+    with multiprocessing.Pool(STATIONS) as pool:
+        results = pool.starmap(engrave_all, [(claims_path, f"station-{i}", i) for i in range(STATIONS)])
+
+    engraved = [key for keys in results for key in keys]
+    assert len(engraved) == len(set(engraved))
+    assert set(engraved) == {claims_module.module_key(data) for data in production_rows()}
@@ -0,0 +1,109 @@
+"""Compact SVG export places the same codes as the default export.
+
+Every compact file is resolved back to placed codes (content, position,
+rotation, size) and checked against the default file: same codes in the same
+order, positions and sizes within the 0.001 mm rounding. `compact_bench.py`
+runs the same check over its larger exports.
+"""
+
+import math
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, List, Tuple
+
+import pytest
+
+import layout_engine
+from synthetic import DEFAULT_PCBS, available_pcbs, build_dataset
+
+SVG = "{http://www.w3.org/2000/svg}"
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+# Half of the 0.001 mm rounding, plus float noise
+TOLERANCE = 0.0005 + 1e-9
+
+# (content, x, y, angle, size): content is the text or path data, size the font size or path scale
+Placement = Tuple[str, float, float, float, float]
+
+
+def _transform(value: str) -> Dict[str, List[float]]:
+    return {name: [float(number) for number in re.split(r"[\s,]+", arguments.strip())]
+            for name, arguments in re.findall(r"(\w+)\(([^)]*)\)", value or "")}
+
+
+def _placement(element, x: float, y: float, angle: float) -> Placement:
+    if element.tag == f"{SVG}text":
+        return element.text.replace(chr(8202), ""), x, y, angle, float(element.get('font-size'))
+    return element.get('d'), x, y, angle, _transform(element.get('transform'))['scale'][0]
+
+
+# Placed codes of an exported file, in document order
+def placements(root) -> List[Placement]:
+    symbols = {symbol.get('id'): symbol[0] for symbol in root.iter(f"{SVG}symbol")}
+    result = []
+    for element in root.iter():
+        if element.tag == f"{SVG}use":
+            transform = _transform(element.get('transform'))
+            x, y = transform['translate']
+            result.append(_placement(symbols[element.get(XLINK_HREF).lstrip('#')], x, y, transform['rotate'][0]))
+        elif element.tag == f"{SVG}text" and element.get('transform'):
+            angle, x, y = _transform(element.get('transform'))['rotate']
+            result.append(_placement(element, x, y, angle))
+        elif element.tag == f"{SVG}path" and 'translate' in (element.get('transform') or ""):
+            transform = _transform(element.get('transform'))
+            x, y = transform['translate']
+            result.append(_placement(element, x, y, transform['rotate'][0]))
+    return result
+
+
+def same_placement(expected: Placement, actual: Placement) -> bool:
+    # Sizes are relative: font sizes round to 0.001, path scales keep 6 significant digits
+    return (expected[0] == actual[0]
+            and all(abs(a - b) <= TOLERANCE for a, b in zip(expected[1:4], actual[1:4]))
+            and math.isclose(expected[4], actual[4], rel_tol=1e-3))
+
+
+# Number of files whose compact placements differ from the default ones
+def mismatched_files(expected: List[List[Placement]], actual: List[List[Placement]]) -> int:
+    return sum(1 for a, b in zip(expected, actual)
+               if len(a) != len(b) or not all(same_placement(x, y) for x, y in zip(a, b)))
+
+
+@pytest.fixture(scope='module')
+def frets(tmp_path_factory):
+    data_dir = str(tmp_path_factory.mktemp("data"))
+    production_file = build_dataset(data_dir, DEFAULT_PCBS, 40, seed=3)
+    offsets = available_pcbs(DEFAULT_PCBS)
+    production_data = layout_engine.load_production_data(production_file, offsets, [])
+    result = []
+    for pcb in DEFAULT_PCBS:
+        layout = layout_engine.apply_offsets(layout_engine.compile_layout(pcb.name, data_dir), pcb.name, offsets)
+        instances = layout_engine.plan_instances(production_data, pcb.name, layout)
+        result.extend((layout_engine.export_file_name(instance, n), layout, instance)
+                      for n, instance in enumerate(instances, start=1) if instance.data)
+    return result
+
+
+def _export(frets, directory: str, **options) -> List[List[Placement]]:
+    os.makedirs(directory)
+    files = []
+    for name, layout, instance in frets:
+        file_path = os.path.join(directory, name)
+        layout_engine.write_svg(layout_engine.render_svg(layout, instance, file_path, **options))
+        files.append(placements(ElementTree.parse(file_path).getroot()))
+    return files
+
+
+def test_compact_export_keeps_geometry(frets, tmp_path):
+    expected = _export(frets, str(tmp_path / "default"))
+    actual = _export(frets, str(tmp_path / "compact"), compact=True)
+    assert all(expected), "every fret places codes"
+    assert mismatched_files(expected, actual) == 0
+
+
+def test_mismatch_is_detected():
+    placed = [("1A2", 10.0, 20.0, 90.0, 1.2), ("1A3", 30.0, 20.0, 90.0, 1.2)]
+    assert mismatched_files([placed], [[("1A2", 10.0004, 20.0, 90.0, 1.2001), placed[1]]]) == 0
+    assert mismatched_files([placed], [[("1A2", 10.002, 20.0, 90.0, 1.2), placed[1]]]) == 1
+    assert mismatched_files([placed], [[placed[1], placed[0]]]) == 1
+    assert mismatched_files([placed], [placed[:1]]) == 1
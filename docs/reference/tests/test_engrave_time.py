@@ -0,0 +1,74 @@
+"""Engrave-time calibration recovers a laser's parameters and counts all marked work.
+
+Logged engravings are simulated from a known profile. With varied frets the
+fit must recover it; when every fret uses one text height, so the marked
+length is a multiple of the glyph count, mark speed must keep its prior value
+and the estimates still fit. Micro-ID dots and QR rectangles add shapes,
+fill and travel to a fret's work, and the handling time is kept apart.
+"""
+
+import random
+
+import pytest
+
+import layout_engine
+from layout_engine import engrave_time
+
+TRUE = layout_engine.LaserProfile("test", setup_seconds=8.0, glyph_seconds=0.035, mark_speed=180.0,
+                                  jump_speed=2500.0, handling_seconds=20.0)
+PRIOR = layout_engine.LaserProfile("test", setup_seconds=5.0, glyph_seconds=0.02, mark_speed=300.0,
+                                   jump_speed=3000.0)
+
+
+def samples(rng, heights, count=40):
+    logged = []
+    for _ in range(count):
+        texts = [(f"A{i}", rng.uniform(0, 40), rng.uniform(0, 40), 0.0, rng.choice(heights))
+                 for i in range(rng.randint(3, 30))]
+        work = engrave_time.fret_work(texts)
+        logged.append((work, TRUE.engrave_seconds(work), TRUE.handling_seconds * rng.uniform(0.8, 1.2)))
+    return logged
+
+
+def test_varied_frets_recover_the_profile():
+    logged = samples(random.Random(1), heights=(1.2, 1.6, 2.4))
+    fitted = engrave_time.calibrate(logged, "test", PRIOR)
+
+    assert fitted.setup_seconds == pytest.approx(TRUE.setup_seconds, rel=0.01)
+    assert fitted.glyph_seconds == pytest.approx(TRUE.glyph_seconds, rel=0.02)
+    assert fitted.mark_speed == pytest.approx(TRUE.mark_speed, rel=0.01)
+    assert fitted.jump_speed == pytest.approx(TRUE.jump_speed, rel=0.01)
+    assert fitted.handling_seconds == pytest.approx(TRUE.handling_seconds, rel=0.05)
+    assert engrave_time.mean_error(fitted, logged) < 0.05
+
+
+def test_collinear_mark_length_keeps_its_prior():
+    logged = samples(random.Random(2), heights=(1.6,))
+    fitted = engrave_time.calibrate(logged, "test", PRIOR)
+
+    assert fitted.mark_speed == PRIOR.mark_speed
+    assert fitted.glyph_seconds > 0 and fitted.jump_speed > 0
+    assert engrave_time.mean_error(fitted, logged) < 0.05
+
+
+def test_codes_add_work():
+    texts = [("A1", 0.0, 0.0, 0.0, 1.6), ("B2", 10.0, 0.0, 0.0, 1.6)]
+    plain = engrave_time.fret_work(texts)
+    coded = engrave_time.fret_work(texts, micro_ids=[(1, 0.0, 5.0), (2, 10.0, 5.0)],
+                                   qr_codes=[("https://example.com/f", 20.0, 0.0, 4.0)])
+
+    assert (coded.glyphs, coded.stroke_mm) == (plain.glyphs, plain.stroke_mm)
+    assert plain.shapes == 0 and plain.fill_mm == 0
+    assert coded.shapes > 4 and coded.fill_mm > 0
+    assert coded.travel_mm > plain.travel_mm
+    assert TRUE.engrave_seconds(coded) > TRUE.engrave_seconds(plain)
+    assert TRUE.estimate(plain) == pytest.approx(TRUE.handling_seconds + TRUE.engrave_seconds(plain))
+
+
+def test_handling_is_logged_apart(tmp_path):
+    path = str(tmp_path / "engrave_times.jsonl")
+    work = engrave_time.fret_work([("A1", 0.0, 0.0, 0.0, 1.6)])
+    layout_engine.log_engraving(path, "test", "f.svg", work, 30.0, 12.5)
+    layout_engine.log_engraving(path, "test", "g.svg", work, 42.0)
+
+    assert engrave_time.read_samples(path) == {"test": [(work, 30.0, 12.5), (work, 42.0, None)]}
@@ -0,0 +1,119 @@
+"""The export cache reuses a fret's SVG only when the output would be identical.
+
+Frets of a synthetic production list are exported through a cache: a repeat
+is a hit with the same bytes, a changed fret a miss, and a later edit of an
+exported file does not reach the cache. Keys follow the glyph library's
+content rather than its path. Eviction drops the least recently used entries
+first, and any entry older than `max_age`.
+"""
+
+import os
+import time
+
+import pytest
+
+import layout_engine
+from synthetic import SyntheticPCB, available_pcbs, build_dataset
+
+PCB = SyntheticPCB("sz-04", 4, 5, 4, pitch=22.0)
+
+
+@pytest.fixture(scope='module')
+def frets(tmp_path_factory):
+    data_dir = str(tmp_path_factory.mktemp("export-cache"))
+    production_file = build_dataset(data_dir, [PCB], 100, seed=2)
+    production_data = layout_engine.load_production_data(production_file, available_pcbs([PCB]), [])
+    layout = layout_engine.apply_offsets(layout_engine.compile_layout(PCB.name, data_dir), PCB.name,
+                                         available_pcbs([PCB]))
+    instances = layout_engine.plan_instances(production_data, PCB.name, layout)
+    return layout, [instance for instance in instances if instance.data]
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_repeated_fret_is_a_hit(frets, tmp_path):
+    layout, instances = frets
+    cache = layout_engine.ExportCache(str(tmp_path / "cache"))
+    first, second = str(tmp_path / "first.svg"), str(tmp_path / "second.svg")
+
+    assert not cache.export(layout, instances[0], first)
+    assert cache.export(layout, instances[0], second)
+    assert read(first) == read(second)
+    assert not cache.export(layout, instances[1], str(tmp_path / "other.svg"))
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.stats()['entries'] == 2
+
+
+def test_edited_export_does_not_change_the_cache(frets, tmp_path):
+    layout, instances = frets
+    cache = layout_engine.ExportCache(str(tmp_path / "cache"))
+    first, second = str(tmp_path / "first.svg"), str(tmp_path / "second.svg")
+    cache.export(layout, instances[0], first)
+    rendered = read(first)
+    cache.export(layout, instances[0], second)
+    with open(second, 'a') as f:
+        f.write("<!-- edited -->")
+
+    third = str(tmp_path / "third.svg")
+    assert cache.export(layout, instances[0], third)
+    assert read(third) == rendered
+
+
+def test_key_follows_glyph_library_content(frets, tmp_path):
+    layout, instances = frets
+    glyphs = str(tmp_path / "glyphs.json")
+    with open(glyphs, 'w') as f:
+        f.write('{"version": 1}')
+    before = layout_engine.fret_key(layout, instances[0], outline_glyphs=glyphs)
+
+    stat = os.stat(glyphs)
+    with open(glyphs, 'w') as f:
+        f.write('{"version": 2}')
+    os.utime(glyphs, (stat.st_atime, stat.st_mtime + 10))
+    assert layout_engine.fret_key(layout, instances[0], outline_glyphs=glyphs) != before
+
+    with open(glyphs, 'w') as f:
+        f.write('{"version": 1}')
+    os.utime(glyphs, (stat.st_atime, stat.st_mtime + 20))
+    assert layout_engine.fret_key(layout, instances[0], outline_glyphs=glyphs) == before
+
+
+def test_least_recently_used_entries_are_evicted(frets, tmp_path):
+    layout, instances = frets
+    cache = layout_engine.ExportCache(str(tmp_path / "cache"))
+    now = time.time()
+    entries = []
+    for age, instance in enumerate(instances[:4]):
+        cache.export(layout, instance, str(tmp_path / f"{age}.svg"))
+        entry = cache.path_for(layout_engine.fret_key(layout, instance, f"{age}.svg"))
+        os.utime(entry, (now - age * 60, now - age * 60))
+        entries.append(entry)
+
+    sizes = [os.path.getsize(entry) for entry in entries]
+    cache.max_bytes = sum(sizes[:2])
+    assert cache.evict() == 2
+    assert [os.path.exists(entry) for entry in entries] == [True, True, False, False]
+
+    # A hit counts as a use, so the older entry now outlives the one not used since
+    cache.export(layout, instances[1], str(tmp_path / "again.svg"))
+    cache.max_bytes = max(sizes[:2])
+    assert cache.evict() == 1
+    assert [os.path.exists(entry) for entry in entries[:2]] == [False, True]
+
+
+def test_entries_past_max_age_are_evicted(frets, tmp_path):
+    layout, instances = frets
+    cache = layout_engine.ExportCache(str(tmp_path / "cache"), max_age=3600)
+    fresh, stale = str(tmp_path / "fresh.svg"), str(tmp_path / "stale.svg")
+    cache.export(layout, instances[0], fresh)
+    cache.export(layout, instances[1], stale)
+    entry = cache.path_for(layout_engine.fret_key(layout, instances[1], "stale.svg"))
+    os.utime(entry, (time.time() - 7200, time.time() - 7200))
+
+    assert cache.evict() == 1
+    assert not os.path.exists(entry)
+    assert cache.stats()['entries'] == 1
+    assert cache.export(layout, instances[0], str(tmp_path / "again.svg"))
@@ -0,0 +1,161 @@
+"""The Batch Export journal survives crashes and only allows legal fret moves.
+
+A job is planned and its frets advanced, the queue is reopened as after a
+restart, and its frets must come back in the states and with the files they
+had. A last line cut short by a crash is ignored and does not swallow the
+next event; finished jobs are compacted away; and moves outside
+`jobs.TRANSITIONS` are refused.
+"""
+
+import json
+import os
+
+import pytest
+
+import layout_engine
+from layout_engine import jobs
+
+FRETS = 4
+MODULES = 6  # per fret
+
+
+def planned_frets():
+    frets = []
+    for index in range(FRETS):
+        instance = layout_engine.PCBInstance(MODULES, 2, 3)
+        instance.data = [layout_engine.ProductionData(
+            product_name=f"SZ-01-A{i}", pcb_type="sz-01", batch_id="B0001", order_number="100000",
+            led_codes=["A1"], lens_code=None, connector_code=None, row_key=f"row{index * MODULES + i}")
+            for i in range(MODULES)]
+        frets.append((f"B0001_sz-01_{index + 1:03d}.svg", instance))
+    return frets
+
+
+# Write an exported file for a fret and move it to `exported`
+def export(queue, job, fret, export_dir):
+    path = os.path.join(export_dir, fret.file_name)
+    with open(path, 'w') as f:
+        f.write(f"<svg>{fret.index}</svg>")
+    queue.advance(job, fret, jobs.EXPORTED, path)
+    return path
+
+
+@pytest.fixture
+def job_dir(tmp_path):
+    return str(tmp_path / "jobs")
+
+
+@pytest.fixture
+def export_dir(tmp_path):
+    directory = tmp_path / "export"
+    directory.mkdir()
+    return str(directory)
+
+
+def test_replay_restores_fret_states(job_dir, export_dir):
+    queue = jobs.JobQueue(job_dir)
+    job = queue.plan("sz-01", "B0001", 2, 3, planned_frets())
+    path = export(queue, job, job.frets[0], export_dir)
+    queue.advance(job, job.frets[0], jobs.LOADED)
+    export(queue, job, job.frets[1], export_dir)
+    queue.close()
+
+    queue = jobs.JobQueue(job_dir)
+    try:
+        [replayed] = queue.unfinished()
+        assert replayed.job_id == job.job_id
+        assert [fret.state for fret in replayed.frets] == [jobs.LOADED, jobs.EXPORTED, jobs.PLANNED, jobs.PLANNED]
+        assert replayed.frets[0].file_path == path and replayed.frets[0].file_intact()
+        assert replayed.frets[0].instance(2, 3).data == planned_frets()[0][1].data
+        assert queue.find_fret(path) == (replayed, replayed.frets[0])
+    finally:
+        queue.close()
+
+
+def test_torn_last_line_is_ignored(job_dir, export_dir):
+    queue = jobs.JobQueue(job_dir)
+    job = queue.plan("sz-01", "B0001", 2, 3, planned_frets())
+    export(queue, job, job.frets[0], export_dir)
+    queue.close()
+    torn = json.dumps({'event': 'state', 'job': job.job_id, 'fret': 1, 'state': jobs.EXPORTED})
+    with open(queue.path, 'a') as f:
+        f.write(torn[:len(torn) // 2])
+
+    queue = jobs.JobQueue(job_dir)
+    [job] = queue.unfinished()
+    assert [fret.state for fret in job.frets] == [jobs.EXPORTED] + [jobs.PLANNED] * (FRETS - 1)
+    # The next event goes on a line of its own and survives the next restart
+    export(queue, job, job.frets[2], export_dir)
+    queue.close()
+
+    queue = jobs.JobQueue(job_dir)
+    try:
+        [job] = queue.unfinished()
+        assert [fret.state for fret in job.frets] == [jobs.EXPORTED, jobs.PLANNED, jobs.EXPORTED, jobs.PLANNED]
+    finally:
+        queue.close()
+
+
+def test_finished_jobs_are_compacted(job_dir, export_dir):
+    queue = jobs.JobQueue(job_dir)
+    done = queue.plan("sz-01", "B0001", 2, 3, planned_frets())
+    for fret in done.frets:
+        export(queue, done, fret, export_dir)
+        queue.advance(done, fret, jobs.LOADED)
+        queue.advance(done, fret, jobs.ENGRAVED)
+    abandoned = queue.plan("sz-01", "B0001", 2, 3, planned_frets())
+    queue.abandon(abandoned)
+    kept = queue.plan("sz-01", "B0002", 2, 3, planned_frets())
+    export(queue, kept, kept.frets[0], export_dir)
+    queue.close()
+    size = os.path.getsize(queue.path)
+
+    queue = jobs.JobQueue(job_dir)
+    try:
+        assert list(queue.jobs) == [kept.job_id]
+        assert os.path.getsize(queue.path) < size
+        events = jobs.read_events(queue.path)
+        assert {event['job'] for event in events} == {kept.job_id}
+        assert [fret.state for fret in queue.jobs[kept.job_id].frets] == [jobs.EXPORTED] + [jobs.PLANNED] * 3
+    finally:
+        queue.close()
+
+
+@pytest.mark.parametrize('path, state', [
+    ((), jobs.LOADED),
+    ((), jobs.ENGRAVED),
+    ((jobs.EXPORTED, jobs.LOADED, jobs.ENGRAVED), jobs.EXPORTED),
+    ((jobs.SKIPPED,), jobs.EXPORTED),
+    ((jobs.EXPORTED, jobs.LOADED, jobs.ENGRAVED), jobs.SKIPPED),
+])
+def test_illegal_transitions_are_refused(job_dir, export_dir, path, state):
+    queue = jobs.JobQueue(job_dir)
+    try:
+        job = queue.plan("sz-01", "B0001", 2, 3, planned_frets())
+        fret = job.frets[0]
+        for step in path:
+            if step == jobs.EXPORTED:
+                export(queue, job, fret, export_dir)
+            else:
+                queue.advance(job, fret, step)
+        before = fret.state
+        with pytest.raises(jobs.JobStateError):
+            queue.advance(job, fret, state)
+        assert fret.state == before
+    finally:
+        queue.close()
+
+
+def test_lost_file_can_be_exported_again(job_dir, export_dir):
+    queue = jobs.JobQueue(job_dir)
+    try:
+        job = queue.plan("sz-01", "B0001", 2, 3, planned_frets())
+        fret = job.frets[0]
+        path = export(queue, job, fret, export_dir)
+        queue.advance(job, fret, jobs.LOADED)
+        os.remove(path)
+        assert not fret.file_intact()
+        export(queue, job, fret, export_dir)
+        assert fret.state == jobs.EXPORTED and fret.file_intact()
+    finally:
+        queue.close()
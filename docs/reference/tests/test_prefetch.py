@@ -0,0 +1,40 @@
+"""The export prefetch worker never imports the viewer script.
+
+A script standing in for the viewer prints a line whenever it is imported and
+starts an `ExportPrefetcher` with spawned worker processes, as on Windows.
+The worker must run its task without importing the script again.
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+
+REFERENCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VIEWER = textwrap.dedent("""
+    import multiprocessing
+    import os
+    import sys
+
+    print("imported", flush=True)
+
+    if __name__ == "__main__":
+        multiprocessing.set_start_method('spawn')
+        sys.path.insert(0, sys.argv[1])
+        import layout_engine
+        prefetcher = layout_engine.ExportPrefetcher(layout_engine.ExportCache(sys.argv[2]), sys.argv[2])
+        try:
+            print("worker", prefetcher._pool.submit(os.getpid).result() != os.getpid(), flush=True)
+        finally:
+            prefetcher.close()
+""")
+
+
+def test_spawned_worker_does_not_import_the_viewer(tmp_path):
+    script = tmp_path / "viewer.py"
+    script.write_text(VIEWER)
+    result = subprocess.run([sys.executable, str(script), REFERENCE_DIR, str(tmp_path / "cache")],
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines() == ["imported", "worker True"]
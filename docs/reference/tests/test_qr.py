@@ -0,0 +1,54 @@
+"""QR code matrices against known answers from reference encoders.
+
+Each case of `qr_reference.CASES` is encoded and compared module for module
+with the reference matrix: every error correction level, versions 1 to 23
+(version information from 7 on), forced masks and masks picked by penalty.
+"""
+
+import numpy as np
+import pytest
+
+from layout_engine import qr
+from qr_reference import CASES
+
+
+def _reference(rows) -> np.ndarray:
+    size = len(rows)
+    return np.array([[int(bit) for bit in format(int(row, 16), f"0{len(row) * 4}b")[:size]] for row in rows],
+                    dtype=np.uint8)
+
+
+@pytest.mark.parametrize('payload, level, mask, reference_mask, version, rows', CASES,
+                         ids=[f"v{case[4]}-{case[1]}-mask{case[2]}" for case in CASES])
+def test_matrix_matches_reference(payload, level, mask, reference_mask, version, rows):
+    modules = qr.matrix(payload, level, mask)
+    assert modules.shape == (17 + 4 * version,) * 2
+    assert np.array_equal(modules, _reference(rows))
+
+
+def test_cases_cover_every_level_and_version_information():
+    assert {case[1] for case in CASES} == set(qr.ERROR_LEVELS)
+    assert max(case[4] for case in CASES) >= 7
+    assert any(case[2] is None for case in CASES)
+
+
+@pytest.mark.parametrize('payload, level, mask, reference_mask, version, rows', CASES[:4],
+                         ids=[f"v{case[4]}-{case[1]}" for case in CASES[:4]])
+def test_rectangles_cover_the_dark_modules(payload, level, mask, reference_mask, version, rows):
+    modules = qr.matrix(payload, level, mask)
+    drawn = np.zeros_like(modules)
+    for col, row, width, height in qr.rectangles(modules):
+        assert not drawn[row:row + height, col:col + width].any()
+        drawn[row:row + height, col:col + width] = 1
+    assert np.array_equal(drawn, modules)
+
+
+@pytest.mark.parametrize('payload, level, mask', [
+    ("", "H", None),
+    ("A", "X", None),
+    ("A", "L", 8),
+    ("x" * 1300, "H", None),
+])
+def test_invalid_input_is_rejected(payload, level, mask):
+    with pytest.raises(qr.QRCodeError):
+        qr.matrix(payload, level, mask)
@@ -0,0 +1,135 @@
+"""Micro-ID scan verification finds the defects planted in synthetic scans.
+
+A synthetic production list with a Serial column is exported through a
+production store, so the fret has its slot assignments and serials. Then a
+scan of the engraved fret is rendered as `scan_verify` expects it: a greyscale
+PNG of the PCB outline with blur, noise, uneven lighting and each code up to
+0.1 mm off its layout position. One slot each gets a missing data dot (Read
+Error), another module's serial (mismatch), no code at all or no orientation
+dot; every other slot must read back as its own serial. `scan_verify_bench.py`
+renders its scans the same way.
+"""
+
+import os
+import random
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+
+import layout_engine
+from layout_engine import micro_id, scan_verify
+from synthetic import SyntheticPCB, available_pcbs, build_dataset
+
+DEFECTS = ("missing_dot", "wrong_serial", "no_code", "no_orientation")
+JITTER = 0.1  # mm a code may be engraved off its position
+PIXELS_PER_MM = 40.0
+MICRO_ID_PCB = SyntheticPCB("sz-id", 6, 6, 1, pitch=16.0, micro_id=True)
+
+
+# Render the scan of an engraved fret; `codes` maps slots to (serial, defect)
+def render_scan(micro_id, layout: Dict[str, Any], codes: Dict[int, Tuple[int, Optional[str]]], path: str,
+                pixels_per_mm: float, rng: random.Random):
+    width, height = float(layout['Width']), float(layout['Height'])
+    left = float(layout['CenterPoint']['x']) - width / 2
+    top = float(layout['CenterPoint']['y']) - height / 2
+    image = Image.new('L', (round(width * pixels_per_mm), round(height * pixels_per_mm)), 200)
+    draw = ImageDraw.Draw(image)
+    radius = micro_id.DOT_DIAMETER / 2 * pixels_per_mm
+    for slot, (serial, defect) in codes.items():
+        if defect == "no_code":
+            continue
+        grid = micro_id.encode([serial])[0]
+        if defect == "missing_dot":
+            row, col = rng.choice([cell for cell in micro_id.STREAM_CELLS if grid[cell]])
+            grid[row, col] = 0
+        dots = micro_id.dot_centers(grid)
+        if defect == "no_orientation":
+            dots = dots[1:]
+        position = layout['Modules'][slot]['micro_id_position']
+        corner_x = float(position['x']) - left - micro_id.CODE_SIZE / 2 + rng.uniform(-JITTER, JITTER)
+        corner_y = float(position['y']) - top - micro_id.CODE_SIZE / 2 + rng.uniform(-JITTER, JITTER)
+        for x, y in dots:
+            cx, cy = (corner_x + x) * pixels_per_mm, (corner_y + y) * pixels_per_mm
+            draw.ellipse((cx - radius, cy - radius, cx + radius, cy + radius), fill=rng.randint(30, 70))
+    image = image.filter(ImageFilter.GaussianBlur(pixels_per_mm * 0.01))
+    pixels = np.asarray(image, dtype=np.float32)
+    # Lighting falling off across the fret, and sensor noise
+    pixels += np.linspace(-25, 25, pixels.shape[1], dtype=np.float32)[None, :]
+    pixels += np.random.default_rng(rng.randrange(2 ** 32)).normal(0, 6, pixels.shape).astype(np.float32)
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(path)
+
+
+# Whether a slot's result is the one its planted defect should give
+def expected_result(scan_verify, result: Dict[str, Any], defect: Optional[str]) -> bool:
+    if defect is None:
+        return result['ok']
+    if defect == "wrong_serial":
+        return not result['ok'] and result['error'] is None and result['read'] is not None
+    return result['error'] == {"missing_dot": scan_verify.READ_ERROR, "no_code": scan_verify.ANCHORS_NOT_FOUND,
+                               "no_orientation": scan_verify.ORIENTATION_NOT_DETECTED}[defect]
+
+
+@pytest.fixture(scope='module')
+def fret(tmp_path_factory):
+    work_dir = str(tmp_path_factory.mktemp("scan-verify"))
+    rng = random.Random(5)
+    data_dir = os.path.join(work_dir, "data")
+    production_file = build_dataset(data_dir, [MICRO_ID_PCB], 36, seed=5,
+                                    first_serial=rng.randint(micro_id.MIN_SERIAL, micro_id.MAX_SERIAL - 35))
+    offsets = available_pcbs([MICRO_ID_PCB])
+    store = layout_engine.ProductionStore(os.path.join(work_dir, "production.sqlite"))
+    try:
+        store.import_csv(production_file, offsets, [])
+        production_data = store.modules(store.current_batches(production_file), MICRO_ID_PCB.name)
+        layout = layout_engine.compile_layout(MICRO_ID_PCB.name, data_dir)
+        instance = next(instance for instance in layout_engine.plan_instances(production_data, MICRO_ID_PCB.name,
+                                                                              layout) if instance.data)
+        file_name = layout_engine.export_file_name(instance, 1)
+        store.assign_fret(instance, file_name, micro_ids=True)
+        slots = {int(row['slot']): int(row['serial']) for row in store.fret_modules(file_name)}
+        defects = dict(zip(rng.sample(sorted(slots), len(DEFECTS)), DEFECTS))
+        codes = {}
+        for slot, serial in slots.items():
+            defect = defects.get(slot)
+            if defect == "wrong_serial":
+                serial = serial % micro_id.MAX_SERIAL + 1
+            codes[slot] = (serial, defect)
+        path = os.path.join(work_dir, os.path.splitext(file_name)[0] + ".png")
+        render_scan(micro_id, layout, codes, path, PIXELS_PER_MM, rng)
+        scans, skipped = scan_verify.plan_scans(store, data_dir, [path, os.path.join(work_dir, "9999_sz-id_001.png")])
+    finally:
+        store.close()
+    return {
+        'slots': slots,
+        'planted': {slot: defect for slot, (_, defect) in codes.items()},
+        'scans': scans,
+        'skipped': skipped,
+        'entries': scan_verify.verify_scans(scans, 1),
+    }
+
+
+def test_plan_expects_the_exported_serials(fret):
+    assert len(fret['scans']) == 1
+    _, _, expected = fret['scans'][0]
+    assert expected == fret['slots']
+
+
+def test_scan_without_export_is_skipped(fret):
+    assert fret['skipped'] == [{'scan': "9999_sz-id_001.png",
+                                'error': "No export of this fret in the production store"}]
+
+
+@pytest.mark.parametrize('defect', (None,) + DEFECTS)
+def test_planted_defect_is_reported(fret, defect):
+    [entry] = fret['entries']
+    results = [result for result in entry['slots'] if fret['planted'][result['slot']] == defect]
+    assert results
+    for result in results:
+        assert expected_result(scan_verify, result, defect), result
+
+
+def test_mismatches_are_counted(fret):
+    [entry] = fret['entries']
+    assert entry['mismatches'] == len(DEFECTS)
@@ -0,0 +1,142 @@
+"""The production store keeps module IDs and export history across imports and upgrades.
+
+A synthetic production list is imported, re-imported unchanged, rewritten
+and forced; module IDs must survive every import, rows that leave the list
+are hidden but kept, and `current_batches` follows the last import. A
+database created before the serial columns existed is opened and upgraded
+in place. A file's modules come from its latest export only, however quickly
+it was exported again, with whether that export drew their Micro-IDs.
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+import layout_engine
+from layout_engine import store as store_module
+from synthetic import SyntheticPCB, available_pcbs, build_dataset, write_production_list
+
+PCB = SyntheticPCB("sz-01", 3, 4, 1, pitch=16.0)
+
+
+@pytest.fixture
+def production_file(tmp_path):
+    return build_dataset(str(tmp_path / "data"), [PCB], 12, seed=3)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = layout_engine.ProductionStore(str(tmp_path / "production.sqlite"))
+    yield store
+    store.close()
+
+
+# Module IDs by row key of the modules currently in the list
+def module_ids(store, production_file):
+    return {data.row_key: data.module_id
+            for data in store.modules(store.current_batches(production_file), PCB.name)}
+
+
+# Rewrite the production list and give it a new mtime, so the next import sees it changed
+def rewrite(production_file, modules, batch_id="B0001", seed=3):
+    stat = os.stat(production_file)
+    write_production_list(production_file, [PCB], modules, batch_id=batch_id, seed=seed)
+    os.utime(production_file, (stat.st_atime, stat.st_mtime + 10))
+
+
+def test_unchanged_file_is_not_reimported(store, production_file):
+    offsets = available_pcbs([PCB])
+    assert store.import_csv(production_file, offsets, [])
+    ids = module_ids(store, production_file)
+    assert len(ids) == 12
+
+    assert not store.import_csv(production_file, offsets, [])
+    assert store.import_csv(production_file, offsets, [], force=True)
+    assert module_ids(store, production_file) == ids
+
+
+def test_rows_keep_their_ids_and_removed_rows_are_hidden(store, production_file):
+    offsets = available_pcbs([PCB])
+    store.import_csv(production_file, offsets, [])
+    ids = module_ids(store, production_file)
+
+    rewrite(production_file, 6)
+    assert store.import_csv(production_file, offsets, [])
+    kept = module_ids(store, production_file)
+    assert len(kept) == 6
+    assert all(ids[row_key] == module_id for row_key, module_id in kept.items())
+    hidden = store.conn.execute("SELECT COUNT(*) FROM modules WHERE present = 0").fetchone()[0]
+    assert hidden == 6
+
+
+def test_current_batches_follow_the_last_import(store, production_file):
+    offsets = available_pcbs([PCB])
+    assert store.current_batches(production_file) == []
+    store.import_csv(production_file, offsets, [])
+    assert store.current_batches(production_file) == ["B0001"]
+
+    rewrite(production_file, 12, batch_id="B0002")
+    store.import_csv(production_file, offsets, [])
+    assert store.current_batches(production_file) == ["B0002"]
+    # The earlier batch stays in the store for its fret history
+    assert len(store.modules(["B0001"], PCB.name)) == 12
+
+
+def test_old_database_is_upgraded(tmp_path, production_file):
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    old_schema = store_module.SCHEMA
+    for table, column, column_type in store_module.ADDED_COLUMNS:
+        old_schema = old_schema.replace(f"    {column} {column_type},\n", "")
+    conn.executescript(old_schema)
+    conn.execute("INSERT INTO modules (source, row_key, batch_id, product_name, pcb_type, led_codes, seq, created)"
+                 " VALUES ('manual', 'manual#0', 'B0000', 'SZ-01-A1', 'sz-01', 'A1', 0, '2024-01-01T00:00:00')")
+    conn.commit()
+    assert "serial" not in {row[1] for row in conn.execute("PRAGMA table_info(modules)")}
+    conn.close()
+
+    store = layout_engine.ProductionStore(path)
+    try:
+        for table, column, _ in store_module.ADDED_COLUMNS:
+            assert column in {row['name'] for row in store.conn.execute(f"PRAGMA table_info({table})")}
+        [old] = store.modules(["B0000"])
+        assert old.led_codes == ["A1"] and old.serial is None
+        assert store.import_csv(production_file, available_pcbs([PCB]), [])
+        assert len(module_ids(store, production_file)) == 12
+    finally:
+        store.close()
+
+
+# A fret of the first `count` modules of the store, with serials from 100
+def fret(store, production_file, count=6, faulty=()):
+    instance = layout_engine.PCBInstance(count, 2, count // 2)
+    instance.data = store.modules(store.current_batches(production_file), PCB.name)[:count - len(faulty)]
+    for serial, data in enumerate(instance.data, start=100):
+        data.serial = serial
+    for slot in faulty:
+        instance.faulty_modules[slot] = True
+    return instance
+
+
+def test_fret_modules_follow_the_latest_export(store, production_file):
+    store.import_csv(production_file, available_pcbs([PCB]), [])
+    store.assign_fret(fret(store, production_file), "B0001_sz-01_001.svg", micro_ids=True)
+    # Exported again within the same second, with a faulty slot and without Micro-IDs
+    store.assign_fret(fret(store, production_file, faulty=(0,)), "B0001_sz-01_001.svg")
+
+    rows = store.fret_modules("B0001_sz-01_001.svg")
+    assert [row['slot'] for row in rows] == [1, 2, 3, 4, 5]
+    assert not any(row['micro_id'] for row in rows)
+    assert len(store.assignments(int(rows[0]['module_id']))) == 2
+    assert store.fret_modules("B0001_sz-01_002.svg") == []
+
+
+def test_nested_load_is_one_export(store, production_file):
+    store.import_csv(production_file, available_pcbs([PCB]), [])
+    store.assign_frets([fret(store, production_file), fret(store, production_file, 4)], "B0001_load_001.svg",
+                       micro_ids=True)
+
+    rows = store.fret_modules("B0001_load_001.svg")
+    assert len(rows) == 10
+    assert all(row['micro_id'] == 1 for row in rows)